@@ -0,0 +1,176 @@
+"""
+Unit tests for the async API client against a local fake UPID API
+"""
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import Mock
+from upid.core.api_client import UPIDAPIClient
+from upid.core.async_api_client import AsyncUPIDAPIClient, run
+
+DELAY = 0.2
+
+
+class FakeUpidHandler(BaseHTTPRequestHandler):
+    """Answers every GET after a fixed delay, echoing the path; /fail paths return 500
+
+    Requests in flight are counted, and when the server has a barrier each
+    request waits there until as many others have arrived.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.clients.add(self.client_address)
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        if self.server.barrier is not None:
+            self.server.barrier.wait()
+        else:
+            time.sleep(DELAY)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        status = 500 if '/fail' in self.path else 200
+        data = json.dumps({'path': self.path, 'auth': self.headers.get('Authorization')}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upid_server():
+    """Run a fake UPID API on a local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpidHandler)
+    server.requests = []
+    server.clients = set()
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = 0
+    server.barrier = None
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api_config(mock_config, upid_server):
+    """Config pointing at the fake API"""
+    mock_config.set('api_url', f'http://127.0.0.1:{upid_server.server_address[1]}')
+    mock_config.set('local_mode', False)
+    return mock_config
+
+
+def _auth(token='token-1'):
+    auth_manager = Mock()
+    auth_manager.get_token.return_value = token
+    return auth_manager
+
+
+def _uncached(config):
+    return UPIDAPIClient(config, _auth(), use_cache=False)
+
+
+class TestAsyncUPIDAPIClient:
+    """Test the coroutine surface and concurrent fan-out"""
+
+    @pytest.mark.unit
+    def test_same_method_surface(self, mock_config):
+        """Test every public client method has a coroutine of the same name returning the same result"""
+        public = [name for name in vars(UPIDAPIClient)
+                  if not name.startswith(('_', 'iter_')) and callable(getattr(UPIDAPIClient, name))]
+        mock_config.set('local_mode', True)
+
+        async def main():
+            async with AsyncUPIDAPIClient(mock_config, _auth()) as client:
+                return await client.analyze_resources('c1'), await client.get_clusters()
+
+        assert all(asyncio.iscoroutinefunction(getattr(AsyncUPIDAPIClient, name)) for name in public)
+        assert AsyncUPIDAPIClient.analyze_costs.__doc__ == UPIDAPIClient.analyze_costs.__doc__
+        resources, clusters = run(main())
+        sync = UPIDAPIClient(mock_config, _auth())
+        assert resources == sync.analyze_resources('c1')
+        assert clusters == sync.get_clusters()
+
+    @pytest.mark.unit
+    def test_iterators_are_not_coroutines(self):
+        """Test the blocking iter_* methods are left out of the coroutine surface"""
+        assert not hasattr(AsyncUPIDAPIClient, 'iter_clusters')
+        assert not any(name.startswith('iter_') for name in vars(AsyncUPIDAPIClient))
+
+    @pytest.mark.unit
+    def test_hung_call_does_not_block_exit(self):
+        """Test the process exits once the caller gives up on a call that is still running"""
+        code = (
+            "import asyncio, time\n"
+            "from unittest.mock import Mock\n"
+            "from upid.core.async_api_client import AsyncUPIDAPIClient, run\n"
+            "client = Mock()\n"
+            "client.get_clusters = lambda: time.sleep(30)\n"
+            "async def main():\n"
+            "    async with AsyncUPIDAPIClient(None, None, client=client) as api:\n"
+            "        try:\n"
+            "            await asyncio.wait_for(api.get_clusters(), 0.3)\n"
+            "        except asyncio.TimeoutError:\n"
+            "            print('gave up')\n"
+            "run(main())\n"
+        )
+        started = time.monotonic()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20,
+                                cwd=Path(__file__).resolve().parents[2])
+
+        assert result.stdout.strip() == 'gave up'
+        assert time.monotonic() - started < 5
+
+    @pytest.mark.unit
+    def test_gather_runs_endpoints_concurrently(self, api_config, upid_server):
+        """Test twelve calls are all in flight at once and the second batch reuses their connections"""
+        # Every request waits until all twelve have arrived, so fewer at once times out the barrier
+        upid_server.barrier = threading.Barrier(12, timeout=5)
+
+        async def main():
+            async with AsyncUPIDAPIClient(api_config, _auth(), max_concurrency=12,
+                                          client=_uncached(api_config)) as client:
+                calls = {}
+                for cluster_id in ('a', 'b', 'c', 'd'):
+                    calls[(cluster_id, 'resources')] = ('analyze_resources', (cluster_id,))
+                    calls[(cluster_id, 'costs')] = ('analyze_costs', (cluster_id, '7d'))
+                    calls[(cluster_id, 'performance')] = ('analyze_performance', (cluster_id,))
+                first = await client.gather(calls)
+                second = await client.gather(calls)
+                return first, second
+
+        first, second = run(main())
+
+        assert first == second
+        assert first[('b', 'costs')] == {'path': '/v1/clusters/b/analysis/costs?period=7d', 'auth': 'Bearer token-1'}
+        assert len(upid_server.requests) == 24
+        assert upid_server.max_in_flight == 12
+        assert not upid_server.barrier.broken
+        assert len(upid_server.clients) == 12
+
+    @pytest.mark.unit
+    def test_fan_out_keeps_failures_per_call(self, api_config):
+        """Test a failing call yields its exception while the others return"""
+        async def main():
+            async with AsyncUPIDAPIClient(api_config, _auth(), client=_uncached(api_config)) as client:
+                return await client.fan_out('get_cluster', [('ok-1',), ('fail',), ('ok-2',)])
+
+        results = run(main())
+
+        assert results[0]['path'] == '/v1/clusters/ok-1'
+        assert isinstance(results[1], Exception)
+        assert results[2]['path'] == '/v1/clusters/ok-2'
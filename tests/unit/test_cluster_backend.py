@@ -0,0 +1,358 @@
+"""
+Unit tests for the cluster access backends against a local fake API server
+"""
+import sys
+import json
+import threading
+import time
+import pytest
+import yaml
+from click.testing import CliRunner
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+from upid.commands.universal import universal
+from upid.core.cluster_backend import (
+    ApiServerBackend, KubectlBackend, KubeconfigError, create_backend, list_contexts, load_kubeconfig
+)
+from upid.core.cluster_detector import ClusterDetector
+from upid.core.cluster_snapshot import ClusterSnapshot
+from upid.core.watch_cache import WatchingSnapshot
+from upid.core.probe_engine import PROBE_OK, PROBE_FAILED
+
+TOKEN = 'test-token'
+
+LISTS = {
+    '/api/v1/nodes': [
+        {'metadata': {'name': 'kind-control-plane'}, 'status': {'allocatable': {'cpu': '4', 'memory': '8Gi'}}}
+    ],
+    '/api/v1/namespaces': [{'metadata': {'name': 'default'}}, {'metadata': {'name': 'kube-system'}}],
+    '/api/v1/pods': [
+        {'metadata': {'name': f'web-{i}', 'namespace': 'default'}, 'status': {'phase': 'Running'},
+         'spec': {'containers': [{'name': 'web', 'resources': {'requests': {'cpu': '100m', 'memory': '64Mi'}}}]}}
+        for i in range(5)
+    ],
+    '/apis/storage.k8s.io/v1/storageclasses': [{'metadata': {'name': 'standard'}}],
+    '/apis/networking.k8s.io/v1/ingressclasses': [],
+    '/apis/apps/v1/deployments': [{'metadata': {'name': 'prometheus', 'namespace': 'monitoring'}}],
+}
+OBJECTS = {
+    '/apis/apps/v1/namespaces/kube-system/deployments/metrics-server': {'metadata': {'name': 'metrics-server'}},
+    '/apis/metrics.k8s.io/v1beta1/nodes': {'items': [
+        {'metadata': {'name': 'kind-control-plane'}, 'usage': {'cpu': '250000000n', 'memory': '1048576Ki'}}
+    ]},
+    '/apis/metrics.k8s.io/v1beta1/pods': {'items': [
+        {'metadata': {'name': 'web-0', 'namespace': 'default'},
+         'containers': [{'name': 'app', 'usage': {'cpu': '5m', 'memory': '10Mi'}},
+                        {'name': 'proxy', 'usage': {'cpu': '1000000n', 'memory': '2Mi'}}]}
+    ]},
+}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Serves canned lists with limit/continue paging over keep-alive connections"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        server.clients.add(self.client_address)
+        if self.headers.get('Authorization') != f'Bearer {TOKEN}':
+            return self._send(401, {'kind': 'Status', 'message': 'Unauthorized'})
+
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        if parsed.path in OBJECTS:
+            return self._send(200, OBJECTS[parsed.path])
+        if parsed.path not in LISTS:
+            return self._send(404, {'kind': 'Status', 'message': 'the server could not find the requested resource'})
+
+        if params.get('watch'):
+            return self._watch(parsed.path, params)
+
+        items = LISTS[parsed.path]
+        selector = params.get('fieldSelector', [''])[0]
+        if selector.startswith('metadata.name='):
+            items = [item for item in items if item['metadata']['name'] == selector.split('=', 1)[1]]
+        start = int(params.get('continue', ['0'])[0])
+        if start and server.expire_once:
+            server.expire_once = False
+            return self._send(410, {'kind': 'Status', 'message': 'The provided continue parameter is too old'})
+        limit = int(params.get('limit', [len(items) or 1])[0])
+        page = {'kind': 'List', 'metadata': {'resourceVersion': '10'}, 'items': items[start:start + limit]}
+        if start + limit < len(items):
+            page['metadata']['continue'] = str(start + limit)
+        self._send(200, page)
+
+    def _watch(self, path, params):
+        """Serve queued events as newline-delimited JSON, or an idle watch that ends quickly"""
+        self.server.watches.append((path, params['resourceVersion'][0]))
+        events = self.server.watch_events.pop(path, None)
+        if events is None:
+            time.sleep(0.1)
+            events = []
+        data = ''.join(json.dumps(event) + '\n' for event in events).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    """Run a fake API server on a local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApiHandler)
+    server.requests = []
+    server.clients = set()
+    server.expire_once = False
+    server.watches = []
+    server.watch_events = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _write_kubeconfig(path, server, user=None, context='fake-context'):
+    config = {
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'current-context': context,
+        'clusters': [{'name': 'fake', 'cluster': {'server': server}}],
+        'users': [{'name': 'fake-user', 'user': user if user is not None else {'token': TOKEN}}],
+        'contexts': [{'name': context, 'context': {'cluster': 'fake', 'user': 'fake-user'}}],
+    }
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+@pytest.fixture
+def backend(api_server, tmp_path):
+    """ApiServerBackend pointed at the fake API server"""
+    host, port = api_server.server_address
+    kubeconfig = _write_kubeconfig(tmp_path / 'config', f'http://{host}:{port}')
+    backend = ApiServerBackend.from_kubeconfig(kubeconfig)
+    yield backend
+    backend.close()
+
+
+class TestKubeconfig:
+    """Test kubeconfig resolution"""
+
+    @pytest.mark.unit
+    def test_merges_files_first_wins(self, tmp_path):
+        """Test multiple kubeconfig files merge like kubectl"""
+        first = _write_kubeconfig(tmp_path / 'first', 'https://first:6443', context='a')
+        second = _write_kubeconfig(tmp_path / 'second', 'https://second:6443', context='b')
+
+        config = load_kubeconfig(f'{first}:{second}')
+
+        assert config['context'] == 'a'
+        assert config['cluster']['server'] == 'https://first:6443'
+        assert load_kubeconfig(f'{first}:{second}', context='b')['context'] == 'b'
+
+    @pytest.mark.unit
+    def test_list_contexts_and_pinned_backend(self, tmp_path):
+        """Test every merged context is listed and backends can pin one"""
+        first = _write_kubeconfig(tmp_path / 'first', 'https://first:6443', context='a')
+        second = _write_kubeconfig(tmp_path / 'second', 'https://second:6443', context='b')
+        backend = create_backend('api', f'{first}:{second}', context='b')
+
+        assert list_contexts(f'{first}:{second}') == ['a', 'b']
+        assert backend.current_context(5).stdout == 'b'
+        assert KubectlBackend('b')._raw_command('/api/v1/pods', {'limit': 5}) == [
+            'kubectl', 'get', '--raw', '/api/v1/pods?limit=5', '--context', 'b'
+        ]
+
+    @pytest.mark.unit
+    def test_missing_context_raises(self, tmp_path):
+        """Test an unusable kubeconfig is reported"""
+        with pytest.raises(KubeconfigError):
+            load_kubeconfig(str(tmp_path / 'missing'))
+
+    @pytest.mark.unit
+    def test_auto_falls_back_to_kubectl(self, tmp_path):
+        """Test auto mode uses kubectl when the kubeconfig cannot be used directly"""
+        user = {'auth-provider': {'name': 'unsupported', 'config': {}}}
+        kubeconfig = _write_kubeconfig(tmp_path / 'config', 'https://example:6443', user=user)
+
+        assert isinstance(create_backend('auto', kubeconfig), KubectlBackend)
+        with pytest.raises(KubeconfigError):
+            create_backend('api', kubeconfig)
+
+    @pytest.mark.unit
+    def test_exec_credential_plugin(self, api_server, tmp_path):
+        """Test an exec credential plugin is run once for the token"""
+        host, port = api_server.server_address
+        plugin = tmp_path / 'plugin.py'
+        plugin.write_text('import json\nprint(json.dumps({"status": {"token": "%s"}}))\n' % TOKEN)
+        user = {'exec': {'apiVersion': 'client.authentication.k8s.io/v1', 'command': sys.executable,
+                         'args': [str(plugin)]}}
+        kubeconfig = _write_kubeconfig(tmp_path / 'config', f'http://{host}:{port}', user=user)
+
+        backend = ApiServerBackend.from_kubeconfig(kubeconfig)
+
+        assert backend.get('probe', '/api/v1/namespaces', None, 5).ok
+        backend.close()
+
+
+class TestApiServerBackend:
+    """Test queries served over one pooled session"""
+
+    @pytest.mark.unit
+    def test_context_and_cluster_info_need_no_request(self, backend, api_server):
+        """Test context and cluster info come from the kubeconfig"""
+        assert backend.current_context(5).stdout == 'fake-context'
+        assert 'control plane is running at http://127.0.0.1' in backend.cluster_info(5).stdout
+        assert api_server.requests == []
+
+    @pytest.mark.unit
+    def test_snapshot_pages_over_one_connection(self, backend, api_server):
+        """Test paginated lists reuse a single keep-alive connection"""
+        snapshot = ClusterSnapshot(page_size=2, backend=backend)
+
+        names = [pod['metadata']['name'] for pod in snapshot.items('pods')]
+        snapshot.items('nodes')
+
+        assert names == [f'web-{i}' for i in range(5)]
+        assert sum(1 for path in api_server.requests if path.startswith('/api/v1/pods')) == 3
+        assert len(api_server.clients) == 1
+
+    @pytest.mark.unit
+    def test_expired_continue_token_restarts(self, backend, api_server):
+        """Test a 410 from the API server restarts the list"""
+        api_server.expire_once = True
+        snapshot = ClusterSnapshot(page_size=2, backend=backend)
+
+        assert snapshot.count('pods') == 5
+        assert 'pods' not in snapshot.errors
+
+    @pytest.mark.unit
+    def test_errors_are_reported(self, api_server, tmp_path):
+        """Test API errors surface as failed probes with the server's message"""
+        host, port = api_server.server_address
+        kubeconfig = _write_kubeconfig(tmp_path / 'config', f'http://{host}:{port}', user={'token': 'wrong'})
+        backend = ApiServerBackend.from_kubeconfig(kubeconfig)
+        snapshot = ClusterSnapshot(backend=backend)
+
+        assert snapshot.items('pods') == []
+        assert snapshot.errors['pods'] == 'Error from server (401): Unauthorized'
+        backend.close()
+
+    @pytest.mark.unit
+    def test_capabilities(self, backend):
+        """Test capability checks map to API lookups"""
+        assert backend.check_capability('metrics_server', 5).status == PROBE_OK
+        assert backend.check_capability('prometheus', 5).status == PROBE_OK
+        assert backend.check_capability('grafana', 5).status == PROBE_FAILED
+        assert backend.check_capability('storage_class', 5).status == PROBE_OK
+        assert backend.check_capability('ingress', 5).status == PROBE_FAILED
+
+    @pytest.mark.unit
+    def test_detector_over_api_backend(self, backend, api_server):
+        """Test detection and metrics are served entirely by the fake API server"""
+        detector = ClusterDetector(backend=backend)
+
+        cluster = detector.detect_cluster()
+        metrics = detector.get_cluster_metrics()
+
+        assert cluster['status'] == 'connected'
+        assert cluster['name'] == 'fake-context'
+        assert cluster['backend'] == 'api'
+        assert cluster['capabilities']['metrics_server'] is True
+        assert len(cluster['info']['pods']['items']) == 5
+        assert metrics['nodes'] == [{'name': 'kind-control-plane', 'cpu_usage': 250, 'memory_usage': 1024 ** 3}]
+        assert metrics['pods'] == [{
+            'namespace': 'default', 'name': 'web-0', 'cpu_usage': 6, 'memory_usage': 12 * 1024 ** 2,
+            'containers': [
+                {'name': 'app', 'cpu_usage': 5, 'memory_usage': 10 * 1024 ** 2},
+                {'name': 'proxy', 'cpu_usage': 1, 'memory_usage': 2 * 1024 ** 2},
+            ],
+        }]
+        assert sum(1 for path in api_server.requests if path.startswith('/apis/metrics.k8s.io/v1beta1/pods')) == 1
+        assert detector.sample_usage().table('pods').totals()['cpu_usage'] == 6
+        assert metrics['resources']['cpu']['used'] == pytest.approx(0.5)
+        assert sum(1 for path in api_server.requests if path.startswith('/api/v1/pods')) == 1
+
+
+def _wait_for(condition, timeout=5):
+    """Poll until a background watch has caught up"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not reached')
+        time.sleep(0.02)
+
+
+class TestWatchingSnapshot:
+    """Test the informer-style watch cache"""
+
+    @pytest.mark.unit
+    def test_events_update_store_without_relisting(self, backend, api_server):
+        """Test watch events are applied and reads never re-list"""
+        api_server.watch_events['/api/v1/pods'] = [
+            {'type': 'MODIFIED', 'object': {'metadata': {'name': 'web-0', 'namespace': 'default', 'resourceVersion': '11'},
+                                            'status': {'phase': 'Pending'}, 'spec': {'containers': []}}},
+            {'type': 'DELETED', 'object': {'metadata': {'name': 'web-1', 'namespace': 'default', 'resourceVersion': '12'}}},
+            {'type': 'ADDED', 'object': {'metadata': {'name': 'web-9', 'namespace': 'default', 'resourceVersion': '13'},
+                                         'status': {'phase': 'Running'}, 'spec': {'containers': []}}},
+            {'type': 'BOOKMARK', 'object': {'metadata': {'resourceVersion': '20'}}},
+        ]
+        snapshot = WatchingSnapshot(page_size=2, backend=backend)
+        try:
+            assert snapshot.count('pods') == 5
+            _wait_for(lambda: snapshot.events['pods'] == 3 and snapshot._versions['pods'] == '20')
+
+            names = sorted(pod['metadata']['name'] for pod in snapshot.items('pods'))
+            assert names == ['web-0', 'web-2', 'web-3', 'web-4', 'web-9']
+            assert snapshot.pod_phases() == {'Pending': 1, 'Running': 4}
+            assert snapshot.get('pods')['metadata']['resourceVersion'] == '20'
+        finally:
+            snapshot.stop()
+
+        list_requests = [path for path in api_server.requests if path.startswith('/api/v1/pods?limit')]
+        assert len(list_requests) == 3
+        assert api_server.watches[0] == ('/api/v1/pods', '10')
+
+    @pytest.mark.unit
+    def test_expired_watch_relists(self, backend, api_server):
+        """Test a 410 watch error relists the kind"""
+        api_server.watch_events['/api/v1/namespaces'] = [
+            {'type': 'ERROR', 'object': {'kind': 'Status', 'code': 410, 'message': 'too old resource version'}},
+        ]
+        snapshot = WatchingSnapshot(backend=backend)
+        try:
+            assert snapshot.count('namespaces') == 2
+            _wait_for(lambda: snapshot.relists.get('namespaces') == 1)
+            assert snapshot.count('namespaces') == 2
+        finally:
+            snapshot.stop()
+
+        list_requests = [path for path in api_server.requests if path.startswith('/api/v1/namespaces?limit')]
+        assert len(list_requests) == 2
+
+    @pytest.mark.unit
+    def test_watch_command_refreshes_without_listing_usage(self, backend, api_server):
+        """Test `universal watch` refreshes from the watch cache and never lists metrics.k8s.io"""
+        with patch('upid.core.cluster_detector.create_backend', return_value=backend):
+            result = CliRunner().invoke(universal, ['--no-cache', 'watch', '--count', '3', '--interval', '0'])
+
+        assert result.exit_code == 0, result.output
+        assert '5/5' in result.output
+        assert not [path for path in api_server.requests if path.startswith('/apis/metrics.k8s.io')]
+        # Pods are listed once up front, then kept current by the watch
+        assert sum(1 for path in api_server.requests if path.startswith('/api/v1/pods?limit')) == 1
@@ -0,0 +1,495 @@
+"""
+Unit tests for cluster detection
+"""
+import io
+import sys
+import time
+import json
+import pytest
+import subprocess
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from unittest.mock import patch
+from upid.core.cluster_detector import ClusterDetector
+from upid.core.cluster_snapshot import ClusterSnapshot
+from upid.core.cluster_backend import KubectlBackend
+from upid.core.snapshot_cache import SnapshotCache
+from upid.core.usage_metrics import UsageTable
+from upid.core.probe_engine import (
+    ProbeEngine, ProbeResult, PROBE_OK, PROBE_FAILED, PROBE_TIMEOUT, PROBE_UNKNOWN
+)
+
+
+def _python(code):
+    """Build a probe command that runs a Python snippet"""
+    return [sys.executable, '-c', code]
+
+
+NODES = {'items': [
+    {'metadata': {'name': 'kind-control-plane'}, 'status': {'allocatable': {'cpu': '4', 'memory': '8Gi'}}}
+]}
+PODS = {'items': [
+    {'metadata': {'name': 'web-1', 'namespace': 'default'}, 'status': {'phase': 'Running'},
+     'spec': {'containers': [{'resources': {'requests': {'cpu': '500m', 'memory': '256Mi'}}}]}},
+    {'metadata': {'name': 'web-2', 'namespace': 'default'}, 'status': {'phase': 'Pending'},
+     'spec': {'containers': [{'resources': {'requests': {'cpu': '250m', 'memory': '128Mi'}}}]}},
+]}
+
+
+class FakeProcess:
+    """Minimal Popen stand-in serving canned stdout through a pipe-like stream"""
+
+    def __init__(self, stdout, stderr, returncode, stderr_file):
+        self.stdout = io.BytesIO(stdout.encode('utf-8'))
+        self.returncode = returncode
+        stderr_file.write(stderr.encode('utf-8'))
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        pass
+
+
+class FakeKubectl:
+    """Stand-in for kubectl that answers commands and counts calls
+
+    Raw list requests are paginated with limit/continue like the API server.
+    """
+
+    def __init__(self, lists=None, expire_once=False):
+        self.calls = []
+        self.lists = lists or {
+            '/api/v1/nodes': NODES['items'],
+            '/api/v1/pods': PODS['items'],
+            '/api/v1/namespaces': [{'metadata': {'name': 'default'}}],
+        }
+        self.expire_once = expire_once
+
+    def patched(self):
+        """Patch subprocess so probes and streamed lists are served by this fake"""
+        return patch.multiple('upid.core.probe_engine.subprocess', run=self.run, Popen=self.popen)
+
+    def run(self, command, **kwargs):
+        self.calls.append(command)
+        stdout = 'kind-test\n' if ' '.join(command) == 'kubectl config current-context' else ''
+        return subprocess.CompletedProcess(command, 0, stdout=stdout, stderr='')
+
+    def popen(self, command, stdout=None, stderr=None):
+        self.calls.append(command)
+        returncode, body, error = self._list(command[3])
+        return FakeProcess(body, error, returncode, stderr)
+
+    def _list(self, raw_path):
+        parsed = urlparse(raw_path)
+        params = parse_qs(parsed.query)
+        items = self.lists.get(parsed.path, [])
+        start = int(params.get('continue', ['0'])[0])
+        if start and self.expire_once:
+            self.expire_once = False
+            return 1, '', 'Error from server (Expired): 410 Gone'
+        limit = int(params.get('limit', [len(items) or 1])[0])
+        page = {'kind': 'List', 'metadata': {}, 'items': items[start:start + limit]}
+        if start + limit < len(items):
+            page['metadata']['continue'] = str(start + limit)
+        return 0, json.dumps(page), ''
+
+    def count(self, prefix):
+        return sum(1 for command in self.calls if ' '.join(command).startswith(prefix))
+
+
+class TestProbeEngine:
+    """Test concurrent probe execution"""
+
+    @pytest.mark.unit
+    def test_run_collects_results(self):
+        """Test successful and failing probes are both reported"""
+        engine = ProbeEngine(max_workers=4, deadline=10)
+        results = engine.run({
+            'ok': (_python("print('hello')"), 5),
+            'fail': (_python("import sys; sys.exit(3)"), 5),
+        })
+
+        assert results['ok'].status == PROBE_OK
+        assert results['ok'].stdout.strip() == 'hello'
+        assert results['fail'].status == PROBE_FAILED
+        assert results['fail'].returncode == 3
+
+    @pytest.mark.unit
+    def test_probe_timeout_is_not_fatal(self):
+        """Test a probe exceeding its own timeout is marked as timed out"""
+        engine = ProbeEngine(max_workers=4, deadline=10)
+        results = engine.run({
+            'slow': (_python("import time; time.sleep(5)"), 0.3),
+            'fast': (_python("print('done')"), 5),
+        })
+
+        assert results['slow'].status == PROBE_TIMEOUT
+        assert not results['slow'].known
+        assert results['fast'].ok
+
+    @pytest.mark.unit
+    def test_deadline_returns_partial_results(self):
+        """Test the overall deadline bounds total detection time"""
+        engine = ProbeEngine(max_workers=4, deadline=0.5)
+        started = time.monotonic()
+        results = engine.run({
+            'slow': (_python("import time; time.sleep(5)"), 10),
+            'fast': (_python("print('done')"), 10),
+        })
+
+        assert time.monotonic() - started < 3
+        assert results['fast'].ok
+        assert results['slow'].status in (PROBE_TIMEOUT, PROBE_UNKNOWN)
+
+    @pytest.mark.unit
+    def test_stuck_task_does_not_block_exit(self):
+        """Test the process exits at the deadline while a task it gave up on is still running"""
+        code = (
+            "import time\n"
+            "from upid.core.probe_engine import ProbeEngine\n"
+            "engine = ProbeEngine(deadline=0.3)\n"
+            "results = engine.run_tasks({'stuck': (lambda remaining: time.sleep(30), 0.3)})\n"
+            "print(results['stuck'].status)\n"
+        )
+        started = time.monotonic()
+        result = subprocess.run(_python(code), capture_output=True, text=True, timeout=20,
+                                cwd=Path(__file__).resolve().parents[2])
+
+        assert result.stdout.strip() == PROBE_UNKNOWN
+        assert time.monotonic() - started < 5
+
+    @pytest.mark.unit
+    def test_probes_run_concurrently(self):
+        """Test probes overlap instead of running one at a time"""
+        engine = ProbeEngine(max_workers=4, deadline=10)
+        started = time.monotonic()
+        results = engine.run({
+            f'sleep-{i}': (_python("import time; time.sleep(0.5)"), 5) for i in range(4)
+        })
+
+        assert all(result.ok for result in results.values())
+        assert time.monotonic() - started < 1.5
+
+    @pytest.mark.unit
+    def test_stream_command_consumes_pipe(self):
+        """Test streamed output is handed to the consumer while the command runs"""
+        lines = []
+        result = ProbeEngine.stream_command(
+            'stream', _python("print('a'); print('b')"), 5,
+            lambda stream: lines.extend(line.strip() for line in stream)
+        )
+
+        assert result.ok
+        assert lines == [b'a', b'b']
+
+    @pytest.mark.unit
+    def test_stream_command_timeout_kills_process(self):
+        """Test a streamed command is killed when it outlives its timeout"""
+        started = time.monotonic()
+        result = ProbeEngine.stream_command(
+            'stream', _python("import time; time.sleep(5)"), 0.3, lambda stream: stream.read()
+        )
+
+        assert result.status == PROBE_TIMEOUT
+        assert time.monotonic() - started < 3
+
+    @pytest.mark.unit
+    def test_missing_binary_is_failed(self):
+        """Test a probe whose binary is missing is reported as failed"""
+        engine = ProbeEngine(deadline=5)
+        results = engine.run({'missing': (['definitely-not-a-real-binary'], 5)})
+
+        assert results['missing'].status == PROBE_FAILED
+
+
+class TestClusterDetector:
+    """Test cluster detection built on probe results"""
+
+    @pytest.mark.unit
+    def test_capabilities_from_probe_results(self):
+        """Test capabilities map to True, False or None (unknown)"""
+        detector = ClusterDetector(backend=KubectlBackend())
+        results = {
+            'capability:metrics_server': ProbeResult('capability:metrics_server', PROBE_OK, 0),
+            'capability:prometheus': ProbeResult('capability:prometheus', PROBE_FAILED, 1),
+            'capability:helm': ProbeResult('capability:helm', PROBE_TIMEOUT),
+        }
+
+        capabilities = detector._detect_capabilities(results)
+
+        assert capabilities['metrics_server'] is True
+        assert capabilities['prometheus'] is False
+        assert capabilities['helm'] is None
+        assert capabilities['grafana'] is None
+        assert capabilities['load_balancer'] is False
+
+    @pytest.mark.unit
+    def test_detect_cluster_with_partial_results(self):
+        """Test detection still succeeds when some probes do not answer"""
+        detector = ClusterDetector(backend=KubectlBackend())
+        # Nodes were listed; the pod list was cut off by the deadline
+        detector.snapshot._lists['nodes'] = {'items': [{'metadata': {'name': 'kind-control-plane'}}]}
+        results = {
+            'context': ProbeResult('context', PROBE_OK, 0, stdout='kind-test\n'),
+            'nodes': ProbeResult('nodes', PROBE_OK, 0),
+            'pods': ProbeResult('pods', PROBE_TIMEOUT),
+        }
+
+        with patch.object(detector.engine, 'run_tasks', return_value=results):
+            cluster = detector.detect_cluster()
+
+        assert cluster['status'] == 'connected'
+        assert cluster['name'] == 'kind-test'
+        assert cluster['type'] == 'kind'
+        assert 'pods' not in cluster['info']
+        assert 'pods' in cluster['info']['unknown']
+        assert cluster['probes']['pods']['status'] == PROBE_TIMEOUT
+
+    @pytest.mark.unit
+    def test_snapshot_lists_each_kind_once(self):
+        """Test detect_cluster and get_cluster_metrics share one fetch per kind"""
+        fake = FakeKubectl()
+        detector = ClusterDetector(backend=KubectlBackend())
+
+        with fake.patched():
+            detector.detect_cluster()
+            metrics = detector.get_cluster_metrics()
+
+        assert fake.count('kubectl get --raw /api/v1/nodes') == 1
+        assert fake.count('kubectl get --raw /api/v1/pods') == 1
+        assert fake.count('kubectl get --raw /api/v1/namespaces') == 1
+        assert metrics['resources']['pods'] == {'running': 1, 'total': 2}
+        assert metrics['resources']['cpu']['total'] == 4.0
+        assert metrics['resources']['cpu']['used'] == pytest.approx(0.75)
+
+    @pytest.mark.unit
+    def test_snapshot_cache_shared_between_commands(self, tmp_path):
+        """Test a second command is served from the on-disk cache, probes included, and --refresh re-lists"""
+        fake = FakeKubectl()
+        cache = SnapshotCache(directory=str(tmp_path))
+
+        with fake.patched():
+            first = ClusterDetector(backend=KubectlBackend(), cache=cache).detect_cluster()
+            spawned = len(fake.calls)
+            second_detector = ClusterDetector(backend=KubectlBackend(), cache=cache)
+            second = second_detector.detect_cluster()
+            # Only the context lookup that keys the cache
+            assert fake.calls[spawned:] == [['kubectl', 'config', 'current-context']]
+            metrics = second_detector.get_cluster_metrics()
+            assert fake.count('kubectl get --raw /api/v1/pods') == 1
+
+            refreshed = ClusterDetector(backend=KubectlBackend(), cache=cache, refresh=True).detect_cluster()
+            assert fake.count('kubectl get --raw /api/v1/pods') == 2
+
+        assert first['snapshot_source'] == 'cluster'
+        assert second['snapshot_source'] == 'cache'
+        assert refreshed['snapshot_source'] == 'cluster'
+        assert second['info']['nodes'] == first['info']['nodes']
+        assert second['capabilities'] == first['capabilities']
+        assert second['info']['cluster_info'] == first['info']['cluster_info']
+        assert metrics['resources']['pods'] == {'running': 1, 'total': 2}
+
+    @pytest.mark.unit
+    def test_scope_pushed_down_to_list_calls(self, tmp_path):
+        """Test namespace and selectors narrow the list and top calls and get their own cache entry"""
+        fake = FakeKubectl(lists={
+            '/api/v1/nodes': NODES['items'],
+            '/api/v1/namespaces/shop/pods': PODS['items'][:1],
+            '/api/v1/namespaces': [{'metadata': {'name': 'shop'}}],
+        })
+        cache = SnapshotCache(directory=str(tmp_path))
+
+        with fake.patched():
+            detector = ClusterDetector(backend=KubectlBackend(), cache=cache, namespace='shop',
+                                       label_selector='app=web', field_selector='status.phase=Running')
+            info = detector.detect_cluster()
+            metrics = detector.get_cluster_metrics()
+            unscoped = ClusterDetector(backend=KubectlBackend(), cache=cache).detect_cluster()
+
+        lists = [urlparse(command[3]) for command in fake.calls if command[:3] == ['kubectl', 'get', '--raw']]
+        pods = parse_qs(next(url for url in lists if url.path == '/api/v1/namespaces/shop/pods').query)
+        namespaces = parse_qs(next(url for url in lists if url.path == '/api/v1/namespaces').query)
+        usage = parse_qs(next(url for url in lists
+                              if url.path == '/apis/metrics.k8s.io/v1beta1/namespaces/shop/pods').query)
+
+        assert pods['labelSelector'] == ['app=web']
+        assert pods['fieldSelector'] == ['status.phase=Running']
+        assert namespaces['fieldSelector'] == ['metadata.name=shop']
+        assert usage['labelSelector'] == ['app=web']
+        assert 'fieldSelector' not in usage
+        assert info['scope'] == 'namespace=shop,labelSelector=app=web,fieldSelector=status.phase=Running'
+        assert metrics['resources']['pods'] == {'running': 1, 'total': 1}
+        assert unscoped['scope'] == 'cluster'
+        assert unscoped['snapshot_source'] == 'cluster'
+
+
+    @pytest.mark.unit
+    def test_usage_series_keyed_by_workload(self):
+        """Test sampled containers are keyed by namespace, owning workload and container"""
+        fake = FakeKubectl(lists={'/api/v1/pods': [
+            {'metadata': {'name': 'web-5d8f-x1', 'namespace': 'shop', 'labels': {'pod-template-hash': '5d8f'},
+                          'ownerReferences': [{'kind': 'ReplicaSet', 'name': 'web-5d8f', 'controller': True}]},
+             'spec': {'containers': []}, 'status': {'phase': 'Running'}},
+        ]})
+        table = UsageTable.from_pod_metrics([
+            {'metadata': {'name': 'web-5d8f-x1', 'namespace': 'shop'},
+             'containers': [{'name': 'app', 'usage': {'cpu': '10m', 'memory': '1Mi'}}]},
+            {'metadata': {'name': 'new-pod', 'namespace': 'shop'},
+             'containers': [{'name': 'app', 'usage': {'cpu': '1m', 'memory': '1Mi'}}]},
+        ])
+
+        with fake.patched():
+            keys = ClusterDetector(backend=KubectlBackend()).usage_series(table)
+
+        assert keys == [('shop', 'Deployment/web', 'app'), ('shop', 'Pod/new-pod', 'app')]
+
+    @pytest.mark.unit
+    def test_workload_rollup_through_owners(self):
+        """Test pods roll up to Deployments and CronJobs via listed ReplicaSets and Jobs"""
+        def pod(name, owner_kind, owner_uid, cpu):
+            return {'metadata': {'name': name, 'namespace': 'shop',
+                                 'ownerReferences': [{'kind': owner_kind, 'name': 'x', 'uid': owner_uid}]},
+                    'spec': {'containers': [{'name': 'app', 'resources': {'requests': {'cpu': cpu}}}]},
+                    'status': {'phase': 'Running'}}
+        fake = FakeKubectl(lists={
+            '/api/v1/pods': [pod('web-a', 'ReplicaSet', 'rs-1', '500m'), pod('web-b', 'ReplicaSet', 'rs-2', '500m'),
+                             pod('backup-1', 'Job', 'job-1', '1')],
+            '/apis/apps/v1/replicasets': [
+                {'metadata': {'name': f'web-{n}', 'namespace': 'shop', 'uid': f'rs-{n}',
+                              'ownerReferences': [{'kind': 'Deployment', 'name': 'web', 'uid': 'dep-1'}]}}
+                for n in (1, 2)
+            ],
+            '/apis/batch/v1/jobs': [
+                {'metadata': {'name': 'backup-28000', 'namespace': 'shop', 'uid': 'job-1',
+                              'ownerReferences': [{'kind': 'CronJob', 'name': 'backup', 'uid': 'cron-1'}]}},
+            ],
+        })
+
+        with fake.patched():
+            rollup = ClusterDetector(backend=KubectlBackend()).workload_rollup()
+
+        assert sorted((row['workload'], row['pods'], row['cpu_requests']) for row in rollup) == [
+            ('CronJob/backup', 1, 1000), ('Deployment/web', 2, 1000)]
+        assert rollup[0]['monthly_cost'] > 0
+
+    @pytest.mark.unit
+    def test_selector_coverage(self):
+        """Test Services, PDBs, NetworkPolicies and HPAs are matched to running pods"""
+        def pod(name, labels, phase='Running'):
+            return {'metadata': {'name': name, 'namespace': 'shop', 'labels': dict(labels, **{'pod-template-hash': '5d4f'}),
+                                 'ownerReferences': [{'kind': 'ReplicaSet', 'name': f"{labels['app']}-5d4f",
+                                                      'uid': name}]},
+                    'status': {'phase': phase}}
+        fake = FakeKubectl(lists={
+            '/api/v1/pods': [pod('web-5d4f-a', {'app': 'web'}), pod('web-5d4f-b', {'app': 'web'}),
+                             pod('db-5d4f-a', {'app': 'db'}), pod('db-5d4f-b', {'app': 'db'}, phase='Pending')],
+            '/api/v1/services': [{'metadata': {'name': 'web', 'namespace': 'shop'},
+                                  'spec': {'selector': {'app': 'web'}}}],
+            '/apis/policy/v1/poddisruptionbudgets': [
+                {'metadata': {'name': 'db', 'namespace': 'shop'},
+                 'spec': {'selector': {'matchExpressions': [{'key': 'app', 'operator': 'In', 'values': ['db']}]}}},
+            ],
+            '/apis/networking.k8s.io/v1/networkpolicies': [
+                {'metadata': {'name': 'default-deny', 'namespace': 'shop'}, 'spec': {'podSelector': {}}},
+            ],
+            '/apis/autoscaling/v2/horizontalpodautoscalers': [
+                {'metadata': {'name': 'web', 'namespace': 'shop'},
+                 'spec': {'scaleTargetRef': {'kind': 'Deployment', 'name': 'web'}}},
+            ],
+        })
+
+        with fake.patched():
+            coverage = ClusterDetector(backend=KubectlBackend()).selector_coverage()
+
+        assert (coverage['pods'], coverage['running']) == (4, 3)
+        assert [(row['kind'], row['pods'], row['running']) for row in coverage['objects']] == [
+            ('services', 2, 2), ('poddisruptionbudgets', 2, 1), ('networkpolicies', 4, 3),
+            ('horizontalpodautoscalers', 2, 2)]
+        assert coverage['uncovered'] == {'services': 1, 'poddisruptionbudgets': 2, 'networkpolicies': 0,
+                                         'horizontalpodautoscalers': 1}
+
+
+class TestClusterSnapshot:
+    """Test the shared per-invocation snapshot"""
+
+    @pytest.mark.unit
+    def test_snapshot_summary(self):
+        """Test counts and phases come from a single fetch"""
+        fake = FakeKubectl()
+        snapshot = ClusterSnapshot()
+
+        with fake.patched():
+            summary = snapshot.summary()
+            snapshot.items('pods')
+
+        assert summary['nodes'] == 1
+        assert summary['pods'] == 2
+        assert summary['pod_phases'] == {'Running': 1, 'Pending': 1}
+        assert fake.count('kubectl get --raw /api/v1/pods') == 1
+
+    @pytest.mark.unit
+    def test_snapshot_records_errors(self):
+        """Test a failed list is recorded rather than silently empty"""
+        snapshot = ClusterSnapshot()
+        with patch('upid.core.probe_engine.subprocess.Popen',
+                   side_effect=lambda command, stdout=None, stderr=None: FakeProcess('', 'forbidden', 1, stderr)):
+            assert snapshot.items('pods') == []
+
+        assert snapshot.errors['pods'] == 'forbidden'
+
+    @pytest.mark.unit
+    def test_snapshot_paginates_with_continue_tokens(self):
+        """Test pods are listed in pages of the configured size"""
+        pods = [
+            {'metadata': {'name': f'pod-{i}', 'namespace': 'default', 'managedFields': [{}] * 5},
+             'status': {'phase': 'Running'}, 'spec': {'containers': []}}
+            for i in range(7)
+        ]
+        fake = FakeKubectl(lists={'/api/v1/pods': pods})
+        snapshot = ClusterSnapshot(page_size=3)
+
+        with fake.patched():
+            items = snapshot.items('pods')
+
+        assert [pod['metadata']['name'] for pod in items] == [f'pod-{i}' for i in range(7)]
+        assert fake.count('kubectl get --raw /api/v1/pods') == 3
+        assert all('limit=3' in fake.calls[i][3] for i in range(3))
+        # Pages are trimmed as they arrive
+        assert 'managedFields' not in items[0]['metadata']
+
+    @pytest.mark.unit
+    def test_snapshot_restarts_on_expired_continue_token(self):
+        """Test an expired continue token restarts the list once"""
+        pods = [{'metadata': {'name': f'pod-{i}'}, 'status': {'phase': 'Running'}} for i in range(4)]
+        fake = FakeKubectl(lists={'/api/v1/pods': pods}, expire_once=True)
+        snapshot = ClusterSnapshot(page_size=2)
+
+        with fake.patched():
+            assert snapshot.count('pods') == 4
+
+        assert 'pods' not in snapshot.errors
+
+    @pytest.mark.unit
+    def test_only_expired_status_counts_as_expired_token(self):
+        """Test other errors that mention 410 or expiry do not restart the list"""
+        def failed(stderr, returncode=1):
+            return ProbeResult('pods', PROBE_FAILED, returncode=returncode, stderr=stderr)
+
+        assert ClusterSnapshot._is_expired(failed('', returncode=410))
+        assert ClusterSnapshot._is_expired(failed(
+            'Error from server (Expired): The provided continue parameter is too old to display a consistent list'))
+        assert not ClusterSnapshot._is_expired(failed('Unable to connect to the server: x509: certificate has expired'))
+        assert not ClusterSnapshot._is_expired(failed('Error from server (NotFound): namespaces "team-410" not found'))
+        assert not ClusterSnapshot._is_expired(failed('dial tcp 10.0.0.1:6410: connect: connection refused'))
+
+    @pytest.mark.unit
+    def test_snapshot_unchunked_mode(self):
+        """Test page size 0 lists everything in one request"""
+        fake = FakeKubectl()
+        snapshot = ClusterSnapshot(page_size=0)
+
+        with fake.patched():
+            assert snapshot.count('pods') == 2
+
+        assert fake.calls == [['kubectl', 'get', '--raw', '/api/v1/pods']]
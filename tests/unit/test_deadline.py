@@ -0,0 +1,151 @@
+"""
+Unit tests for request timeouts and per-command deadline budgets
+"""
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+from upid.core.api_client import UPIDAPIClient
+from upid.core.deadline import Deadline, DeadlineExceeded
+from upid.core.retry_policy import CircuitBreaker
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Answers after the server's delay, with the server's status and headers"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        data = json.dumps({'path': self.path}).encode('utf-8')
+        self.send_response(self.server.status)
+        for name, value in self.server.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    """Run a fake UPID API that answers slowly"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    server.requests = []
+    server.delay = 0.0
+    server.status = 200
+    server.headers = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(mock_config, slow_server):
+    """API client pointed at the slow server, without cache or retry sleeps"""
+    mock_config.set('api_url', f'http://127.0.0.1:{slow_server.server_address[1]}')
+    mock_config.set('local_mode', False)
+    auth_manager = Mock()
+    auth_manager.get_token.return_value = 'token-1'
+    api_client = UPIDAPIClient(mock_config, auth_manager, use_cache=False)
+    api_client.retry_policy.sleep = lambda seconds: None
+    return api_client
+
+
+class TestDeadline:
+    """Test the budget arithmetic"""
+
+    @pytest.mark.unit
+    def test_remaining_and_timeouts(self):
+        """Test timeouts are cut to the time left and an expired deadline raises"""
+        now = [100.0]
+        deadline = Deadline(10, clock=lambda: now[0])
+
+        assert deadline.timeouts(5, 30) == (5, 10)
+        now[0] = 108.5
+        assert deadline.timeouts(5, 30) == (1.5, 1.5)
+        now[0] = 111.0
+        assert deadline.remaining() == 0
+        with pytest.raises(DeadlineExceeded, match='10s exceeded before GET /clusters'):
+            deadline.check('GET /clusters')
+
+
+class TestClientTimeouts:
+    """Test timeouts and deadlines are applied to real requests"""
+
+    @pytest.mark.unit
+    def test_read_timeout_is_applied(self, client, slow_server):
+        """Test a request to a hanging server fails after the read timeout instead of waiting"""
+        client.timeout = 0.2
+        client.retry_policy.max_retries = 0
+        slow_server.delay = 2.0
+
+        started = time.perf_counter()
+        with pytest.raises(Exception, match='Request failed'):
+            client.get_clusters()
+
+        assert time.perf_counter() - started < 1.0
+
+    @pytest.mark.unit
+    def test_deadline_is_shared_across_calls(self, client, slow_server):
+        """Test the second of two slow calls gets only the budget the first left and fails with it"""
+        slow_server.delay = 0.3
+        client.deadline = Deadline(0.5)
+
+        started = time.perf_counter()
+        assert client.get_cluster('c1') == {'path': '/v1/clusters/c1'}
+        with pytest.raises(DeadlineExceeded):
+            client.get_cluster('c2')
+        with pytest.raises(DeadlineExceeded, match='before GET /v1/clusters/c3'):
+            client.get_cluster('c3')
+
+        assert time.perf_counter() - started < 0.8
+        assert slow_server.requests == ['/v1/clusters/c1', '/v1/clusters/c2']
+        assert next(iter(client.request_metrics()['breakers'].values()))['failures'] == 0
+
+    @pytest.mark.unit
+    def test_retries_do_not_wait_past_the_deadline(self, client, slow_server):
+        """Test a Retry-After longer than the remaining budget ends the call at once"""
+        waits = []
+        client.retry_policy.sleep = waits.append
+        slow_server.status = 503
+        slow_server.headers = {'Retry-After': '5'}
+        client.deadline = Deadline(2)
+
+        with pytest.raises(Exception):
+            client.get_clusters()
+
+        assert waits == []
+        assert len(slow_server.requests) == 1
+
+    @pytest.mark.unit
+    def test_trial_cut_short_by_deadline_is_released(self, client, slow_server):
+        """Test a half-open trial call that runs out of budget lets the next trial through"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        client.breakers[f'127.0.0.1:{slow_server.server_address[1]}'] = breaker
+        slow_server.delay = 0.5
+        now[0] = 10.0
+        client.deadline = Deadline(0.2)
+
+        with pytest.raises(DeadlineExceeded):
+            client.get_clusters()
+
+        assert breaker.status() == {'state': 'half_open', 'failures': 1, 'times_opened': 1}
+        slow_server.delay = 0.0
+        client.deadline = None
+        now[0] = 20.0
+        assert client.get_clusters() == {'path': '/v1/clusters'}
+        assert breaker.status()['state'] == 'closed'
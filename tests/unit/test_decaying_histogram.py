@@ -0,0 +1,159 @@
+"""
+Unit tests and a benchmark for VPA-style decaying usage histograms
+"""
+import time
+import numpy as np
+import pytest
+from upid.core.decaying_histogram import DecayingHistograms, UsageRecommender, CPU_BUCKETS, MIN_CPU, MIN_MEMORY
+from upid.services.optimization_service import OptimizationService
+
+WEB = ('shop', 'Deployment/web', 'app')
+DB = ('ops', 'StatefulSet/db', 'db')
+HOUR = 3600
+START = 1700000000.0
+
+
+class TestDecayingHistograms:
+    """Test bucket layout, decay and percentiles"""
+
+    @pytest.mark.unit
+    def test_percentile_is_end_of_bucket(self):
+        """Test the percentile is the end of the bucket holding it, like the VPA histogram"""
+        histograms = DecayingHistograms(*CPU_BUCKETS)
+        histograms.grow(1)
+        histograms.add(np.zeros(100, dtype=np.int64), np.arange(1, 101) * 10, np.full(100, START))
+
+        p90 = histograms.percentiles(90, 1)[0]
+        bucket = histograms.index(np.array([900]))[0]
+
+        assert histograms.starts[bucket] <= 900 < histograms.starts[bucket + 1] == p90
+        assert histograms.percentiles(90, 1)[0] >= histograms.percentiles(50, 1)[0]
+
+    @pytest.mark.unit
+    def test_old_samples_fade(self):
+        """Test a sample one half-life older counts half as much, and renormalizing keeps ratios"""
+        histograms = DecayingHistograms(*CPU_BUCKETS, half_life=HOUR)
+        histograms.grow(1)
+        histograms.add(np.array([0]), np.array([1000]), np.array([START]))
+        histograms.add(np.array([0]), np.array([10]), np.array([START + HOUR]))
+        before = histograms.weights[0, histograms.index(np.array([1000, 10]))]
+
+        histograms.add(np.array([0]), np.array([5000]), np.array([START + 100 * HOUR]))
+        after = histograms.weights[0, histograms.index(np.array([1000, 10, 5000]))]
+        shift = (histograms.reference - START) / HOUR
+
+        assert before[0] / before[1] == pytest.approx(0.5)
+        assert shift > 0
+        assert after[:2].tolist() == pytest.approx((before * 2.0 ** -shift).tolist())
+        assert after[2] == pytest.approx(2.0 ** (100 - shift))
+
+
+class TestUsageRecommender:
+    """Test incremental recommendations, memory peaks and persistence"""
+
+    @pytest.mark.unit
+    def test_recommendation_follows_recent_usage(self):
+        """Test targets track the current load once older samples have decayed"""
+        recommender = UsageRecommender(half_life=HOUR)
+        for tick in range(48):
+            cpu = 2000 if tick < 24 else 200
+            recommender.add(START + tick * HOUR, [WEB], np.array([cpu]), np.array([512 << 20]))
+
+        target = recommender.recommend()[WEB]['target']
+
+        assert 200 * 1.15 <= target['cpu'] < 300
+        assert target['memory'] >= 512 * 1.15 * (1 << 20)
+
+    @pytest.mark.unit
+    def test_memory_records_one_peak_per_window(self):
+        """Test each aggregation window contributes only its highest memory sample"""
+        recommender = UsageRecommender(aggregation=HOUR)
+        for tick, memory in enumerate([100, 400, 300, 200]):
+            recommender.add(START + tick * 60, [DB, DB], np.array([10, 10]), np.array([memory << 20, 0]))
+
+        weights = recommender.memory.weights[0]
+        row = recommender.index[DB]
+
+        assert recommender.window_peak[row] == 400 << 20
+        assert weights.sum() == pytest.approx(recommender.memory.decay_factor(np.array([START]))[0])
+        assert weights[recommender.memory.index(np.array([400 << 20]))[0]] > 0
+
+    @pytest.mark.unit
+    def test_bounds_widen_with_little_history(self):
+        """Test short histories get wider bounds, and tiny usage is floored at the minimums"""
+        recommender = UsageRecommender()
+        for tick in range(10):
+            recommender.add(START + tick * 60, [WEB, DB], np.array([500, 1]), np.array([1 << 30, 1]))
+        for tick in range(10):
+            recommender.add(START + 7 * 86400 + tick * 60, [DB], np.array([1]), np.array([1]))
+
+        recommendations = recommender.recommend()
+        web, db = recommendations[WEB], recommendations[DB]
+
+        assert web['upper_bound']['cpu'] > web['target']['cpu'] >= web['lower_bound']['cpu']
+        assert web['upper_bound']['cpu'] > 5 * web['target']['cpu']
+        assert db['confidence_days'] == pytest.approx(7, rel=0.01)
+        assert db['target'] == {'cpu': MIN_CPU, 'memory': MIN_MEMORY}
+
+    @pytest.mark.unit
+    def test_save_and_load(self, tmp_path):
+        """Test a saved recommender gives the same recommendations and keeps updating"""
+        recommender = UsageRecommender()
+        for tick in range(20):
+            recommender.add(START + tick * HOUR, [WEB, DB], np.array([100 + tick, 50]), np.array([1 << 28, 1 << 29]))
+
+        path = recommender.save(tmp_path / 'recommender.npz')
+        loaded = UsageRecommender.load(path)
+        loaded.add(START + 21 * HOUR, [('new', 'Pod/x', 'c')], np.array([5]), np.array([5]))
+
+        assert {key: value for key, value in loaded.recommend().items() if key != ('new', 'Pod/x', 'c')} == \
+            recommender.recommend()
+        assert UsageRecommender.load(tmp_path / 'missing.npz') is None
+
+
+class TestContainerRecommendations:
+    """Test OptimizationService.calculate_container_recommendations"""
+
+    @pytest.mark.unit
+    def test_actions_against_current_requests(self):
+        """Test containers outside their bounds are flagged and unknown ones kept apart"""
+        recommender = UsageRecommender()
+        for tick in range(3 * 24):
+            recommender.add(START + tick * HOUR, [WEB, DB, ('x', 'Pod/y', 'z')],
+                            np.array([300, 300, 300]), np.array([1 << 30] * 3))
+        service = OptimizationService(config={})
+
+        result = service.calculate_container_recommendations(recommender, {
+            WEB: {'cpu': 4000, 'memory': 8 << 30},
+            DB: {'cpu': 50, 'memory': 1 << 30},
+        })
+        actions = {tuple(container['key']): container['action'] for container in result['containers']}
+
+        assert actions == {WEB: 'decrease', DB: 'increase', ('x', 'Pod/y', 'z'): 'unknown'}
+        assert result['counts'] == {'decrease': 1, 'increase': 1, 'keep': 0, 'unknown': 1}
+        assert len(result['recommendations']) == 2
+
+
+class TestUsageRecommenderPerformance:
+    """Benchmark histogram updates and recommendations over many containers"""
+
+    @pytest.mark.performance
+    def test_many_containers(self):
+        """Benchmark samples of 20k containers and a full recommendation pass"""
+        rng = np.random.default_rng(0)
+        keys = [(f'ns{i % 50}', f'Deployment/w{i % 5000}', f'c{i}') for i in range(20000)]
+        recommender = UsageRecommender()
+
+        started = time.perf_counter()
+        for tick in range(20):
+            recommender.add(START + tick * 60, keys, rng.integers(0, 4000, len(keys)),
+                            rng.integers(0, 8 << 30, len(keys)))
+        added = (time.perf_counter() - started) / 20
+        started = time.perf_counter()
+        recommendations = recommender.recommend()
+        recommended = time.perf_counter() - started
+
+        print(f'\n{len(keys)} containers: {added * 1000:.0f} ms per sample, recommendations in {recommended * 1000:.0f} ms')
+        assert len(recommendations) == len(keys)
+        assert added < 0.5
+        assert recommended < 2.0
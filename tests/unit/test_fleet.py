@@ -0,0 +1,132 @@
+"""
+Unit tests for multi-context fleet fan-out
+"""
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from pathlib import Path
+from upid.core.fleet import Fleet, resolve_contexts
+
+
+class FakeBackend:
+    """Backend stand-in that records being closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDetector:
+    """Detector stand-in answering for one context after an optional delay"""
+
+    def __init__(self, context, delay=0.0, fail=False):
+        self.context = context
+        self.delay = delay
+        self.fail = fail
+        self.backend = FakeBackend()
+
+    def report(self):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f'{self.context}: connection refused')
+        return {
+            'cluster': {'status': 'connected', 'name': self.context,
+                        'info': {'nodes': {'items': [{}, {}]}}},
+            'metrics': {'resources': {'cpu': {'used': 1.5, 'total': 8}, 'memory': {'used': 2, 'total': 16},
+                                      'pods': {'running': 3, 'total': 4}}},
+        }
+
+
+class TestFleet:
+    """Test concurrent per-context runs and merged results"""
+
+    @pytest.mark.unit
+    def test_contexts_run_concurrently(self):
+        """Test contexts overlap in a bounded pool and every backend is closed"""
+        detectors = {}
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def factory(context):
+            detectors[context] = FakeDetector(context, delay=0.2)
+            return detectors[context]
+
+        def collect(detector):
+            with lock:
+                running.append(detector.context)
+                peak.append(len(running))
+            try:
+                return detector.report()
+            finally:
+                with lock:
+                    running.remove(detector.context)
+
+        started = time.monotonic()
+        results = Fleet([f'c{i}' for i in range(6)], factory, max_workers=3).run(collect)
+        elapsed = time.monotonic() - started
+
+        assert list(results) == [f'c{i}' for i in range(6)]
+        assert all(entry['status'] == 'ok' for entry in results.values())
+        assert max(peak) == 3
+        assert elapsed < 1.0
+        assert all(detector.backend.closed for detector in detectors.values())
+
+    @pytest.mark.unit
+    def test_slow_and_failing_contexts_do_not_block(self):
+        """Test a slow cluster times out and a broken one errors while the rest answer"""
+        delays = {'fast': 0.0, 'slow': 2.0, 'broken': 0.0}
+
+        def factory(context):
+            return FakeDetector(context, delay=delays[context], fail=context == 'broken')
+
+        started = time.monotonic()
+        results = Fleet(list(delays), factory, max_workers=3, deadline=0.5).run(lambda d: d.report())
+
+        assert time.monotonic() - started < 1.5
+        assert results['fast']['status'] == 'ok'
+        assert results['slow']['status'] == 'timeout'
+        assert results['broken'] == {'status': 'error', 'error': 'broken: connection refused'}
+
+    @pytest.mark.unit
+    def test_stuck_context_does_not_block_exit(self):
+        """Test the command exits at the fleet deadline while a context it gave up on still hangs"""
+        code = (
+            "import time\n"
+            "from upid.core.fleet import Fleet\n"
+            "class Detector:\n"
+            "    backend = type('Backend', (), {'close': lambda self: None})()\n"
+            "results = Fleet(['stuck'], lambda context: Detector(), deadline=0.3).run(lambda d: time.sleep(30))\n"
+            "print(results['stuck']['status'])\n"
+        )
+        started = time.monotonic()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20,
+                                cwd=Path(__file__).resolve().parents[2])
+
+        assert result.stdout.strip() == 'timeout'
+        assert time.monotonic() - started < 5
+
+    @pytest.mark.unit
+    def test_summarize(self):
+        """Test fleet totals only count clusters that answered"""
+        results = Fleet(['a', 'b', 'c'], lambda context: FakeDetector(context, fail=context == 'c')).run(
+            lambda d: d.report())
+
+        totals = Fleet.summarize(results)
+
+        assert totals['contexts'] == 3
+        assert totals['ok'] == 2
+        assert totals['failed'] == 1
+        assert totals['nodes'] == 4
+        assert totals['pods'] == {'running': 6, 'total': 8}
+        assert totals['cpu'] == {'used': 3.0, 'total': 16}
+
+    @pytest.mark.unit
+    def test_resolve_contexts(self):
+        """Test --contexts parsing drops blanks and duplicates"""
+        assert resolve_contexts(contexts='prod-eu, prod-us,,prod-eu') == ['prod-eu', 'prod-us']
+        assert resolve_contexts() == []
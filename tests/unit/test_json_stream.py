@@ -0,0 +1,95 @@
+"""
+Unit tests for the streaming list parser
+"""
+import io
+import json
+import pytest
+from upid.core.json_stream import ListStreamParser, iter_list_items, iter_watch_events
+
+
+def _stream(document, binary=True):
+    text = json.dumps(document)
+    return io.BytesIO(text.encode('utf-8')) if binary else io.StringIO(text)
+
+
+class TestListStreamParser:
+    """Test incremental parsing of Kubernetes list responses"""
+
+    @pytest.mark.unit
+    def test_items_and_metadata(self):
+        """Test items are yielded in order and metadata is collected"""
+        document = {
+            'kind': 'PodList',
+            'metadata': {'resourceVersion': '42', 'continue': 'token'},
+            'items': [{'metadata': {'name': f'pod-{i}'}} for i in range(50)]
+        }
+        parser = ListStreamParser(_stream(document), chunk_size=7)
+
+        names = [item['metadata']['name'] for item in parser.items()]
+
+        assert names == [f'pod-{i}' for i in range(50)]
+        assert parser.metadata == {'resourceVersion': '42', 'continue': 'token'}
+        assert parser.fields['kind'] == 'PodList'
+
+    @pytest.mark.unit
+    def test_metadata_after_items(self):
+        """Test fields following items[] are still collected"""
+        fields = {}
+        stream = io.StringIO('{"items": [1, 22, 333], "metadata": {"continue": "abc"}}')
+
+        items = list(iter_list_items(stream, chunk_size=3, fields=fields))
+
+        assert items == [1, 22, 333]
+        assert fields['metadata'] == {'continue': 'abc'}
+
+    @pytest.mark.unit
+    def test_empty_list(self):
+        """Test empty items and empty objects"""
+        assert list(iter_list_items(io.StringIO('{"items": []}'))) == []
+        assert list(iter_list_items(io.StringIO('{}'))) == []
+        assert list(iter_list_items(io.StringIO('{"items": null}'))) == []
+
+    @pytest.mark.unit
+    def test_multibyte_characters_across_reads(self):
+        """Test UTF-8 characters split between reads are decoded correctly"""
+        document = {'items': [{'metadata': {'name': 'café-☃-日本'}}] * 20}
+        items = list(iter_list_items(_stream(document), chunk_size=5))
+
+        assert len(items) == 20
+        assert items[0]['metadata']['name'] == 'café-☃-日本'
+
+    @pytest.mark.unit
+    def test_large_item_spanning_many_reads(self):
+        """Test an item much larger than the read size"""
+        document = {'items': [{'data': 'x' * 100000}, {'data': 'y'}]}
+        items = list(iter_list_items(_stream(document), chunk_size=16))
+
+        assert len(items[0]['data']) == 100000
+        assert items[1] == {'data': 'y'}
+
+    @pytest.mark.unit
+    def test_truncated_stream_raises(self):
+        """Test a stream cut off mid-item is reported as an error"""
+        stream = io.StringIO('{"items": [{"a": 1}, {"b": ')
+
+        with pytest.raises(ValueError):
+            list(iter_list_items(stream))
+
+
+class TestWatchEvents:
+    """Test parsing of newline-delimited watch streams"""
+
+    @pytest.mark.unit
+    def test_events_split_across_reads(self):
+        """Test events are yielded whole regardless of read boundaries"""
+        events = [{'type': 'ADDED', 'object': {'metadata': {'name': f'pod-{i}'}}} for i in range(10)]
+        stream = io.BytesIO(''.join(json.dumps(event) + '\n' for event in events).encode('utf-8'))
+
+        assert list(iter_watch_events(stream, chunk_size=7)) == events
+
+    @pytest.mark.unit
+    def test_final_event_without_newline(self):
+        """Test a last event not terminated by a newline is still returned"""
+        stream = io.StringIO('{"type": "BOOKMARK"}\n\n{"type": "DELETED"}')
+
+        assert [event['type'] for event in iter_watch_events(stream)] == ['BOOKMARK', 'DELETED']
@@ -0,0 +1,127 @@
+"""
+Unit tests and a benchmark for the inverted pod label index
+"""
+import time
+import pytest
+from upid.core.label_index import LabelIndex, parse_selector
+
+
+def _pod(name, labels, namespace='shop'):
+    return {'metadata': {'name': name, 'namespace': namespace, 'labels': labels}}
+
+
+PODS = [
+    _pod('web-1', {'app': 'web', 'tier': 'frontend', 'track': 'stable'}),
+    _pod('web-2', {'app': 'web', 'tier': 'frontend', 'track': 'canary'}),
+    _pod('api-1', {'app': 'api', 'tier': 'backend'}),
+    _pod('db-0', {'app': 'db', 'tier': 'backend', 'critical': 'true'}),
+    _pod('web-1', {'app': 'web', 'tier': 'frontend'}, namespace='staging'),
+]
+
+
+def _linear(pods, selector, namespace=None):
+    """Reference implementation: evaluate the selector against every pod"""
+    matched = set()
+    for pod_id, pod in enumerate(pods):
+        metadata = pod['metadata']
+        labels = metadata['labels']
+        if namespace is not None and metadata['namespace'] != namespace:
+            continue
+        ok = all(labels.get(key) == value for key, value in selector.get('matchLabels', {}).items())
+        for expression in selector.get('matchExpressions', []):
+            key, operator, values = expression['key'], expression['operator'], expression.get('values', [])
+            ok = ok and {
+                'In': key in labels and labels[key] in values,
+                'NotIn': not (key in labels and labels[key] in values),
+                'Exists': key in labels,
+                'DoesNotExist': key not in labels,
+            }[operator]
+        if ok:
+            matched.add(pod_id)
+    return matched
+
+
+class TestLabelIndex:
+    """Test selector queries answered from the index"""
+
+    @pytest.mark.unit
+    def test_match_labels_and_namespace(self):
+        """Test equality selectors intersect label sets within a namespace"""
+        index = LabelIndex.from_pods(PODS)
+
+        assert index.names(index.select({'matchLabels': {'app': 'web'}}, 'shop')) == ['shop/web-1', 'shop/web-2']
+        assert index.names(index.select({'matchLabels': {'app': 'web'}})) == ['shop/web-1', 'shop/web-2',
+                                                                              'staging/web-1']
+        assert index.select({'matchLabels': {'app': 'web', 'tier': 'backend'}}) == set()
+        assert index.select({'matchLabels': {'app': 'web'}}, 'missing') == set()
+
+    @pytest.mark.unit
+    def test_expressions_match_linear_scan(self):
+        """Test In, NotIn, Exists and DoesNotExist agree with evaluating every pod"""
+        index = LabelIndex.from_pods(PODS)
+        selectors = [
+            {},
+            {'matchExpressions': [{'key': 'tier', 'operator': 'In', 'values': ['backend', 'frontend']}]},
+            {'matchExpressions': [{'key': 'track', 'operator': 'NotIn', 'values': ['canary']}]},
+            {'matchExpressions': [{'key': 'critical', 'operator': 'Exists'}]},
+            {'matchLabels': {'tier': 'frontend'}, 'matchExpressions': [{'key': 'track', 'operator': 'DoesNotExist'}]},
+        ]
+
+        for selector in selectors:
+            for namespace in (None, 'shop'):
+                assert index.select(selector, namespace) == _linear(PODS, selector, namespace), selector
+
+    @pytest.mark.unit
+    def test_empty_and_missing_selectors(self):
+        """Test an empty LabelSelector matches all pods but a missing one or empty Service selector none"""
+        index = LabelIndex.from_pods(PODS)
+
+        assert len(index.select({}, 'shop')) == 4
+        assert index.select(None) == set()
+        assert index.select_labels({}) == set()
+        assert index.names(index.select_labels({'app': 'db'}, 'shop')) == ['shop/db-0']
+        with pytest.raises(ValueError):
+            index.select({'matchExpressions': [{'key': 'app', 'operator': 'Gt'}]})
+
+    @pytest.mark.unit
+    def test_parse_selector(self):
+        """Test kubectl-style selector strings become LabelSelectors"""
+        selector = parse_selector('app=web, tier!=backend,track in (stable, canary),!critical,env')
+
+        assert selector == {
+            'matchLabels': {'app': 'web'},
+            'matchExpressions': [
+                {'key': 'tier', 'operator': 'NotIn', 'values': ['backend']},
+                {'key': 'track', 'operator': 'In', 'values': ['stable', 'canary']},
+                {'key': 'critical', 'operator': 'DoesNotExist'},
+                {'key': 'env', 'operator': 'Exists'},
+            ],
+        }
+        assert LabelIndex.from_pods(PODS).names(LabelIndex.from_pods(PODS).select(parse_selector('app=web,track'))) == [
+            'shop/web-1', 'shop/web-2']
+        with pytest.raises(ValueError):
+            parse_selector('app in web')
+
+
+class TestLabelIndexPerformance:
+    """Benchmark selector queries over a large cluster"""
+
+    @pytest.mark.performance
+    def test_100k_pods(self):
+        """Benchmark indexing 100k pods and answering 1000 selectors"""
+        pods = [_pod(f'w{n}-{i}', {'app': f'w{n}', 'tier': ('web', 'api', 'db')[n % 3], 'team': f't{n % 40}',
+                                   'pod-template-hash': f'h{n}'}, namespace=f'ns{n % 50}')
+                for n in range(20000) for i in range(5)]
+
+        started = time.perf_counter()
+        index = LabelIndex.from_pods(pods)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        matched = [index.select({'matchLabels': {'app': f'w{n}'},
+                                 'matchExpressions': [{'key': 'tier', 'operator': 'In', 'values': ['web', 'api']}]},
+                                f'ns{n % 50}') for n in range(1000)]
+        queried = time.perf_counter() - started
+
+        print(f'\n{len(pods)} pods indexed in {built * 1000:.0f} ms, 1000 selectors in {queried * 1000:.0f} ms')
+        assert sum(len(pods) for pods in matched) == 5 * sum(1 for n in range(1000) if n % 3 != 2)
+        assert queried < 0.5
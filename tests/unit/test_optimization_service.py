@@ -0,0 +1,48 @@
+"""
+Unit tests for locally computed zero-pod recommendations
+"""
+import pytest
+from upid.commands.universal import _generate_optimizations
+from upid.services.optimization_service import OptimizationService, MIN_IDLE_SECONDS
+
+HOUR_MS = 3600 * 1000
+START_MS = 1700000000000
+
+
+def _stored(*workloads):
+    """A _stored_usage() result over 30d holding one idle container per (workload, span hours)"""
+    return {'period': '30d', 'tier': '1h', 'workloads': [
+        {'namespace': 'shop', 'workload': workload, 'container': 'app', 'samples': hours, 'cpu_avg': 1.0,
+         'cpu_p99': 2, 'first': START_MS, 'last': START_MS + hours * HOUR_MS}
+        for workload, hours in workloads
+    ]}
+
+
+class TestIdleWorkloads:
+    """Test idle time comes from the span the store holds"""
+
+    @pytest.mark.unit
+    def test_idle_time_is_the_observed_span(self):
+        """Test a workload seen for 2 days of a 30d period is idle for 2 days, not 30"""
+        rollup = [{'namespace': 'shop', 'workload': 'Deployment/web', 'pods': 3, 'monthly_cost': 40.0}]
+
+        recommendations = _generate_optimizations({}, {}, stored=_stored(('Deployment/web', 48)), rollup=rollup)
+
+        zero_pod = [rec['zero_pod'] for rec in recommendations if 'zero_pod' in rec]
+        assert len(zero_pod) == 1
+        assert zero_pod[0]['idle_time_seconds'] == 48 * 3600
+        assert zero_pod[0]['current_replicas'] == 3
+
+    @pytest.mark.unit
+    def test_short_spans_are_skipped(self):
+        """Test workloads observed for less than the minimum are not scale-to-zero candidates"""
+        rollup = [{'namespace': 'shop', 'workload': workload, 'pods': 1, 'monthly_cost': 10.0}
+                  for workload in ('Deployment/new', 'Deployment/old')]
+        stored = _stored(('Deployment/new', MIN_IDLE_SECONDS // 3600 - 1), ('Deployment/old', 72))
+
+        recommendations = OptimizationService().calculate_idle_workload_recommendations([
+            dict(row, idle_seconds=(workload['last'] - workload['first']) // 1000)
+            for row, workload in zip(rollup, stored['workloads'])
+        ])
+
+        assert [rec['deployment'] for rec in recommendations] == ['old']
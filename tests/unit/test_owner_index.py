@@ -0,0 +1,77 @@
+"""
+Unit tests and a benchmark for the owner-reference index
+"""
+import time
+import pytest
+from upid.core.owner_index import OwnerIndex
+
+
+def _owned(name, uid, owner_kind=None, owner_name=None, owner_uid=None, labels=None):
+    metadata = {'name': name, 'namespace': 'shop', 'uid': uid, 'labels': labels or {}}
+    if owner_kind:
+        metadata['ownerReferences'] = [{'kind': owner_kind, 'name': owner_name, 'uid': owner_uid, 'controller': True}]
+    return {'metadata': metadata}
+
+
+class TestOwnerIndex:
+    """Test pods resolve to the workload at the top of their controller chain"""
+
+    @pytest.mark.unit
+    def test_resolves_deployments_and_cronjobs(self):
+        """Test ReplicaSet pods name their Deployment and Job pods their CronJob"""
+        index = OwnerIndex.from_objects({
+            'ReplicaSet': [_owned('api-7c9', 'rs-1', 'Deployment', 'api', 'dep-1'), _owned('solo', 'rs-2')],
+            'Job': [_owned('backup-1', 'job-1', 'CronJob', 'backup', 'cron-1'), _owned('migrate', 'job-2')],
+        })
+
+        assert index.workload(_owned('api-7c9-x', 'p1', 'ReplicaSet', 'api-7c9', 'rs-1')['metadata']) == 'Deployment/api'
+        assert index.workload(_owned('solo-x', 'p2', 'ReplicaSet', 'solo', 'rs-2')['metadata']) == 'ReplicaSet/solo'
+        assert index.workload(_owned('backup-1-x', 'p3', 'Job', 'backup-1', 'job-1')['metadata']) == 'CronJob/backup'
+        assert index.workload(_owned('migrate-x', 'p4', 'Job', 'migrate', 'job-2')['metadata']) == 'Job/migrate'
+        assert index.workload(_owned('db-0', 'p5', 'StatefulSet', 'db', 'sts-1')['metadata']) == 'StatefulSet/db'
+        assert index.workload(_owned('debug', 'p6')['metadata']) == 'Pod/debug'
+
+    @pytest.mark.unit
+    def test_unlisted_owner_falls_back_to_template_hash(self):
+        """Test pods whose ReplicaSet was not listed are named from the pod-template-hash label"""
+        index = OwnerIndex.from_objects({'ReplicaSet': []})
+        pod = _owned('web-5d8f-x', 'p1', 'ReplicaSet', 'web-5d8f', 'rs-9', labels={'pod-template-hash': '5d8f'})
+
+        assert index.workload(pod['metadata']) == 'Deployment/web'
+        assert index.pod_workloads([pod]) == {'shop/web-5d8f-x': 'Deployment/web'}
+
+    @pytest.mark.unit
+    def test_chains_are_memoized(self):
+        """Test every owner on a resolved chain is memoized, and cycles stop at the depth limit"""
+        index = OwnerIndex({
+            'a': ('Custom', 'a', ('Custom', 'b', 'b')),
+            'b': ('Custom', 'b', ('Custom', 'c', 'c')),
+            'c': ('Custom', 'c', None),
+            'x': ('Loop', 'x', ('Loop', 'y', 'y')),
+            'y': ('Loop', 'y', ('Loop', 'x', 'x')),
+        })
+
+        assert index.resolve('a') == 'Custom/c'
+        assert index._resolved == {'a': 'Custom/c', 'b': 'Custom/c', 'c': 'Custom/c'}
+        assert index.resolve('x') in ('Loop/x', 'Loop/y')
+        assert index.resolve('missing') is None
+
+
+class TestOwnerIndexPerformance:
+    """Benchmark attributing a large cluster's pods"""
+
+    @pytest.mark.performance
+    def test_100k_pods(self):
+        """Benchmark indexing 20k ReplicaSets and resolving 100k pods"""
+        replicasets = [_owned(f'w{n}-h', f'rs-{n}', 'Deployment', f'w{n % 5000}', f'dep-{n % 5000}')
+                       for n in range(20000)]
+        pods = [_owned(f'w{n}-{i}', f'pod-{n}-{i}', 'ReplicaSet', f'w{n}-h', f'rs-{n}')
+                for n in range(20000) for i in range(5)]
+
+        started = time.perf_counter()
+        workloads = OwnerIndex.from_objects({'ReplicaSet': replicasets}).pod_workloads(pods)
+        elapsed = time.perf_counter() - started
+
+        print(f'\n{len(pods)} pods attributed to {len(set(workloads.values()))} workloads in {elapsed * 1000:.0f} ms')
+        assert len(set(workloads.values())) == 5000
+        assert elapsed < 1.0
@@ -0,0 +1,193 @@
+"""
+Unit tests for paginated list iteration with background prefetch
+"""
+import io
+import json
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import Mock, patch
+from urllib.parse import urlparse, parse_qs
+from rich.console import Console
+from upid.core.api_client import UPIDAPIClient
+from upid.core.pagination import PageIterator, parse_page
+from upid.core import utils
+from upid.core.utils import stream_items
+
+CLUSTERS = [{'cluster_id': f'c{n}', 'name': f'cluster-{n}', 'status': 'healthy'} for n in range(7)]
+
+
+class CursorHandler(BaseHTTPRequestHandler):
+    """Serves /v1/clusters in pages of `limit` with an opaque next_cursor"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        self.server.requests.append(params)
+        start = int(params.get('cursor', ['0'])[0])
+        limit = int(params.get('limit', ['100'])[0])
+        body = {'items': CLUSTERS[start:start + limit]}
+        if start + limit < len(CLUSTERS):
+            body['next_cursor'] = str(start + limit)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    """Run a fake UPID API with cursor pagination"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CursorHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pages(count, delay=0.0, calls=None):
+    """Fetch function serving `count` pages of two items with a cursor"""
+    def fetch(params):
+        if calls is not None:
+            calls.append(dict(params))
+        time.sleep(delay)
+        page = int(params.get('cursor', 0))
+        body = {'items': [page * 2, page * 2 + 1]}
+        if page + 1 < count:
+            body['next_cursor'] = page + 1
+        return body
+    return fetch
+
+
+class TestParsePage:
+    """Test the supported response shapes"""
+
+    @pytest.mark.unit
+    def test_response_shapes(self):
+        """Test bare arrays, cursors, page numbers and has_more"""
+        params = {'limit': 2}
+
+        assert parse_page([1, 2], params) == ([1, 2], None)
+        assert parse_page({'items': [1], 'next_cursor': 'abc'}, params) == ([1], {'limit': 2, 'cursor': 'abc'})
+        assert parse_page({'data': [1], 'page': 1, 'total_pages': 3}, params) == ([1], {'limit': 2, 'page': 2})
+        assert parse_page({'results': [1], 'page': 3, 'total_pages': 3}, params) == ([1], None)
+        assert parse_page({'items': [1], 'page': 1, 'has_more': True}, params) == ([1], {'limit': 2, 'page': 2})
+        assert parse_page({'items': [], 'next_cursor': 'loop'}, params) == ([], None)
+        assert parse_page(None, params) == ([], None)
+
+
+class TestPageIterator:
+    """Test iteration, prefetch overlap and early exit"""
+
+    @pytest.mark.unit
+    def test_yields_every_item_in_order(self):
+        """Test items of all pages are yielded in order with the cursor passed along"""
+        calls = []
+        pages = PageIterator(_pages(4, calls=calls), {'namespace': 'shop'}, page_size=2)
+
+        assert list(pages) == list(range(8))
+        assert pages.pages == 4
+        assert calls[1] == {'namespace': 'shop', 'limit': 2, 'cursor': 1}
+
+    @pytest.mark.unit
+    def test_next_page_is_fetched_while_the_caller_works(self):
+        """Test fetching overlaps with handling the previous page"""
+        def consume(prefetch):
+            started = time.perf_counter()
+            for _ in PageIterator(_pages(5, delay=0.1), page_size=2, prefetch=prefetch).iter_pages():
+                time.sleep(0.1)
+            return time.perf_counter() - started
+
+        sequential = consume(False)
+        prefetched = consume(True)
+
+        assert sequential >= 1.0
+        assert prefetched < 0.85
+
+    @pytest.mark.unit
+    def test_stopping_early_fetches_at_most_one_extra_page(self):
+        """Test breaking out after the first page leaves no further fetches behind"""
+        calls = []
+        for item in PageIterator(_pages(100, delay=0.05, calls=calls), page_size=2):
+            break
+        time.sleep(0.15)
+
+        assert item == 0
+        assert len(calls) <= 2
+
+    @pytest.mark.unit
+    def test_prefetch_in_flight_does_not_block_exit(self):
+        """Test the process exits while a prefetched page nobody will read still hangs"""
+        code = (
+            "import time\n"
+            "from upid.core.pagination import PageIterator\n"
+            "def fetch(params):\n"
+            "    if 'cursor' in params:\n"
+            "        time.sleep(30)\n"
+            "    return {'items': [1, 2], 'next_cursor': 'c2'}\n"
+            "print(next(iter(PageIterator(fetch, page_size=2))))\n"
+        )
+        started = time.monotonic()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20,
+                                cwd=Path(__file__).resolve().parents[2])
+
+        assert result.stdout.strip() == '1'
+        assert time.monotonic() - started < 5
+
+
+class TestClientIterators:
+    """Test the client's paginated list methods and streamed output"""
+
+    @pytest.mark.unit
+    def test_iter_clusters_follows_cursors(self, mock_config, api_server):
+        """Test iter_clusters requests pages of page_size and yields every cluster"""
+        mock_config.set('api_url', f'http://127.0.0.1:{api_server.server_address[1]}')
+        mock_config.set('local_mode', False)
+        auth_manager = Mock()
+        auth_manager.get_token.return_value = 'token-1'
+        client = UPIDAPIClient(mock_config, auth_manager, use_cache=False)
+
+        clusters = list(client.iter_clusters(page_size=3))
+
+        assert clusters == CLUSTERS
+        assert api_server.requests == [{'limit': ['3']}, {'limit': ['3'], 'cursor': ['3']},
+                                       {'limit': ['3'], 'cursor': ['6']}]
+
+    @pytest.mark.unit
+    def test_local_mode_iterates_mock_data(self, mock_config):
+        """Test local mode yields the same items as the list method"""
+        mock_config.set('local_mode', True)
+        client = UPIDAPIClient(mock_config, Mock(), use_cache=False)
+
+        assert list(client.iter_deployments('c1', 'shop')) == client.get_deployments('c1', 'shop')
+
+    @pytest.mark.unit
+    def test_stream_items_formats(self):
+        """Test table lines, JSON Lines and YAML documents are printed per item"""
+        columns = [('ID', 4, lambda item: item['cluster_id']), ('NAME', 10, lambda item: item['name'])]
+
+        def printed(pages, format):
+            out = io.StringIO()
+            with patch.object(utils, 'console', Console(file=out, width=200)):
+                count = stream_items(pages, format, columns)
+            return count, out.getvalue()
+
+        count, out = printed([CLUSTERS[:2], CLUSTERS[2:3]], 'table')
+        assert count == 3
+        assert out.splitlines() == ['ID   NAME', 'c0   cluster-0', 'c1   cluster-1', 'c2   cluster-2']
+        assert [json.loads(line) for line in printed([CLUSTERS[:2]], 'json')[1].splitlines()] == CLUSTERS[:2]
+        assert printed([CLUSTERS[:1]], 'yaml')[1].startswith('---\ncluster_id: c0\n')
+        assert printed([[]], 'table') == (0, '')
@@ -0,0 +1,124 @@
+"""
+Unit tests and a benchmark for mergeable usage quantile sketches
+
+Run the benchmark alone with `make perf-test` (pytest -m performance).
+"""
+import time
+import numpy as np
+import pytest
+from upid.core.quantile_sketch import QuantileSketches, LogMapping, merge_sketches
+
+WEB = ('shop', 'Deployment/web', 'app')
+DB = ('ops', 'StatefulSet/db', 'db')
+
+
+def _exact(values, percentile):
+    """Nearest-rank percentile"""
+    ordered = np.sort(values)
+    return ordered[max(int(np.ceil(len(ordered) * percentile / 100)), 1) - 1]
+
+
+class TestLogMapping:
+    """Test values map to bins within the relative accuracy"""
+
+    @pytest.mark.unit
+    def test_representatives_within_accuracy(self):
+        """Test bin representatives are within 2% of the value (plus integer rounding), and zero maps to zero"""
+        mapping = LogMapping(0.02, 1, 10 ** 6)
+        values = np.unique(np.geomspace(1, 10 ** 6, 5000).astype(np.int64))
+
+        estimates = mapping.value(mapping.index(values))
+
+        assert np.all(np.abs(estimates - values) <= 0.02 * values + 0.5)
+        assert mapping.index(np.array([0]))[0] == 0 and mapping.value(np.array([0]))[0] == 0
+        assert mapping.index(np.array([10 ** 9]))[0] == mapping.bins - 1
+
+
+class TestQuantileSketches:
+    """Test incremental updates, merging and serialization"""
+
+    @pytest.mark.unit
+    def test_percentiles_within_accuracy(self):
+        """Test sketch percentiles track exact nearest-rank percentiles"""
+        rng = np.random.default_rng(1)
+        cpu = rng.lognormal(5, 1, 20000).astype(np.int64) + 1
+        memory = rng.integers(64 << 20, 4 << 30, 20000)
+        sketches = QuantileSketches()
+        for start in range(0, len(cpu), 100):
+            sketches.add([WEB] * 100, cpu[start:start + 100], memory[start:start + 100])
+
+        summary = sketches.summarize()[WEB]
+
+        assert summary['samples'] == 20000
+        for percentile in (50, 90, 95, 99):
+            assert summary[f'cpu_p{percentile}'] == pytest.approx(_exact(cpu, percentile), rel=0.03)
+            assert summary[f'memory_p{percentile}'] == pytest.approx(_exact(memory, percentile), rel=0.03)
+
+    @pytest.mark.unit
+    def test_merge_equals_combined_stream(self):
+        """Test merging sketches of two clusters equals sketching all samples together"""
+        rng = np.random.default_rng(2)
+        east, west, both = QuantileSketches(), QuantileSketches(), QuantileSketches()
+        for tick in range(200):
+            cpu, memory = rng.integers(0, 2000, 2), rng.integers(0, 2 << 30, 2)
+            (east if tick % 2 else west).add([WEB, DB], cpu, memory)
+            both.add([WEB, DB], cpu, memory)
+
+        merged = merge_sketches([east, west])
+
+        assert merged.summarize() == both.summarize()
+        with pytest.raises(ValueError):
+            merged.merge(QuantileSketches(relative_accuracy=0.05))
+
+    @pytest.mark.unit
+    def test_grouped_rekeys_rows(self):
+        """Test rows merge by a key function, e.g. pods into their workload"""
+        sketches = QuantileSketches()
+        sketches.add([('shop', 'web-1', 'app'), ('shop', 'web-2', 'app')], np.array([100, 300]), np.array([0, 0]))
+
+        workload = sketches.grouped(lambda key: (key[0], key[2]))
+
+        assert len(workload) == 1
+        assert workload.summarize()[('shop', 'app')]['samples'] == 2
+
+    @pytest.mark.unit
+    def test_round_trip_and_save(self, tmp_path):
+        """Test sketches survive to_bytes()/save() and unreadable files load as None"""
+        rng = np.random.default_rng(3)
+        sketches = QuantileSketches()
+        for _ in range(50):
+            sketches.add([WEB, DB], rng.integers(0, 4000, 2), rng.integers(0, 8 << 30, 2))
+
+        path = sketches.save(tmp_path / 'sketch.bin')
+        (tmp_path / 'bad.bin').write_bytes(b'not a sketch')
+
+        assert QuantileSketches.from_bytes(sketches.to_bytes()).summarize() == sketches.summarize()
+        assert QuantileSketches.load(path).summarize() == sketches.summarize()
+        assert QuantileSketches.load(tmp_path / 'bad.bin') is None
+        assert QuantileSketches.load(tmp_path / 'missing.bin') is None
+
+
+class TestQuantileSketchesPerformance:
+    """Benchmark sketch updates and queries over many series"""
+
+    @pytest.mark.performance
+    def test_many_series(self):
+        """Benchmark 100 samples of 20k containers, then percentiles and encoding"""
+        rng = np.random.default_rng(0)
+        keys = [(f'ns{i % 50}', f'Deployment/w{i % 5000}', f'c{i % 4}') for i in range(20000)]
+        sketches = QuantileSketches()
+
+        started = time.perf_counter()
+        for _ in range(100):
+            sketches.add(keys, rng.integers(0, 4000, len(keys)), rng.integers(0, 8 << 30, len(keys)))
+        added = time.perf_counter() - started
+        started = time.perf_counter()
+        quantiles = sketches.quantiles()
+        queried = time.perf_counter() - started
+        encoded = sketches.to_bytes()
+
+        print(f'\n{len(sketches)} series: {added / 100 * 1000:.1f} ms per sample, percentiles in {queried * 1000:.0f} ms, '
+              f'{sketches.nbytes / len(sketches):.0f} bytes/series in memory, {len(encoded) / len(sketches):.0f} encoded')
+        assert quantiles['cpu'].shape == (len(sketches), 4)
+        assert added / 100 < 0.1
+        assert queried < 1.0
@@ -0,0 +1,120 @@
+"""
+Unit tests and micro-benchmarks for Kubernetes quantity parsing
+
+Run the benchmarks alone with `make perf-test` (pytest -m performance).
+"""
+import time
+import timeit
+import pytest
+from fractions import Fraction
+from upid.core import quantity
+from upid.core.quantity import (
+    parse_quantity, parse_millicores, parse_bytes, millicores_or_zero, bytes_or_zero
+)
+from upid.core.resource_table import ResourceTable
+
+
+class TestQuantityParsing:
+    """Test the full quantity grammar"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value, expected', [
+        ('100m', 100), ('1', 1000), ('0.5', 500), ('1.5', 1500), ('2k', 2000000),
+        ('250000000n', 250), ('1n', 1), ('1500u', 2), ('5e-3', 5), ('1e3', 1000000),
+        ('0', 0), ('+1', 1000), (0.25, 250), (2, 2000),
+    ])
+    def test_millicores(self, value, expected):
+        """Test CPU quantities become integer millicores, rounded up"""
+        assert parse_millicores(value) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value, expected', [
+        ('128Mi', 128 * 1024 ** 2), ('1.5Gi', 3 * 1024 ** 3 // 2), ('1Pi', 1024 ** 5), ('2Ei', 2 * 1024 ** 6),
+        ('1Ki', 1024), ('1k', 1000), ('1M', 10 ** 6), ('1G', 10 ** 9), ('2T', 2 * 10 ** 12),
+        ('1P', 10 ** 15), ('1E', 10 ** 18), ('500e6', 500 * 10 ** 6), ('1.5E3', 1500), ('129m', 1),
+        ('12345', 12345),
+    ])
+    def test_bytes(self, value, expected):
+        """Test binary and decimal SI suffixes and exponents"""
+        assert parse_bytes(value) == expected
+
+    @pytest.mark.unit
+    def test_exact_values(self):
+        """Test values are exact rather than floating point"""
+        assert parse_quantity('0.1') * 3 == Fraction(3, 10)
+        assert parse_bytes('1.000000001G') == 1000000001
+        assert parse_bytes('8Ei') == 8 * 2 ** 60
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value', ['', 'abc', '1Kb', '1e', '1.2.3', 'Mi', '1 Gi 2', '--1'])
+    def test_invalid(self, value):
+        """Test malformed quantities are rejected, or count as zero in the lenient helpers"""
+        with pytest.raises(ValueError):
+            parse_quantity(value)
+        assert millicores_or_zero(value) == 0
+        assert bytes_or_zero(value) == 0
+
+    @pytest.mark.unit
+    def test_memoized(self):
+        """Test repeated strings are served from the cache"""
+        parse_bytes('777Mi')
+        hits = quantity.cache_info()['bytes']['hits']
+        parse_bytes('777Mi')
+
+        assert quantity.cache_info()['bytes']['hits'] == hits + 1
+
+
+class TestQuantityPerformance:
+    """Micro-benchmarks for quantity parsing and columnar aggregation"""
+
+    VALUES = ['100m', '250m', '500m', '1', '2', '64Mi', '128Mi', '256Mi', '1Gi', '1.5Gi', '500e6', '2G']
+
+    @pytest.mark.performance
+    def test_memoized_parse_throughput(self):
+        """Benchmark cached parses of repeated strings"""
+        values = self.VALUES * 10000
+        for value in self.VALUES:
+            millicores_or_zero(value)
+
+        elapsed = min(timeit.repeat(lambda: [millicores_or_zero(v) for v in values], number=1, repeat=3))
+        print(f'\n{len(values)} memoized parses: {elapsed * 1000:.1f} ms '
+              f'({elapsed / len(values) * 1e9:.0f} ns/parse)')
+        assert elapsed < 1.0
+
+    @pytest.mark.performance
+    def test_uncached_parse_cost(self):
+        """Benchmark first-time parses of distinct strings"""
+        values = [f'{i}Mi' for i in range(1, 5001)]
+        quantity._parse.cache_clear()
+        quantity._bytes.cache_clear()
+
+        started = time.perf_counter()
+        for value in values:
+            parse_bytes(value)
+        elapsed = time.perf_counter() - started
+        print(f'\n{len(values)} uncached parses: {elapsed * 1000:.1f} ms '
+              f'({elapsed / len(values) * 1e6:.1f} us/parse)')
+        assert elapsed < 2.0
+
+    @pytest.mark.performance
+    def test_resource_table_aggregation(self):
+        """Benchmark building and aggregating a 100k-container table"""
+        pods = [
+            {'metadata': {'name': f'pod-{i}', 'namespace': f'ns-{i % 50}'},
+             'spec': {'nodeName': f'node-{i % 200}', 'containers': [
+                 {'resources': {'requests': {'cpu': self.VALUES[i % 5], 'memory': self.VALUES[5 + i % 5]}}}
+             ] * 2},
+             'status': {'phase': 'Running'}}
+            for i in range(50000)
+        ]
+
+        started = time.perf_counter()
+        table = ResourceTable.from_pods(pods)
+        built = time.perf_counter()
+        table.totals()
+        table.group_by('namespace')
+        table.group_by('node')
+        aggregated = time.perf_counter()
+        print(f'\n{len(table)} containers: build {(built - started) * 1000:.0f} ms, '
+              f'aggregate {(aggregated - built) * 1000:.1f} ms')
+        assert aggregated - built < 1.0
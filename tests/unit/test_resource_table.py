@@ -0,0 +1,100 @@
+"""
+Unit tests for the columnar resource table
+"""
+import pytest
+from upid.core.resource_table import ResourceTable
+
+
+def _pod(name, namespace, node, phase, containers, owner=None):
+    metadata = {'name': name, 'namespace': namespace}
+    if owner:
+        metadata['ownerReferences'] = [{'kind': owner[0], 'name': owner[1], 'controller': True}]
+    return {
+        'metadata': metadata,
+        'spec': {'nodeName': node, 'containers': [{'name': f'c{i}', 'resources': r} for i, r in enumerate(containers)]},
+        'status': {'phase': phase},
+    }
+
+
+PODS = [
+    _pod('web-1', 'shop', 'node-a', 'Running', [
+        {'requests': {'cpu': '500m', 'memory': '256Mi'}, 'limits': {'cpu': '1', 'memory': '512Mi'}},
+        {'requests': {'cpu': '100m', 'memory': '64Mi'}},
+    ], owner=('ReplicaSet', 'web-5d8f')),
+    _pod('web-2', 'shop', 'node-b', 'Pending', [
+        {'requests': {'cpu': '500m', 'memory': '256Mi'}, 'limits': {'cpu': '1', 'memory': '512Mi'}},
+    ], owner=('ReplicaSet', 'web-5d8f')),
+    _pod('dns', 'kube-system', 'node-a', 'Running', [
+        {'requests': {'cpu': '2', 'memory': '1Gi'}, 'limits': {'cpu': '2', 'memory': '1Gi'}},
+    ]),
+]
+
+
+@pytest.fixture
+def table():
+    return ResourceTable.from_pods(PODS)
+
+
+class TestResourceTable:
+    """Test vectorized totals and group-bys"""
+
+    @pytest.mark.unit
+    def test_totals(self, table):
+        """Test cluster totals over every container"""
+        totals = table.totals()
+
+        assert len(table) == 4
+        assert totals['pods'] == 3
+        assert totals['running_pods'] == 2
+        assert totals['cpu_requests'] == 3100
+        assert totals['memory_requests'] == (256 + 64 + 256 + 1024) * 1024 ** 2
+        assert totals['cpu_limits'] == 4000
+
+    @pytest.mark.unit
+    def test_group_by_namespace_node_and_owner(self, table):
+        """Test sums and container counts per group"""
+        namespaces = table.group_by('namespace')
+        nodes = table.group_by('node')
+        owners = table.group_by('owner')
+
+        assert namespaces['shop']['containers'] == 3
+        assert namespaces['shop']['cpu_requests'] == 1100
+        assert isinstance(namespaces['shop']['memory_requests'], int)
+        assert nodes['node-a']['cpu_requests'] == 2600
+        assert owners['shop/ReplicaSet/web-5d8f']['containers'] == 3
+        assert owners['']['cpu_requests'] == 2000
+
+    @pytest.mark.unit
+    def test_top_and_ratios(self, table):
+        """Test ranking and requests/limits ratios"""
+        assert [name for name, _ in table.top('namespace')] == ['kube-system', 'shop']
+
+        ratios = table.ratios('cpu_requests', 'cpu_limits', 'namespace')
+        assert ratios['kube-system'] == pytest.approx(1.0)
+        assert ratios['shop'] == pytest.approx(1.1 / 2.0)
+
+    @pytest.mark.unit
+    def test_empty(self):
+        """Test an empty cluster produces an empty table"""
+        table = ResourceTable.from_pods([])
+
+        assert len(table) == 0
+        assert table.totals()['cpu_requests'] == 0
+        assert table.group_by('namespace') == {}
+        assert table.top('node') == []
+
+    @pytest.mark.unit
+    def test_out_of_range_quantity_counts_as_zero(self):
+        """Test a quantity too large for int64 is dropped with a warning instead of failing the table"""
+        pods = PODS + [_pod('huge', 'shop', 'node-a', 'Running', [
+            {'requests': {'cpu': '1e20', 'memory': '16Ei'}, 'limits': {'memory': '1Ei'}},
+        ])]
+
+        with pytest.warns(RuntimeWarning, match="memory_requests quantity '16Ei'"):
+            table = ResourceTable.from_pods(pods)
+
+        totals = table.totals()
+        assert totals['containers'] == 5
+        assert totals['cpu_requests'] == 3100
+        assert totals['memory_requests'] == (576 + 1024) * 1024**2
+        assert totals['memory_limits'] == 1024 * 1024**2 + 2**60 + 512 * 1024**2 * 2
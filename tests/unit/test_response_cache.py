@@ -0,0 +1,159 @@
+"""
+Unit tests for the API response cache against a local fake UPID API
+"""
+import json
+import os
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+from upid.core.api_client import UPIDAPIClient
+from upid.core.response_cache import ResponseCache, cache_control
+
+
+class FakeUpidHandler(BaseHTTPRequestHandler):
+    """Serves versioned JSON with an ETag, answering matching If-None-Match with 304"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get('If-None-Match')))
+        version = server.versions.get(self.path.split('?')[0], 1)
+        etag = f'"v{version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(200, {'path': self.path, 'version': version}, etag)
+
+    def do_DELETE(self):
+        self.server.requests.append((self.path, None))
+        self._send(200, {'deleted': True})
+
+    def _send(self, status, body, etag=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+        control = self.server.cache_control.get(self.path.split('?')[0])
+        if control:
+            self.send_header('Cache-Control', control)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upid_server():
+    """Run a fake UPID API on a local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpidHandler)
+    server.requests = []
+    server.versions = {}
+    server.cache_control = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(mock_config, upid_server, tmp_path):
+    """API client pointed at the fake API with a cache in a temporary directory"""
+    mock_config.set('api_url', f'http://127.0.0.1:{upid_server.server_address[1]}')
+    mock_config.set('local_mode', False)
+    auth_manager = Mock()
+    auth_manager.get_token.return_value = 'token-1'
+    api_client = UPIDAPIClient(mock_config, auth_manager)
+    api_client.response_cache = ResponseCache(directory=str(tmp_path / 'http-cache'))
+    return api_client
+
+
+class TestResponseCache:
+    """Test fresh hits, conditional revalidation and invalidation"""
+
+    @pytest.mark.unit
+    def test_fresh_responses_skip_the_request(self, client, upid_server):
+        """Test an endpoint with a TTL is answered from disk on repeat calls"""
+        first = client.analyze_costs('c1', '30d')
+        second = client.analyze_costs('c1', '30d')
+        other_period = client.analyze_costs('c1', '7d')
+
+        assert first == second == {'path': '/v1/clusters/c1/analysis/costs?period=30d', 'version': 1}
+        assert other_period['path'].endswith('period=7d')
+        assert len(upid_server.requests) == 2
+
+    @pytest.mark.unit
+    def test_stale_responses_revalidate_with_etag(self, client, upid_server):
+        """Test an endpoint without a TTL sends If-None-Match and reuses the body on 304"""
+        first = client.get_optimization_result('op-1')
+        second = client.get_optimization_result('op-1')
+        upid_server.versions['/v1/optimizations/op-1'] = 2
+        third = client.get_optimization_result('op-1')
+
+        assert first == second
+        assert third['version'] == 2
+        assert upid_server.requests == [('/v1/optimizations/op-1', None), ('/v1/optimizations/op-1', '"v1"'),
+                                        ('/v1/optimizations/op-1', '"v1"')]
+
+    @pytest.mark.unit
+    def test_cache_control_overrides_endpoint_ttl(self, client, upid_server):
+        """Test no-store responses are never kept and max-age makes others fresh"""
+        upid_server.cache_control['/v1/clusters/c1/analysis/resources'] = 'private, no-store'
+        upid_server.cache_control['/v1/deployments/d1'] = 'max-age=60'
+        client.analyze_resources('c1')
+        client.analyze_resources('c1')
+        client.get_deployment_status('d1')
+        client.get_deployment_status('d1')
+
+        assert [path for path, _ in upid_server.requests] == ['/v1/clusters/c1/analysis/resources',
+                                                              '/v1/clusters/c1/analysis/resources',
+                                                              '/v1/deployments/d1']
+        assert cache_control('no-cache, max-age="30"') == {'no_store': False, 'no_cache': True, 'max_age': 30}
+
+    @pytest.mark.unit
+    def test_writes_invalidate_cluster_reads(self, client, upid_server):
+        """Test deleting a cluster drops its cached reads and the cluster list, but not other clusters"""
+        for cluster_id in ('c1', 'c2'):
+            client.get_cluster(cluster_id)
+        client.get_clusters()
+        client.delete_cluster('c1')
+        upid_server.requests.clear()
+        client.get_cluster('c1')
+        client.get_cluster('c2')
+        client.get_clusters()
+
+        assert [path for path, _ in upid_server.requests] == ['/v1/clusters/c1', '/v1/clusters']
+
+    @pytest.mark.unit
+    def test_entries_are_per_token_and_optional(self, client, upid_server, mock_config):
+        """Test another token misses the cache and a client without a cache always asks"""
+        client.analyze_performance('c1')
+        client.auth_manager.get_token.return_value = 'token-2'
+        client.analyze_performance('c1')
+        uncached = UPIDAPIClient(mock_config, client.auth_manager, use_cache=False)
+        uncached.analyze_performance('c1')
+
+        assert uncached.response_cache is None
+        assert len(upid_server.requests) == 3
+
+    @pytest.mark.unit
+    def test_least_recently_used_files_are_evicted(self, tmp_path):
+        """Test the size bound keeps recently read entries"""
+        cache = ResponseCache(directory=str(tmp_path), max_bytes=2500)
+        paths = [cache.path(f'/clusters/c{n}', f'https://api/v1/clusters/c{n}') for n in range(3)]
+        for n, path in enumerate(paths[:2]):
+            cache.store(path, f'/clusters/c{n}', {}, {'payload': 'x' * 1000})
+            os.utime(path, (time.time() - 10 + n, time.time() - 10 + n))
+        assert cache.load(paths[0]) is not None
+        cache.store(paths[2], '/clusters/c2', {}, {'payload': 'x' * 1000})
+
+        assert [path.exists() for path in paths] == [True, False, True]
@@ -0,0 +1,190 @@
+"""
+Unit tests for API retries, backoff and the per-host circuit breaker
+"""
+import json
+import random
+import socket
+import threading
+import pytest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+from upid.core.api_client import UPIDAPIClient
+from upid.core.retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, parse_retry_after
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next scripted (status, headers) for its path, then 200"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._reply()
+
+    def _reply(self):
+        self.server.requests.append((self.command, self.path))
+        script = self.server.script.get(self.path, [])
+        status, headers = script.pop(0) if script else (200, {})
+        data = json.dumps({'status': status}).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    """Run a scripted fake UPID API on a local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.requests = []
+    server.script = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(config, api_url, sleeps):
+    config.set('api_url', api_url)
+    config.set('local_mode', False)
+    auth_manager = Mock()
+    auth_manager.get_token.return_value = 'token-1'
+    client = UPIDAPIClient(config, auth_manager, use_cache=False)
+    client.retry_policy.sleep = sleeps.append
+    client.retry_policy.rng = random.Random(1)
+    return client
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestRetryPolicy:
+    """Test which failures are retried and how long each wait is"""
+
+    @pytest.mark.unit
+    def test_backoff_uses_full_jitter_and_retry_after(self):
+        """Test waits stay within the exponential cap, honor Retry-After and stop after max_retries"""
+        policy = RetryPolicy(max_retries=3, backoff=1.0, max_backoff=3.0, max_retry_after=60, rng=random.Random(7))
+
+        for attempt, cap in enumerate((1.0, 2.0, 3.0)):
+            assert all(0 <= policy.delay(attempt) <= cap for _ in range(200))
+        assert policy.delay(0, retry_after=5) >= 5
+        assert policy.delay(0, retry_after=61) is None
+        assert policy.delay(3) is None
+        assert policy.retries_status('GET', 503) and policy.retries_status('POST', 429)
+        assert not policy.retries_status('POST', 503) and not policy.retries_status('GET', 500)
+
+    @pytest.mark.unit
+    def test_parse_retry_after(self):
+        """Test delta seconds and HTTP dates"""
+        assert parse_retry_after('7') == 7.0
+        assert parse_retry_after(formatdate(1_000_030, usegmt=True), now=1_000_000) == 30.0
+        assert parse_retry_after('soon') is None
+        assert parse_retry_after(None) is None
+
+
+class TestClientRetries:
+    """Test retries and the circuit breaker through UPIDAPIClient against a local server"""
+
+    @pytest.mark.unit
+    def test_get_retries_transient_statuses(self, mock_config, api_server):
+        """Test a GET survives a 503 with Retry-After and a 502, with metrics of both"""
+        sleeps = []
+        client = _client(mock_config, f'http://127.0.0.1:{api_server.server_address[1]}', sleeps)
+        api_server.script['/v1/clusters'] = [(503, {'Retry-After': '2'}), (502, {})]
+
+        assert client.get_clusters() == {'status': 200}
+        assert len(api_server.requests) == 3
+        assert sleeps[0] >= 2
+        metrics = client.request_metrics()
+        assert (metrics['calls'], metrics['attempts'], metrics['retries']) == (1, 3, 2)
+        assert metrics['retry_reasons'] == {'502': 1, '503': 1}
+        assert next(iter(metrics['breakers'].values()))['state'] == 'closed'
+
+    @pytest.mark.unit
+    def test_post_is_retried_only_when_not_processed(self, mock_config, api_server):
+        """Test a POST is retried after a 429 but a 503 is returned as an error"""
+        sleeps = []
+        client = _client(mock_config, f'http://127.0.0.1:{api_server.server_address[1]}', sleeps)
+        api_server.script['/v1/clusters/c1/analyze'] = [(429, {'Retry-After': '1'}), (503, {})]
+
+        with pytest.raises(Exception):
+            client.analyze_cluster('c1')
+
+        assert api_server.requests == [('POST', '/v1/clusters/c1/analyze')] * 2
+        assert client.request_metrics()['retries'] == 1
+
+    @pytest.mark.unit
+    def test_too_long_retry_after_gives_up(self, mock_config, api_server):
+        """Test a Retry-After beyond the limit fails at once instead of sleeping"""
+        sleeps = []
+        client = _client(mock_config, f'http://127.0.0.1:{api_server.server_address[1]}', sleeps)
+        api_server.script['/v1/clusters'] = [(503, {'Retry-After': '3600'})]
+
+        with pytest.raises(Exception):
+            client.get_clusters()
+
+        assert sleeps == []
+        assert client.request_metrics()['exhausted'] == 1
+
+    @pytest.mark.unit
+    def test_circuit_opens_and_recovers(self, mock_config):
+        """Test an unreachable host opens the breaker, calls then fail fast, and a trial call closes it"""
+        sleeps = []
+        port = _closed_port()
+        client = _client(mock_config, f'http://127.0.0.1:{port}', sleeps)
+        client.retry_policy.max_retries = 1
+        now = [0.0]
+        client.breakers[f'127.0.0.1:{port}'] = CircuitBreaker(failure_threshold=4, reset_timeout=30,
+                                                              clock=lambda: now[0])
+
+        for _ in range(2):
+            with pytest.raises(Exception, match='Request failed'):
+                client.get_clusters()
+        with pytest.raises(CircuitOpenError):
+            client.get_clusters()
+        metrics = client.request_metrics()
+        assert (metrics['attempts'], metrics['rejected']) == (4, 1)
+        assert metrics['retry_reasons'] == {'ConnectionError': 2}
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), ScriptedHandler)
+        server.requests, server.script = [], {}
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        try:
+            now[0] = 31.0
+            assert client.get_clusters() == {'status': 200}
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert client.request_metrics()['breakers'][f'127.0.0.1:{port}'] == {
+            'state': 'closed', 'failures': 0, 'times_opened': 1}
+
+    @pytest.mark.unit
+    def test_half_open_allows_one_trial(self):
+        """Test only one call passes while half open and a failed trial reopens the breaker"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call('api')
+        now[0] = 10.0
+        breaker.before_call('api')
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call('api')
+        breaker.record_failure()
+
+        assert breaker.status() == {'state': 'open', 'failures': 2, 'times_opened': 2}
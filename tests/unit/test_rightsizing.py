@@ -0,0 +1,153 @@
+"""
+Unit tests and a benchmark for percentile-based container right-sizing
+
+Run the benchmark alone with `make perf-test` (pytest -m performance).
+"""
+import time
+import numpy as np
+import pytest
+from upid.core.resource_table import ResourceTable
+from upid.core.rightsizing import RightsizingEngine, ContainerUsage, MEBIBYTE, MIN_CPU_REQUEST
+
+MI = MEBIBYTE
+
+
+def _pod(name, container, requests, limits=None, namespace='shop', deployment='web'):
+    return {
+        'metadata': {
+            'name': name, 'namespace': namespace, 'labels': {'pod-template-hash': 'abc'},
+            'ownerReferences': [{'kind': 'ReplicaSet', 'name': f'{deployment}-abc'}],
+        },
+        'spec': {'containers': [{'name': container, 'resources': {'requests': requests, 'limits': limits or {}}}]},
+        'status': {'phase': 'Running'},
+    }
+
+
+def _usage(cpu, memory, samples=1000, namespace='shop', workload='Deployment/web', container='app'):
+    return {
+        'namespace': namespace, 'workload': workload, 'container': container, 'samples': samples,
+        'cpu_p50': cpu // 2, 'cpu_p90': cpu, 'cpu_p95': cpu, 'cpu_p99': cpu, 'cpu_peak': cpu,
+        'memory_p50': memory // 2, 'memory_p90': memory, 'memory_p95': memory, 'memory_p99': memory,
+        'memory_peak': memory,
+    }
+
+
+class TestRightsizingEngine:
+    """Test recommendations computed from usage percentiles and pod specs"""
+
+    @pytest.mark.unit
+    def test_downsize_over_provisioned_container(self):
+        """Test requests follow p95 CPU and p99 memory plus headroom, and savings count replicas"""
+        pods = [_pod(f'web-{i}', 'app', {'cpu': '1', 'memory': '1Gi'}) for i in range(3)]
+        usage = ContainerUsage.from_rows([_usage(200, 256 * MI)])
+
+        result = RightsizingEngine('balanced').recommend(usage, ResourceTable.from_pods(pods))
+        row = result.rows()[0]
+
+        assert (row['namespace'], row['workload'], row['container']) == ('shop', 'Deployment/web', 'app')
+        assert row['replicas'] == 3
+        assert row['cpu_recommended'] == 230
+        assert row['memory_recommended'] == 295 * MI
+        assert row['cpu_limit_recommended'] == 0 and row['memory_limit_recommended'] == 0
+        assert row['monthly_savings'] > 0
+        assert result.totals()['cpu_request_delta'] == 3 * (230 - 1000)
+
+    @pytest.mark.unit
+    def test_limits_keep_ratio_and_cover_peak(self):
+        """Test set limits keep their ratio to the request and memory limits stay above the peak"""
+        pods = [_pod('web-0', 'app', {'cpu': '500m', 'memory': '512Mi'}, {'cpu': '1', 'memory': '512Mi'})]
+        usage = _usage(100, 100 * MI)
+        usage['memory_peak'] = 300 * MI
+
+        row = RightsizingEngine().recommend(ContainerUsage.from_rows([usage]), ResourceTable.from_pods(pods)).rows()[0]
+
+        assert row['cpu_limit_recommended'] == 2 * row['cpu_recommended']
+        assert row['memory_limit_recommended'] >= 300 * MI * 1.15
+        assert row['memory_limit_recommended'] % MI == 0
+
+    @pytest.mark.unit
+    def test_upsize_and_strategies(self):
+        """Test under-provisioned containers get more, with negative savings, and strategies differ"""
+        pods = [_pod('web-0', 'app', {'cpu': '100m', 'memory': '128Mi'})]
+        usage = ContainerUsage.from_rows([_usage(400, 512 * MI)])
+        table = ResourceTable.from_pods(pods)
+
+        balanced = RightsizingEngine('balanced').recommend(usage, table).rows()[0]
+        conservative = RightsizingEngine('conservative').recommend(usage, table).rows()[0]
+
+        assert balanced['cpu_recommended'] > 100 and balanced['monthly_savings'] < 0
+        assert conservative['cpu_recommended'] > balanced['cpu_recommended']
+        with pytest.raises(ValueError):
+            RightsizingEngine('reckless')
+
+    @pytest.mark.unit
+    def test_unmatched_sparse_and_tolerated(self):
+        """Test unknown containers, too few samples and small changes produce no recommendation"""
+        pods = [
+            _pod('web-0', 'app', {'cpu': '230m', 'memory': '295Mi'}),
+            _pod('api-0', 'api', {'cpu': '1', 'memory': '1Gi'}, deployment='api'),
+        ]
+        usage = ContainerUsage.from_rows([
+            _usage(200, 256 * MI),
+            _usage(1, 1, samples=5, workload='Deployment/api', container='api'),
+            _usage(1, 1, workload='Deployment/gone'),
+        ])
+
+        result = RightsizingEngine().recommend(usage, ResourceTable.from_pods(pods))
+
+        assert result.rows() == []
+        assert result.totals()['containers'] == 1
+        assert (result.unmatched, result.skipped) == (1, 1)
+
+    @pytest.mark.unit
+    def test_minimum_requests(self):
+        """Test idle containers are not sized below the minimum requests"""
+        pods = [_pod('web-0', 'app', {'cpu': '1', 'memory': '1Gi'})]
+
+        row = RightsizingEngine().recommend(ContainerUsage.from_rows([_usage(0, 0)]),
+                                            ResourceTable.from_pods(pods)).rows()[0]
+
+        assert row['cpu_recommended'] == MIN_CPU_REQUEST
+        assert row['memory_recommended'] == 16 * MI
+
+
+class TestRightsizingPerformance:
+    """Benchmark right-sizing a large cluster"""
+
+    @pytest.mark.performance
+    def test_100k_containers(self):
+        """Benchmark recommendations for 100k containers in 20k workloads"""
+        rng = np.random.default_rng(0)
+        pods = []
+        for index in range(50000):
+            workload = index % 20000
+            containers = [{'name': name, 'resources': {'requests': {'cpu': f'{100 * (1 + workload % 8)}m',
+                                                                    'memory': f'{128 * (1 + workload % 4)}Mi'}}}
+                          for name in ('app', 'proxy')]
+            pods.append({
+                'metadata': {'name': f'w{workload}-{index}', 'namespace': f'ns{workload % 50}',
+                             'labels': {'pod-template-hash': 'h'},
+                             'ownerReferences': [{'kind': 'ReplicaSet', 'name': f'w{workload}-h'}]},
+                'spec': {'containers': containers},
+            })
+        table = ResourceTable.from_pods(pods)
+        keys = [(f'ns{workload % 50}', f'Deployment/w{workload}', name)
+                for workload in range(20000) for name in ('app', 'proxy')]
+        columns = {column: rng.integers(1, 800, len(keys)) for column in
+                   ('cpu_p50', 'cpu_p90', 'cpu_p95', 'cpu_p99', 'cpu_peak')}
+        columns.update({column: rng.integers(1, 600, len(keys)) * MI for column in
+                        ('memory_p50', 'memory_p90', 'memory_p95', 'memory_p99', 'memory_peak')})
+        columns['samples'] = np.full(len(keys), 10000)
+        usage = ContainerUsage(keys, columns)
+
+        started = time.perf_counter()
+        result = RightsizingEngine().recommend(usage, table)
+        totals = result.totals()
+        rows = result.rows(limit=100)
+        elapsed = time.perf_counter() - started
+        print(f'\n{len(table)} containers in {len(keys)} series right-sized in {elapsed * 1000:.0f} ms '
+              f'({totals["changes"]} changes, ${totals["monthly_savings"]:.0f}/month)')
+        assert len(table) == 100000
+        assert totals['containers'] == len(keys)
+        assert len(rows) == 100
+        assert elapsed < 3.0
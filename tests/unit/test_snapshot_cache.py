@@ -0,0 +1,76 @@
+"""
+Unit tests for the on-disk cluster snapshot cache
+"""
+import os
+import time
+import pytest
+from upid.core.snapshot_cache import SnapshotCache
+
+LISTS = {
+    'nodes': {'items': [{'metadata': {'name': 'node-1'}}], 'metadata': {'resourceVersion': '7'}},
+    'pods': {'items': [{'metadata': {'name': 'pod-1'}}], 'metadata': {'resourceVersion': '7'}},
+}
+
+
+class TestSnapshotCache:
+    """Test TTL, eviction and invalidation"""
+
+    @pytest.mark.unit
+    def test_round_trip_per_context(self, tmp_path):
+        """Test lists are stored and loaded per context"""
+        cache = SnapshotCache(directory=str(tmp_path))
+        cache.store('kind-a', LISTS)
+
+        assert cache.load('kind-a') == LISTS
+        assert cache.load('kind-b') is None
+        assert cache.path('arn:aws:eks:us-east-1:1:cluster/a').parent == tmp_path
+
+    @pytest.mark.unit
+    def test_expired_entries_are_ignored(self, tmp_path):
+        """Test entries older than the TTL are dropped"""
+        cache = SnapshotCache(directory=str(tmp_path), ttl=60)
+        cache.store('kind-a', LISTS)
+
+        later = time.time() + 61
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr('upid.core.snapshot_cache.time.time', lambda: later)
+            assert cache.load('kind-a') is None
+        assert not cache.path('kind-a').exists()
+
+    @pytest.mark.unit
+    def test_size_bound_evicts_oldest(self, tmp_path):
+        """Test the oldest snapshots are evicted once the directory exceeds max_bytes"""
+        cache = SnapshotCache(directory=str(tmp_path))
+        cache.store('old', LISTS)
+        size = cache.path('old').stat().st_size
+        past = time.time() - 30
+        os.utime(cache.path('old'), (past, past))
+
+        cache.max_bytes = int(size * 1.5)
+        cache.store('new', LISTS)
+
+        assert not cache.path('old').exists()
+        assert cache.load('new') == LISTS
+
+    @pytest.mark.unit
+    def test_invalidate_and_corrupt_files(self, tmp_path):
+        """Test invalidate removes an entry and unreadable files count as misses"""
+        cache = SnapshotCache(directory=str(tmp_path))
+        cache.store('kind-a', LISTS)
+        cache.invalidate('kind-a')
+        assert cache.load('kind-a') is None
+
+        cache.path('kind-b').write_text('{not json')
+        assert cache.load('kind-b') is None
+
+    @pytest.mark.unit
+    def test_failed_write_leaves_no_temp_file(self, tmp_path, monkeypatch):
+        """Test a write that fails after the temp file was created removes it"""
+        def full_disk(source, target):
+            raise OSError(28, 'No space left on device')
+
+        cache = SnapshotCache(directory=str(tmp_path))
+        monkeypatch.setattr('upid.core.snapshot_cache.os.replace', full_disk)
+        cache.store('kind-a', LISTS)
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,235 @@
+"""
+Unit tests and a scan benchmark for the on-disk usage time-series store
+
+Run the benchmark alone with `make perf-test` (pytest -m performance).
+"""
+import time
+import numpy as np
+import pytest
+from upid.core.timeseries_store import TimeSeriesStore, RECORD, SEGMENT_MS
+
+DAY = SEGMENT_MS // 1000
+KEYS = [('shop', 'Deployment/web', 'app'), ('shop', 'Deployment/web', 'proxy'), ('ops', 'StatefulSet/db', 'db')]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TimeSeriesStore(str(tmp_path), retention_days=10000)
+
+
+def _fill(store, start, samples, step=60):
+    """Append `samples` ticks of every key; returns the raw rows appended"""
+    rng = np.random.default_rng(7)
+    rows = []
+    for tick in range(samples):
+        timestamp = start + tick * step
+        keys = [key for key in KEYS if rng.random() < 0.8]
+        cpu = rng.integers(0, 4000, len(keys))
+        memory = rng.integers(0, 8 << 30, len(keys))
+        store.append('prod', timestamp, keys, cpu, memory)
+        rows += [(key, int(timestamp * 1000), int(c), int(m)) for key, c, m in zip(keys, cpu, memory)]
+    return rows
+
+
+def _expected(rows, start, end):
+    series = {}
+    for key, ms, cpu, memory in rows:
+        if start * 1000 <= ms < end * 1000:
+            series.setdefault(key, []).append((ms, cpu, memory))
+    return {key: [np.array(column) for column in zip(*values)] for key, values in series.items()}
+
+
+class TestTimeSeriesStore:
+    """Test appending, sealing and range scans"""
+
+    START = 1700000000 - 1700000000 % DAY
+
+    @pytest.mark.unit
+    def test_round_trip_across_segments_and_head(self, store):
+        """Test samples read back exactly from sealed days and the open head"""
+        rows = _fill(store, self.START + 3600, 3 * 24 * 12, step=300)
+
+        stats = store.stats('prod')
+        expected = _expected(rows, self.START, self.START + 4 * DAY)
+        result = store.query('prod', self.START, self.START + 4 * DAY)
+
+        assert stats['segments'] == 3 and stats['heads'] == 1
+        assert set(result) == set(expected)
+        for key, columns in expected.items():
+            for got, want in zip(result[key], columns):
+                assert got.tolist() == want.tolist()
+
+    @pytest.mark.unit
+    def test_range_and_key_filters(self, store):
+        """Test partial-day ranges and namespace/container filters"""
+        rows = _fill(store, self.START, 3 * 24 * 12, step=300)
+        start, end = self.START + DAY // 2, self.START + 2 * DAY + 7
+
+        expected = _expected(rows, start, end)
+        result = store.query('prod', start, end, namespace='shop', container='app')
+
+        assert list(result) == [KEYS[0]]
+        assert result[KEYS[0]][1].tolist() == expected[KEYS[0]][1].tolist()
+        assert result[KEYS[0]][0].min() >= start * 1000 and result[KEYS[0]][0].max() < end * 1000
+        assert len(store.scan('prod', self.START - 10 * DAY, self.START - DAY)) == 0
+
+    @pytest.mark.unit
+    def test_summarize(self, store):
+        """Test per-series sample counts, sample time spans, averages and peaks"""
+        store.append('prod', self.START, KEYS[:2], np.array([100, 10]), np.array([1000, 50]))
+        store.append('prod', self.START + 60, KEYS[:1], np.array([300]), np.array([3000]))
+
+        summary = store.scan('prod', self.START, self.START + DAY).summarize()
+
+        assert summary[KEYS[0]] == {
+            'samples': 2, 'first': self.START * 1000, 'last': (self.START + 60) * 1000, 'cpu_avg': 200.0, 'cpu_peak': 300, 'cpu_p50': 100, 'cpu_p90': 300, 'cpu_p95': 300,
+            'cpu_p99': 300, 'memory_avg': 2000.0, 'memory_peak': 3000, 'memory_p50': 1000, 'memory_p90': 3000,
+            'memory_p95': 3000, 'memory_p99': 3000,
+        }
+        assert summary[KEYS[1]]['samples'] == 1
+        assert KEYS[2] not in summary
+
+    @pytest.mark.unit
+    def test_torn_head_write_is_skipped(self, store):
+        """Test a partial record left at the end of a head is ignored on read and dropped on the next append"""
+        store.append('prod', self.START, KEYS[:2], np.array([100, 10]), np.array([1000, 50]))
+        head = next(store.cluster_dir('prod').glob('head-*.bin'))
+        with open(head, 'ab') as f:
+            f.write(b'\x01' * (RECORD.itemsize // 2))
+
+        assert store.scan('prod', self.START, self.START + DAY).cpu.tolist() == [100, 10]
+        store.append('prod', self.START + 60, KEYS[:1], np.array([300]), np.array([3000]))
+
+        assert head.stat().st_size == 3 * RECORD.itemsize
+        assert sorted(store.scan('prod', self.START, self.START + DAY).cpu.tolist()) == [10, 100, 300]
+
+    @pytest.mark.unit
+    def test_series_survive_reopen_and_retention(self, tmp_path):
+        """Test series ids persist across instances and old days are pruned"""
+        store = TimeSeriesStore(str(tmp_path), retention_days=2)
+        today = time.time() - time.time() % DAY
+        for day in range(5, -1, -1):
+            store.append('prod', today - day * DAY, KEYS[day % 3:day % 3 + 1], np.array([day]), np.array([day]))
+
+        reopened = TimeSeriesStore(str(tmp_path), retention_days=2)
+
+        assert reopened.clusters() == ['prod']
+        assert reopened.series_keys('prod') == [KEYS[2], KEYS[1], KEYS[0]]
+        assert reopened.stats('prod')['segments'] == 2
+        assert sorted(reopened.scan('prod', today - 10 * DAY, today + DAY).cpu.tolist()) == [0, 1, 2]
+
+
+class TestRollups:
+    """Test rollup tiers written when days are sealed"""
+
+    START = 1700000000 - 1700000000 % DAY
+
+    @pytest.mark.unit
+    def test_hour_buckets_match_raw_samples(self, store):
+        """Test 1h buckets hold the count, min, max, sum and percentiles of their raw samples"""
+        rows = _fill(store, self.START, 2 * 24 * 12, step=300)
+
+        rollup = store.rollup('prod', self.START, self.START + 2 * DAY, '1h', series=[0])
+
+        hour = [cpu for key, ms, cpu, _ in rows if key == KEYS[0] and ms < (self.START + 3600) * 1000]
+        first = {name: values[0] for name, values in rollup.columns.items()}
+        assert rollup.tier == '1h'
+        assert len(rollup) == 48
+        assert first['time'] == self.START * 1000
+        assert first['count'] == len(hour)
+        assert (first['cpu_min'], first['cpu_max'], first['cpu_sum']) == (min(hour), max(hour), sum(hour))
+        assert first['cpu_p50'] == sorted(hour)[(len(hour) + 1) // 2 - 1]
+        assert rollup.columns['count'].sum() == sum(1 for key, *_ in rows if key == KEYS[0])
+
+    @pytest.mark.unit
+    def test_summaries_agree_across_tiers(self, store):
+        """Test every tier gives the raw counts, averages and peaks and near percentiles"""
+        _fill(store, self.START, 2 * 24 * 60, step=60)
+        start, end = self.START, self.START + 2 * DAY
+
+        raw = store.scan('prod', start, end).summarize()
+        for tier in ('1m', '1h', '1d'):
+            summary = store.rollup('prod', start, end, tier).summarize()
+            for key, expected in raw.items():
+                assert summary[key]['samples'] == expected['samples']
+                assert summary[key]['cpu_avg'] == pytest.approx(expected['cpu_avg'])
+                assert summary[key]['memory_peak'] == expected['memory_peak']
+                assert summary[key]['cpu_p95'] == pytest.approx(expected['cpu_p95'], rel=0.1)
+                # Bucket spans cover the raw span and overshoot it by less than one bucket at each end
+                width = {'1m': 60, '1h': 3600, '1d': DAY}[tier] * 1000
+                assert summary[key]['first'] <= expected['first'] < summary[key]['first'] + width
+                assert expected['last'] < summary[key]['last'] <= expected['last'] + width
+
+    @pytest.mark.unit
+    def test_open_day_rolled_up_on_the_fly(self, store):
+        """Test buckets of the unsealed head day are computed when read"""
+        store.append('prod', self.START + 10, KEYS[:1], np.array([5]), np.array([50]))
+        store.append('prod', self.START + 20, KEYS[:1], np.array([7]), np.array([70]))
+
+        rollup = store.rollup('prod', self.START, self.START + DAY, '1m')
+
+        assert store.stats('prod')['segments'] == 0
+        assert rollup.columns['count'].tolist() == [2]
+        assert rollup.columns['cpu_max'].tolist() == [7]
+
+    @pytest.mark.unit
+    def test_raw_expires_before_rollups(self, tmp_path):
+        """Test raw samples and 1m buckets are dropped first while coarser tiers remain"""
+        store = TimeSeriesStore(str(tmp_path), retention_days=30, raw_retention_days=3)
+        today = time.time() - time.time() % DAY
+        for day in (10, 1, 0):
+            store.append('prod', today - day * DAY, KEYS[:1], np.array([day]), np.array([day]))
+
+        assert len(store.scan('prod', today - 20 * DAY, today + DAY)) == 2
+        assert len(store.rollup('prod', today - 20 * DAY, today + DAY, '1m')) == 2
+        assert store.rollup('prod', today - 20 * DAY, today + DAY, '1h').columns['cpu_max'].tolist() == [10, 1, 0]
+
+    @pytest.mark.unit
+    def test_choose_tier(self, tmp_path):
+        """Test the coarsest tier meeting the resolution and period is chosen"""
+        store = TimeSeriesStore(str(tmp_path), retention_days=90, raw_retention_days=35)
+
+        assert store.choose_tier(7 * DAY) == '1h'
+        assert store.choose_tier(90 * DAY) == '1h'
+        assert store.choose_tier(365 * DAY) == '1d'
+        assert store.choose_tier(DAY, resolution=60) == '1m'
+        assert store.choose_tier(DAY, resolution=15) == 'raw'
+        assert store.choose_tier(60 * DAY, resolution=60) == '1h'
+
+
+class TestTimeSeriesStorePerformance:
+    """Benchmark range scans over months of samples"""
+
+    @pytest.mark.performance
+    def test_scan_months(self, tmp_path):
+        """Benchmark 30 days of 1-minute samples from 200 series, raw and from rollups"""
+        store = TimeSeriesStore(str(tmp_path), retention_days=10000)
+        keys = [(f'ns{i % 10}', f'Deployment/w{i % 50}', f'c{i}') for i in range(200)]
+        ids = store._series_ids('prod', keys)
+        rng = np.random.default_rng(0)
+        first = int(time.time()) // DAY - 30
+        for day in range(first, first + 30):
+            times = np.arange(day * DAY, (day + 1) * DAY, 60) * 1000
+            records = np.empty(len(times) * len(keys), dtype=RECORD)
+            records['time'] = np.repeat(times, len(keys))
+            records['series'] = np.tile(ids, len(times))
+            records['cpu'] = rng.integers(0, 500, len(records))
+            records['memory'] = rng.integers(100 << 20, 200 << 20, len(records))
+            records.tofile(store.cluster_dir('prod') / f'head-{day:08d}.bin')
+        store.seal('prod', before_day=first + 30)
+
+        started = time.perf_counter()
+        scan = store.scan('prod', first * DAY, (first + 30) * DAY)
+        elapsed = time.perf_counter() - started
+        stats = store.stats('prod')
+        print(f'\n{len(scan)} rows over 30 days scanned in {elapsed * 1000:.0f} ms '
+              f'({stats["bytes"] / len(scan):.1f} bytes/row on disk)')
+        assert len(scan) == 30 * 1440 * 200
+        assert elapsed < 2.0
+
+        started = time.perf_counter()
+        summary = store.rollup('prod', first * DAY, (first + 30) * DAY, store.choose_tier(30 * DAY)).summarize()
+        elapsed = time.perf_counter() - started
+        print(f'30 days summarized from 1h rollups in {elapsed * 1000:.0f} ms')
+        assert len(summary) == 200
+        assert elapsed < 1.0
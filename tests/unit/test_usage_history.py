@@ -0,0 +1,126 @@
+"""
+Unit tests for usage ring buffers and the saved usage history
+"""
+import numpy as np
+import pytest
+from upid.core.usage_history import UsageRingBuffer, UsageHistory, parse_duration
+from upid.core.usage_metrics import UsageTable
+
+
+def _pod_metrics(cpu):
+    return [{'metadata': {'name': 'web-1', 'namespace': 'shop'}, 'containers': [
+        {'name': 'app', 'usage': {'cpu': f'{cpu}m', 'memory': '100Mi'}},
+    ]}]
+
+
+class TestUsageRingBuffer:
+    """Test bounded per-series sample storage"""
+
+    @pytest.mark.unit
+    def test_wraps_and_keeps_latest_samples(self):
+        """Test only the newest `capacity` samples are kept, oldest first"""
+        buffer = UsageRingBuffer(capacity=4)
+        for tick in range(10):
+            buffer.append(float(tick), ['a'], np.array([tick * 10]), np.array([tick]))
+
+        times, cpu, memory = buffer.series('a')
+
+        assert len(buffer) == 4
+        assert times.tolist() == [6.0, 7.0, 8.0, 9.0]
+        assert cpu.tolist() == [60, 70, 80, 90]
+        assert memory.tolist() == [6, 7, 8, 9]
+
+    @pytest.mark.unit
+    def test_memory_stays_bounded(self):
+        """Test the arrays stop growing however many samples and series arrive"""
+        buffer = UsageRingBuffer(capacity=8, max_series=300)
+        for tick in range(50):
+            keys = [f'pod-{tick}-{i}' for i in range(20)]
+            buffer.append(float(tick), keys, np.ones(20), np.ones(20))
+            if tick == 20:
+                size = buffer.nbytes
+
+        assert buffer.nbytes == size
+        assert buffer.cpu.shape == (300, 8)
+        assert len(buffer.keys) == 300
+        assert buffer.evicted == 50 * 20 - 300
+
+    @pytest.mark.unit
+    def test_four_byte_cells(self):
+        """Test cells take 4 bytes each and the worst case matches a full buffer"""
+        buffer = UsageRingBuffer(capacity=8, max_series=256)
+        buffer.append(1.0, [f'pod-{i}' for i in range(256)], np.ones(256), np.ones(256))
+
+        assert buffer.cpu.dtype == np.int32 and buffer.memory.dtype == np.int32
+        assert buffer.nbytes == buffer.max_nbytes
+        assert UsageRingBuffer().max_nbytes < 256 * 1024 ** 2
+
+    @pytest.mark.unit
+    def test_large_memory_rescales_the_row(self):
+        """Test memory above 2 GiB rescales its row to 64-byte steps, rounded up, and cpu is clamped"""
+        buffer = UsageRingBuffer(capacity=4)
+        buffer.append(1.0, ['node', 'pod'], np.array([1000, 5]), np.array([3, 7]))
+        buffer.append(2.0, ['node', 'pod'], np.array([3 << 31, 5]), np.array([(64 << 30) + 1, 9]))
+
+        times, cpu, memory = buffer.series('node')
+
+        assert cpu.tolist() == [1000, np.iinfo(np.int32).max]
+        assert memory.tolist() == [64, (64 << 30) + 64]
+        assert buffer.series('pod')[2].tolist() == [7, 9]
+        assert buffer.peaks()['node']['memory'] == (64 << 30) + 64
+        assert buffer.totals()[2].tolist() == [71, (64 << 30) + 73]
+
+    @pytest.mark.unit
+    def test_absent_series_are_missing(self):
+        """Test samples where a series was absent are skipped and not summed"""
+        buffer = UsageRingBuffer(capacity=4)
+        buffer.append(1.0, ['a', 'b'], np.array([100, 5]), np.array([1, 1]))
+        buffer.append(2.0, ['a'], np.array([200]), np.array([2]))
+
+        _, cpu, _ = buffer.series('b')
+        _, totals, _ = buffer.totals()
+
+        assert cpu.tolist() == [5]
+        assert totals.tolist() == [105, 200]
+        assert buffer.peaks()['a'] == {'cpu': 200, 'memory': 2}
+
+
+class TestUsageHistory:
+    """Test recording usage tables and saving them for later commands"""
+
+    @pytest.mark.unit
+    def test_record_save_and_load(self, tmp_path):
+        """Test per-container series survive a save/load round trip"""
+        history = UsageHistory('kind-test', interval=15, capacity=16)
+        nodes = UsageTable.from_node_metrics([{'metadata': {'name': 'node-a'}, 'usage': {'cpu': '1', 'memory': '1Gi'}}])
+        for tick, cpu in enumerate([120, 80, 300]):
+            history.record(1000.0 + tick * 15, UsageTable.from_pod_metrics(_pod_metrics(cpu)), nodes)
+
+        path = history.save(tmp_path / 'usage.npz')
+        loaded = UsageHistory.load(path)
+        times, cpu, memory = loaded.containers.series('shop/web-1/app')
+
+        assert loaded.context == 'kind-test'
+        assert loaded.summary()['samples'] == 3
+        assert cpu.tolist() == [120, 80, 300]
+        assert memory.tolist() == [100 * 1024 ** 2] * 3
+        assert times[-1] - times[0] == 30
+        assert loaded.nodes.series('node-a')[1].tolist() == [1000] * 3
+
+    @pytest.mark.unit
+    def test_load_missing_file(self, tmp_path):
+        """Test a missing history reads as None"""
+        assert UsageHistory.load(tmp_path / 'missing.npz') is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value, seconds', [('15s', 15), ('5m', 300), ('24h', 86400), ('7d', 604800),
+                                                ('30', 30), ('1.5h', 5400), ('250ms', 0.25)])
+    def test_parse_duration(self, value, seconds):
+        """Test duration strings"""
+        assert parse_duration(value) == pytest.approx(seconds)
+
+    @pytest.mark.unit
+    def test_parse_duration_invalid(self):
+        """Test malformed durations are rejected"""
+        with pytest.raises(ValueError):
+            parse_duration('soon')
@@ -0,0 +1,98 @@
+"""
+Unit tests for the metrics.k8s.io usage collector
+"""
+import io
+import json
+import pytest
+from upid.core.probe_engine import ProbeResult, PROBE_OK
+from upid.core.usage_metrics import UsageSnapshot, UsageTable
+
+
+NODE_METRICS = [
+    {'metadata': {'name': 'node-a'}, 'usage': {'cpu': '1500m', 'memory': '2Gi'}},
+    {'metadata': {'name': 'node-b'}, 'usage': {'cpu': '250000000n', 'memory': '512Mi'}},
+]
+
+POD_METRICS = [
+    {'metadata': {'name': 'web-1', 'namespace': 'shop'}, 'window': '30s', 'containers': [
+        {'name': 'app', 'usage': {'cpu': '120m', 'memory': '200Mi'}},
+        {'name': 'proxy', 'usage': {'cpu': '5m', 'memory': '16Mi'}},
+    ]},
+    {'metadata': {'name': 'dns', 'namespace': 'kube-system'}, 'containers': [
+        {'name': 'coredns', 'usage': {'cpu': '3m', 'memory': 'bogus'}},
+    ]},
+]
+
+
+class FakeBackend:
+    """Backend that serves metrics lists from memory and records requests"""
+
+    def __init__(self, lists):
+        self.lists = lists
+        self.requests = []
+
+    def stream_list(self, name, path, params, timeout, consume):
+        self.requests.append((path, params))
+        consume(io.BytesIO(json.dumps({'kind': 'List', 'metadata': {}, 'items': self.lists[path]}).encode()))
+        return ProbeResult(name, PROBE_OK, returncode=0)
+
+
+class TestUsageTable:
+    """Test numeric usage columns"""
+
+    @pytest.mark.unit
+    def test_node_metrics(self):
+        """Test node usage becomes millicores and bytes"""
+        table = UsageTable.from_node_metrics(NODE_METRICS)
+
+        assert table.rows() == [
+            {'name': 'node-a', 'cpu_usage': 1500, 'memory_usage': 2 * 1024 ** 3},
+            {'name': 'node-b', 'cpu_usage': 250, 'memory_usage': 512 * 1024 ** 2},
+        ]
+        assert table.totals()['cpu_usage'] == 1750
+
+    @pytest.mark.unit
+    def test_pod_metrics_per_container(self):
+        """Test one row per container, grouped by pod and namespace"""
+        table = UsageTable.from_pod_metrics(POD_METRICS)
+
+        assert len(table) == 3
+        assert table.names == ['app', 'proxy', 'coredns']
+        assert table.columns['cpu_usage'].tolist() == [120, 5, 3]
+        assert table.columns['memory_usage'].tolist() == [200 * 1024 ** 2, 16 * 1024 ** 2, 0]
+        assert table.group_by('pod')['shop/web-1'] == {
+            'cpu_usage': 125, 'memory_usage': 216 * 1024 ** 2, 'containers': 2
+        }
+        assert table.group_by('namespace')['kube-system']['cpu_usage'] == 3
+
+    @pytest.mark.unit
+    def test_empty(self):
+        """Test no metrics produce empty tables"""
+        assert UsageTable.from_pod_metrics([]).totals() == {'cpu_usage': 0, 'memory_usage': 0, 'rows': 0}
+        assert UsageTable.from_node_metrics([]).rows() == []
+
+
+class TestUsageSnapshot:
+    """Test the metrics API is listed once per kind"""
+
+    @pytest.mark.unit
+    def test_one_list_per_kind_scoped(self):
+        """Test pod metrics are listed from the namespace with only the label selector"""
+        backend = FakeBackend({
+            '/apis/metrics.k8s.io/v1beta1/nodes': NODE_METRICS,
+            '/apis/metrics.k8s.io/v1beta1/namespaces/shop/pods': POD_METRICS[:1],
+        })
+        usage = UsageSnapshot(backend=backend, namespace='shop', label_selector='app=web',
+                              field_selector='status.phase=Running')
+
+        usage.prefetch()
+
+        assert sorted(path for path, _ in backend.requests) == [
+            '/apis/metrics.k8s.io/v1beta1/namespaces/shop/pods',
+            '/apis/metrics.k8s.io/v1beta1/nodes',
+        ]
+        assert dict(backend.requests)['/apis/metrics.k8s.io/v1beta1/namespaces/shop/pods'] == {
+            'labelSelector': 'app=web', 'limit': 500
+        }
+        assert usage.table('pods').totals()['cpu_usage'] == 125
+        assert usage.table('nodes').totals()['rows'] == 2
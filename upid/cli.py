@@ -19,12 +19,14 @@ try:
     from .core.config import Config
     from .core.auth import AuthManager
     from .core.api_client import UPIDAPIClient
+    from .core.deadline import Deadline
 except ImportError:
     # Fallback for PyInstaller
     from upid.commands import auth, cluster, analyze, optimize, deploy, report, universal
     from upid.core.config import Config
     from upid.core.auth import AuthManager
     from upid.core.api_client import UPIDAPIClient
+    from upid.core.deadline import Deadline
 
 console = Console()
 
@@ -32,8 +34,11 @@ console = Console()
 @click.option('--config', '-c', help='Configuration file path')
 @click.option('--local', is_flag=True, help='Enable local mode for testing without authentication')
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
+@click.option('--no-cache', is_flag=True, help='Do not read or write the API response cache')
+@click.option('--deadline', type=click.FloatRange(min=0, min_open=True),
+              help='Seconds all API calls of the command must finish within')
 @click.pass_context
-def cli(ctx, config, local, verbose):
+def cli(ctx, config, local, verbose, no_cache, deadline):
     """
     UPID CLI - Kubernetes Resource Optimization Platform
     
@@ -54,7 +59,32 @@ def cli(ctx, config, local, verbose):
     
     # Initialize auth manager and API client
     ctx.obj['auth_manager'] = AuthManager(ctx.obj['config'])
-    ctx.obj['api_client'] = UPIDAPIClient(ctx.obj['config'], ctx.obj['auth_manager'])
+    ctx.obj['api_client'] = UPIDAPIClient(ctx.obj['config'], ctx.obj['auth_manager'], use_cache=not no_cache)
+    
+    # One time budget for every API call the command makes
+    deadline = deadline or ctx.obj['config'].get('command_deadline')
+    if deadline:
+        ctx.obj['api_client'].deadline = Deadline(deadline)
+    
+    # Report API retries and circuit breaker state when the command finishes
+    if verbose:
+        ctx.call_on_close(lambda: _print_request_metrics(ctx.obj['api_client']))
+
+def _print_request_metrics(api_client: UPIDAPIClient) -> None:
+    """Print API call, retry and circuit breaker counters if any call was made"""
+    metrics = api_client.request_metrics()
+    if not metrics['calls']:
+        return
+    reasons = ', '.join(f"{reason}×{count}" for reason, count in sorted(metrics['retry_reasons'].items()))
+    console.print(
+        f"[dim]API calls: {metrics['calls']}, attempts: {metrics['attempts']}, "
+        f"retries: {metrics['retries']}{f' ({reasons})' if reasons else ''}, "
+        f"waited {metrics['retry_wait_seconds']:.1f}s, gave up: {metrics['exhausted']}, "
+        f"rejected by open circuit: {metrics['rejected']}[/dim]"
+    )
+    for host, breaker in metrics['breakers'].items():
+        console.print(f"[dim]Circuit {host}: {breaker['state']} "
+                      f"({breaker['failures']} consecutive failures, opened {breaker['times_opened']}x)[/dim]")
 
 # Add command groups
 cli.add_command(auth.auth)
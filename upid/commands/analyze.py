@@ -381,3 +381,94 @@ def performance(ctx, cluster_id, format):
     except Exception as e:
         console.print(f"[red]✗ Failed to analyze performance: {str(e)}[/red]")
         raise click.Abort()
+
+@analyze.command(name='all')
+@click.argument('cluster_ids', nargs=-1, required=True)
+@click.option('--period', '-p', default='30d', help='Cost analysis period (e.g., 7d, 30d, 90d)')
+@click.option('--concurrency', '-j', default=16, type=click.IntRange(1, 256), help='Maximum concurrent API requests')
+@click.option('--format', '-f', default='table', type=click.Choice(['table', 'json', 'yaml']), help='Output format')
+@click.pass_context
+def all_clusters(ctx, cluster_ids, period, concurrency, format):
+    """Analyze resources, costs and performance of one or more clusters concurrently"""
+    try:
+        from ..core.async_api_client import AsyncUPIDAPIClient, run
+
+        config = ctx.obj['config']
+        auth_manager = ctx.obj['auth_manager']
+        
+        # Check if we're in local mode
+        if config.is_local_mode():
+            console.print("[yellow]🔧 Local mode - using mock data[/yellow]")
+        elif not auth_manager.is_authenticated():
+            console.print("[red]✗ Not authenticated. Please login first.[/red]")
+            raise click.Abort()
+        
+        async def fetch():
+            async with AsyncUPIDAPIClient(config, auth_manager, max_concurrency=concurrency,
+                                          client=ctx.obj['api_client']) as client:
+                calls = {}
+                for cluster_id in cluster_ids:
+                    calls[(cluster_id, 'resources')] = ('analyze_resources', (cluster_id,))
+                    calls[(cluster_id, 'costs')] = ('analyze_costs', (cluster_id, period))
+                    calls[(cluster_id, 'performance')] = ('analyze_performance', (cluster_id,))
+                return await client.gather(calls, return_exceptions=True)
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            task = progress.add_task(f"Analyzing {len(cluster_ids)} cluster(s)...", total=None)
+            results = run(fetch())
+            progress.update(task, completed=True)
+        
+        analysis = {}
+        for (cluster_id, kind), result in results.items():
+            entry = analysis.setdefault(cluster_id, {})
+            if isinstance(result, Exception):
+                entry.setdefault('errors', {})[kind] = str(result)
+            else:
+                entry[kind] = result
+        
+        if format == 'table':
+            table = Table(title="Cluster Analysis", box=box.ROUNDED)
+            table.add_column("Cluster", style="cyan", no_wrap=True)
+            table.add_column("CPU", style="yellow")
+            table.add_column("Memory", style="yellow")
+            table.add_column("Total Cost", style="green")
+            table.add_column("CPU Now", style="blue")
+            table.add_column("Memory Now", style="blue")
+            table.add_column("Errors", style="red")
+            
+            for cluster_id, entry in analysis.items():
+                resources_data = entry.get('resources') or {}
+                costs_data = entry.get('costs') or {}
+                performance_data = entry.get('performance') or {}
+                cpu = resources_data.get('cpu', {})
+                memory = resources_data.get('memory', {})
+                table.add_row(
+                    cluster_id,
+                    f"{cpu.get('used', 0):.1f} / {cpu.get('total', 0):.1f} cores" if resources_data else "-",
+                    f"{memory.get('used', 0):.1f} / {memory.get('total', 0):.1f} GB" if resources_data else "-",
+                    f"${costs_data.get('total_cost', 0):.2f}" if costs_data else "-",
+                    f"{performance_data.get('cpu', {}).get('current', 0):.1f}%" if performance_data else "-",
+                    f"{performance_data.get('memory', {}).get('current', 0):.1f}%" if performance_data else "-",
+                    ", ".join(entry.get('errors', {})) or "-"
+                )
+            
+            console.print(table)
+            for cluster_id, entry in analysis.items():
+                for kind, error in entry.get('errors', {}).items():
+                    console.print(f"[red]✗ {cluster_id} {kind}: {error}[/red]")
+            
+        elif format == 'json':
+            import json
+            console.print(json.dumps(analysis, indent=2))
+            
+        elif format == 'yaml':
+            import yaml
+            console.print(yaml.dump(analysis, default_flow_style=False))
+        
+    except Exception as e:
+        console.print(f"[red]✗ Failed to analyze clusters: {str(e)}[/red]")
+        raise click.Abort()
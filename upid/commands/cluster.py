@@ -22,8 +22,10 @@ def cluster():
 @cluster.command()
 @click.option('--format', '-f', default='table', type=click.Choice(['table', 'json', 'yaml']), help='Output format')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
+@click.option('--stream', is_flag=True, help='Print clusters page by page as they arrive (table lines, JSON Lines or YAML documents)')
+@click.option('--page-size', default=100, type=click.IntRange(1, 1000), help='Clusters requested per page when streaming')
 @click.pass_context
-def list(ctx, format, verbose):
+def list(ctx, format, verbose, stream, page_size):
     """List all clusters"""
     try:
         config = ctx.obj['config']
@@ -37,6 +39,21 @@ def list(ctx, format, verbose):
             console.print("[red]✗ Not authenticated. Please login first.[/red]")
             raise click.Abort()
         
+        if stream:
+            from ..core.utils import stream_items
+            columns = [
+                ("ID", 24, lambda cluster: cluster.get('cluster_id', 'N/A')),
+                ("NAME", 28, lambda cluster: cluster.get('name', 'N/A')),
+                ("REGION", 14, lambda cluster: cluster.get('region', 'N/A')),
+                ("STATUS", 10, lambda cluster: cluster.get('status', 'N/A')),
+                ("NODES", 6, lambda cluster: cluster.get('nodes_count', 0)),
+                ("PODS", 6, lambda cluster: cluster.get('pods_count', 0)),
+                ("CREATED", 20, lambda cluster: cluster.get('created_at', 'N/A')),
+            ]
+            if not stream_items(api_client.iter_clusters(page_size).iter_pages(), format, columns):
+                console.print("[yellow]No clusters found[/yellow]")
+            return
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
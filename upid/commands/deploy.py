@@ -86,8 +86,10 @@ def create(ctx, cluster_id, name, namespace, image, replicas, port, env, wait):
 @click.argument('cluster_id')
 @click.option('--namespace', '-ns', default='default', help='Namespace')
 @click.option('--format', '-f', default='table', type=click.Choice(['table', 'json', 'yaml']), help='Output format')
+@click.option('--stream', is_flag=True, help='Print deployments page by page as they arrive (table lines, JSON Lines or YAML documents)')
+@click.option('--page-size', default=100, type=click.IntRange(1, 1000), help='Deployments requested per page when streaming')
 @click.pass_context
-def list(ctx, cluster_id, namespace, format):
+def list(ctx, cluster_id, namespace, format, stream, page_size):
     """List deployments"""
     try:
         config = ctx.obj['config']
@@ -101,6 +103,20 @@ def list(ctx, cluster_id, namespace, format):
             console.print("[red]✗ Not authenticated. Please login first.[/red]")
             raise click.Abort()
         
+        if stream:
+            from ..core.utils import stream_items
+            columns = [
+                ("NAME", 40, lambda deployment: deployment.get('name', 'N/A')),
+                ("REPLICAS", 9, lambda deployment: deployment.get('replicas', 0)),
+                ("AVAILABLE", 10, lambda deployment: deployment.get('available', 0)),
+                ("STATUS", 12, lambda deployment: deployment.get('status', 'N/A')),
+                ("AGE", 10, lambda deployment: deployment.get('age', 'N/A')),
+            ]
+            deployments = api_client.iter_deployments(cluster_id, namespace, page_size)
+            if not stream_items(deployments.iter_pages(), format, columns):
+                console.print(f"[yellow]No deployments found in namespace '{namespace}'[/yellow]")
+            return
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -11,20 +11,180 @@ from rich.table import Table
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich import box
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from ..core.cluster_detector import ClusterDetector
+from ..core.cluster_snapshot import ClusterSnapshot, DEFAULT_PAGE_SIZE
+from ..core.cluster_backend import BACKEND_CHOICES
+from ..core.config import Config
+from ..core.snapshot_cache import SnapshotCache
+from ..core.fleet import Fleet, resolve_contexts
+from ..core.usage_history import UsageHistory, DEFAULT_CAPACITY, DEFAULT_MAX_SERIES, parse_duration
+from ..core.timeseries_store import TimeSeriesStore
+from ..core.quantile_sketch import QuantileSketches, merge_sketches
+from ..core.decaying_histogram import UsageRecommender
+from ..services.optimization_service import OptimizationService
+from ..core.resource_table import ResourceTable
+from ..core.rightsizing import RightsizingEngine, ContainerUsage, STRATEGIES
 
 console = Console()
 
 @click.group()
-def universal():
+@click.option('--page-size', default=DEFAULT_PAGE_SIZE, type=int,
+              help='Objects fetched per list request (0 disables chunked listing)')
+@click.option('--backend', default='auto', type=click.Choice(BACKEND_CHOICES),
+              help='Cluster access: API server directly, kubectl, or auto (API with kubectl fallback)')
+@click.option('--refresh', is_flag=True, help='Ignore the cached cluster snapshot and fetch a fresh one')
+@click.option('--no-cache', is_flag=True, help='Do not read or write the cluster snapshot cache')
+@click.option('--all-contexts', is_flag=True, help='Run status/analyze/report against every kubeconfig context')
+@click.option('--contexts', help='Comma separated kubeconfig contexts to run against (e.g. prod-eu,prod-us)')
+@click.option('--fleet-workers', default=8, type=int, help='Contexts queried concurrently with --all-contexts/--contexts')
+@click.option('--fleet-timeout', default=120.0, type=float, help='Seconds before unfinished contexts are reported as timed out')
+@click.pass_context
+def universal(ctx, page_size, backend, refresh, no_cache, all_contexts, contexts, fleet_workers, fleet_timeout):
     """Universal Kubernetes commands - works with any cluster"""
-    pass
+    ctx.ensure_object(dict)
+    ctx.obj['page_size'] = page_size
+    ctx.obj['backend'] = backend
+    ctx.obj['refresh'] = refresh
+    ctx.obj['no_cache'] = no_cache
+    ctx.obj['all_contexts'] = all_contexts
+    ctx.obj['contexts'] = contexts
+    ctx.obj['fleet_workers'] = fleet_workers
+    ctx.obj['fleet_timeout'] = fleet_timeout
+
+def _get_snapshot_cache(obj: Dict[str, Any]) -> Optional[SnapshotCache]:
+    """Snapshot cache configured from ~/.upid/config.yaml, unless disabled"""
+    if obj.get('no_cache'):
+        return None
+    config = obj.get('config')
+    ttl = config.get('snapshot_cache_ttl') if config else None
+    max_mb = config.get('snapshot_cache_max_mb') if config else None
+    return SnapshotCache(
+        ttl=ttl if ttl is not None else Config.DEFAULTS['snapshot_cache_ttl'],
+        max_bytes=int((max_mb if max_mb is not None else Config.DEFAULTS['snapshot_cache_max_mb']) * 1024 * 1024)
+    )
+
+def _detector_options(ctx) -> Dict[str, Any]:
+    """ClusterDetector arguments from the command group options"""
+    obj = ctx.obj or {}
+    return {
+        'page_size': obj.get('page_size', DEFAULT_PAGE_SIZE),
+        'backend_type': obj.get('backend', 'auto'),
+        'cache': _get_snapshot_cache(obj),
+        'refresh': obj.get('refresh', False),
+    }
+
+def _get_detector(ctx, watch: bool = False, **scope) -> ClusterDetector:
+    """Create a cluster detector configured from the command group options
+
+    Keyword arguments (namespace, label_selector, field_selector) scope the
+    list calls so only matching objects are transferred.
+    """
+    try:
+        return ClusterDetector(watch=watch, **_detector_options(ctx), **scope)
+    except Exception as e:
+        console.print(f"[red]✗ Cannot connect to the API server: {e}[/red]")
+        raise click.Abort()
+
+def _get_fleet(ctx, **scope) -> Optional[Fleet]:
+    """Fleet for --all-contexts/--contexts, or None for a single-cluster run"""
+    obj = ctx.obj or {}
+    if not obj.get('all_contexts') and not obj.get('contexts'):
+        return None
+    try:
+        contexts = resolve_contexts(obj.get('all_contexts', False), obj.get('contexts'))
+    except Exception as e:
+        console.print(f"[red]✗ Cannot read kubeconfig contexts: {e}[/red]")
+        raise click.Abort()
+    if not contexts:
+        console.print("[red]✗ No kubeconfig contexts to run against[/red]")
+        raise click.Abort()
+    options = _detector_options(ctx)
+    return Fleet(contexts, lambda context: ClusterDetector(context=context, **options, **scope),
+                 max_workers=obj.get('fleet_workers', 8), deadline=obj.get('fleet_timeout', 120.0))
+
+def _collect_fleet(fleet: Fleet, collect) -> Dict[str, Any]:
+    """Run collect() on every context and merge the results into one fleet-wide document"""
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console
+    ) as progress:
+        progress.add_task(f"Querying {len(fleet.contexts)} clusters...", total=None)
+        results = fleet.run(collect)
+    return {'timestamp': _get_timestamp(), 'fleet': Fleet.summarize(results), 'contexts': results}
+
+def _run_fleet(fleet: Fleet, collect, format: str, title: str) -> None:
+    """Run collect() on every context and print one fleet-wide table or JSON/YAML document"""
+    document = _collect_fleet(fleet, collect)
+    results = document['contexts']
+    if format == 'json':
+        console.print(json.dumps(document, indent=2))
+        return
+    if format == 'yaml':
+        import yaml
+        console.print(yaml.dump(document, default_flow_style=False))
+        return
+    console.print(_fleet_table(results, title))
+    totals = document['fleet']
+    console.print(Panel(
+        f"Clusters: {totals['ok']}/{totals['contexts']} answered\n"
+        f"Nodes: {totals['nodes']}\n"
+        f"Pods: {totals['pods']['running']}/{totals['pods']['total']} running\n"
+        f"CPU: {totals['cpu']['used']:.1f}/{totals['cpu']['total']:.1f} cores\n"
+        f"Memory: {totals['memory']['used'] / (1024**3):.1f}/{totals['memory']['total'] / (1024**3):.1f} GB",
+        title="[bold green]Fleet Totals[/bold green]",
+        border_style="green"
+    ))
+
+def _fleet_table(results: Dict[str, Dict[str, Any]], title: str) -> Table:
+    """One row per context: status and resource totals"""
+    table = Table(title=title, box=box.ROUNDED)
+    table.add_column("Context", style="cyan")
+    table.add_column("Type", style="white")
+    table.add_column("Status", style="white")
+    table.add_column("Nodes", style="blue")
+    table.add_column("Pods", style="blue")
+    table.add_column("CPU", style="yellow")
+    table.add_column("Memory", style="yellow")
+    table.add_column("Time", style="white")
+    
+    for context, entry in results.items():
+        result = entry.get('result') or {}
+        cluster_info = result.get('cluster', {})
+        if not Fleet.answered(entry):
+            error = entry.get('error') or cluster_info.get('error') or 'Cluster unreachable'
+            status = "⏱ Timed out" if entry['status'] == 'timeout' else f"❌ {error.strip()[:60]}"
+            table.add_row(context, "-", status, "-", "-", "-", "-", f"{entry.get('duration', 0):.1f}s")
+            continue
+        resources = result.get('metrics', {}).get('resources', {})
+        cpu = resources.get('cpu', {})
+        memory = resources.get('memory', {})
+        pods = resources.get('pods', {})
+        table.add_row(
+            context,
+            cluster_info.get('type', 'unknown'),
+            "✅ Connected",
+            str(len(cluster_info.get('info', {}).get('nodes', {}).get('items', []))),
+            f"{pods.get('running', 0)}/{pods.get('total', 0)}",
+            f"{cpu.get('used', 0):.1f}/{cpu.get('total', 0):.1f} cores",
+            f"{memory.get('used', 0) / (1024**3):.1f}/{memory.get('total', 0) / (1024**3):.1f} GB",
+            f"{entry['duration']:.1f}s"
+        )
+    return table
 
 @universal.command()
 @click.option('--format', '-f', default='table', help='Output format (table, json, yaml)')
-def status(format):
+@click.pass_context
+def status(ctx, format):
     """Show cluster status and health"""
+    fleet = _get_fleet(ctx)
+    if fleet:
+        def collect(detector):
+            return {'cluster': detector.detect_cluster(), 'metrics': detector.get_cluster_metrics()}
+        _run_fleet(fleet, collect, format, "Fleet Status")
+        return
+    
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -32,7 +192,7 @@ def status(format):
     ) as progress:
         task = progress.add_task("Detecting cluster...", total=None)
         
-        detector = ClusterDetector()
+        detector = _get_detector(ctx)
         cluster_info = detector.detect_cluster()
         
         progress.update(task, description="Getting cluster metrics...")
@@ -61,7 +221,10 @@ def status(format):
     cap_table.add_column("Available", style="green")
     
     for cap, available in capabilities.items():
-        status = "✅ Yes" if available else "❌ No"
+        if available is None:
+            status = "❔ Unknown"
+        else:
+            status = "✅ Yes" if available else "❌ No"
         cap_table.add_row(cap.replace('_', ' ').title(), status)
     
     console.print(cap_table)
@@ -136,9 +299,28 @@ def status(format):
 
 @universal.command()
 @click.option('--namespace', '-n', help='Namespace to analyze')
+@click.option('--selector', '-l', help='Label selector for pods (e.g. app=web,tier!=cache)')
+@click.option('--field-selector', help='Field selector for pods (e.g. status.phase=Running)')
+@click.option('--period', '-p', type=click.Choice(['7d', '30d', '90d']),
+              help='Also show workload usage stored by `collect` over this period')
 @click.option('--format', '-f', default='table', help='Output format (table, json, yaml)')
-def analyze(namespace, format):
+@click.pass_context
+def analyze(ctx, namespace, selector, field_selector, period, format):
     """Analyze cluster resources and performance"""
+    fleet = _get_fleet(ctx, namespace=namespace, label_selector=selector, field_selector=field_selector)
+    if fleet:
+        def collect(detector):
+            cluster_info = detector.detect_cluster()
+            metrics = detector.get_cluster_metrics()
+            return {
+                'cluster': cluster_info,
+                'metrics': metrics,
+                'namespaces': detector.resource_table().group_by('namespace'),
+                'insights': _generate_insights(cluster_info, metrics, detector.snapshot)
+            }
+        _run_fleet(fleet, collect, format, "Fleet Analysis")
+        return
+    
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -146,9 +328,11 @@ def analyze(namespace, format):
     ) as progress:
         task = progress.add_task("Analyzing cluster...", total=None)
         
-        detector = ClusterDetector()
+        detector = _get_detector(ctx, namespace=namespace, label_selector=selector,
+                                 field_selector=field_selector)
         cluster_info = detector.detect_cluster()
         metrics = detector.get_cluster_metrics()
+        stored = _stored_usage(cluster_info['name'], period, namespace) if period else None
         
         progress.update(task, description="Generating insights...")
     
@@ -156,8 +340,11 @@ def analyze(namespace, format):
         analysis = {
             'cluster': cluster_info,
             'metrics': metrics,
-            'insights': _generate_insights(cluster_info, metrics)
+            'namespaces': detector.resource_table().group_by('namespace'),
+            'insights': _generate_insights(cluster_info, metrics, detector.snapshot)
         }
+        if stored is not None:
+            analysis['usage'] = stored
         console.print(json.dumps(analysis, indent=2))
         return
     
@@ -165,6 +352,7 @@ def analyze(namespace, format):
     console.print(Panel(
         f"[bold blue]Cluster Analysis: {cluster_info['name']}[/bold blue]\n"
         f"Type: {cluster_info['type'].upper()}\n"
+        f"Scope: {cluster_info.get('scope', 'cluster')}\n"
         f"Analysis completed at: {_get_timestamp()}",
         title="[bold green]Resource Analysis[/bold green]",
         border_style="green"
@@ -214,8 +402,34 @@ def analyze(namespace, format):
         
         console.print(analysis_table)
         
+        # Namespaces with the largest requests
+        table = detector.resource_table()
+        namespaces = table.group_by('namespace')
+        namespace_table = Table(title="Top Namespaces by CPU Requests", box=box.ROUNDED)
+        namespace_table.add_column("Namespace", style="cyan")
+        namespace_table.add_column("Containers", style="white")
+        namespace_table.add_column("CPU Requests", style="yellow")
+        namespace_table.add_column("Memory Requests", style="yellow")
+        namespace_table.add_column("CPU Requests/Limits", style="green")
+        cpu_ratios = table.ratios('cpu_requests', 'cpu_limits', 'namespace')
+        for name, _ in table.top('namespace', 'cpu_requests', limit=10):
+            group = namespaces[name]
+            ratio = cpu_ratios.get(name)
+            namespace_table.add_row(
+                name,
+                str(group['containers']),
+                f"{group['cpu_requests'] / 1000:.2f} cores",
+                f"{group['memory_requests'] / (1024**3):.2f} GB",
+                f"{ratio * 100:.0f}%" if ratio is not None else "no limits"
+            )
+        if namespaces:
+            console.print(namespace_table)
+        
+        if stored and stored['workloads']:
+            console.print(_usage_table(stored, f"Top Workloads by CPU (last {period})", 10))
+        
         # Insights
-        insights = _generate_insights(cluster_info, metrics)
+        insights = _generate_insights(cluster_info, metrics, detector.snapshot)
         if insights:
             insights_panel = Panel(
                 "\n".join([f"• {insight}" for insight in insights]),
@@ -226,8 +440,13 @@ def analyze(namespace, format):
 
 @universal.command()
 @click.option('--dry-run', is_flag=True, help='Show optimizations without applying')
+@click.option('--period', '-p', default='7d', type=click.Choice(['7d', '30d', '90d']),
+              help='Period of stored usage to base recommendations on')
+@click.option('--strategy', '-s', default=Config.DEFAULTS['optimization_strategy'], type=click.Choice(list(STRATEGIES)),
+              help='How closely recommended requests follow observed usage')
 @click.option('--format', '-f', default='table', help='Output format (table, json, yaml)')
-def optimize(dry_run, format):
+@click.pass_context
+def optimize(ctx, dry_run, period, strategy, format):
     """Get optimization recommendations for the cluster"""
     with Progress(
         SpinnerColumn(),
@@ -236,22 +455,35 @@ def optimize(dry_run, format):
     ) as progress:
         task = progress.add_task("Analyzing for optimizations...", total=None)
         
-        detector = ClusterDetector()
+        detector = _get_detector(ctx)
         cluster_info = detector.detect_cluster()
         metrics = detector.get_cluster_metrics()
+        # Usage sampled earlier by `upid universal collect`, if any
+        history = UsageHistory.load(UsageHistory.path(cluster_info.get('name', '')))
+        stored = _stored_usage(cluster_info.get('name', ''), period)
         
         progress.update(task, description="Generating recommendations...")
     
     # Generate optimization recommendations
-    recommendations = _generate_optimizations(cluster_info, metrics)
+    resources = detector.resource_table() if stored['workloads'] else None
+    recommendations = _generate_optimizations(cluster_info, metrics, detector.snapshot, history, stored, strategy,
+                                              detector.workload_rollup(), resources)
     
     if format == 'json':
         console.print(json.dumps(recommendations, indent=2))
         return
     
+    history_line = ""
+    if history is not None and len(history.containers):
+        summary = history.summary()
+        history_line = (f"\nUsage history: {summary['samples']} samples over "
+                        f"{_format_span(summary['end'] - summary['start'])}")
+    if stored['workloads']:
+        history_line += f"\nStored usage: {len(stored['workloads'])} containers over {period} ({stored['tier']} tier)"
     console.print(Panel(
         f"[bold blue]Optimization Analysis: {cluster_info['name']}[/bold blue]\n"
-        f"Found {len(recommendations)} optimization opportunities",
+        f"Found {len(recommendations)} optimization opportunities"
+        f"{history_line}",
         title="[bold green]Optimization Recommendations[/bold green]",
         border_style="green"
     ))
@@ -338,8 +570,33 @@ def optimize(dry_run, format):
 @universal.command()
 @click.option('--output', '-o', help='Output file path')
 @click.option('--format', '-f', default='html', help='Report format (html, json, yaml)')
-def report(output, format):
+@click.option('--period', '-p', default='30d', type=click.Choice(['7d', '30d', '90d']),
+              help='Period of stored workload usage to include')
+@click.pass_context
+def report(ctx, output, format, period):
     """Generate comprehensive cluster report"""
+    fleet = _get_fleet(ctx)
+    if fleet:
+        def collect(detector):
+            return _generate_comprehensive_report(detector.detect_cluster(), detector.get_cluster_metrics(),
+                                                  detector.snapshot)
+        report_data = _collect_fleet(fleet, collect)
+        if format == 'json':
+            report_content = json.dumps(report_data, indent=2)
+        elif format == 'yaml':
+            import yaml
+            report_content = yaml.dump(report_data, default_flow_style=False)
+        else:  # HTML
+            report_content = _generate_fleet_html_report(report_data)
+        
+        if output:
+            with open(output, 'w') as f:
+                f.write(report_content)
+            console.print(f"[green]✅ Report saved to: {output}[/green]")
+        else:
+            console.print(report_content)
+        return
+    
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -347,14 +604,16 @@ def report(output, format):
     ) as progress:
         task = progress.add_task("Generating report...", total=None)
         
-        detector = ClusterDetector()
+        detector = _get_detector(ctx)
         cluster_info = detector.detect_cluster()
         metrics = detector.get_cluster_metrics()
         
         progress.update(task, description="Compiling insights...")
         
         # Generate comprehensive report
-        report_data = _generate_comprehensive_report(cluster_info, metrics)
+        stored = _stored_usage(cluster_info['name'], period)
+        resources = detector.resource_table() if stored['workloads'] else None
+        report_data = _generate_comprehensive_report(cluster_info, metrics, detector.snapshot, stored, resources)
         
         progress.update(task, description="Finalizing report...")
     
@@ -373,6 +632,372 @@ def report(output, format):
     else:
         console.print(report_content)
 
+@universal.command()
+@click.option('--interval', '-i', default=30.0, type=float, help='Seconds between refreshes')
+@click.option('--count', '-c', default=0, type=int, help='Number of refreshes (0 runs until interrupted)')
+@click.pass_context
+def watch(ctx, interval, count):
+    """Keep refreshing cluster usage from a watch cache instead of re-listing"""
+    import time
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console
+    ) as progress:
+        progress.add_task("Listing cluster...", total=None)
+        detector = _get_detector(ctx, watch=True)
+        cluster_info = detector.detect_cluster()
+
+    console.print(f"[bold blue]Watching {cluster_info['name']}[/bold blue] (Ctrl+C to stop)")
+
+    table = Table(box=box.SIMPLE)
+    for column in ("Time", "Nodes", "Pods Running", "CPU Requested", "Memory Requested", "Events"):
+        table.add_column(column)
+
+    refreshes = 0
+    try:
+        while True:
+            # Requests and counts only, from the watch cache; no usage is listed per refresh
+            resources = detector.get_resource_usage()
+            snapshot = detector.snapshot
+            table.add_row(
+                _get_timestamp(),
+                str(snapshot.count('nodes')),
+                f"{resources.get('pods', {}).get('running', 0)}/{resources.get('pods', {}).get('total', 0)}",
+                f"{resources.get('cpu', {}).get('used', 0):.1f}/{resources.get('cpu', {}).get('total', 0):.1f} cores",
+                f"{resources.get('memory', {}).get('used', 0) / (1024**3):.1f}/"
+                f"{resources.get('memory', {}).get('total', 0) / (1024**3):.1f} GB",
+                str(sum(snapshot.events.values()))
+            )
+            console.clear()
+            console.print(table)
+
+            refreshes += 1
+            if count and refreshes >= count:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.snapshot.stop()
+
+@universal.command()
+@click.option('--interval', '-i', default='15s', help='Time between samples (e.g. 15s, 1m)')
+@click.option('--duration', '-d', default='24h', help='How long to sample (e.g. 30m, 24h, 7d)')
+@click.option('--capacity', type=int, help=f'Samples kept per series (default: duration/interval, at most {DEFAULT_CAPACITY})')
+@click.option('--max-series', default=DEFAULT_MAX_SERIES, type=int,
+              help='Containers and nodes tracked at once; the least recently seen are evicted beyond this')
+@click.option('--namespace', '-n', help='Only sample pods in this namespace')
+@click.option('--output', '-o', help='History file (default: ~/.upid/usage/, read by optimize)')
+@click.option('--store/--no-store', default=True,
+              help='Also append container samples to the on-disk store, quantile sketches and decaying '
+                   'histograms read by `usage` and `recommend` (~/.upid/)')
+@click.pass_context
+def collect(ctx, interval, duration, capacity, max_series, namespace, output, store):
+    """Sample pod and node usage into bounded in-memory ring buffers"""
+    import math
+    import time
+
+    try:
+        interval_seconds = parse_duration(interval)
+        duration_seconds = parse_duration(duration)
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        raise click.Abort()
+    if interval_seconds <= 0:
+        console.print("[red]✗ Interval must be positive[/red]")
+        raise click.Abort()
+
+    total = max(1, math.ceil(duration_seconds / interval_seconds))
+    # The pod list is kept current from a watch to map each sampled pod to its workload
+    detector = _get_detector(ctx, watch=store, namespace=namespace)
+    context = detector.backend.current_context(detector.INFO_TIMEOUT).stdout.strip() or 'unknown'
+    series_store = TimeSeriesStore() if store else None
+    # Sketches keep accumulating across runs, so start from the ones saved last time
+    sketch_path = QuantileSketches.path(context)
+    sketches = (QuantileSketches.load(sketch_path) or QuantileSketches()) if store else None
+    recommender_path = UsageRecommender.path(context)
+    recommender = (UsageRecommender.load(recommender_path) or UsageRecommender()) if store else None
+    history = UsageHistory(context, interval_seconds, capacity=capacity or min(total, DEFAULT_CAPACITY),
+                           max_series=max_series)
+    # Namespace-scoped samples are kept apart from the whole-cluster history optimize reads
+    path = output or UsageHistory.path(f'{context}#namespace={namespace}' if namespace else context)
+    # Checkpoint about every five minutes so an interrupted run still leaves usable history
+    checkpoint = max(1, int(300 // interval_seconds))
+
+    console.print(f"[bold blue]Sampling {context}[/bold blue] every {interval} for {duration} "
+                  f"({history.containers.capacity} samples kept per series, up to "
+                  f"{history.max_nbytes / (1024**2):.0f} MB at {max_series} series, Ctrl+C to stop)")
+    started = time.monotonic()
+    samples = 0
+    try:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            task = progress.add_task("Sampling usage...", total=None)
+            while samples < total:
+                usage = detector.sample_usage()
+                if usage.errors:
+                    progress.update(task, description=f"Sample {samples + 1}/{total} failed: "
+                                                      f"{next(iter(usage.errors.values()))[:80]}")
+                else:
+                    timestamp = time.time()
+                    pods = usage.table('pods')
+                    history.record(timestamp, pods, usage.table('nodes'))
+                    if series_store is not None:
+                        keys = detector.usage_series(pods)
+                        series_store.append(context, timestamp, keys,
+                                            pods.columns['cpu_usage'], pods.columns['memory_usage'])
+                        sketches.add(keys, pods.columns['cpu_usage'], pods.columns['memory_usage'])
+                        recommender.add(timestamp, keys, pods.columns['cpu_usage'], pods.columns['memory_usage'])
+                    summary = history.summary()
+                    progress.update(task, description=f"Sample {samples + 1}/{total}: {summary['containers']} containers, "
+                                                      f"{summary['nodes']} nodes, {summary['bytes'] / (1024**2):.1f} MB")
+                samples += 1
+                if samples % checkpoint == 0:
+                    history.save(path)
+                    if sketches is not None:
+                        sketches.save(sketch_path)
+                        recommender.save(recommender_path)
+                if samples < total:
+                    # Sleep to the next tick of a fixed schedule so slow samples do not drift
+                    time.sleep(max(0.0, started + samples * interval_seconds - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        saved = history.save(path)
+        if sketches is not None:
+            sketches.save(sketch_path)
+            recommender.save(recommender_path)
+        detector.snapshot.stop()
+
+    summary = history.summary()
+    console.print(Panel(
+        f"Samples: {summary['samples']}\n"
+        f"Containers: {summary['containers']}\n"
+        f"Nodes: {summary['nodes']}\n"
+        f"Buffer size: {summary['bytes'] / (1024**2):.1f} MB\n"
+        f"Saved to: {saved}",
+        title="[bold green]Usage Collected[/bold green]",
+        border_style="green"
+    ))
+
+@universal.command()
+@click.option('--period', '-p', default='30d', type=click.Choice(['7d', '30d', '90d']), help='Usage period')
+@click.option('--resolution', '-r', help='Finest bucket width needed (e.g. 1m, 1h); picks the rollup tier read')
+@click.option('--namespace', '-n', help='Only show workloads in this namespace')
+@click.option('--limit', default=20, type=int, help='Number of workloads to show')
+@click.option('--sketch', is_flag=True,
+              help='All-time percentiles from the quantile sketches kept by `collect`, merged across --contexts')
+@click.option('--format', '-f', default='table', help='Output format (table, json)')
+@click.pass_context
+def usage(ctx, period, resolution, namespace, limit, sketch, format):
+    """Show workload usage over a period from samples stored by `collect`"""
+    if sketch:
+        _show_sketch_usage(ctx, namespace, limit, format)
+        return
+    detector = _get_detector(ctx)
+    context = detector.backend.current_context(detector.INFO_TIMEOUT).stdout.strip() or 'unknown'
+    try:
+        stored = _stored_usage(context, period, namespace, resolution)
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        raise click.Abort()
+
+    if format == 'json':
+        console.print(json.dumps(dict(stored, context=context, workloads=stored['workloads'][:limit]), indent=2))
+        return
+    if not stored['workloads']:
+        console.print(f"[yellow]No usage stored for {context} in the last {period} - "
+                      f"run `upid universal collect` first[/yellow]")
+        return
+    console.print(_usage_table(stored, f"Workload Usage ({context}, last {period})", limit))
+
+@universal.command()
+@click.option('--namespace', '-n', help='Only show containers in this namespace')
+@click.option('--all', 'show_all', is_flag=True, help='Also show containers whose requests are within bounds')
+@click.option('--limit', default=30, type=int, help='Number of containers to show')
+@click.option('--format', '-f', default='table', help='Output format (table, json)')
+@click.pass_context
+def recommend(ctx, namespace, show_all, limit, format):
+    """VPA-style request recommendations from the decaying usage histograms kept by `collect`"""
+    detector = _get_detector(ctx, namespace=namespace)
+    context = detector.backend.current_context(detector.INFO_TIMEOUT).stdout.strip() or 'unknown'
+    recommender = UsageRecommender.load(UsageRecommender.path(context))
+    if recommender is None:
+        console.print(f"[yellow]No usage histograms for {context} - run `upid universal collect` first[/yellow]")
+        return
+    # Current requests per workload container, from the pods as listed now
+    index, specs = detector.resource_table().by_container()
+    requests = {}
+    for key in recommender.keys:
+        group = index.get((f'{key[0]}/{key[1]}', key[2]))
+        if group is not None:
+            requests[key] = {'cpu': int(specs['cpu_requests'][group]), 'memory': int(specs['memory_requests'][group])}
+    result = OptimizationService(ctx.obj.get('config') if ctx.obj else None).calculate_container_recommendations(
+        recommender, requests)
+    containers = [c for c in result['containers'] if not namespace or c['key'][0] == namespace]
+    if not show_all:
+        containers = [c for c in containers if c['action'] in ('decrease', 'increase')]
+
+    if format == 'json':
+        console.print(json.dumps(dict(result, context=context, containers=containers[:limit]), indent=2))
+        return
+    table = Table(title=f"Container Recommendations ({context})", box=box.ROUNDED)
+    for column, style in (("Namespace", "cyan"), ("Workload", "cyan"), ("Container", "white"), ("Action", "bold"),
+                          ("CPU Request", "white"), ("CPU Target [bounds]", "yellow"),
+                          ("Memory Request", "white"), ("Memory Target [bounds]", "green"), ("History", "blue")):
+        table.add_column(column, style=style)
+    for container in containers[:limit]:
+        current = container['current'] or {}
+        target, lower, upper = container['target'], container['lower_bound'], container['upper_bound']
+        table.add_row(
+            *container['key'], container['action'],
+            f"{current['cpu']}m" if current else "-",
+            f"{target['cpu']}m [{lower['cpu']}-{upper['cpu']}]",
+            f"{current['memory'] / (1024**2):.0f} MB" if current else "-",
+            f"{target['memory'] / (1024**2):.0f} MB [{lower['memory'] / (1024**2):.0f}-{upper['memory'] / (1024**2):.0f}]",
+            _format_span(container['confidence_days'] * 86400)
+        )
+    console.print(table)
+    for line in result['recommendations']:
+        console.print(f"• {line}")
+
+@universal.command()
+@click.option('--namespace', '-n', help='Only check objects and pods in this namespace')
+@click.option('--limit', default=30, type=int, help='Number of objects to show')
+@click.option('--format', '-f', default='table', help='Output format (table, json)')
+@click.pass_context
+def coverage(ctx, namespace, limit, format):
+    """Show which pods each Service, PDB, NetworkPolicy and HPA covers, and the running pods left uncovered"""
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console
+    ) as progress:
+        progress.add_task("Matching selectors to pods...", total=None)
+        detector = _get_detector(ctx, namespace=namespace)
+        result = detector.selector_coverage()
+
+    if format == 'json':
+        console.print(json.dumps(result, indent=2))
+        return
+    for kind, error in result['errors'].items():
+        console.print(f"[yellow]⚠ Could not list {kind}: {error}[/yellow]")
+    labels = {'services': 'Service', 'poddisruptionbudgets': 'PDB', 'networkpolicies': 'NetworkPolicy',
+              'horizontalpodautoscalers': 'HPA'}
+    table = Table(title="Selector Coverage", box=box.ROUNDED)
+    for column, style in (("Kind", "cyan"), ("Namespace", "cyan"), ("Name", "white"), ("Pods", "yellow"),
+                          ("Running", "green")):
+        table.add_column(column, style=style)
+    # Selectors matching nothing first, since they are usually mistakes
+    for item in sorted(result['objects'], key=lambda item: (item['pods'] > 0, -item['pods']))[:limit]:
+        table.add_row(labels[item['kind']], item['namespace'], item['name'],
+                      str(item['pods']) if item['pods'] else "[red]0[/red]", str(item['running']))
+    console.print(table)
+    console.print(Panel(
+        "\n".join(f"{labels[kind]}: {count} of {result['running']} running pods not covered"
+                  for kind, count in result['uncovered'].items()),
+        title="[bold blue]Uncovered Pods[/bold blue]",
+        border_style="blue"
+    ))
+
+def _stored_usage(context: str, period: str, namespace: Optional[str] = None,
+                  resolution: Optional[str] = None) -> Dict[str, Any]:
+    """Per-container usage over a period from the store, read from the coarsest tier that fits"""
+    import time
+
+    store = TimeSeriesStore()
+    seconds = parse_duration(period)
+    tier = store.choose_tier(seconds, parse_duration(resolution) if resolution else None)
+    end = time.time()
+    summary = store.read(context, end - seconds, end, tier, series=store.select(context, namespace)).summarize()
+    workloads = [dict(stats, namespace=key[0], workload=key[1], container=key[2]) for key, stats in summary.items()]
+    workloads.sort(key=lambda workload: workload['cpu_avg'], reverse=True)
+    return {'period': period, 'tier': tier, 'workloads': workloads}
+
+def _show_sketch_usage(ctx, namespace: Optional[str], limit: int, format: str) -> None:
+    """Percentiles per workload container from saved sketches, merged over the selected contexts"""
+    obj = ctx.obj or {}
+    if obj.get('all_contexts') or obj.get('contexts'):
+        try:
+            contexts = resolve_contexts(obj.get('all_contexts', False), obj.get('contexts'))
+        except Exception as e:
+            console.print(f"[red]✗ Cannot read kubeconfig contexts: {e}[/red]")
+            raise click.Abort()
+    else:
+        detector = _get_detector(ctx)
+        contexts = [detector.backend.current_context(detector.INFO_TIMEOUT).stdout.strip() or 'unknown']
+    loaded = {context: QuantileSketches.load(QuantileSketches.path(context)) for context in contexts}
+    found = [context for context, sketches in loaded.items() if sketches is not None]
+    try:
+        merged = merge_sketches([loaded[context] for context in found])
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        raise click.Abort()
+    workloads = [dict(stats, namespace=key[0], workload=key[1], container=key[2])
+                 for key, stats in merged.summarize().items() if not namespace or key[0] == namespace]
+    workloads.sort(key=lambda workload: workload['cpu_p95'], reverse=True)
+
+    if format == 'json':
+        console.print(json.dumps({'contexts': found, 'missing': [c for c in contexts if c not in found],
+                                  'workloads': workloads[:limit]}, indent=2))
+        return
+    if not workloads:
+        console.print(f"[yellow]No usage sketches for {', '.join(contexts)} - run `upid universal collect` first[/yellow]")
+        return
+    table = Table(title=f"Workload Usage Percentiles ({', '.join(found)}, all time)", box=box.ROUNDED)
+    for column, style in (("Namespace", "cyan"), ("Workload", "cyan"), ("Container", "white"), ("Samples", "white"),
+                          ("CPU p50", "yellow"), ("CPU p95", "yellow"), ("CPU p99", "yellow"),
+                          ("Memory p50", "green"), ("Memory p95", "green"), ("Memory p99", "green")):
+        table.add_column(column, style=style)
+    for workload in workloads[:limit]:
+        table.add_row(
+            workload['namespace'], workload['workload'], workload['container'], str(workload['samples']),
+            f"{workload['cpu_p50']}m", f"{workload['cpu_p95']}m", f"{workload['cpu_p99']}m",
+            f"{workload['memory_p50'] / (1024**2):.0f} MB", f"{workload['memory_p95'] / (1024**2):.0f} MB",
+            f"{workload['memory_p99'] / (1024**2):.0f} MB"
+        )
+    console.print(table)
+
+def _usage_table(stored: Dict[str, Any], title: str, limit: int) -> Table:
+    """Table of the busiest containers in a _stored_usage() result"""
+    table = Table(title=f"{title} [{stored['tier']}]", box=box.ROUNDED)
+    for column, style in (("Namespace", "cyan"), ("Workload", "cyan"), ("Container", "white"),
+                          ("Samples", "white"), ("CPU Avg", "yellow"), ("CPU p95", "yellow"), ("CPU Peak", "yellow"),
+                          ("Memory Avg", "green"), ("Memory p95", "green"), ("Memory Peak", "green")):
+        table.add_column(column, style=style)
+    for workload in stored['workloads'][:limit]:
+        table.add_row(
+            workload['namespace'], workload['workload'], workload['container'], str(workload['samples']),
+            f"{workload['cpu_avg']:.0f}m", f"{workload['cpu_p95']}m", f"{workload['cpu_peak']}m",
+            f"{workload['memory_avg'] / (1024**2):.0f} MB", f"{workload['memory_p95'] / (1024**2):.0f} MB",
+            f"{workload['memory_peak'] / (1024**2):.0f} MB"
+        )
+    return table
+
+def _limits_text(row: Dict[str, Any]) -> str:
+    """Recommended limits of a right-sizing row, for the limits that are set"""
+    limits = []
+    if row['cpu_limit_recommended']:
+        limits.append(f"{row['cpu_limit_recommended']}m CPU")
+    if row['memory_limit_recommended']:
+        limits.append(f"{row['memory_limit_recommended'] / (1024**2):.0f} MB")
+    return f", limits {' / '.join(limits)}" if limits else ""
+
+def _format_span(seconds: float) -> str:
+    """Human readable length of a time span"""
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f}d"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds:.0f}s"
+
 def _get_timestamp():
     """Get current timestamp"""
     from datetime import datetime
@@ -389,7 +1014,8 @@ def _get_resource_status(percentage: float) -> str:
     else:
         return "🔴 Critical"
 
-def _generate_insights(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) -> List[str]:
+def _generate_insights(cluster_info: Dict[str, Any], metrics: Dict[str, Any],
+                       snapshot: Optional[ClusterSnapshot] = None) -> List[str]:
     """Generate insights from cluster data"""
     insights = []
     
@@ -406,6 +1032,10 @@ def _generate_insights(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) ->
         
         pods_running = resources.get('pods', {}).get('running', 0)
         pods_total = resources.get('pods', {}).get('total', 0)
+        if snapshot is not None and snapshot.is_loaded('pods'):
+            phases = snapshot.pod_phases()
+            pods_running = phases.get('Running', 0)
+            pods_total = sum(phases.values())
         
         # CPU insights
         if cpu_percent < 20:
@@ -424,6 +1054,10 @@ def _generate_insights(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) ->
             insights.append("No pods found - cluster may be empty")
         elif pods_running < pods_total:
             insights.append(f"{pods_total - pods_running} pods are not running - check pod status")
+            if snapshot is not None and snapshot.is_loaded('pods'):
+                pending = snapshot.pod_phases().get('Pending', 0)
+                if pending:
+                    insights.append(f"{pending} pods are pending - check node capacity and scheduling constraints")
     
     # Cluster type insights
     cluster_type = cluster_info.get('type', 'unknown')
@@ -434,10 +1068,115 @@ def _generate_insights(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) ->
     
     return insights
 
-def _generate_optimizations(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+def _generate_optimizations(cluster_info: Dict[str, Any], metrics: Dict[str, Any],
+                            snapshot: Optional[ClusterSnapshot] = None,
+                            history: Optional[UsageHistory] = None,
+                            stored: Optional[Dict[str, Any]] = None,
+                            strategy: str = 'balanced',
+                            rollup: Optional[List[Dict[str, Any]]] = None,
+                            resources: Optional[ResourceTable] = None) -> List[Dict[str, Any]]:
     """Generate optimization recommendations"""
     recommendations = []
     
+    if stored and stored['workloads'] and resources is not None:
+        # Per-container requests and limits from usage percentiles against the current pod specs
+        rightsizing = RightsizingEngine(strategy).recommend(ContainerUsage.from_rows(stored['workloads']), resources)
+        totals = rightsizing.totals()
+        if totals['changes']:
+            recommendations.append({
+                'type': 'resource',
+                'issue': f"{totals['changes']} of {totals['containers']} containers are sized away from their "
+                         f"{stored['period']} usage",
+                'recommendation': f"Right-size requests ({strategy}): {totals['cpu_request_delta']:+d}m CPU, "
+                                  f"{totals['memory_request_delta'] / (1024**2):+.0f} MB memory, "
+                                  f"${totals['monthly_savings']:.2f}/month",
+                'impact': 'High',
+                'effort': 'Medium',
+                'monthly_savings': totals['monthly_savings']
+            })
+        for row in rightsizing.rows(limit=10):
+            recommendations.append({
+                'type': 'resource',
+                'issue': f"{row['namespace']}/{row['workload']} [{row['container']}] requests "
+                         f"{row['cpu_request']}m / {row['memory_request'] / (1024**2):.0f} MB, "
+                         f"p95 use {row['cpu_p95']}m / {row['memory_p95'] / (1024**2):.0f} MB",
+                'recommendation': f"Set requests to {row['cpu_recommended']}m / "
+                                  f"{row['memory_recommended'] / (1024**2):.0f} MB"
+                                  f"{_limits_text(row)}",
+                'impact': f"${row['monthly_savings']:.2f}/month" if row['monthly_savings'] >= 0 else 'Avoids throttling/OOM',
+                'effort': 'Low',
+                'workload': f"{row['namespace']}/{row['workload']}",
+                'container': row['container'],
+                'requests': {'cpu': row['cpu_recommended'], 'memory': row['memory_recommended']},
+                'limits': {'cpu': row['cpu_limit_recommended'], 'memory': row['memory_limit_recommended']},
+                'monthly_savings': row['monthly_savings']
+            })
+    
+    if stored and stored['workloads']:
+        # Containers that never needed more than a sliver of CPU over the whole stored period
+        busy = {f"{w['namespace']}/{w['workload']}" for w in stored['workloads'] if w['cpu_p99'] >= 10}
+        idle = sorted({f"{w['namespace']}/{w['workload']}" for w in stored['workloads']} - busy)
+        if idle and rollup is not None:
+            # Whole workloads (every container idle) priced from their requests, as zero-pod candidates.
+            # Each is idle for the span the store actually holds for it, not the requested period.
+            spans: Dict[str, List[int]] = {}
+            for w in stored['workloads']:
+                span = spans.setdefault(f"{w['namespace']}/{w['workload']}", [w['first'], w['last']])
+                span[0], span[1] = min(span[0], w['first']), max(span[1], w['last'])
+            idle_set = set(idle)
+            zero_pod = OptimizationService().calculate_idle_workload_recommendations([
+                dict(row, idle_seconds=(spans[key][1] - spans[key][0]) // 1000)
+                for row, key in ((row, f"{row['namespace']}/{row['workload']}") for row in rollup)
+                if key in idle_set
+            ])
+            for rec in zero_pod[:10]:
+                recommendations.append({
+                    'type': 'cost',
+                    'opportunity': f"{rec['namespace']}/{rec['kind']}/{rec['deployment']} idle for {rec['idle_time']} "
+                                   f"({rec['current_replicas']} pods)",
+                    'action': 'Scale to zero',
+                    'savings': f"${rec['estimated_savings']:.2f}/month",
+                    'risk': rec['risk_level'],
+                    'zero_pod': rec
+                })
+        elif idle:
+            recommendations.append({
+                'type': 'resource',
+                'issue': f"{len(idle)} workloads stayed under 10m CPU at p99 over {stored['period']}",
+                'recommendation': f"Scale idle workloads down or to zero: {', '.join(idle[:5])}"
+                                  f"{' and more' if len(idle) > 5 else ''}",
+                'impact': 'Medium',
+                'effort': 'Low'
+            })
+    
+    if history is not None and len(history.containers) >= 2 and 'resources' in metrics:
+        # Compare requests with the highest usage actually observed by `collect`
+        times, cpu, memory = history.containers.totals()
+        span = _format_span(times[-1] - times[0])
+        resources = metrics['resources']
+        cpu_requested = resources.get('cpu', {}).get('used', 0)
+        memory_requested = resources.get('memory', {}).get('used', 0)
+        cpu_peak = cpu.max() / 1000
+        memory_peak = int(memory.max())
+        if cpu_requested > 0 and cpu_peak < cpu_requested * 0.5:
+            recommendations.append({
+                'type': 'resource',
+                'issue': f'CPU requests are {cpu_requested / max(cpu_peak, 0.001):.1f}x the observed peak',
+                'recommendation': f'Peak CPU over the last {span} was {cpu_peak:.2f} of {cpu_requested:.2f} '
+                                  f'requested cores; lower requests toward observed usage',
+                'impact': 'High',
+                'effort': 'Medium'
+            })
+        if memory_requested > 0 and memory_peak < memory_requested * 0.5:
+            recommendations.append({
+                'type': 'resource',
+                'issue': f'Memory requests are {memory_requested / max(memory_peak, 1):.1f}x the observed peak',
+                'recommendation': f'Peak memory over the last {span} was {memory_peak / (1024**3):.2f} of '
+                                  f'{memory_requested / (1024**3):.2f} requested GB; lower requests toward observed usage',
+                'impact': 'High',
+                'effort': 'Medium'
+            })
+    
     if 'resources' in metrics and not metrics.get('error'):
         resources = metrics['resources']
         
@@ -496,32 +1235,47 @@ def _generate_optimizations(cluster_info: Dict[str, Any], metrics: Dict[str, Any
             })
             
             if cpu_percent < 50 and memory_percent < 50:
+                node_count = snapshot.count('nodes') if snapshot is not None else 0
+                action = 'Downsize node groups based on actual usage'
+                if node_count:
+                    action = f'Downsize node groups ({node_count} nodes) based on actual usage'
                 recommendations.append({
                     'type': 'cost',
                     'opportunity': 'Right-sizing opportunity',
-                    'action': 'Downsize node groups based on actual usage',
+                    'action': action,
                     'savings': '20-40%',
                     'risk': 'Low'
                 })
     
     return recommendations
 
-def _generate_comprehensive_report(cluster_info: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, Any]:
+def _generate_comprehensive_report(cluster_info: Dict[str, Any], metrics: Dict[str, Any],
+                                   snapshot: Optional[ClusterSnapshot] = None,
+                                   stored: Optional[Dict[str, Any]] = None,
+                                   resources: Optional[ResourceTable] = None) -> Dict[str, Any]:
     """Generate comprehensive report data"""
-    return {
+    if snapshot is not None:
+        counts = snapshot.summary()
+    else:
+        info = cluster_info.get('info', {})
+        counts = {kind: len(info.get(kind, {}).get('items', [])) for kind in ('nodes', 'pods', 'namespaces')}
+    report_data = {
         'timestamp': _get_timestamp(),
         'cluster': cluster_info,
         'metrics': metrics,
-        'insights': _generate_insights(cluster_info, metrics),
-        'optimizations': _generate_optimizations(cluster_info, metrics),
+        'insights': _generate_insights(cluster_info, metrics, snapshot),
+        'optimizations': _generate_optimizations(cluster_info, metrics, snapshot, stored=stored, resources=resources),
         'summary': {
-            'total_nodes': len(cluster_info.get('info', {}).get('nodes', {}).get('items', [])),
-            'total_pods': len(cluster_info.get('info', {}).get('pods', {}).get('items', [])),
-            'total_namespaces': len(cluster_info.get('info', {}).get('namespaces', {}).get('items', [])),
+            'total_nodes': counts['nodes'],
+            'total_pods': counts['pods'],
+            'total_namespaces': counts['namespaces'],
             'cluster_type': cluster_info.get('type', 'unknown'),
             'capabilities': cluster_info.get('capabilities', {})
         }
     }
+    if stored and stored['workloads']:
+        report_data['usage'] = dict(stored, workloads=stored['workloads'][:20])
+    return report_data
 
 def _generate_html_report(report_data: Dict[str, Any]) -> str:
     """Generate HTML report"""
@@ -567,7 +1321,83 @@ def _generate_html_report(report_data: Dict[str, Any]) -> str:
                 {''.join([f'<li>{opt["recommendation"] if "recommendation" in opt else opt["action"]}</li>' for opt in report_data['optimizations']])}
             </ul>
         </div>
+        {_html_usage_section(report_data.get('usage'))}
+    </body>
+    </html>
+    """
+    return html 
+
+def _html_usage_section(stored: Optional[Dict[str, Any]]) -> str:
+    """HTML table of stored workload usage, empty without any"""
+    if not stored:
+        return ''
+    rows = ''.join(
+        f"<tr><td>{w['namespace']}</td><td>{w['workload']}</td><td>{w['container']}</td>"
+        f"<td>{w['cpu_avg']:.0f}m</td><td>{w['cpu_p95']}m</td><td>{w['memory_p95'] / (1024**2):.0f} MB</td></tr>"
+        for w in stored['workloads']
+    )
+    return f"""
+        <div class="section">
+            <h2>Workload Usage (last {stored['period']})</h2>
+            <table>
+                <tr><th>Namespace</th><th>Workload</th><th>Container</th><th>CPU Avg</th><th>CPU p95</th><th>Memory p95</th></tr>
+                {rows}
+            </table>
+        </div>
+    """
+
+def _generate_fleet_html_report(report_data: Dict[str, Any]) -> str:
+    """Generate an HTML report covering every context of a fleet run"""
+    rows = []
+    sections = []
+    for context, entry in report_data['contexts'].items():
+        result = entry.get('result') or {}
+        summary = result.get('summary', {})
+        if not Fleet.answered(entry):
+            error = entry.get('error') or result.get('cluster', {}).get('error') or 'Cluster unreachable'
+            rows.append(f'<tr><td>{context}</td><td class="status-error" colspan="4">{error}</td></tr>')
+            continue
+        rows.append(
+            f"<tr><td>{context}</td><td>{summary.get('cluster_type', 'unknown')}</td>"
+            f"<td>{summary.get('total_nodes', 0)}</td><td>{summary.get('total_pods', 0)}</td>"
+            f"<td>{summary.get('total_namespaces', 0)}</td></tr>"
+        )
+        sections.append(
+            f'<div class="section"><h2>{context}</h2><ul>'
+            f"{''.join(f'<li>{insight}</li>' for insight in result.get('insights', []))}"
+            f'</ul></div>'
+        )
+    totals = report_data['fleet']
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>UPID Fleet Report</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .header {{ background: #f0f0f0; padding: 20px; border-radius: 5px; }}
+            .section {{ margin: 20px 0; }}
+            table {{ border-collapse: collapse; }}
+            td, th {{ padding: 6px 12px; border-bottom: 1px solid #ddd; text-align: left; }}
+            .status-error {{ color: red; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>UPID Fleet Report</h1>
+            <p>Generated: {report_data['timestamp']}</p>
+            <p>Clusters: {totals['ok']}/{totals['contexts']} answered, {totals['nodes']} nodes,
+               {totals['pods']['total']} pods</p>
+        </div>
+        
+        <div class="section">
+            <h2>Clusters</h2>
+            <table>
+                <tr><th>Context</th><th>Type</th><th>Nodes</th><th>Pods</th><th>Namespaces</th></tr>
+                {''.join(rows)}
+            </table>
+        </div>
+        {''.join(sections)}
     </body>
     </html>
     """
-    return html 
\ No newline at end of file
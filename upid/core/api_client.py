@@ -4,23 +4,53 @@ API client for UPID platform
 
 import requests
 import json
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Callable, Optional, List
 from datetime import datetime
+from urllib.parse import urlparse
 from .config import Config
 from .auth import AuthManager
+from .response_cache import ResponseCache, DEFAULT_TTLS
+from .deadline import Deadline, DeadlineExceeded
+from .pagination import DEFAULT_PAGE_SIZE, PageIterator
+from .retry_policy import CircuitBreaker, CircuitOpenError, RequestMetrics, RetryPolicy, parse_retry_after
 
 class UPIDAPIClient:
     """UPID API Client for interacting with the UPID platform"""
     
-    def __init__(self, config: Config, auth_manager: AuthManager):
+    def __init__(self, config: Config, auth_manager: AuthManager, use_cache: bool = True):
         self.config = config
         self.auth_manager = auth_manager
         self.session = requests.Session()
         self.timeout = self.config.get('timeout', 30)
-        self.session.timeout = self.timeout
         self.base_url = self.config.get('api_url')
         self.api_version = self.config.get('api_version', 'v1')
         self.local_mode = self.config.get('local_mode', False)
+        self.response_cache = self._get_response_cache() if use_cache else None
+        self.retry_policy = RetryPolicy(
+            max_retries=self._setting('retry_max_retries'),
+            backoff=self._setting('retry_backoff'),
+            max_backoff=self._setting('retry_max_backoff'),
+        )
+        self.connect_timeout = self._setting('connect_timeout')
+        # Shared budget of every call in a command; None leaves only the per-request timeouts
+        self.deadline: Optional[Deadline] = None
+        self.metrics = RequestMetrics()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+    def _setting(self, key: str) -> Any:
+        value = self.config.get(key)
+        return value if value is not None else Config.DEFAULTS[key]
+
+    def _get_response_cache(self) -> ResponseCache:
+        """Response cache sized and tuned from the configuration"""
+        max_mb = self.config.get('response_cache_max_mb')
+        ttls = self.config.get('response_cache_ttls') or {}
+        return ResponseCache(
+            max_bytes=int((max_mb if max_mb is not None else Config.DEFAULTS['response_cache_max_mb']) * 1024 * 1024),
+            ttls=tuple(ttls.items()) + DEFAULT_TTLS
+        )
 
     def _build_url(self, endpoint: str) -> str:
         if endpoint.startswith('http'):
@@ -60,43 +90,138 @@ class UPIDAPIClient:
         except requests.exceptions.HTTPError as e:
             raise e
 
+    def _breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(
+                    failure_threshold=self._setting('circuit_failure_threshold'),
+                    reset_timeout=self._setting('circuit_reset_timeout'),
+                )
+            return breaker
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the host's circuit breaker, retrying transient failures per the retry policy
+
+        Connection errors and 5xx responses count against the breaker; a
+        response that is still retryable when retries run out is returned for
+        _handle_response to raise. Every attempt gets the connect and read
+        timeouts, cut to what is left of the deadline, and no retry waits
+        past it. The read timeout bounds each socket read, so a response that
+        keeps trickling in can overrun the deadline by up to one read timeout.
+        """
+        policy = self.retry_policy
+        deadline = self.deadline
+        host = urlparse(url).netloc
+        breaker = self._breaker(host)
+        self.metrics.record(calls=1)
+        attempt = 0
+        while True:
+            if deadline is not None:
+                deadline.check(f'{method} {urlparse(url).path}')
+            try:
+                breaker.before_call(host)
+            except CircuitOpenError:
+                self.metrics.record(rejected=1)
+                raise
+            self.metrics.record(attempts=1)
+            try:
+                timeout = (self.connect_timeout, self.timeout)
+                if deadline is not None:
+                    timeout = deadline.timeouts(*timeout)
+                response = getattr(self.session, method.lower())(url, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                # A timeout cut short by the deadline says nothing about the host's health
+                if deadline is not None and deadline.expired():
+                    breaker.release_trial()
+                    raise DeadlineExceeded(f'Deadline of {deadline.seconds:g}s exceeded during {method} '
+                                           f'{urlparse(url).path}: {e}')
+                breaker.record_failure()
+                retryable = policy.retries_error(method, isinstance(e, requests.exceptions.ConnectTimeout))
+                wait = self._retry_wait(attempt) if retryable else None
+                if wait is None:
+                    self.metrics.record(exhausted=int(retryable))
+                    raise Exception(f'Request failed: {e}')
+                reason = type(e).__name__
+            except BaseException:
+                breaker.release_trial()
+                raise
+            else:
+                status = response.status_code
+                if 500 <= status < 600:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not policy.retries_status(method, status):
+                    return response
+                wait = self._retry_wait(attempt, parse_retry_after(response.headers.get('Retry-After')))
+                if wait is None:
+                    self.metrics.record(exhausted=1)
+                    return response
+                reason = str(status)
+                response.close()
+            self.metrics.record_retry(reason, wait)
+            policy.sleep(wait)
+            attempt += 1
+
+    def _retry_wait(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Wait before the next attempt, or None to give up, also when it would not finish before the deadline"""
+        wait = self.retry_policy.delay(attempt, retry_after)
+        if wait is not None and self.deadline is not None and wait >= self.deadline.remaining():
+            return None
+        return wait
+
+    def request_metrics(self) -> Dict[str, Any]:
+        """Call, retry and rejection counters plus the circuit breaker state of every host called"""
+        metrics = self.metrics.as_dict()
+        with self._breakers_lock:
+            metrics['breakers'] = {host: breaker.status() for host, breaker in self.breakers.items()}
+        return metrics
+
     def _get(self, endpoint: str, params: Optional[Dict] = None) -> Any:
         url = self._build_url(endpoint)
         headers = self._get_headers()
-        try:
-            response = self.session.get(url, headers=headers, params=params)
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'Request failed: {e}')
-        return self._handle_response(response)
+        cache = self.response_cache
+        cache_path = cache.path(endpoint, url, params, headers.get('Authorization')) if cache else None
+        entry = cache.load(cache_path) if cache else None
+        if entry is not None:
+            if cache.is_fresh(entry):
+                return entry['body']
+            headers.update(cache.validators(entry))
+        response = self._send('GET', url, headers=headers, params=params)
+        if entry is not None and response.status_code == 304:
+            cache.refresh(cache_path, entry, response.headers)
+            return entry['body']
+        result = self._handle_response(response)
+        if cache and response.status_code == 200:
+            cache.store(cache_path, endpoint, response.headers, result)
+        return result
 
     def _post(self, endpoint: str, data: Optional[Dict] = None, json: Optional[Dict] = None) -> Any:
         url = self._build_url(endpoint)
         headers = self._get_headers()
-        try:
-            payload = json if json is not None else data
-            response = self.session.post(url, headers=headers, json=payload)
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'Request failed: {e}')
-        return self._handle_response(response)
+        payload = json if json is not None else data
+        response = self._send('POST', url, headers=headers, json=payload)
+        return self._changed(endpoint, self._handle_response(response))
 
     def _put(self, endpoint: str, data: Optional[Dict] = None, json: Optional[Dict] = None) -> Any:
         url = self._build_url(endpoint)
         headers = self._get_headers()
-        try:
-            payload = json if json is not None else data
-            response = self.session.put(url, headers=headers, json=payload)
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'Request failed: {e}')
-        return self._handle_response(response)
+        payload = json if json is not None else data
+        response = self._send('PUT', url, headers=headers, json=payload)
+        return self._changed(endpoint, self._handle_response(response))
 
     def _delete(self, endpoint: str) -> Any:
         url = self._build_url(endpoint)
         headers = self._get_headers()
-        try:
-            response = self.session.delete(url, headers=headers)
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'Request failed: {e}')
-        return self._handle_response(response)
+        response = self._send('DELETE', url, headers=headers)
+        return self._changed(endpoint, self._handle_response(response))
+
+    def _changed(self, endpoint: str, result: Any) -> Any:
+        """Drop cached reads a successful write may have made stale, passing its result through"""
+        if self.response_cache:
+            self.response_cache.invalidate(endpoint)
+        return result
 
     # Local mode methods for testing
     def _get_local_clusters(self) -> List[Dict[str, Any]]:
@@ -609,3 +734,42 @@ class UPIDAPIClient:
         
         return self._post('/auth/logout')
 
+    # Paginated list methods: iterate items page by page, fetching the next page in the background
+    def _paginate(self, endpoint: str, local: Callable[[], List[Dict[str, Any]]],
+                  params: Optional[Dict[str, Any]] = None, page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterator over a list endpoint; local mode yields the single page of mock data"""
+        if self.local_mode:
+            return PageIterator(lambda page: local(), prefetch=False)
+        return PageIterator(lambda page: self._get(endpoint, params=page), params, page_size)
+
+    def iter_clusters(self, page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over clusters page by page"""
+        return self._paginate('/clusters', self.get_clusters, page_size=page_size)
+
+    def iter_deployments(self, cluster_id: str, namespace: str = 'default',
+                         page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over the deployments in a namespace page by page"""
+        return self._paginate(f'/clusters/{cluster_id}/deployments', lambda: self.get_deployments(cluster_id, namespace),
+                              params={'namespace': namespace}, page_size=page_size)
+
+    def iter_optimization_history(self, cluster_name: str, page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over a cluster's optimization history page by page"""
+        return self._paginate(f'/clusters/{cluster_name}/optimization-history',
+                              lambda: self.get_optimization_history(cluster_name), page_size=page_size)
+
+    def iter_resource_optimizations(self, cluster_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over resource optimization recommendations page by page"""
+        return self._paginate(f'/clusters/{cluster_id}/optimizations/resources',
+                              lambda: self.get_resource_optimizations(cluster_id), page_size=page_size)
+
+    def iter_cost_optimizations(self, cluster_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over cost optimization recommendations page by page"""
+        return self._paginate(f'/clusters/{cluster_id}/optimizations/costs',
+                              lambda: self.get_cost_optimizations(cluster_id), page_size=page_size)
+
+    def iter_zero_pod_recommendations(self, cluster_name: str, namespace: Optional[str] = None,
+                                      page_size: int = DEFAULT_PAGE_SIZE) -> PageIterator:
+        """Iterate over zero-pod scaling recommendations page by page"""
+        return self._paginate(f'/clusters/{cluster_name}/zero-pod-recommendations',
+                              lambda: self.get_zero_pod_recommendations(cluster_name, namespace),
+                              params={'namespace': namespace} if namespace else None, page_size=page_size)
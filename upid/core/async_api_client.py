@@ -0,0 +1,108 @@
+"""
+Async API client for UPID platform
+Asyncio front end to UPIDAPIClient whose calls share one connection pool and
+run concurrently, so several endpoints or clusters are fetched at once
+"""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from .api_client import UPIDAPIClient
+from .auth import AuthManager
+from .config import Config
+from .probe_engine import DaemonExecutor
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+# UPIDAPIClient methods awaitable under the same name; iter_* methods return blocking
+# iterators, which have no coroutine form
+COROUTINE_METHODS = (
+    'request_metrics', 'login', 'logout', 'get_profile', 'refresh_token', 'get_clusters', 'get_cluster',
+    'create_cluster', 'delete_cluster', 'get_cluster_info', 'analyze_cluster', 'optimize_cluster',
+    'get_optimization_result', 'deploy_optimization', 'get_deployment_status', 'deploy_optimizations',
+    'get_zero_pod_recommendations', 'get_cost_analysis', 'get_optimization_history', 'get_report',
+    'analyze_resources', 'analyze_costs', 'analyze_performance', 'get_resource_optimizations',
+    'apply_resource_optimizations', 'get_cost_optimizations', 'apply_cost_optimizations',
+    'apply_zero_pod_optimizations', 'enable_auto_optimization', 'disable_auto_optimization', 'create_deployment',
+    'get_deployments', 'get_deployment', 'scale_deployment', 'delete_deployment', 'generate_summary_report',
+    'generate_cost_report', 'generate_performance_report', 'get_current_user',
+)
+
+
+class AsyncUPIDAPIClient:
+    """UPID API client whose methods are coroutines
+
+    Every method in COROUTINE_METHODS is available under the same name and
+    arguments and returns the same result when awaited. Calls go through one
+    UPIDAPIClient, so headers, local mode and error handling are shared. Each
+    call is still one blocking request, run on a bounded pool of
+    `max_concurrency` threads over a requests session that keeps as many
+    connections per host alive, so many calls awaited at once overlap
+    instead of running one after another.
+    """
+
+    def __init__(self, config: Config, auth_manager: AuthManager,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, client: Optional[UPIDAPIClient] = None):
+        self.client = client or UPIDAPIClient(config, auth_manager)
+        self.max_concurrency = max_concurrency
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.client.session.mount('https://', adapter)
+        self.client.session.mount('http://', adapter)
+        # Daemon workers, so a call still hanging at exit does not hold the process open
+        self._executor = DaemonExecutor(max_workers=max_concurrency, thread_name_prefix='upid-api')
+
+    async def __aenter__(self) -> 'AsyncUPIDAPIClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker threads and close pooled connections"""
+        self._executor.shutdown(wait=False)
+        self.client.session.close()
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """Await one UPIDAPIClient method by name"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(getattr(self.client, method), *args, **kwargs))
+
+    async def gather(self, calls: Dict[str, Tuple[str, Sequence[Any]]],
+                     return_exceptions: bool = False) -> Dict[str, Any]:
+        """Run named calls ({name: (method, args)}) concurrently; results by name
+
+        With return_exceptions a failed call yields its exception instead of
+        cancelling the rest.
+        """
+        names = list(calls)
+        results = await asyncio.gather(*(self.call(calls[name][0], *calls[name][1]) for name in names),
+                                       return_exceptions=return_exceptions)
+        return dict(zip(names, results))
+
+    async def fan_out(self, method: str, arguments: Iterable[Sequence[Any]],
+                      return_exceptions: bool = True) -> List[Any]:
+        """Call one method with every argument tuple concurrently (e.g. one per cluster), results in order"""
+        return await asyncio.gather(*(self.call(method, *args) for args in arguments),
+                                    return_exceptions=return_exceptions)
+
+
+def run(coroutine: Awaitable[Any]) -> Any:
+    """Run a coroutine from synchronous code such as a click command"""
+    return asyncio.run(coroutine)
+
+
+def _coroutine_method(name: str, method: Callable) -> Callable:
+    async def call(self, *args, **kwargs):
+        return await self.call(name, *args, **kwargs)
+    call.__name__ = name
+    call.__qualname__ = f'AsyncUPIDAPIClient.{name}'
+    call.__doc__ = method.__doc__
+    return call
+
+
+for _name in COROUTINE_METHODS:
+    setattr(AsyncUPIDAPIClient, _name, _coroutine_method(_name, getattr(UPIDAPIClient, _name)))
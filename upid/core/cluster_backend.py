@@ -0,0 +1,407 @@
+"""
+Cluster access backends for the cluster detector
+KubectlBackend forks kubectl per query; ApiServerBackend reads the kubeconfig
+once and serves every query over a single pooled HTTPS session
+"""
+
+import base64
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+from urllib.parse import urlencode
+from typing import Dict, Any, Callable, IO, Iterator, List, Optional, Tuple
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+from .probe_engine import ProbeEngine, ProbeResult, PROBE_OK, PROBE_FAILED, PROBE_TIMEOUT
+
+BACKEND_CHOICES = ['auto', 'api', 'kubectl']
+
+METRICS_API = '/apis/metrics.k8s.io/v1beta1'
+
+
+class KubeconfigError(Exception):
+    """Raised when a kubeconfig cannot be used by the native API backend"""
+
+
+class ClusterBackend:
+    """Interface shared by all backends; every query returns a ProbeResult"""
+
+    name = 'base'
+
+    # Capability -> (API path, query params); list paths count as present when non-empty
+    CAPABILITIES = {
+        'metrics_server': ('/apis/apps/v1/namespaces/kube-system/deployments/metrics-server', None),
+        'prometheus': ('/apis/apps/v1/deployments', {'fieldSelector': 'metadata.name=prometheus', 'limit': 1}),
+        'grafana': ('/apis/apps/v1/deployments', {'fieldSelector': 'metadata.name=grafana', 'limit': 1}),
+        'ingress': ('/apis/networking.k8s.io/v1/ingressclasses', {'limit': 1}),
+        'storage_class': ('/apis/storage.k8s.io/v1/storageclasses', {'limit': 1}),
+    }
+
+    def current_context(self, timeout: float) -> ProbeResult:
+        """Name of the kube context in use (stdout)"""
+        raise NotImplementedError
+
+    def cluster_info(self, timeout: float) -> ProbeResult:
+        """Human readable control plane information (stdout)"""
+        raise NotImplementedError
+
+    def get(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float) -> ProbeResult:
+        """GET an API path; the JSON body is returned in stdout"""
+        raise NotImplementedError
+
+    def stream_list(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float,
+                    consume: Callable[[IO], None]) -> ProbeResult:
+        """GET a list path and hand the response body stream to consume()"""
+        raise NotImplementedError
+
+    def check_capability(self, capability: str, timeout: float) -> ProbeResult:
+        """Probe one capability; ok means present"""
+        name = f'capability:{capability}'
+        if capability == 'helm':
+            return ProbeEngine.run_command(name, ['helm', 'version'], timeout)
+
+        path, params = self.CAPABILITIES[capability]
+        result = self.get(name, path, params, timeout)
+        if result.ok and params is not None:
+            try:
+                present = bool(json.loads(result.stdout).get('items'))
+            except ValueError:
+                present = False
+            if not present:
+                result.status = PROBE_FAILED
+        return result
+
+    def close(self) -> None:
+        """Release any held connections or files"""
+
+
+class KubectlBackend(ClusterBackend):
+    """Backend that runs one kubectl process per query"""
+
+    name = 'kubectl'
+
+    def __init__(self, context: Optional[str] = None):
+        # Pinned kube context; None follows kubectl's current context
+        self.context = context
+
+    def current_context(self, timeout: float) -> ProbeResult:
+        if self.context:
+            return ProbeResult('context', PROBE_OK, returncode=0, stdout=self.context)
+        return ProbeEngine.run_command('context', ['kubectl', 'config', 'current-context'], timeout)
+
+    def cluster_info(self, timeout: float) -> ProbeResult:
+        return ProbeEngine.run_command('cluster_info', self._kubectl('cluster-info'), timeout)
+
+    def get(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float) -> ProbeResult:
+        return ProbeEngine.run_command(name, self._raw_command(path, params), timeout)
+
+    def stream_list(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float,
+                    consume: Callable[[IO], None]) -> ProbeResult:
+        return ProbeEngine.stream_command(name, self._raw_command(path, params), timeout, consume)
+
+    def _kubectl(self, *args: str) -> List[str]:
+        command = ['kubectl', *args]
+        if self.context:
+            command += ['--context', self.context]
+        return command
+
+    def _raw_command(self, path: str, params: Optional[Dict[str, Any]]) -> List[str]:
+        if params:
+            path = f'{path}?{urlencode(params)}'
+        return self._kubectl('get', '--raw', path)
+
+
+class _ChunkReader:
+    """File-like adapter over an iterator of byte chunks"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+
+    def read(self, size: int = -1) -> bytes:
+        return next(self._chunks, b'')
+
+
+class ApiServerBackend(ClusterBackend):
+    """Backend that talks to the API server directly over one pooled session"""
+
+    name = 'api'
+    CONNECT_TIMEOUT = 5
+
+    def __init__(self, server: str, context: str, session: requests.Session, temp_files: Optional[List[str]] = None):
+        self.server = server.rstrip('/')
+        self.context = context
+        self.session = session
+        self._temp_files = temp_files or []
+        weakref.finalize(self, _remove_files, self._temp_files)
+
+    @classmethod
+    def from_kubeconfig(cls, kubeconfig: Optional[str] = None, max_connections: int = 8,
+                        context: Optional[str] = None) -> 'ApiServerBackend':
+        """Build a backend from a kubeconfig context (the current one by default)"""
+        config = load_kubeconfig(kubeconfig, context)
+        cluster, user = config['cluster'], config['user']
+        temp_files: List[str] = []
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_connections))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Accept'] = 'application/json'
+        session.headers['User-Agent'] = 'UPID-CLI/1.0.0'
+
+        try:
+            # Server trust
+            if cluster.get('insecure-skip-tls-verify'):
+                session.verify = False
+            elif cluster.get('certificate-authority-data'):
+                session.verify = _write_temp(cluster['certificate-authority-data'], temp_files)
+            elif cluster.get('certificate-authority'):
+                session.verify = cluster['certificate-authority']
+            if cluster.get('proxy-url'):
+                session.proxies = {'http': cluster['proxy-url'], 'https': cluster['proxy-url']}
+
+            # Client credentials
+            credentials = dict(user)
+            if 'exec' in user:
+                credentials.update(_exec_credentials(user['exec']))
+            elif 'auth-provider' in user:
+                provider = user['auth-provider'].get('config', {})
+                token = provider.get('id-token') or provider.get('access-token')
+                if not token:
+                    raise KubeconfigError(f"Unsupported auth provider: {user['auth-provider'].get('name')}")
+                credentials['token'] = token
+
+            cert = credentials.get('client-certificate')
+            key = credentials.get('client-key')
+            if credentials.get('client-certificate-data'):
+                cert = _write_temp(credentials['client-certificate-data'], temp_files)
+            if credentials.get('client-key-data'):
+                key = _write_temp(credentials['client-key-data'], temp_files)
+            if cert and key:
+                session.cert = (cert, key)
+
+            token = credentials.get('token')
+            if not token and credentials.get('tokenFile'):
+                token = Path(credentials['tokenFile']).read_text().strip()
+            if token:
+                session.headers['Authorization'] = f'Bearer {token}'
+            elif credentials.get('username') and credentials.get('password'):
+                session.auth = (credentials['username'], credentials['password'])
+        except Exception:
+            _remove_files(temp_files)
+            session.close()
+            raise
+
+        return cls(cluster['server'], config['context'], session, temp_files)
+
+    def _url(self, path: str) -> str:
+        return f'{self.server}{path}'
+
+    def current_context(self, timeout: float) -> ProbeResult:
+        return ProbeResult('context', PROBE_OK, returncode=0, stdout=self.context)
+
+    def cluster_info(self, timeout: float) -> ProbeResult:
+        return ProbeResult('cluster_info', PROBE_OK, returncode=0,
+                           stdout=f'Kubernetes control plane is running at {self.server}\n')
+
+    def get(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float) -> ProbeResult:
+        started = time.monotonic()
+        try:
+            response = self.session.get(self._url(path), params=params,
+                                        timeout=(min(self.CONNECT_TIMEOUT, timeout), timeout))
+        except requests.exceptions.Timeout:
+            return ProbeResult(name, PROBE_TIMEOUT, duration=time.monotonic() - started)
+        except requests.exceptions.RequestException as e:
+            return ProbeResult(name, PROBE_FAILED, stderr=str(e), duration=time.monotonic() - started)
+
+        if response.status_code >= 400:
+            return ProbeResult(name, PROBE_FAILED, returncode=response.status_code,
+                               stderr=_status_message(response.status_code, response.text),
+                               duration=time.monotonic() - started)
+        return ProbeResult(name, PROBE_OK, returncode=0, stdout=response.text,
+                           duration=time.monotonic() - started)
+
+    def stream_list(self, name: str, path: str, params: Optional[Dict[str, Any]], timeout: float,
+                    consume: Callable[[IO], None]) -> ProbeResult:
+        started = time.monotonic()
+        try:
+            response = self.session.get(self._url(path), params=params, stream=True,
+                                        timeout=(min(self.CONNECT_TIMEOUT, timeout), timeout))
+        except requests.exceptions.Timeout:
+            return ProbeResult(name, PROBE_TIMEOUT, duration=time.monotonic() - started)
+        except requests.exceptions.RequestException as e:
+            return ProbeResult(name, PROBE_FAILED, stderr=str(e), duration=time.monotonic() - started)
+
+        if response.status_code >= 400:
+            message = _status_message(response.status_code, response.text)
+            return ProbeResult(name, PROBE_FAILED, returncode=response.status_code, stderr=message,
+                               duration=time.monotonic() - started)
+
+        # Bound the whole body read, not just each socket read
+        timed_out = threading.Event()
+
+        def _abort():
+            timed_out.set()
+            response.close()
+
+        remaining = max(0.0, timeout - (time.monotonic() - started))
+        timer = threading.Timer(remaining, _abort)
+        timer.daemon = True
+        timer.start()
+        chunks = response.iter_content(chunk_size=64 * 1024)
+        try:
+            consume(_ChunkReader(chunks))
+            # Drain any trailing bytes so the connection goes back to the pool
+            for _ in chunks:
+                pass
+        except Exception as e:
+            status = PROBE_TIMEOUT if timed_out.is_set() else PROBE_FAILED
+            return ProbeResult(name, status, stderr='' if timed_out.is_set() else str(e),
+                               duration=time.monotonic() - started)
+        finally:
+            timer.cancel()
+            response.close()
+
+        return ProbeResult(name, PROBE_OK, returncode=0, duration=time.monotonic() - started)
+
+    def close(self) -> None:
+        self.session.close()
+        _remove_files(self._temp_files)
+
+
+def create_backend(kind: str = 'auto', kubeconfig: Optional[str] = None,
+                   max_connections: int = 8, context: Optional[str] = None) -> ClusterBackend:
+    """Create a backend; 'auto' uses the API server directly and falls back to kubectl"""
+    if kind == 'kubectl':
+        return KubectlBackend(context)
+    try:
+        return ApiServerBackend.from_kubeconfig(kubeconfig, max_connections, context)
+    except Exception:
+        if kind == 'api':
+            raise
+        return KubectlBackend(context)
+
+
+def load_kubeconfig(kubeconfig: Optional[str] = None, context: Optional[str] = None) -> Dict[str, Any]:
+    """Resolve the cluster and user of a kubeconfig context
+
+    Multiple files separated by os.pathsep are merged the way kubectl does:
+    the first file to define a name wins. Relative paths are resolved
+    against the file that contains them.
+    """
+    merged, current = _merge_kubeconfig(kubeconfig)
+    context = context or current
+    if not context or context not in merged['contexts']:
+        raise KubeconfigError(f'Context not found in kubeconfig: {context}')
+    entry = merged['contexts'][context]
+    cluster = merged['clusters'].get(entry.get('cluster'))
+    if not cluster or not cluster.get('server'):
+        raise KubeconfigError(f"Cluster not found for context {context}")
+    return {
+        'context': context,
+        'namespace': entry.get('namespace', 'default'),
+        'cluster': cluster,
+        'user': merged['users'].get(entry.get('user'), {}),
+    }
+
+
+def list_contexts(kubeconfig: Optional[str] = None) -> List[str]:
+    """Names of every context in the (merged) kubeconfig, in file order"""
+    merged, _ = _merge_kubeconfig(kubeconfig)
+    return list(merged['contexts'])
+
+
+def _merge_kubeconfig(kubeconfig: Optional[str]) -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
+    """Merged clusters/users/contexts of the kubeconfig files and the current context"""
+    paths = kubeconfig or os.getenv('KUBECONFIG') or '~/.kube/config'
+    merged: Dict[str, Dict[str, Any]] = {'clusters': {}, 'users': {}, 'contexts': {}}
+    current = None
+
+    for raw_path in paths.split(os.pathsep):
+        if not raw_path:
+            continue
+        path = Path(os.path.expanduser(raw_path))
+        if not path.exists():
+            continue
+        try:
+            data = yaml.safe_load(path.read_text()) or {}
+        except Exception as e:
+            raise KubeconfigError(f'Could not read kubeconfig {path}: {e}')
+        current = current or data.get('current-context')
+        for section, key in (('clusters', 'cluster'), ('users', 'user'), ('contexts', 'context')):
+            for entry in data.get(section) or []:
+                name = entry.get('name')
+                if name is not None and name not in merged[section]:
+                    merged[section][name] = _resolve_paths(dict(entry.get(key) or {}), path.parent)
+    return merged, current
+
+
+def _resolve_paths(entry: Dict[str, Any], base: Path) -> Dict[str, Any]:
+    for key in ('certificate-authority', 'client-certificate', 'client-key', 'tokenFile'):
+        value = entry.get(key)
+        if value and not os.path.isabs(os.path.expanduser(value)):
+            entry[key] = str(base / value)
+    return entry
+
+
+def _exec_credentials(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an exec credential plugin once and map its output to user fields"""
+    env = dict(os.environ)
+    for item in spec.get('env') or []:
+        env[item['name']] = item['value']
+    env['KUBERNETES_EXEC_INFO'] = json.dumps({
+        'apiVersion': spec.get('apiVersion', 'client.authentication.k8s.io/v1beta1'),
+        'kind': 'ExecCredential',
+        'spec': {'interactive': False},
+    })
+    try:
+        result = subprocess.run([spec['command']] + list(spec.get('args') or []),
+                                capture_output=True, text=True, timeout=30, env=env)
+    except Exception as e:
+        raise KubeconfigError(f'Exec credential plugin failed: {e}')
+    if result.returncode != 0:
+        raise KubeconfigError(f'Exec credential plugin failed: {result.stderr.strip()}')
+    status = json.loads(result.stdout).get('status', {})
+    credentials = {}
+    if status.get('token'):
+        credentials['token'] = status['token']
+    if status.get('clientCertificateData') and status.get('clientKeyData'):
+        credentials['client-certificate-data'] = base64.b64encode(status['clientCertificateData'].encode()).decode()
+        credentials['client-key-data'] = base64.b64encode(status['clientKeyData'].encode()).decode()
+    if not credentials:
+        raise KubeconfigError('Exec credential plugin returned no credentials')
+    return credentials
+
+
+def _write_temp(data: str, temp_files: List[str]) -> str:
+    """Write base64 kubeconfig data to a private temp file for requests"""
+    handle, path = tempfile.mkstemp(prefix='upid-kube-')
+    with os.fdopen(handle, 'wb') as f:
+        f.write(base64.b64decode(data))
+    temp_files.append(path)
+    return path
+
+
+def _remove_files(paths: List[str]) -> None:
+    while paths:
+        try:
+            os.unlink(paths.pop())
+        except OSError:
+            pass
+
+
+def _status_message(status_code: int, body: str) -> str:
+    """Format an API error like kubectl does, keeping the HTTP code visible"""
+    try:
+        message = json.loads(body).get('message', '')
+    except ValueError:
+        message = body.strip()
+    return f'Error from server ({status_code}): {message}'
@@ -4,39 +4,110 @@ Detects and configures any Kubernetes cluster automatically
 """
 
 import os
-import subprocess
 import yaml
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
-import json
+from .probe_engine import ProbeEngine, ProbeResult, PROBE_TIMEOUT, PROBE_UNKNOWN
+from .cluster_snapshot import ClusterSnapshot, DEFAULT_PAGE_SIZE
+from .cluster_backend import ClusterBackend, create_backend
+from .watch_cache import WatchingSnapshot
+from .snapshot_cache import SnapshotCache
+from .resource_table import ResourceTable
+from .owner_index import OwnerIndex
+from .label_index import LabelIndex
+from .usage_metrics import UsageSnapshot, UsageTable
+from .quantity import millicores_or_zero, bytes_or_zero
+from .rightsizing import DEFAULT_CPU_PRICE, DEFAULT_MEMORY_PRICE, HOURS_PER_MONTH
+
+def _same(cached: Optional[Tuple[Any, ...]], current: Tuple[Any, ...]) -> bool:
+    """Whether a derived view was built from exactly these source objects"""
+    return cached is not None and all(old is new for old, new in zip(cached, current))
 
 class ClusterDetector:
     """Detects and analyzes any Kubernetes cluster"""
     
-    def __init__(self):
+    # Capabilities probed through the backend; an ok probe means the capability is present
+    CAPABILITIES = ['metrics_server', 'prometheus', 'grafana', 'ingress', 'storage_class', 'helm']
+    CAPABILITY_TIMEOUT = 5
+    INFO_TIMEOUT = 10
+    
+    def __init__(self, max_workers: int = 8, probe_deadline: float = 15.0,
+                 snapshot: Optional[ClusterSnapshot] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 backend: Optional[ClusterBackend] = None, backend_type: str = 'auto',
+                 watch: bool = False, cache: Optional[SnapshotCache] = None, refresh: bool = False,
+                 namespace: Optional[str] = None, label_selector: Optional[str] = None,
+                 field_selector: Optional[str] = None, context: Optional[str] = None):
         self.kubeconfig = os.getenv('KUBECONFIG', '~/.kube/config')
         self.kubeconfig = os.path.expanduser(self.kubeconfig)
+        self.engine = ProbeEngine(max_workers=max_workers, deadline=probe_deadline)
+        # Every query goes through one backend: the API server directly, or kubectl as a fallback.
+        # context pins a kube context instead of following the current one
+        self.backend = backend or create_backend(backend_type, max_connections=max_workers, context=context)
+        # Shared by detect_cluster() and get_cluster_metrics() so each kind is listed once;
+        # with watch=True it is then kept current from watch events for long-running sessions
+        snapshot_class = WatchingSnapshot if watch else ClusterSnapshot
+        self.snapshot = snapshot or snapshot_class(self.engine, timeout=self.INFO_TIMEOUT, page_size=page_size,
+                                                   backend=self.backend, namespace=namespace,
+                                                   label_selector=label_selector, field_selector=field_selector)
+        # On-disk cache shared by consecutive commands; a watch cache is always live instead
+        self.cache = None if watch else cache
+        self.refresh = refresh
+        self.snapshot_source = 'cluster'
+        self._cache_context: Optional[str] = None
+        self._cached_kinds: set = set()
+        # Context, cluster info and capability outcomes kept with the cached snapshot
+        self._context_result: Optional[ProbeResult] = None
+        self._cached_probes: Dict[str, ProbeResult] = {}
+        self._resource_table: Optional[ResourceTable] = None
+        self._resource_table_source = None
+        self._workloads: Dict[str, str] = {}
+        self._workloads_source = None
+        self._owner_index: Optional[OwnerIndex] = None
+        self._owner_index_source = None
+        self._label_index: Optional[LabelIndex] = None
+        self._label_index_source = None
+        self.page_size = page_size
+        # Usage from metrics.k8s.io, replaced on every get_cluster_metrics() call
+        self.usage: Optional[UsageSnapshot] = None
     
     def detect_cluster(self) -> Dict[str, Any]:
         """Detect cluster type and capabilities"""
         try:
-            # Get current context
-            context = self._get_current_context()
-            cluster_info = self._get_cluster_info(context)
+            self._load_cached_snapshot()
+            
+            # Run every detection probe not answered by the cache concurrently under one deadline
+            tasks = {} if self._context_result is not None else self._context_probes()
+            tasks.update(self._info_probes())
+            tasks.update(self._capability_probes())
+            tasks = {name: task for name, task in tasks.items() if name not in self._cached_probes}
+            tasks.update(self.snapshot.tasks())
+            results = self.engine.run_tasks(tasks)
+            if self._context_result is not None:
+                results['context'] = self._context_result
+            results.update(self._cached_probes)
+            self.snapshot.record(results)
+            self._store_cached_snapshot(results)
+            
+            context = self._get_current_context(results)
+            cluster_info = self._get_cluster_info(context, results)
             
             # Detect cluster type
             cluster_type = self._detect_cluster_type(cluster_info)
             
             # Get cluster capabilities
-            capabilities = self._detect_capabilities()
+            capabilities = self._detect_capabilities(results)
             
             return {
                 'name': context,
                 'type': cluster_type,
                 'info': cluster_info,
                 'capabilities': capabilities,
+                'probes': {name: result.to_dict() for name, result in results.items()},
                 'status': 'connected',
-                'kubeconfig': self.kubeconfig
+                'kubeconfig': self.kubeconfig,
+                'backend': self.backend.name,
+                'snapshot_source': self.snapshot_source,
+                'scope': self.snapshot.scope or 'cluster'
             }
         except Exception as e:
             return {
@@ -46,52 +117,115 @@ class ClusterDetector:
                 'error': str(e)
             }
     
-    def _get_current_context(self) -> str:
+    def _load_cached_snapshot(self) -> None:
+        """Seed the snapshot from the on-disk cache for the current context (once)"""
+        if self.cache is None or self._cache_context is not None:
+            return
+        result = self.backend.current_context(self.INFO_TIMEOUT)
+        if not result.ok or not result.stdout.strip():
+            # Without a context there is no safe cache key
+            self.cache = None
+            return
+        self._context_result = result
+        # Scoped snapshots are cached separately from the whole-cluster one
+        self._cache_context = result.stdout.strip()
+        if self.snapshot.scope:
+            self._cache_context += f'#{self.snapshot.scope}'
+        if self.refresh:
+            self.cache.invalidate(self._cache_context)
+            return
+        entry = self.cache.load_entry(self._cache_context)
+        if entry is None:
+            return
+        if entry['lists']:
+            self.snapshot.seed(entry['lists'])
+            self._cached_kinds = set(entry['lists'])
+            self.snapshot_source = 'cache'
+        self._cached_probes = {
+            name: ProbeResult(name, probe['status'], probe.get('returncode'), probe.get('stdout', ''),
+                              probe.get('stderr', ''), probe.get('duration', 0.0))
+            for name, probe in entry['probes'].items()
+        }
+    
+    def _store_cached_snapshot(self, results: Optional[Dict[str, ProbeResult]] = None) -> None:
+        """Persist the snapshot once new kinds have been listed or detection probes answered"""
+        if self.cache is None or self._cache_context is None:
+            return
+        lists = self.snapshot.export()
+        # Only answered cluster info and capability probes; timeouts are retried next time
+        probes = dict(self._cached_probes)
+        probes.update({
+            name: result for name, result in (results or {}).items()
+            if (name == 'cluster_info' or name.startswith('capability:')) and result.known
+        })
+        if set(lists) - self._cached_kinds or set(probes) - set(self._cached_probes):
+            self.cache.store(self._cache_context, lists, {
+                name: dict(result.to_dict(), stdout=result.stdout, stderr=result.stderr)
+                for name, result in probes.items()
+            })
+            self._cached_kinds = set(lists)
+            self._cached_probes = probes
+    
+    def _task(self, query, timeout: float):
+        """Engine task running one backend query, bounded by its timeout and the deadline"""
+        return (lambda remaining: query(min(timeout, remaining)), self.engine.deadline)
+    
+    def _context_probes(self) -> Dict[str, Any]:
+        """Probe for the current context"""
+        return {'context': self._task(self.backend.current_context, self.INFO_TIMEOUT)}
+    
+    def _info_probes(self) -> Dict[str, Any]:
+        """Probes that gather cluster information"""
+        return {'cluster_info': self._task(self.backend.cluster_info, self.INFO_TIMEOUT)}
+    
+    def _capability_probes(self) -> Dict[str, Any]:
+        """Probes that detect optional cluster capabilities"""
+        return {
+            f'capability:{name}': self._task(
+                lambda timeout, name=name: self.backend.check_capability(name, timeout), self.CAPABILITY_TIMEOUT)
+            for name in self.CAPABILITIES
+        }
+    
+    def _get_current_context(self, results: Optional[Dict[str, ProbeResult]] = None) -> str:
         """Get current kubectl context"""
-        try:
-            result = subprocess.run(
-                ['kubectl', 'config', 'current-context'],
-                capture_output=True, text=True, timeout=10
-            )
+        if results is None:
+            results = self.engine.run_tasks(self._context_probes())
+        result = results.get('context')
+        if result is not None and result.known:
             return result.stdout.strip()
-        except Exception:
-            return 'default'
+        return 'default'
     
-    def _get_cluster_info(self, context: str) -> Dict[str, Any]:
+    def _get_cluster_info(self, context: str, results: Optional[Dict[str, ProbeResult]] = None) -> Dict[str, Any]:
         """Get detailed cluster information"""
+        if results is None:
+            tasks = self._info_probes()
+            tasks.update(self.snapshot.tasks())
+            results = self.engine.run_tasks(tasks)
+            self.snapshot.record(results)
         info = {}
         
         try:
             # Get cluster info
-            result = subprocess.run(
-                ['kubectl', 'cluster-info'],
-                capture_output=True, text=True, timeout=10
-            )
-            info['cluster_info'] = result.stdout
+            result = results.get('cluster_info')
+            if result is not None and result.known:
+                info['cluster_info'] = result.stdout
             
-            # Get nodes
-            result = subprocess.run(
-                ['kubectl', 'get', 'nodes', '-o', 'json'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                info['nodes'] = json.loads(result.stdout)
+            # Get nodes, namespaces and pods from the shared snapshot
+            for kind in ('nodes', 'namespaces', 'pods'):
+                data = self.snapshot.get(kind)
+                if data is not None:
+                    info[kind] = data
             
-            # Get namespaces
-            result = subprocess.run(
-                ['kubectl', 'get', 'namespaces', '-o', 'json'],
-                capture_output=True, text=True, timeout=10
+            # Record probes that did not answer before their timeout or the deadline
+            unknown = []
+            if 'cluster_info' in results and not results['cluster_info'].known:
+                unknown.append('cluster_info')
+            unknown.extend(
+                kind for kind, error in self.snapshot.errors.items()
+                if error in (PROBE_TIMEOUT, PROBE_UNKNOWN)
             )
-            if result.returncode == 0:
-                info['namespaces'] = json.loads(result.stdout)
-            
-            # Get pods
-            result = subprocess.run(
-                ['kubectl', 'get', 'pods', '--all-namespaces', '-o', 'json'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                info['pods'] = json.loads(result.stdout)
+            if unknown:
+                info['unknown'] = unknown
             
         except Exception as e:
             info['error'] = str(e)
@@ -157,8 +291,14 @@ class ClusterDetector:
         except Exception:
             return 'unknown'
     
-    def _detect_capabilities(self) -> Dict[str, bool]:
-        """Detect cluster capabilities"""
+    def _detect_capabilities(self, results: Optional[Dict[str, ProbeResult]] = None) -> Dict[str, Optional[bool]]:
+        """Detect cluster capabilities
+        
+        Each capability is True/False, or None when its probe timed out or
+        did not run before the deadline.
+        """
+        if results is None:
+            results = self.engine.run_tasks(self._capability_probes())
         capabilities = {
             'metrics_server': False,
             'prometheus': False,
@@ -169,51 +309,12 @@ class ClusterDetector:
             'helm': False
         }
         
-        try:
-            # Check for metrics-server
-            result = subprocess.run(
-                ['kubectl', 'get', 'deployment', 'metrics-server', '-n', 'kube-system'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['metrics_server'] = result.returncode == 0
-            
-            # Check for Prometheus
-            result = subprocess.run(
-                ['kubectl', 'get', 'deployment', 'prometheus', '--all-namespaces'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['prometheus'] = result.returncode == 0
-            
-            # Check for Grafana
-            result = subprocess.run(
-                ['kubectl', 'get', 'deployment', 'grafana', '--all-namespaces'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['grafana'] = result.returncode == 0
-            
-            # Check for ingress controller
-            result = subprocess.run(
-                ['kubectl', 'get', 'ingressclass'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['ingress'] = result.returncode == 0
-            
-            # Check for storage classes
-            result = subprocess.run(
-                ['kubectl', 'get', 'storageclass'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['storage_class'] = result.returncode == 0
-            
-            # Check for Helm
-            result = subprocess.run(
-                ['helm', 'version'],
-                capture_output=True, text=True, timeout=5
-            )
-            capabilities['helm'] = result.returncode == 0
-            
-        except Exception:
-            pass
+        for name in self.CAPABILITIES:
+            result = results.get(f'capability:{name}')
+            if result is None or not result.known:
+                capabilities[name] = None
+            else:
+                capabilities[name] = result.ok
         
         return capabilities
     
@@ -227,21 +328,21 @@ class ClusterDetector:
         }
         
         try:
-            # Get node metrics
-            result = subprocess.run(
-                ['kubectl', 'top', 'nodes'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                metrics['nodes'] = self._parse_top_output(result.stdout)
+            # Current usage and any snapshot kinds still missing run concurrently
+            self.usage = self._usage_snapshot()
+            tasks = self.usage.tasks()
+            self._load_cached_snapshot()
+            tasks.update(self.snapshot.tasks(['nodes', 'pods']))
+            results = self.engine.run_tasks(tasks)
+            self.snapshot.record(results)
+            self.usage.record(results)
+            self._store_cached_snapshot()
             
-            # Get pod metrics
-            result = subprocess.run(
-                ['kubectl', 'top', 'pods', '--all-namespaces'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                metrics['pods'] = self._parse_top_output(result.stdout)
+            # Get node and pod usage; both stay empty when the metrics API is unavailable
+            if 'node_metrics' not in self.usage.errors:
+                metrics['nodes'] = self.usage_table('nodes').rows()
+            if 'pod_metrics' not in self.usage.errors:
+                metrics['pods'] = self._pod_usage_rows(self.usage_table('pods'))
             
             # Get resource usage
             metrics['resources'] = self._get_resource_usage()
@@ -251,25 +352,178 @@ class ClusterDetector:
         
         return metrics
     
-    def _parse_top_output(self, output: str) -> List[Dict[str, Any]]:
-        """Parse kubectl top output"""
-        lines = output.strip().split('\n')
-        if len(lines) < 2:
-            return []
-        
-        headers = lines[0].split()
-        results = []
-        
-        for line in lines[1:]:
-            if line.strip():
-                values = line.split()
-                if len(values) >= len(headers):
-                    row = {}
-                    for i, header in enumerate(headers):
-                        row[header.lower()] = values[i] if i < len(values) else ''
-                    results.append(row)
-        
-        return results
+    def _usage_snapshot(self) -> UsageSnapshot:
+        """Fresh usage view scoped like the cluster snapshot"""
+        return UsageSnapshot(self.engine, timeout=self.INFO_TIMEOUT, page_size=self.page_size,
+                             backend=self.backend, namespace=self.snapshot.namespace,
+                             label_selector=self.snapshot.label_selector)
+    
+    def sample_usage(self) -> UsageSnapshot:
+        """List current node and pod usage only, for periodic sampling"""
+        usage = self._usage_snapshot()
+        usage.prefetch()
+        self.usage = usage
+        return usage
+    
+    def usage_table(self, kind: str) -> UsageTable:
+        """Current usage of 'nodes' or 'pods' from the last get_cluster_metrics() call"""
+        if self.usage is None:
+            return UsageTable.from_node_metrics([]) if kind == 'nodes' else UsageTable.from_pod_metrics([])
+        return self.usage.table(kind)
+    
+    def _pod_usage_rows(self, table: UsageTable) -> List[Dict[str, Any]]:
+        """Per-pod usage rows (millicores and bytes) with each pod's container breakdown"""
+        rows = []
+        containers = table.rows()
+        pod_codes = table.codes['pod'].tolist()
+        for label, group in table.group_by('pod').items():
+            namespace, name = label.split('/', 1)
+            rows.append(dict(group, namespace=namespace, name=name, containers=[]))
+        for index, container in enumerate(containers):
+            rows[pod_codes[index]]['containers'].append(container)
+        return rows
+    
+    def owner_index(self) -> OwnerIndex:
+        """ReplicaSet and Job owner chains, rebuilt only when either list changes"""
+        source = (self.snapshot.get('replicasets'), self.snapshot.get('jobs'))
+        if self._owner_index is None or not _same(self._owner_index_source, source):
+            self._owner_index = OwnerIndex.from_objects({
+                'ReplicaSet': self.snapshot.items('replicasets'),
+                'Job': self.snapshot.items('jobs'),
+            })
+            self._owner_index_source = source
+        return self._owner_index
+    
+    def resource_table(self) -> ResourceTable:
+        """Columnar view of container requests and limits, rebuilt only when the pod or owner lists change"""
+        pods = self.snapshot.get('pods')
+        owners = self.owner_index()
+        if self._resource_table is None or not _same(self._resource_table_source, (pods, owners)):
+            self._resource_table = ResourceTable.from_pods(pods.get('items', []) if pods else [], owners.workload)
+            self._resource_table_source = (pods, owners)
+        return self._resource_table
+    
+    def pod_workloads(self) -> Dict[str, str]:
+        """Workload ('Kind/name') of every pod by 'namespace/name', rebuilt only when the pod or owner lists change"""
+        pods = self.snapshot.get('pods')
+        owners = self.owner_index()
+        if not _same(self._workloads_source, (pods, owners)):
+            self._workloads = owners.pod_workloads(pods.get('items', []) if pods else [])
+            self._workloads_source = (pods, owners)
+        return self._workloads
+    
+    def label_index(self) -> LabelIndex:
+        """Pods by label, rebuilt only when the pod list changes"""
+        pods = self.snapshot.get('pods')
+        if self._label_index is None or not _same(self._label_index_source, (pods,)):
+            self._label_index = LabelIndex.from_pods(pods.get('items', []) if pods else [])
+            self._label_index_source = (pods,)
+        return self._label_index
+    
+    def selector_coverage(self) -> Dict[str, Any]:
+        """Pods matched by every Service, PDB, NetworkPolicy and HPA, and running pods none of each covers
+
+        Selectors are evaluated against the label index; HPAs match the pods
+        of their scale target through pod_workloads().
+        """
+        kinds = ('services', 'poddisruptionbudgets', 'networkpolicies', 'horizontalpodautoscalers')
+        self.snapshot.prefetch(list(kinds))
+        index = self.label_index()
+        workloads = self.pod_workloads()
+        by_workload: Dict[Tuple[str, str], set] = {}
+        for pod_id, pod in enumerate(index.pods):
+            namespace = pod.split('/', 1)[0]
+            by_workload.setdefault((namespace, workloads.get(pod, '')), set()).add(pod_id)
+        pods = self.snapshot.items('pods')
+        running = {pod_id for pod_id, pod in enumerate(pods) if (pod.get('status') or {}).get('phase') == 'Running'}
+
+        objects = []
+        covered: Dict[str, set] = {kind: set() for kind in kinds}
+        for kind in kinds:
+            for item in self.snapshot.items(kind):
+                metadata = item.get('metadata') or {}
+                spec = item.get('spec') or {}
+                namespace = metadata.get('namespace') or ''
+                if kind == 'services':
+                    matched = index.select_labels(spec.get('selector'), namespace)
+                elif kind == 'networkpolicies':
+                    matched = index.select(spec.get('podSelector'), namespace)
+                elif kind == 'horizontalpodautoscalers':
+                    target = spec.get('scaleTargetRef') or {}
+                    matched = by_workload.get((namespace, f"{target.get('kind')}/{target.get('name')}"), set())
+                else:
+                    matched = index.select(spec.get('selector'), namespace)
+                covered[kind] |= matched
+                objects.append({'kind': kind, 'namespace': namespace, 'name': metadata.get('name'),
+                                'pods': len(matched), 'running': len(matched & running)})
+        return {
+            'pods': len(index),
+            'running': len(running),
+            'objects': objects,
+            'uncovered': {kind: len(running - covered[kind]) for kind in kinds},
+            'errors': {kind: self.snapshot.errors[kind] for kind in kinds if kind in self.snapshot.errors},
+        }
+    
+    def workload_rollup(self) -> List[Dict[str, Any]]:
+        """Pods, requests, current usage and monthly cost per workload, largest cost first
+
+        Requests come from the resource table's workload codes and usage from
+        the last get_cluster_metrics()/sample_usage() call, mapped through
+        pod_workloads(); both are summed in one pass over their rows.
+        """
+        table = self.resource_table()
+        workloads = self.pod_workloads()
+        rollup = {}
+        for label, group in table.group_by('workload').items():
+            namespace, workload = label.split('/', 1)
+            rollup[label] = dict(group, namespace=namespace, workload=workload, pods=0, running=0,
+                                 cpu_usage=0, memory_usage=0)
+        pods = self.snapshot.get('pods')
+        for pod in (pods.get('items', []) if pods else []):
+            metadata = pod.get('metadata') or {}
+            key = f"{metadata.get('namespace')}/{metadata.get('name')}"
+            row = rollup.get(f"{metadata.get('namespace')}/{workloads.get(key)}")
+            if row is not None:
+                row['pods'] += 1
+                row['running'] += (pod.get('status') or {}).get('phase') == 'Running'
+        if self.usage is not None and 'pod_metrics' not in self.usage.errors:
+            usage = self.usage_table('pods')
+            pod_labels = usage.labels.get('pod', [])
+            cpu = usage.columns['cpu_usage'].tolist()
+            memory = usage.columns['memory_usage'].tolist()
+            for index, code in enumerate(usage.codes['pod'].tolist()):
+                pod = pod_labels[code]
+                row = rollup.get(f"{pod.split('/', 1)[0]}/{workloads.get(pod)}")
+                if row is not None:
+                    row['cpu_usage'] += cpu[index]
+                    row['memory_usage'] += memory[index]
+        for row in rollup.values():
+            row['monthly_cost'] = round((row['cpu_requests'] / 1000 * DEFAULT_CPU_PRICE
+                                         + row['memory_requests'] / (1024**3) * DEFAULT_MEMORY_PRICE) * HOURS_PER_MONTH, 2)
+        return sorted(rollup.values(), key=lambda row: row['monthly_cost'], reverse=True)
+    
+    def usage_series(self, table: UsageTable) -> List[Tuple[str, str, str]]:
+        """(namespace, workload, container) of every row of a pod usage table
+
+        Replicas of a workload share a series; pods missing from the pod list
+        (started since it was fetched) are keyed as bare pods.
+        """
+        workloads = self.pod_workloads()
+        pods = table.labels.get('pod', [])
+        keys = []
+        for code, container in zip(table.codes['pod'].tolist(), table.names):
+            pod = pods[code]
+            namespace, name = pod.split('/', 1)
+            keys.append((namespace, workloads.get(pod) or f'Pod/{name}', container))
+        return keys
+    
+    def get_resource_usage(self) -> Dict[str, Any]:
+        """Requested and allocatable CPU and memory plus pod counts, read from the snapshot alone
+
+        Unlike get_cluster_metrics() this lists no usage from metrics.k8s.io,
+        so with a watch cache it costs nothing beyond the events already applied.
+        """
+        return self._get_resource_usage()
     
     def _get_resource_usage(self) -> Dict[str, Any]:
         """Get detailed resource usage"""
@@ -280,82 +534,27 @@ class ClusterDetector:
         }
         
         try:
-            # Get node resources
-            result = subprocess.run(
-                ['kubectl', 'get', 'nodes', '-o', 'json'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                nodes = json.loads(result.stdout)
-                for node in nodes.get('items', []):
-                    status = node.get('status', {})
-                    allocatable = status.get('allocatable', {})
-                    
-                    # CPU
-                    cpu_str = allocatable.get('cpu', '0')
-                    cpu_cores = self._parse_cpu(cpu_str)
-                    resources['cpu']['total'] += cpu_cores
-                    
-                    # Memory
-                    memory_str = allocatable.get('memory', '0')
-                    memory_bytes = self._parse_memory(memory_str)
-                    resources['memory']['total'] += memory_bytes
+            # Get node resources, summed exactly in millicores and bytes
+            cpu_millicores = 0
+            for node in self.snapshot.items('nodes'):
+                status = node.get('status', {})
+                allocatable = status.get('allocatable', {})
+                
+                # CPU
+                cpu_millicores += millicores_or_zero(allocatable.get('cpu', '0'))
+                
+                # Memory
+                resources['memory']['total'] += bytes_or_zero(allocatable.get('memory', '0'))
+            resources['cpu']['total'] = cpu_millicores / 1000
             
-            # Get pod resources
-            result = subprocess.run(
-                ['kubectl', 'get', 'pods', '--all-namespaces', '-o', 'json'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
-                pods = json.loads(result.stdout)
-                for pod in pods.get('items', []):
-                    status = pod.get('status', {}).get('phase', '')
-                    if status == 'Running':
-                        resources['pods']['running'] += 1
-                    resources['pods']['total'] += 1
-                    
-                    # Calculate resource usage from pod specs
-                    spec = pod.get('spec', {})
-                    containers = spec.get('containers', [])
-                    for container in containers:
-                        requests = container.get('resources', {}).get('requests', {})
-                        
-                        # CPU
-                        cpu_str = requests.get('cpu', '0')
-                        cpu_cores = self._parse_cpu(cpu_str)
-                        resources['cpu']['used'] += cpu_cores
-                        
-                        # Memory
-                        memory_str = requests.get('memory', '0')
-                        memory_bytes = self._parse_memory(memory_str)
-                        resources['memory']['used'] += memory_bytes
+            # Pod requests are summed as columns rather than container by container
+            totals = self.resource_table().totals()
+            resources['cpu']['used'] = totals['cpu_requests'] / 1000
+            resources['memory']['used'] = totals['memory_requests']
+            resources['pods']['running'] = totals['running_pods']
+            resources['pods']['total'] = totals['pods']
             
         except Exception:
             pass
         
         return resources
-    
-    def _parse_cpu(self, cpu_str: str) -> float:
-        """Parse CPU string to cores"""
-        try:
-            if cpu_str.endswith('m'):
-                return float(cpu_str[:-1]) / 1000
-            return float(cpu_str)
-        except:
-            return 0.0
-    
-    def _parse_memory(self, memory_str: str) -> int:
-        """Parse memory string to bytes"""
-        try:
-            if memory_str.endswith('Ki'):
-                return int(memory_str[:-2]) * 1024
-            elif memory_str.endswith('Mi'):
-                return int(memory_str[:-2]) * 1024 * 1024
-            elif memory_str.endswith('Gi'):
-                return int(memory_str[:-2]) * 1024 * 1024 * 1024
-            elif memory_str.endswith('Ti'):
-                return int(memory_str[:-2]) * 1024 * 1024 * 1024 * 1024
-            else:
-                return int(memory_str)
-        except:
-            return 0 
\ No newline at end of file
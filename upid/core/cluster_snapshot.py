@@ -0,0 +1,297 @@
+"""
+Per-invocation cluster snapshot
+Fetches each Kubernetes resource kind at most once and shares it between
+cluster detection, metrics and the analyses built on top of them
+"""
+
+import re
+import threading
+import time
+from urllib.parse import quote
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from .probe_engine import ProbeEngine, ProbeResult, PROBE_OK, PROBE_TIMEOUT
+from .cluster_backend import ClusterBackend, KubectlBackend
+from .json_stream import iter_list_items
+
+DEFAULT_PAGE_SIZE = 500
+
+# kubectl's rendering of a list Status with reason Expired (HTTP 410 Gone)
+_EXPIRED_CONTINUE = re.compile(r'^Error from server \(Expired\)|continue parameter is too old', re.MULTILINE)
+
+
+def _trim_pod(pod: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the pod fields the analyses read"""
+    metadata = pod.get('metadata', {})
+    spec = pod.get('spec', {})
+    return {
+        'metadata': {
+            'name': metadata.get('name'),
+            'namespace': metadata.get('namespace'),
+            'uid': metadata.get('uid'),
+            'labels': metadata.get('labels', {}),
+            'ownerReferences': metadata.get('ownerReferences', []),
+        },
+        'spec': {
+            'nodeName': spec.get('nodeName'),
+            'containers': [
+                {'name': container.get('name'), 'resources': container.get('resources', {})}
+                for container in spec.get('containers', [])
+            ],
+        },
+        'status': {'phase': pod.get('status', {}).get('phase')},
+    }
+
+
+def _trim_owner(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields that link an owner object (ReplicaSet, Job) to its own controller"""
+    metadata = item.get('metadata', {})
+    return {
+        'metadata': {
+            'name': metadata.get('name'),
+            'namespace': metadata.get('namespace'),
+            'uid': metadata.get('uid'),
+            'ownerReferences': metadata.get('ownerReferences', []),
+        },
+    }
+
+
+# Spec fields of objects that select or target pods
+_SELECTING_FIELDS = ('selector', 'podSelector', 'scaleTargetRef', 'minAvailable', 'maxUnavailable',
+                     'minReplicas', 'maxReplicas', 'policyTypes')
+
+
+def _trim_selecting(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields that say which pods an object (Service, PDB, NetworkPolicy, HPA) applies to"""
+    metadata = item.get('metadata', {})
+    spec = item.get('spec', {})
+    return {
+        'metadata': {'name': metadata.get('name'), 'namespace': metadata.get('namespace'), 'uid': metadata.get('uid')},
+        'spec': {field: spec[field] for field in _SELECTING_FIELDS if field in spec},
+    }
+
+
+class ClusterSnapshot:
+    """Read-once view of the cluster's nodes, namespaces, pods and the objects that refer to pods"""
+
+    # Kind -> API list path
+    KINDS = {
+        'nodes': '/api/v1/nodes',
+        'namespaces': '/api/v1/namespaces',
+        'pods': '/api/v1/pods',
+        'replicasets': '/apis/apps/v1/replicasets',
+        'jobs': '/apis/batch/v1/jobs',
+        'services': '/api/v1/services',
+        'poddisruptionbudgets': '/apis/policy/v1/poddisruptionbudgets',
+        'networkpolicies': '/apis/networking.k8s.io/v1/networkpolicies',
+        'horizontalpodautoscalers': '/apis/autoscaling/v2/horizontalpodautoscalers',
+    }
+    # Kinds only listed when asked for, not by a default prefetch()
+    ON_DEMAND = {'services', 'poddisruptionbudgets', 'networkpolicies', 'horizontalpodautoscalers'}
+    # Namespaced kinds, listed from one namespace when the snapshot is scoped
+    NAMESPACED = {'pods', 'replicasets', 'jobs'} | ON_DEMAND
+    # Kinds the label/field selectors apply to
+    SELECTED = {'pods'}
+    # Kind -> transform applied to every item as its page arrives
+    TRANSFORMS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+        'pods': _trim_pod,
+        'replicasets': _trim_owner,
+        'jobs': _trim_owner,
+        **{kind: _trim_selecting for kind in ON_DEMAND},
+    }
+
+    def __init__(self, engine: Optional[ProbeEngine] = None, timeout: float = 10,
+                 page_size: int = DEFAULT_PAGE_SIZE, list_deadline: float = 120,
+                 backend: Optional[ClusterBackend] = None, namespace: Optional[str] = None,
+                 label_selector: Optional[str] = None, field_selector: Optional[str] = None):
+        self.engine = engine or ProbeEngine()
+        self.backend = backend or KubectlBackend()
+        self.timeout = timeout
+        self.page_size = page_size
+        self.list_deadline = list_deadline
+        # Filters pushed down to the API server so scoped runs only transfer what they need
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.field_selector = field_selector
+        self.errors: Dict[str, str] = {}
+        # Kinds listed from the cluster by this snapshot (as opposed to seeded)
+        self.fetched: set = set()
+        self._lists: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def seed(self, lists: Dict[str, Dict[str, Any]]) -> None:
+        """Pre-populate kinds (e.g. from the on-disk cache) so they are not listed again"""
+        with self._lock:
+            for kind, data in lists.items():
+                if kind in self.KINDS and not self.is_loaded(kind):
+                    self._lists[kind] = data
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """The list objects loaded so far, for persisting"""
+        with self._lock:
+            return dict(self._lists)
+
+    def is_loaded(self, kind: str) -> bool:
+        """Whether the kind has already been fetched (successfully or not)"""
+        return kind in self._lists or kind in self.errors
+
+    def tasks(self, kinds: Optional[List[str]] = None) -> Dict[str, Tuple[Callable[[float], ProbeResult], float]]:
+        """Engine tasks that list the kinds not fetched yet (by default all but the ON_DEMAND ones)"""
+        kinds = kinds or [kind for kind in self.KINDS if kind not in self.ON_DEMAND]
+        return {
+            kind: (lambda remaining, kind=kind: self._list_kind(kind, remaining), self.list_deadline)
+            for kind in kinds if not self.is_loaded(kind)
+        }
+
+    def prefetch(self, kinds: Optional[List[str]] = None) -> None:
+        """Fetch all missing kinds concurrently"""
+        tasks = self.tasks(kinds)
+        if tasks:
+            self.record(self.engine.run_tasks(tasks))
+
+    def record(self, results: Dict[str, ProbeResult]) -> None:
+        """Record list tasks that never ran or were cut off by the deadline"""
+        with self._lock:
+            for kind in self.KINDS:
+                result = results.get(kind)
+                if result is not None and not self.is_loaded(kind):
+                    self.errors[kind] = result.stderr.strip() or result.status
+
+    @property
+    def scope(self) -> str:
+        """Canonical description of the filters, '' for the whole cluster"""
+        parts = [
+            f'{name}={value}' for name, value in (
+                ('namespace', self.namespace),
+                ('labelSelector', self.label_selector),
+                ('fieldSelector', self.field_selector),
+            ) if value
+        ]
+        return ','.join(parts)
+
+    def _list_path(self, kind: str) -> str:
+        """API path of a kind, narrowed to the snapshot's namespace for namespaced kinds"""
+        path = self.KINDS[kind]
+        if self.namespace and kind in self.NAMESPACED:
+            prefix, resource = path.rsplit('/', 1)
+            path = f'{prefix}/namespaces/{quote(self.namespace, safe="")}/{resource}'
+        return path
+
+    def _selector_params(self, kind: str) -> Dict[str, Any]:
+        """Label/field selectors for a kind"""
+        params: Dict[str, Any] = {}
+        if kind in self.SELECTED:
+            if self.label_selector:
+                params['labelSelector'] = self.label_selector
+            if self.field_selector:
+                params['fieldSelector'] = self.field_selector
+        elif kind == 'namespaces' and self.namespace:
+            params['fieldSelector'] = f'metadata.name={self.namespace}'
+        return params
+
+    def _list_params(self, kind: str, continue_token: Optional[str]) -> Dict[str, Any]:
+        """Query parameters that fetch one page of a list"""
+        params = self._selector_params(kind)
+        if self.page_size > 0:
+            params['limit'] = self.page_size
+        if continue_token:
+            params['continue'] = continue_token
+        return params
+
+    def _list_kind(self, kind: str, budget: float) -> ProbeResult:
+        """List a kind page by page using limit/continue
+
+        Each page gets its own timeout, and its items are streamed off the
+        backend's response stream and transformed one at a time. Only one
+        page of raw JSON is held at once; the trimmed items of every page are
+        kept, since the analyses share them. An expired continue token
+        restarts the list once from the beginning.
+        """
+        started = time.monotonic()
+        transform = self.TRANSFORMS.get(kind)
+        items: List[Dict[str, Any]] = []
+        continue_token = None
+        restarted = False
+
+        while True:
+            remaining = budget - (time.monotonic() - started)
+            if remaining <= 0:
+                return self._fail(kind, ProbeResult(kind, PROBE_TIMEOUT, duration=time.monotonic() - started))
+
+            fields: Dict[str, Any] = {}
+
+            def consume(stream):
+                # Items are parsed off the stream and transformed one at a time
+                for item in iter_list_items(stream, fields=fields):
+                    items.append(transform(item) if transform else item)
+
+            result = self.backend.stream_list(kind, self._list_path(kind), self._list_params(kind, continue_token),
+                                              min(self.timeout, remaining), consume)
+            if not result.ok:
+                if continue_token and not restarted and self._is_expired(result):
+                    items.clear()
+                    continue_token, restarted = None, True
+                    continue
+                return self._fail(kind, result)
+
+            metadata = fields.get('metadata') or {}
+            continue_token = metadata.get('continue')
+            if not continue_token:
+                break
+
+        with self._lock:
+            # Every page of one list shares the resourceVersion it was served at
+            self._lists[kind] = {'items': items, 'metadata': {'resourceVersion': metadata.get('resourceVersion')}}
+            self.errors.pop(kind, None)
+            self.fetched.add(kind)
+        return ProbeResult(kind, PROBE_OK, returncode=0, duration=time.monotonic() - started)
+
+    def _fail(self, kind: str, result: ProbeResult) -> ProbeResult:
+        """Record a failed list so it is reported instead of looking empty"""
+        with self._lock:
+            self.errors[kind] = result.stderr.strip() or result.status
+        return result
+
+    @staticmethod
+    def _is_expired(result: ProbeResult) -> bool:
+        """Whether a page failed because its continue token expired (HTTP 410 Gone, reason Expired)
+
+        The native backend reports the HTTP status as the return code; kubectl
+        exits with 1 and prints the Status as "Error from server (Expired): ...".
+        """
+        if result.returncode == 410:
+            return True
+        return bool(_EXPIRED_CONTINUE.search(result.stderr))
+
+    def get(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Get the list object for a kind, fetching it on first use"""
+        if not self.is_loaded(kind):
+            self.prefetch([kind])
+        return self._lists.get(kind)
+
+    def items(self, kind: str) -> List[Dict[str, Any]]:
+        """Get the items of a kind"""
+        data = self.get(kind)
+        return data.get('items', []) if data else []
+
+    def count(self, kind: str) -> int:
+        """Number of objects of a kind"""
+        return len(self.items(kind))
+
+    def pod_phases(self) -> Dict[str, int]:
+        """Pod counts by status phase"""
+        phases: Dict[str, int] = {}
+        for pod in self.items('pods'):
+            phase = pod.get('status', {}).get('phase') or 'Unknown'
+            phases[phase] = phases.get(phase, 0) + 1
+        return phases
+
+    def summary(self) -> Dict[str, Any]:
+        """Object counts used by reports and insights"""
+        self.prefetch()
+        return {
+            'nodes': self.count('nodes'),
+            'namespaces': self.count('namespaces'),
+            'pods': self.count('pods'),
+            'pod_phases': self.pod_phases(),
+            'errors': dict(self.errors)
+        }
@@ -15,6 +15,8 @@ class Config:
         'api_url': 'https://api.upid.io',
         'api_version': 'v1',
         'timeout': 30,
+        'connect_timeout': 5,
+        'command_deadline': None,
         'verbose': False,
         'output_format': 'table',
         'color_output': True,
@@ -28,6 +30,15 @@ class Config:
         'auth_token': None,
         'user_email': None,
         'organization': None,
+        'snapshot_cache_ttl': 300,
+        'snapshot_cache_max_mb': 64,
+        'response_cache_max_mb': 32,
+        'response_cache_ttls': {},
+        'retry_max_retries': 3,
+        'retry_backoff': 0.5,
+        'retry_max_backoff': 30.0,
+        'circuit_failure_threshold': 5,
+        'circuit_reset_timeout': 30.0,
     }
 
     def __init__(self, config_path: Optional[str] = None):
@@ -0,0 +1,40 @@
+"""
+Deadline budgets for UPID API calls
+A per-command time budget shared by every call the command makes, so each
+request and retry wait is cut to whatever time is left
+"""
+
+import time
+from typing import Callable, Tuple
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a command's time budget runs out before its calls finish"""
+
+
+class Deadline:
+    """A fixed point in time, `seconds` after creation, that calls may not run past"""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(self.expires_at - self.clock(), 0.0)
+
+    def expired(self) -> bool:
+        """Whether no time is left"""
+        return self.remaining() <= 0
+
+    def check(self, what: str) -> None:
+        """Raise DeadlineExceeded if no time is left for `what`"""
+        if self.expired():
+            raise DeadlineExceeded(f'Deadline of {self.seconds:g}s exceeded before {what}')
+
+    def timeouts(self, connect: float, read: float) -> Tuple[float, float]:
+        """(connect, read) timeouts cut to the time left"""
+        remaining = self.remaining()
+        return min(connect, remaining), min(read, remaining)
+
@@ -0,0 +1,254 @@
+"""
+Decaying usage histograms
+Exponentially decaying CPU and memory histograms per container, modeled on
+the Kubernetes Vertical Pod Autoscaler recommender and updated sample by sample
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_RECOMMENDER_DIR = '~/.upid/recommender'
+DEFAULT_HALF_LIFE = 86400.0
+DEFAULT_AGGREGATION = 86400.0
+
+# Bucket layout of the VPA recommender: (first bucket width, width ratio, largest value)
+CPU_BUCKETS = (10, 1.05, 1000 * 1000)           # millicores
+MEMORY_BUCKETS = (10 ** 7, 1.05, 10 ** 12)      # bytes
+
+# Recommendation parameters of the VPA recommender
+TARGET_PERCENTILE = 90
+LOWER_BOUND_PERCENTILE = 50
+UPPER_BOUND_PERCENTILE = 95
+SAFETY_MARGIN = 0.15
+MIN_CPU = 25
+MIN_MEMORY = 250 * 1024 ** 2
+
+# Bump when the saved array layout changes
+RECOMMENDER_FORMAT = 1
+
+# Renormalize weights once the newest sample would weigh more than 2^this
+_MAX_DECAY_EXPONENT = 64.0
+
+
+class DecayingHistograms:
+    """One exponential-bucket histogram per row whose weights halve every `half_life` seconds
+
+    Rather than shrinking old weights on every sample, a sample taken at t is
+    added with weight 2^((t - reference) / half_life); only ratios between
+    weights matter for percentiles. When that factor grows too large the
+    reference moves forward and every weight is scaled down once.
+    """
+
+    GROWTH_BLOCK = 256
+
+    def __init__(self, first_bucket: float, ratio: float, maximum: float, half_life: float = DEFAULT_HALF_LIFE):
+        self.first_bucket = first_bucket
+        self.ratio = ratio
+        self.half_life = half_life
+        self.bins = self._index(np.array([maximum]))[0] + 1
+        self.reference: Optional[float] = None
+        self.weights = np.zeros((0, self.bins), dtype=np.float64)
+        # Bucket i covers [starts[i], starts[i + 1])
+        self.starts = first_bucket * (np.power(ratio, np.arange(self.bins + 1, dtype=np.float64)) - 1) / (ratio - 1)
+
+    def _index(self, values: np.ndarray) -> np.ndarray:
+        scaled = np.log1p(np.maximum(values, 0) * (self.ratio - 1) / self.first_bucket) / math.log(self.ratio)
+        return np.floor(scaled + 1e-9).astype(np.int64)
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        """Bucket of every value; values past the largest land in the last bucket"""
+        return np.minimum(self._index(np.asarray(values, dtype=np.float64)), self.bins - 1)
+
+    def grow(self, rows: int) -> None:
+        """Make room for at least `rows` rows"""
+        if rows > len(self.weights):
+            extra = max(self.GROWTH_BLOCK, len(self.weights), rows - len(self.weights))
+            self.weights = np.vstack([self.weights, np.zeros((extra, self.bins), dtype=np.float64)])
+
+    def decay_factor(self, timestamps: np.ndarray) -> np.ndarray:
+        """Weight multiplier of samples taken at `timestamps`, renormalizing first if they are far ahead"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if self.reference is None:
+            self.reference = float(timestamps.min()) if timestamps.size else time.time()
+        exponent = (timestamps.max() - self.reference) / self.half_life if timestamps.size else 0.0
+        if exponent > _MAX_DECAY_EXPONENT:
+            shift = math.floor(exponent)
+            self.weights *= 2.0 ** -shift
+            self.reference += shift * self.half_life
+        return np.power(2.0, (timestamps - self.reference) / self.half_life)
+
+    def add(self, rows: np.ndarray, values: np.ndarray, timestamps: np.ndarray,
+            weights: Optional[np.ndarray] = None) -> None:
+        """Add samples (negative weights subtract earlier ones); repeated (row, bucket) cells accumulate"""
+        if not len(rows):
+            return
+        factor = self.decay_factor(timestamps) * (1.0 if weights is None else weights)
+        factor = np.broadcast_to(factor, np.shape(rows))
+        np.add.at(self.weights, (rows, self.index(values)), factor)
+
+    def percentiles(self, percentile: float, rows: int) -> np.ndarray:
+        """End of the bucket holding the weighted percentile, per row (0 for empty rows)"""
+        weights = np.maximum(self.weights[:rows], 0)
+        cumulative = weights.cumsum(axis=1)
+        totals = cumulative[:, -1:]
+        buckets = (cumulative < totals * percentile / 100).sum(axis=1)
+        values = self.starts[np.minimum(buckets, self.bins - 1) + 1]
+        return np.where(totals[:, 0] > 0, values, 0.0)
+
+
+class UsageRecommender:
+    """VPA-style CPU and memory request recommendations per container key
+
+    CPU samples go straight into a decaying histogram. Memory follows the
+    VPA in recording one peak per container per `aggregation` window: when a
+    sample raises the window's peak, the old peak is subtracted and the new
+    one added. Recommendations are read from the histograms in one pass, so
+    they never replay history.
+    """
+
+    def __init__(self, half_life: float = DEFAULT_HALF_LIFE, aggregation: float = DEFAULT_AGGREGATION):
+        self.half_life = half_life
+        self.aggregation = aggregation
+        self.keys: List[Tuple[str, ...]] = []
+        self.index: Dict[Tuple[str, ...], int] = {}
+        self.cpu = DecayingHistograms(*CPU_BUCKETS, half_life=half_life)
+        self.memory = DecayingHistograms(*MEMORY_BUCKETS, half_life=half_life)
+        self.first_seen = np.zeros(0, dtype=np.float64)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+        self.window_start = np.zeros(0, dtype=np.float64)
+        self.window_peak = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _rows(self, keys: Sequence[Tuple[str, ...]], timestamp: float) -> np.ndarray:
+        rows = np.empty(len(keys), dtype=np.int64)
+        for position, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.keys)
+                self.keys.append(key)
+            rows[position] = row
+        if len(self.keys) > len(self.first_seen):
+            added = len(self.keys) - len(self.first_seen)
+            self.first_seen = np.concatenate([self.first_seen, np.full(added, timestamp)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(added, timestamp)])
+            self.window_start = np.concatenate([self.window_start, np.full(added, timestamp)])
+            self.window_peak = np.concatenate([self.window_peak, np.zeros(added, dtype=np.int64)])
+            self.cpu.grow(len(self.keys))
+            self.memory.grow(len(self.keys))
+        return rows
+
+    def add(self, timestamp: float, keys: Sequence[Tuple[str, ...]], cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Record one sample of every key (millicores and bytes); a key may repeat, e.g. per pod"""
+        rows = self._rows(keys, timestamp)
+        cpu = np.asarray(cpu, dtype=np.int64)
+        memory = np.asarray(memory, dtype=np.int64)
+        self.cpu.add(rows, cpu, np.full(len(rows), timestamp))
+        self.last_seen[rows] = timestamp
+
+        # Reduce to the highest memory per row in this sample, then start windows that have ended
+        unique, inverse = np.unique(rows, return_inverse=True)
+        peaks = np.zeros(len(unique), dtype=np.int64)
+        np.maximum.at(peaks, inverse, memory)
+        expired = timestamp >= self.window_start[unique] + self.aggregation
+        self.window_start[unique[expired]] = timestamp
+        self.window_peak[unique[expired]] = 0
+
+        raised = peaks > self.window_peak[unique]
+        rows, peaks = unique[raised], peaks[raised]
+        previous = self.window_peak[rows]
+        starts = self.window_start[rows]
+        replaced = previous > 0
+        self.memory.add(rows[replaced], previous[replaced], starts[replaced], -1.0)
+        self.memory.add(rows, peaks, starts)
+        self.window_peak[rows] = peaks
+
+    def recommend(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        """Target, lower and upper bound requests per key, with the days of history behind them
+
+        The bounds widen while history is short, as the VPA's confidence
+        multipliers do: lower bounds are scaled by (1 + 0.001/days)^-2 and
+        upper bounds by (1 + 1/days).
+        """
+        rows = len(self.keys)
+        days = np.maximum((self.last_seen - self.first_seen) / 86400, 1e-3)
+        lower_scale = np.power(1 + 0.001 / days, -2.0)
+        upper_scale = 1 + 1 / days
+        margin = 1 + SAFETY_MARGIN
+        values = {}
+        for metric, histograms, minimum in (('cpu', self.cpu, MIN_CPU), ('memory', self.memory, MIN_MEMORY)):
+            target = histograms.percentiles(TARGET_PERCENTILE, rows) * margin
+            lower = histograms.percentiles(LOWER_BOUND_PERCENTILE, rows) * margin * lower_scale
+            upper = histograms.percentiles(UPPER_BOUND_PERCENTILE, rows) * margin * upper_scale
+            values[metric] = [np.ceil(np.maximum(bound, minimum)).astype(np.int64).tolist()
+                              for bound in (target, lower, upper)]
+        result = {}
+        for row, key in enumerate(self.keys):
+            result[key] = {
+                'target': {metric: values[metric][0][row] for metric in values},
+                'lower_bound': {metric: values[metric][1][row] for metric in values},
+                'upper_bound': {metric: values[metric][2][row] for metric in values},
+                'confidence_days': round(float(days[row]), 3),
+            }
+        return result
+
+    @staticmethod
+    def path(context: str, directory: str = DEFAULT_RECOMMENDER_DIR) -> Path:
+        """Recommender file for a context (hashed, since context names may contain '/' or ':')"""
+        digest = hashlib.sha256(context.encode('utf-8')).hexdigest()[:24]
+        return Path(os.path.expanduser(directory)) / f'recommender-{digest}.npz'
+
+    def save(self, path: Path) -> Path:
+        """Write the histograms atomically so readers never see a partial file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = len(self.keys)
+        header = {
+            'format': RECOMMENDER_FORMAT, 'half_life': self.half_life, 'aggregation': self.aggregation,
+            'keys': [list(key) for key in self.keys],
+            'cpu_reference': self.cpu.reference, 'memory_reference': self.memory.reference,
+        }
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.recommender-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, header=np.array(json.dumps(header)),
+                         cpu=self.cpu.weights[:rows], memory=self.memory.weights[:rows],
+                         first_seen=self.first_seen, last_seen=self.last_seen,
+                         window_start=self.window_start, window_peak=self.window_peak)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['UsageRecommender']:
+        """Recommender saved by save(), or None when missing or unreadable"""
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            header = json.loads(str(arrays['header']))
+        except (OSError, ValueError, KeyError):
+            return None
+        if header.get('format') != RECOMMENDER_FORMAT:
+            return None
+        recommender = cls(header['half_life'], header['aggregation'])
+        recommender.keys = [tuple(key) for key in header['keys']]
+        recommender.index = {key: row for row, key in enumerate(recommender.keys)}
+        recommender.cpu.weights = arrays['cpu']
+        recommender.cpu.reference = header['cpu_reference']
+        recommender.memory.weights = arrays['memory']
+        recommender.memory.reference = header['memory_reference']
+        for name in ('first_seen', 'last_seen', 'window_start', 'window_peak'):
+            setattr(recommender, name, arrays[name])
+        return recommender
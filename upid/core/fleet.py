@@ -0,0 +1,100 @@
+"""
+Multi-context fleet fan-out
+Runs the same detector workload against many kube contexts concurrently
+and merges the per-cluster results into one fleet-wide document
+"""
+
+import time
+from typing import Dict, Any, Callable, List, Optional
+from .cluster_backend import list_contexts
+from .cluster_detector import ClusterDetector
+from .probe_engine import ProbeEngine, ProbeResult, PROBE_OK, PROBE_UNKNOWN, PROBE_TIMEOUT
+
+
+def resolve_contexts(all_contexts: bool = False, contexts: Optional[str] = None,
+                     kubeconfig: Optional[str] = None) -> List[str]:
+    """Contexts named by --all-contexts or a comma separated --contexts list"""
+    if all_contexts:
+        return list_contexts(kubeconfig)
+    names = [name.strip() for name in (contexts or '').split(',')]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class Fleet:
+    """Runs one ClusterDetector per context in a bounded worker pool
+
+    Each context gets its own backend and the whole run has one deadline:
+    contexts that fail or are still running when it passes are reported as
+    such instead of holding up the others.
+    """
+
+    def __init__(self, contexts: List[str], detector_factory: Callable[[str], ClusterDetector],
+                 max_workers: int = 8, deadline: float = 120.0):
+        self.contexts = contexts
+        self.detector_factory = detector_factory
+        self.engine = ProbeEngine(max_workers=max_workers, deadline=deadline)
+
+    def run(self, collect: Callable[[ClusterDetector], Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Run collect(detector) for every context
+
+        Returns {context: {'status', 'duration', 'result' or 'error'}} in
+        the order the contexts were given.
+        """
+        tasks = {
+            context: (lambda remaining, context=context: self._run_one(context, collect), self.engine.deadline)
+            for context in self.contexts
+        }
+        results = self.engine.run_tasks(tasks)
+
+        fleet = {}
+        for context in self.contexts:
+            result = results[context]
+            if result.ok:
+                fleet[context] = {'status': 'ok', 'duration': round(result.duration, 3), 'result': result.data}
+            elif result.status in (PROBE_UNKNOWN, PROBE_TIMEOUT):
+                fleet[context] = {'status': 'timeout', 'error': 'Did not finish before the fleet deadline'}
+            else:
+                fleet[context] = {'status': 'error', 'error': result.stderr or result.status}
+        return fleet
+
+    def _run_one(self, context: str, collect: Callable[[ClusterDetector], Dict[str, Any]]) -> ProbeResult:
+        started = time.monotonic()
+        detector = self.detector_factory(context)
+        try:
+            data = collect(detector)
+        finally:
+            detector.backend.close()
+        return ProbeResult(context, PROBE_OK, returncode=0, duration=time.monotonic() - started, data=data)
+
+    @staticmethod
+    def answered(entry: Dict[str, Any]) -> bool:
+        """Whether a context's run finished and its cluster could actually be listed"""
+        cluster_info = (entry.get('result') or {}).get('cluster', {})
+        nodes = cluster_info.get('probes', {}).get('nodes', {}).get('status', PROBE_OK)
+        return entry['status'] == 'ok' and cluster_info.get('status') == 'connected' and nodes == PROBE_OK
+
+    @staticmethod
+    def summarize(fleet: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Fleet-wide totals over the contexts that answered"""
+        totals = {
+            'contexts': len(fleet),
+            'ok': 0,
+            'failed': 0,
+            'nodes': 0,
+            'pods': {'running': 0, 'total': 0},
+            'cpu': {'used': 0, 'total': 0},
+            'memory': {'used': 0, 'total': 0},
+        }
+        for entry in fleet.values():
+            result = entry.get('result') or {}
+            if not Fleet.answered(entry):
+                totals['failed'] += 1
+                continue
+            totals['ok'] += 1
+            totals['nodes'] += len(result['cluster'].get('info', {}).get('nodes', {}).get('items', []))
+            resources = result.get('metrics', {}).get('resources', {})
+            for key, fields in (('pods', ('running', 'total')), ('cpu', ('used', 'total')),
+                                ('memory', ('used', 'total'))):
+                for field in fields:
+                    totals[key][field] += resources.get(key, {}).get(field, 0)
+        return totals
@@ -0,0 +1,155 @@
+"""
+Streaming parser for Kubernetes list responses
+Yields the objects of a list's items[] one at a time while reading from a
+pipe, so a huge `kubectl get -o json` never has to be held in memory whole
+"""
+
+import codecs
+import json
+from typing import Dict, Any, IO, Iterator, Optional
+
+_WHITESPACE = ' \t\n\r'
+
+
+class ListStreamParser:
+    """Incrementally parse a JSON list object ({"metadata": ..., "items": [...]})
+
+    Iterate items() to receive each element of items[] as soon as it has been
+    read. Every other top-level field (kind, apiVersion, metadata with the
+    continue token, ...) is collected into `fields` and is complete once
+    items() is exhausted.
+    """
+
+    def __init__(self, stream: IO, chunk_size: int = 64 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.fields: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """The list's metadata (resourceVersion, continue token)"""
+        return self.fields.get('metadata') or {}
+
+    def items(self) -> Iterator[Dict[str, Any]]:
+        """Yield each element of the top-level items array"""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._decode()
+            self._expect(':')
+            if key == 'items' and self._peek() == '[':
+                self._pos += 1
+                yield from self._array_items()
+            else:
+                self.fields[key] = self._decode()
+            if self._separator('}'):
+                return
+
+    def _array_items(self) -> Iterator[Dict[str, Any]]:
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._decode()
+            if self._separator(']'):
+                return
+
+    def _separator(self, closing: str) -> bool:
+        """Consume ',' or the closing bracket; True when the container ended"""
+        char = self._peek()
+        self._pos += 1
+        if char == ',':
+            return False
+        if char == closing:
+            return True
+        raise ValueError(f"Expected ',' or '{closing}' at offset {self._pos}, got {char!r}")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos}, got {found!r}")
+        self._pos += 1
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON stream')
+
+    def _decode(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed"""
+        self._peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Grow reads geometrically so large objects are not re-scanned per chunk
+                if not self._fill(read_size):
+                    raise
+                read_size *= 2
+                continue
+            # A number at the very end of the buffer may still be incomplete
+            if end == len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Read another chunk, dropping already-consumed input; False at EOF"""
+        chunk = ''
+        while not chunk:
+            if self._eof:
+                return False
+            raw = self.stream.read(size or self.chunk_size)
+            if not raw:
+                self._eof = True
+                chunk = self._utf8.decode(b'', final=True) if isinstance(raw, bytes) else ''
+            elif isinstance(raw, bytes):
+                # A multi-byte character split across reads decodes on the next one
+                chunk = self._utf8.decode(raw)
+            else:
+                chunk = raw
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+
+def iter_list_items(stream: IO, chunk_size: int = 64 * 1024,
+                    fields: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a JSON list read from a stream
+
+    If `fields` is given it receives the list's other top-level fields.
+    """
+    parser = ListStreamParser(stream, chunk_size)
+    yield from parser.items()
+    if fields is not None:
+        fields.update(parser.fields)
+
+
+def iter_watch_events(stream: IO, chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Yield watch events ({"type": ..., "object": ...}) from a newline-delimited stream"""
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    while True:
+        raw = stream.read(chunk_size)
+        if not raw:
+            break
+        pending += utf8.decode(raw) if isinstance(raw, bytes) else raw
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
@@ -0,0 +1,133 @@
+"""
+Inverted label index
+Maps (label key, value) pairs to the set of pods carrying them, so Service,
+PDB and NetworkPolicy selectors are answered by set intersections
+"""
+
+import re
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+# One requirement of a selector string: "key", "!key", "key=value", "key!=value", "key in (a,b)", "key notin (a)"
+_REQUIREMENT = re.compile(
+    r'\s*(?:(?P<absent>!)\s*(?P<absent_key>[^\s,=!()]+)'
+    r'|(?P<set_key>[^\s,=!()]+)\s+(?P<set_op>in|notin)\s*\((?P<values>[^)]*)\)'
+    r'|(?P<key>[^\s,=!()]+)\s*(?:(?P<op>==|=|!=)\s*(?P<value>[^\s,=!()]*))?)\s*(?:,|$)'
+)
+
+
+def parse_selector(selector: str) -> Dict[str, Any]:
+    """Turn a label selector string (as for kubectl -l) into a LabelSelector object"""
+    match_labels: Dict[str, str] = {}
+    expressions: List[Dict[str, Any]] = []
+    position = 0
+    selector = selector.strip()
+    while position < len(selector):
+        match = _REQUIREMENT.match(selector, position)
+        if not match or match.end() == position:
+            raise ValueError(f'Invalid label selector: {selector!r}')
+        position = match.end()
+        if match.group('absent'):
+            expressions.append({'key': match.group('absent_key'), 'operator': 'DoesNotExist'})
+        elif match.group('set_op'):
+            values = [value.strip() for value in match.group('values').split(',') if value.strip()]
+            operator = 'In' if match.group('set_op') == 'in' else 'NotIn'
+            expressions.append({'key': match.group('set_key'), 'operator': operator, 'values': values})
+        elif match.group('op') == '!=':
+            expressions.append({'key': match.group('key'), 'operator': 'NotIn', 'values': [match.group('value')]})
+        elif match.group('op'):
+            match_labels[match.group('key')] = match.group('value')
+        else:
+            expressions.append({'key': match.group('key'), 'operator': 'Exists'})
+    return {'matchLabels': match_labels, 'matchExpressions': expressions}
+
+
+class LabelIndex:
+    """Pod ids by label pair, label key and namespace, built once per pod list
+
+    Pod ids are positions in `pods` ('namespace/name'). A selector is
+    answered by intersecting the sets of its equality and In requirements,
+    smallest first, then removing the sets excluded by NotIn and
+    DoesNotExist. Queries start from the smallest requirement and only test
+    membership in the others, so their cost follows the smallest set rather
+    than the cluster size.
+    """
+
+    def __init__(self, pods: List[str], by_label: Dict[Tuple[str, str], Set[int]],
+                 by_key: Dict[str, Set[int]], by_namespace: Dict[str, Set[int]]):
+        self.pods = pods
+        self.by_label = by_label
+        self.by_key = by_key
+        self.by_namespace = by_namespace
+        self.all = set(range(len(pods)))
+
+    def __len__(self) -> int:
+        return len(self.pods)
+
+    @classmethod
+    def from_pods(cls, pods: Iterable[Dict[str, Any]]) -> 'LabelIndex':
+        """Index pods by their labels in one pass"""
+        names: List[str] = []
+        by_label: Dict[Tuple[str, str], Set[int]] = {}
+        by_key: Dict[str, Set[int]] = {}
+        by_namespace: Dict[str, Set[int]] = {}
+        for pod_id, pod in enumerate(pods):
+            metadata = pod.get('metadata') or {}
+            namespace = metadata.get('namespace') or ''
+            names.append(f"{namespace}/{metadata.get('name') or ''}")
+            by_namespace.setdefault(namespace, set()).add(pod_id)
+            for key, value in (metadata.get('labels') or {}).items():
+                by_label.setdefault((key, value), set()).add(pod_id)
+                by_key.setdefault(key, set()).add(pod_id)
+        return cls(names, by_label, by_key, by_namespace)
+
+    def _sets(self, key: str, values: Iterable[str]) -> List[Set[int]]:
+        return [pods for pods in (self.by_label.get((key, value)) for value in values) if pods]
+
+    def select(self, selector: Optional[Dict[str, Any]], namespace: Optional[str] = None) -> Set[int]:
+        """Ids of pods matching a LabelSelector ({matchLabels, matchExpressions}) in a namespace
+
+        An empty selector matches every pod (as for PDBs and NetworkPolicies);
+        a None selector matches none.
+        """
+        if selector is None:
+            return set()
+        scope = self.by_namespace.get(namespace, set()) if namespace is not None else self.all
+        # Each requirement is a list of sets a pod must be in one of (In) or none of (NotIn, DoesNotExist)
+        included: List[List[Set[int]]] = [[scope]]
+        excluded: List[Set[int]] = []
+        for key, value in (selector.get('matchLabels') or {}).items():
+            included.append([self.by_label.get((key, value), set())])
+        for expression in selector.get('matchExpressions') or ():
+            key, operator, values = expression.get('key'), expression.get('operator'), expression.get('values') or []
+            if operator == 'In':
+                included.append(self._sets(key, values))
+            elif operator == 'NotIn':
+                excluded.extend(self._sets(key, values))
+            elif operator == 'Exists':
+                included.append([self.by_key.get(key, set())])
+            elif operator == 'DoesNotExist':
+                excluded.append(self.by_key.get(key, set()))
+            else:
+                raise ValueError(f'Unknown selector operator: {operator!r}')
+
+        # Start from the smallest requirement and test membership in the rest, so large sets are never copied
+        included.sort(key=lambda sets: sum(len(pods) for pods in sets))
+        matched = set().union(*included[0])
+        for sets in included[1:]:
+            if not matched:
+                break
+            if len(sets) == 1:
+                matched &= sets[0]
+            else:
+                matched = {pod_id for pod_id in matched if any(pod_id in pods for pods in sets)}
+        if excluded and matched:
+            matched = {pod_id for pod_id in matched if not any(pod_id in pods for pods in excluded)}
+        return matched
+
+    def select_labels(self, labels: Optional[Dict[str, str]], namespace: Optional[str] = None) -> Set[int]:
+        """Ids of pods matching an equality-only selector such as a Service's; empty or None matches none"""
+        return self.select({'matchLabels': labels}, namespace) if labels else set()
+
+    def names(self, pod_ids: Iterable[int]) -> List[str]:
+        """'namespace/name' of pod ids, sorted"""
+        return sorted(self.pods[pod_id] for pod_id in pod_ids)
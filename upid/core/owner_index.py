@@ -0,0 +1,100 @@
+"""
+Owner-reference index
+Resolves pods to the workload that ultimately controls them (ReplicaSet to
+Deployment, Job to CronJob) through dict lookups on owner UIDs
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .resource_table import workload_name
+
+# Longest controller chain followed; real chains are at most pod -> ReplicaSet/Job -> Deployment/CronJob
+MAX_DEPTH = 8
+
+
+def _controller(metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Controller owner reference of an object, if any"""
+    for reference in metadata.get('ownerReferences') or ():
+        if reference.get('controller', True):
+            return reference
+    return None
+
+
+class OwnerIndex:
+    """Controller chains of listed owner objects, keyed by UID
+
+    Built in one pass over the ReplicaSets and Jobs; each pod is then
+    resolved by following controller UIDs upwards, and every owner's
+    resolution is memoized, so attributing n pods costs O(n) lookups. The
+    top of a chain need not be listed: a ReplicaSet's controller reference
+    already names its Deployment. Pods whose owner was not listed (no
+    permission, or created since) fall back to workload_name().
+    """
+
+    def __init__(self, owners: Dict[str, Tuple[str, str, Optional[Tuple[str, str, str]]]]):
+        # uid -> (kind, name, controller (kind, name, uid) or None)
+        self.owners = owners
+        self._resolved: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    @classmethod
+    def from_objects(cls, kinds: Dict[str, Iterable[Dict[str, Any]]]) -> 'OwnerIndex':
+        """Index owner objects given as {Kind: items}, e.g. {'ReplicaSet': [...], 'Job': [...]}"""
+        owners = {}
+        for kind, items in kinds.items():
+            for item in items:
+                metadata = item.get('metadata') or {}
+                uid = metadata.get('uid')
+                if uid:
+                    controller = _controller(metadata)
+                    parent = (controller.get('kind') or '', controller.get('name') or '',
+                              controller.get('uid') or '') if controller else None
+                    owners[uid] = (kind, metadata.get('name') or '', parent)
+        return cls(owners)
+
+    def resolve(self, uid: str) -> Optional[str]:
+        """Top controller of a listed owner as 'Kind/name', or None when the UID is unknown"""
+        resolved = self._resolved.get(uid)
+        if resolved is not None or uid not in self.owners:
+            return resolved
+        chain: List[str] = []
+        current = uid
+        top = None
+        while len(chain) < MAX_DEPTH:
+            chain.append(current)
+            kind, name, parent = self.owners[current]
+            if parent is None:
+                top = f'{kind}/{name}'
+                break
+            parent_uid = parent[2]
+            if parent_uid in self._resolved:
+                top = self._resolved[parent_uid]
+                break
+            if parent_uid not in self.owners:
+                top = f'{parent[0]}/{parent[1]}'
+                break
+            current = parent_uid
+        if top is None:
+            kind, name, _ = self.owners[chain[-1]]
+            top = f'{kind}/{name}'
+        for link in chain:
+            self._resolved[link] = top
+        return top
+
+    def workload(self, metadata: Dict[str, Any]) -> str:
+        """Workload a pod belongs to as 'Kind/name'"""
+        controller = _controller(metadata)
+        if controller is None:
+            return f"Pod/{metadata.get('name') or ''}"
+        resolved = self.resolve(controller.get('uid') or '')
+        return workload_name(metadata) if resolved is None else resolved
+
+    def pod_workloads(self, pods: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Workload of every pod by 'namespace/name'"""
+        workloads = {}
+        for pod in pods:
+            metadata = pod.get('metadata') or {}
+            workloads[f"{metadata.get('namespace')}/{metadata.get('name')}"] = self.workload(metadata)
+        return workloads
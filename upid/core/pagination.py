@@ -0,0 +1,82 @@
+"""
+Paginated list iteration for UPID API endpoints
+Yields the items of cursor- or page-based list endpoints page by page while the
+next page is already being fetched in the background
+"""
+
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from .probe_engine import DaemonExecutor
+
+DEFAULT_PAGE_SIZE = 100
+
+# Response keys holding a page's items and the cursor of the next page
+ITEM_KEYS = ('items', 'data', 'results')
+CURSOR_KEYS = ('next_cursor', 'cursor', 'next')
+
+
+def parse_page(body: Any, params: Dict[str, Any]) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+    """Items of one response and the parameters of the next page, or None after the last
+
+    A bare JSON array is a complete, unpaginated list. An object carries
+    its items under one of ITEM_KEYS and either a next-page cursor under one
+    of CURSOR_KEYS, or `page` with `total_pages` or `has_more`.
+    """
+    if body is None:
+        return [], None
+    if isinstance(body, list):
+        return body, None
+    items = next((body[key] for key in ITEM_KEYS if isinstance(body.get(key), list)), [])
+    cursor = next((body[key] for key in CURSOR_KEYS if body.get(key)), None)
+    if cursor is not None and items:
+        return items, dict(params, cursor=cursor)
+    page = body.get('page')
+    if page is not None and items:
+        total = body.get('total_pages')
+        if (total is not None and page < total) or (total is None and body.get('has_more')):
+            return items, dict(params, page=page + 1)
+    return items, None
+
+
+class PageIterator:
+    """Iterator over the items of a paginated endpoint, one page ahead
+
+    When a page arrives, the request for the next one is submitted to a
+    background thread before the page's items are yielded, so fetching page
+    n + 1 overlaps with the caller's handling of page n. Only two pages are
+    held at a time. `pages` counts the pages received so far.
+    """
+
+    def __init__(self, fetch: Callable[[Dict[str, Any]], Any], params: Optional[Dict[str, Any]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = True):
+        self.fetch = fetch
+        self.params = dict(params or {}, limit=page_size)
+        self.prefetch = prefetch
+        self.pages = 0
+
+    def _pages(self) -> Iterator[List[Any]]:
+        executor = DaemonExecutor(max_workers=1, thread_name_prefix='upid-page') if self.prefetch else None
+        pending: Optional[Future] = None
+        try:
+            params: Optional[Dict[str, Any]] = self.params
+            while params is not None:
+                body = pending.result() if pending is not None else self.fetch(params)
+                items, params = parse_page(body, params)
+                pending = executor.submit(self.fetch, params) if executor and params is not None else None
+                self.pages += 1
+                yield items
+        finally:
+            if executor:
+                # A caller that stops early must not wait for a page nobody will read, nor
+                # have the process held open at exit by one still in flight
+                if pending is not None:
+                    pending.cancel()
+                executor.shutdown(wait=False)
+
+    def __iter__(self) -> Iterator[Any]:
+        for items in self._pages():
+            yield from items
+
+    def iter_pages(self) -> Iterator[List[Any]]:
+        """Pages as lists of items, e.g. to render each as it arrives"""
+        return self._pages()
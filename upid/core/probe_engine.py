@@ -0,0 +1,245 @@
+"""
+Concurrent probe engine for cluster detection
+Runs independent kubectl/helm probes in a bounded thread pool with an overall deadline
+"""
+
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, Future, wait
+from typing import Dict, Any, Callable, IO, List, Tuple
+
+PROBE_OK = 'ok'
+PROBE_FAILED = 'failed'
+PROBE_TIMEOUT = 'timeout'
+PROBE_UNKNOWN = 'unknown'
+
+
+class ProbeResult:
+    """Outcome of a single probe command"""
+
+    def __init__(self, name: str, status: str, returncode: int = None,
+                 stdout: str = '', stderr: str = '', duration: float = 0.0, data: Any = None):
+        self.name = name
+        self.status = status
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        # Structured payload for probes answered without a text command
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        """Whether the probe completed with a zero exit code"""
+        return self.status == PROBE_OK
+
+    @property
+    def known(self) -> bool:
+        """Whether the probe produced an answer before its timeout or the deadline"""
+        return self.status in (PROBE_OK, PROBE_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'returncode': self.returncode,
+            'duration': round(self.duration, 3)
+        }
+
+
+class DaemonExecutor(Executor):
+    """Thread pool whose workers are daemon threads
+
+    ThreadPoolExecutor workers are joined at interpreter exit, so a task
+    abandoned at its deadline would still keep the CLI from exiting until it
+    finished. Work left running here is dropped at exit instead.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = 'upid-probe'):
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'{self.thread_name_prefix}_{len(self._threads)}')
+                self._threads.append(thread)
+                thread.start()
+        return future
+
+    def _work(self) -> None:
+        while True:
+            work = self._queue.get()
+            if work is None:
+                return
+            future, fn, args, kwargs = work
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Stop the workers once the queued work is done, joining them only when wait is set"""
+        if cancel_futures:
+            while True:
+                try:
+                    work = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if work is not None:
+                    work[0].cancel()
+        with self._lock:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class ProbeEngine:
+    """Runs probe commands concurrently and returns whatever finished by the deadline"""
+
+    def __init__(self, max_workers: int = 8, deadline: float = 15.0):
+        self.max_workers = max(1, max_workers)
+        self.deadline = deadline
+
+    def run(self, probes: Dict[str, Tuple[List[str], float]]) -> Dict[str, ProbeResult]:
+        """Run probes given as {name: (command, timeout)}
+
+        Probes still running when the deadline expires are reported as unknown;
+        the per-probe timeout is capped by the remaining deadline so worker
+        threads never outlive it by much.
+        """
+        return self.run_tasks(self.command_tasks(probes))
+
+    def command_tasks(self, probes: Dict[str, Tuple[List[str], float]]) -> Dict[str, Tuple[Callable[[float], ProbeResult], float]]:
+        """Convert {name: (command, timeout)} probes into tasks for run_tasks()"""
+        return {
+            name: (self._command_task(name, command, timeout), self.deadline)
+            for name, (command, timeout) in probes.items()
+        }
+
+    def run_tasks(self, tasks: Dict[str, Tuple[Callable[[float], ProbeResult], float]]) -> Dict[str, ProbeResult]:
+        """Run tasks given as {name: (fn, deadline)} concurrently
+
+        Each fn is called with the seconds left before its own deadline and
+        must return a ProbeResult. Tasks that have not finished when their
+        deadline passes are reported as unknown.
+        """
+        results = {name: ProbeResult(name, PROBE_UNKNOWN) for name in tasks}
+        if not tasks:
+            return results
+
+        started = time.monotonic()
+        executor = DaemonExecutor(max_workers=min(self.max_workers, len(tasks)))
+        try:
+            futures = {
+                executor.submit(self._run_task, name, fn, deadline, started): name
+                for name, (fn, deadline) in tasks.items()
+            }
+            done, not_done = wait(futures, timeout=max(deadline for _, deadline in tasks.values()))
+            for future in done:
+                results[futures[future]] = future.result()
+            for future in not_done:
+                future.cancel()
+        finally:
+            executor.shutdown(wait=False)
+
+        return results
+
+    def _command_task(self, name: str, command: List[str], timeout: float) -> Callable[[float], ProbeResult]:
+        """Wrap a probe command as a task bounded by its timeout and the remaining deadline"""
+        return lambda remaining: self.run_command(name, command, min(timeout, remaining))
+
+    def _run_task(self, name: str, fn: Callable[[float], ProbeResult], deadline: float, started: float) -> ProbeResult:
+        """Run a single task if its deadline has not already passed"""
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            return ProbeResult(name, PROBE_UNKNOWN)
+        try:
+            return fn(remaining)
+        except Exception as e:
+            return ProbeResult(name, PROBE_FAILED, stderr=str(e))
+
+    @staticmethod
+    def run_command(name: str, command: List[str], timeout: float) -> ProbeResult:
+        """Run one command and classify its outcome"""
+        probe_started = time.monotonic()
+        try:
+            result = subprocess.run(
+                command,
+                capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            return ProbeResult(name, PROBE_TIMEOUT, duration=time.monotonic() - probe_started)
+        except Exception as e:
+            # Missing binaries (kubectl/helm not installed) count as a failed probe
+            return ProbeResult(name, PROBE_FAILED, stderr=str(e),
+                               duration=time.monotonic() - probe_started)
+
+        status = PROBE_OK if result.returncode == 0 else PROBE_FAILED
+        return ProbeResult(
+            name, status,
+            returncode=result.returncode,
+            stdout=result.stdout,
+            stderr=result.stderr,
+            duration=time.monotonic() - probe_started
+        )
+
+    @staticmethod
+    def stream_command(name: str, command: List[str], timeout: float,
+                       consume: Callable[[IO], None]) -> ProbeResult:
+        """Run one command and hand its stdout pipe to consume() while it runs
+
+        Output is processed as it is produced instead of being buffered; the
+        process is killed if it outlives the timeout or consume() raises.
+        """
+        probe_started = time.monotonic()
+        with tempfile.TemporaryFile() as stderr_file:
+            try:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+            except Exception as e:
+                return ProbeResult(name, PROBE_FAILED, stderr=str(e),
+                                   duration=time.monotonic() - probe_started)
+
+            timed_out = threading.Event()
+
+            def _kill():
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(timeout, _kill)
+            timer.daemon = True
+            timer.start()
+            error = None
+            try:
+                consume(process.stdout)
+            except Exception as e:
+                error = e
+                process.kill()
+            finally:
+                timer.cancel()
+                returncode = process.wait()
+                process.stdout.close()
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode('utf-8', errors='replace')
+
+        duration = time.monotonic() - probe_started
+        if timed_out.is_set():
+            return ProbeResult(name, PROBE_TIMEOUT, duration=duration)
+        if returncode != 0:
+            return ProbeResult(name, PROBE_FAILED, returncode=returncode, stderr=stderr, duration=duration)
+        if error is not None:
+            return ProbeResult(name, PROBE_FAILED, returncode=returncode, stderr=str(error), duration=duration)
+        return ProbeResult(name, PROBE_OK, returncode=returncode, stderr=stderr, duration=duration)
@@ -0,0 +1,248 @@
+"""
+Quantile sketches
+Mergeable DDSketch-style log histograms of CPU and memory usage per series,
+so percentiles come from fixed-size counters instead of every raw sample
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from .timeseries_store import _narrowest
+
+DEFAULT_SKETCH_DIR = '~/.upid/sketches'
+DEFAULT_RELATIVE_ACCURACY = 0.02
+PERCENTILES = (50, 90, 95, 99)
+
+# Metric -> (smallest value told apart from zero, largest value before the top bin saturates)
+METRIC_RANGES = {
+    'cpu': (1, 1000 * 1000),           # 1 millicore to 1000 cores
+    'memory': (1024 ** 2, 4 * 1024 ** 4),  # 1 MiB to 4 TiB
+}
+
+# Bump when the saved layout changes
+SKETCH_FORMAT = 1
+
+# Rows of the cumulative counts computed at once by quantiles(), to bound temporary memory
+_QUANTILE_BLOCK = 4096
+
+
+class LogMapping:
+    """Maps values to logarithmic bins whose representative is within `relative_accuracy` of them
+
+    Bin 0 holds values below `minimum` (reported as 0); bin i > 0 holds
+    (minimum * gamma^(i-2), minimum * gamma^(i-1)]. Values past `maximum`
+    land in the top bin.
+    """
+
+    def __init__(self, relative_accuracy: float, minimum: int, maximum: int):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.minimum = minimum
+        self.bins = math.ceil(math.log(maximum / minimum) / self.log_gamma) + 2
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        """Bin of every value"""
+        values = np.asarray(values, dtype=np.float64)
+        scaled = np.log(np.maximum(values, self.minimum) / self.minimum) / self.log_gamma
+        bins = np.ceil(scaled - 1e-9).astype(np.int64) + 1
+        return np.where(values < self.minimum, 0, np.minimum(bins, self.bins - 1))
+
+    def value(self, bins: np.ndarray) -> np.ndarray:
+        """Representative value of every bin, rounded to an integer"""
+        upper = self.minimum * np.power(self.gamma, np.asarray(bins, dtype=np.float64) - 1)
+        return np.where(bins > 0, np.rint(2 * upper / (self.gamma + 1)), 0).astype(np.int64)
+
+
+class QuantileSketches:
+    """CPU and memory quantile sketches for many series, one counter row per series
+
+    Each row is a fixed number of uint32 bin counts per metric (about 3 KB
+    at the default 2% relative accuracy), however many samples it absorbs.
+    Sketches with the same accuracy merge exactly by adding counts, so rows
+    of different pods, workloads or clusters can be combined in any order.
+    """
+
+    GROWTH_BLOCK = 256
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.mappings = {metric: LogMapping(relative_accuracy, *bounds) for metric, bounds in METRIC_RANGES.items()}
+        self.keys: List[Hashable] = []
+        self.index: Dict[Hashable, int] = {}
+        self.counts = {metric: np.zeros((0, mapping.bins), dtype=np.uint32)
+                       for metric, mapping in self.mappings.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the counters"""
+        return sum(counts.nbytes for counts in self.counts.values())
+
+    def _rows(self, keys: Sequence[Hashable]) -> np.ndarray:
+        """Row of every key, adding rows for new keys"""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for position, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.keys)
+                self.keys.append(key)
+            rows[position] = row
+        allocated = len(next(iter(self.counts.values())))
+        if len(self.keys) > allocated:
+            extra = max(self.GROWTH_BLOCK, allocated, len(self.keys) - allocated)
+            self.counts = {metric: np.vstack([counts, np.zeros((extra, counts.shape[1]), dtype=np.uint32)])
+                           for metric, counts in self.counts.items()}
+        return rows
+
+    def _add(self, metric: str, rows: np.ndarray, bins: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        """Add counts to (row, bin) cells; repeated cells accumulate"""
+        counts = self.counts[metric]
+        flat = rows * counts.shape[1] + bins
+        cells, inverse = np.unique(flat, return_inverse=True)
+        added = np.bincount(inverse, weights=weights, minlength=len(cells)).astype(np.uint32)
+        counts.reshape(-1)[cells] += added
+
+    def add(self, keys: Sequence[Hashable], cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Add one sample per key; a key may repeat, e.g. every pod of a workload"""
+        rows = self._rows(keys)
+        self._add('cpu', rows, self.mappings['cpu'].index(cpu))
+        self._add('memory', rows, self.mappings['memory'].index(memory))
+
+    def merge(self, other: 'QuantileSketches', key: Optional[Callable[[Hashable], Hashable]] = None) -> None:
+        """Add another set's counts into this one, optionally re-keying its rows (e.g. dropping the pod)"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches of different relative accuracy')
+        keys = [key(name) for name in other.keys] if key else other.keys
+        rows = self._rows(keys)
+        for metric, counts in other.counts.items():
+            source, bins = np.nonzero(counts[:len(other)])
+            self._add(metric, rows[source], bins, counts[source, bins])
+
+    def grouped(self, key: Callable[[Hashable], Hashable]) -> 'QuantileSketches':
+        """New set with rows merged by key(row key)"""
+        merged = QuantileSketches(self.relative_accuracy)
+        merged.merge(self, key)
+        return merged
+
+    def samples(self) -> np.ndarray:
+        """Samples absorbed by every row"""
+        return self.counts['cpu'][:len(self)].sum(axis=1, dtype=np.int64)
+
+    def quantiles(self, percentiles: Sequence[float] = PERCENTILES) -> Dict[str, np.ndarray]:
+        """Nearest-rank percentiles per row: metric -> (rows, len(percentiles)) int64, 0 for empty rows"""
+        fractions = np.asarray(percentiles, dtype=np.float64) / 100
+        result = {}
+        for metric, counts in self.counts.items():
+            mapping = self.mappings[metric]
+            out = np.zeros((len(self), len(fractions)), dtype=np.int64)
+            for start in range(0, len(self), _QUANTILE_BLOCK):
+                cumulative = counts[start:start + _QUANTILE_BLOCK].cumsum(axis=1, dtype=np.int64)
+                cumulative = cumulative[:len(self) - start]
+                totals = cumulative[:, -1:]
+                ranks = np.maximum(np.ceil(totals * fractions), 1)
+                # First bin whose cumulative count reaches each rank
+                bins = (cumulative[:, None, :] < ranks[:, :, None]).sum(axis=2)
+                out[start:start + len(cumulative)] = np.where(totals > 0, mapping.value(np.minimum(bins, mapping.bins - 1)), 0)
+            result[metric] = out
+        return result
+
+    def summarize(self, percentiles: Sequence[float] = PERCENTILES) -> Dict[Hashable, Dict[str, int]]:
+        """Sample count and percentiles per key, in the field names of stored usage summaries"""
+        samples = self.samples().tolist()
+        quantiles = {metric: values.tolist() for metric, values in self.quantiles(percentiles).items()}
+        summary = {}
+        for row, key in enumerate(self.keys):
+            stats = {'samples': samples[row]}
+            for metric, values in quantiles.items():
+                stats.update({f'{metric}_p{percentile:g}': value for percentile, value in zip(percentiles, values[row])})
+            summary[key] = stats
+        return summary
+
+    def to_bytes(self) -> bytes:
+        """Compact encoding: a JSON header line, then the non-zero cells of each metric
+
+        Cells are stored as gaps between flat (row, bin) positions plus their
+        counts, each at the narrowest integer width that holds them, so a
+        sketch costs a few bytes per occupied bin.
+        """
+        arrays = {}
+        for metric, counts in self.counts.items():
+            flat = counts[:len(self)].reshape(-1)
+            positions = np.flatnonzero(flat)
+            arrays[f'{metric}_gaps'] = _narrowest(np.diff(positions, prepend=0).astype(np.uint64))
+            arrays[f'{metric}_counts'] = _narrowest(flat[positions].astype(np.uint64))
+        index = {}
+        offset = 0
+        for name, array in arrays.items():
+            index[name] = [array.dtype.str, len(array), offset]
+            offset += array.nbytes
+        header = {'format': SKETCH_FORMAT, 'relative_accuracy': self.relative_accuracy,
+                  'keys': [list(key) if isinstance(key, tuple) else key for key in self.keys], 'arrays': index}
+        return b''.join([json.dumps(header).encode('utf-8'), b'\n'] + [array.tobytes() for array in arrays.values()])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'QuantileSketches':
+        """Rebuild a set encoded with to_bytes()"""
+        line, _, payload = data.partition(b'\n')
+        header = json.loads(line)
+        if header.get('format') != SKETCH_FORMAT:
+            raise ValueError(f"Unsupported sketch format: {header.get('format')}")
+        sketches = cls(header['relative_accuracy'])
+        sketches._rows([tuple(key) if isinstance(key, list) else key for key in header['keys']])
+        for metric, counts in sketches.counts.items():
+            dtype, count, offset = header['arrays'][f'{metric}_gaps']
+            positions = np.frombuffer(payload, dtype=dtype, count=count, offset=offset).astype(np.int64).cumsum()
+            dtype, count, offset = header['arrays'][f'{metric}_counts']
+            counts.reshape(-1)[positions] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        return sketches
+
+    @staticmethod
+    def path(context: str, directory: str = DEFAULT_SKETCH_DIR) -> Path:
+        """Sketch file for a context (hashed, since context names may contain '/' or ':')"""
+        digest = hashlib.sha256(context.encode('utf-8')).hexdigest()[:24]
+        return Path(os.path.expanduser(directory)) / f'sketch-{digest}.bin'
+
+    def save(self, path: Path) -> Path:
+        """Write the sketches atomically so readers never see a partial file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.sketch-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(self.to_bytes())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['QuantileSketches']:
+        """Sketches saved by save(), or None when missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                return cls.from_bytes(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def merge_sketches(sketches: Sequence[QuantileSketches],
+                   key: Optional[Callable[[Hashable], Hashable]] = None) -> QuantileSketches:
+    """One set holding the merged counts of several, e.g. the same workload in several clusters"""
+    merged = QuantileSketches(sketches[0].relative_accuracy if sketches else DEFAULT_RELATIVE_ACCURACY)
+    for sketch in sketches:
+        merged.merge(sketch, key)
+    return merged
+
@@ -0,0 +1,89 @@
+"""
+Kubernetes resource quantity parsing
+Exact parsing of quantities ("500m", "1.5Gi", "500e6", "2k", ...) into
+integer millicores and bytes, memoized because clusters repeat the same
+few hundred strings across every container
+"""
+
+import math
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import Union
+
+# Binary (power of 1024) and decimal (power of 10) SI suffixes
+BINARY_SUFFIXES = {'Ki': 1, 'Mi': 2, 'Gi': 3, 'Ti': 4, 'Pi': 5, 'Ei': 6}
+DECIMAL_SUFFIXES = {'n': -9, 'u': -6, 'm': -3, '': 0, 'k': 3, 'M': 6, 'G': 9, 'T': 12, 'P': 15, 'E': 18}
+
+_QUANTITY = re.compile(
+    r'^\s*(?P<number>[+-]?(?:\d+\.?\d*|\.\d+))'
+    r'(?:(?P<exponent>[eE][+-]?\d+)|(?P<suffix>Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE]?))\s*$'
+)
+
+CACHE_SIZE = 4096
+
+Quantity = Union[str, int, float]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value: str) -> Fraction:
+    match = _QUANTITY.match(value)
+    if not match:
+        raise ValueError(f'Invalid quantity: {value!r}')
+    number = Fraction(match.group('number'))
+    if match.group('exponent'):
+        return number * Fraction(10) ** int(match.group('exponent')[1:])
+    suffix = match.group('suffix')
+    if suffix in BINARY_SUFFIXES:
+        return number * 1024 ** BINARY_SUFFIXES[suffix]
+    return number * Fraction(10) ** DECIMAL_SUFFIXES[suffix]
+
+
+def parse_quantity(value: Quantity) -> Fraction:
+    """Exact value of a quantity; raises ValueError for malformed input"""
+    return _parse(value if isinstance(value, str) else repr(value))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _millicores(value: str) -> int:
+    return math.ceil(_parse(value) * 1000)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _bytes(value: str) -> int:
+    return math.ceil(_parse(value))
+
+
+def parse_millicores(value: Quantity) -> int:
+    """CPU quantity as integer millicores, rounded up like Quantity.MilliValue()"""
+    return _millicores(value if isinstance(value, str) else repr(value))
+
+
+def parse_bytes(value: Quantity) -> int:
+    """Memory/storage quantity as integer bytes, rounded up like Quantity.Value()"""
+    return _bytes(value if isinstance(value, str) else repr(value))
+
+
+def millicores_or_zero(value: Quantity) -> int:
+    """parse_millicores() that treats malformed input as 0"""
+    try:
+        return parse_millicores(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def bytes_or_zero(value: Quantity) -> int:
+    """parse_bytes() that treats malformed input as 0"""
+    try:
+        return parse_bytes(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def cache_info() -> dict:
+    """Hit/miss statistics of the memoized parsers"""
+    return {
+        'quantity': _parse.cache_info()._asdict(),
+        'millicores': _millicores.cache_info()._asdict(),
+        'bytes': _bytes.cache_info()._asdict(),
+    }
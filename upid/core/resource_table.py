@@ -0,0 +1,219 @@
+"""
+Columnar resource table
+Container requests and limits held in NumPy arrays, so cluster totals,
+ratios and per-namespace/node/owner/workload group-bys are vector operations
+"""
+
+import warnings
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .quantity import millicores_or_zero, bytes_or_zero
+
+GROUP_KEYS = ('namespace', 'node', 'owner', 'workload')
+VALUE_COLUMNS = ('cpu_requests', 'cpu_limits', 'memory_requests', 'memory_limits')
+
+
+_EMPTY: Dict[str, Any] = {}
+_INT64 = np.iinfo(np.int64)
+
+
+def _owner(references: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """Controller owner reference of a pod as (kind, name); ('', '') when unowned"""
+    for reference in references:
+        if reference.get('controller', True):
+            return reference.get('kind') or '', reference.get('name') or ''
+    return '', ''
+
+
+def workload_name(metadata: Dict[str, Any]) -> str:
+    """Workload a pod belongs to as 'Kind/name'
+
+    Pods of a Deployment are owned by a ReplicaSet named after it plus the
+    pod-template-hash label, so that suffix is stripped to name the
+    Deployment. Pods without a controller are their own workload.
+    """
+    kind, name = _owner(metadata.get('ownerReferences') or [])
+    if not kind:
+        return f"Pod/{metadata.get('name') or ''}"
+    template_hash = (metadata.get('labels') or {}).get('pod-template-hash')
+    if kind == 'ReplicaSet' and template_hash and name.endswith(f'-{template_hash}'):
+        return f"Deployment/{name[:-len(template_hash) - 1]}"
+    return f'{kind}/{name}'
+
+
+def _quantity_column(column: str, quantities: List[Optional[str]], parse: Callable[[str], int]) -> np.ndarray:
+    """Parsed quantities as int64; one too large for int64 counts as 0, like a malformed one, with a warning"""
+    values = []
+    for quantity in quantities:
+        value = parse(quantity or '0')
+        if not _INT64.min <= value <= _INT64.max:
+            warnings.warn(f'{column} quantity {quantity!r} is out of the int64 range and counted as 0',
+                          RuntimeWarning, stacklevel=3)
+            value = 0
+        values.append(value)
+    return np.array(values, dtype=np.int64)
+
+
+def _group_sum(codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """Sum values per group code, keeping integer columns exact"""
+    if np.issubdtype(values.dtype, np.integer):
+        sums = np.zeros(size, dtype=values.dtype)
+        np.add.at(sums, codes, values)
+        return sums
+    return np.bincount(codes, weights=values, minlength=size)
+
+
+class ResourceTable:
+    """One row per container: group codes plus request/limit columns
+
+    CPU columns hold exact millicores and memory columns exact bytes (int64).
+    `running` marks containers whose pod is in the Running phase. Besides the
+    pod-level GROUP_KEYS, rows are coded by 'container' name; workloads are
+    labelled "namespace/Kind/name" (see workload_name()).
+    """
+
+    def __init__(self, labels: Dict[str, List[str]], codes: Dict[str, np.ndarray],
+                 columns: Dict[str, np.ndarray], running: np.ndarray, pods: int, running_pods: int):
+        self.labels = labels
+        self.codes = codes
+        self.columns = columns
+        self.running = running
+        self.pods = pods
+        self.running_pods = running_pods
+
+    def __len__(self) -> int:
+        return len(self.running)
+
+    @classmethod
+    def from_pods(cls, pods: Iterable[Dict[str, Any]],
+                  workload: Optional[Callable[[Dict[str, Any]], str]] = None) -> 'ResourceTable':
+        """Build the table from pod objects in one pass
+
+        Group keys are coded once per pod and repeated per container, and
+        each distinct (cpu/memory request/limit) combination is parsed once,
+        since real clusters repeat a few hundred resource specs everywhere.
+        `workload` names a pod's workload from its metadata (default
+        workload_name(); see OwnerIndex.workload).
+        """
+        workload = workload or workload_name
+        namespaces: Dict[str, int] = {}
+        nodes: Dict[str, int] = {}
+        owners: Dict[Tuple[str, str, str], int] = {}
+        workloads: Dict[str, int] = {}
+        names: Dict[str, int] = {}
+        specs: Dict[Tuple[Any, ...], int] = {}
+        pod_codes: Dict[str, List[int]] = {key: [] for key in GROUP_KEYS}
+        add_namespace, add_node, add_owner, add_workload = (pod_codes[key].append for key in GROUP_KEYS)
+        pod_running: List[bool] = []
+        container_counts: List[int] = []
+        container_specs: List[int] = []
+        container_names: List[int] = []
+        add_spec = container_specs.append
+        add_name = container_names.append
+
+        for pod in pods:
+            metadata = pod.get('metadata') or _EMPTY
+            spec = pod.get('spec') or _EMPTY
+            namespace = metadata.get('namespace') or ''
+            add_namespace(namespaces.setdefault(namespace, len(namespaces)))
+            add_node(nodes.setdefault(spec.get('nodeName') or '', len(nodes)))
+            references = metadata.get('ownerReferences')
+            owner = (namespace,) + _owner(references) if references else (namespace, '', '')
+            add_owner(owners.setdefault(owner, len(owners)))
+            label = f'{namespace}/{workload(metadata)}'
+            add_workload(workloads.setdefault(label, len(workloads)))
+            pod_running.append((pod.get('status') or _EMPTY).get('phase') == 'Running')
+
+            containers = spec.get('containers') or ()
+            container_counts.append(len(containers))
+            for container in containers:
+                resources = container.get('resources') or _EMPTY
+                requests = resources.get('requests') or _EMPTY
+                limits = resources.get('limits') or _EMPTY
+                key = (requests.get('cpu'), requests.get('memory'), limits.get('cpu'), limits.get('memory'))
+                add_spec(specs.setdefault(key, len(specs)))
+                name = container.get('name') or ''
+                add_name(names.setdefault(name, len(names)))
+
+        counts = np.array(container_counts, dtype=np.int64)
+        codes = {key: np.repeat(np.array(pod_codes[key], dtype=np.int64), counts) for key in GROUP_KEYS}
+        codes['container'] = np.array(container_names, dtype=np.int64)
+        labels = {
+            'namespace': list(namespaces),
+            'node': list(nodes),
+            'owner': [f'{namespace}/{kind}/{name}' if kind else '' for namespace, kind, name in owners],
+            'workload': list(workloads),
+            'container': list(names),
+        }
+
+        # Parse each distinct spec once, then broadcast through the per-container codes
+        spec_codes = np.array(container_specs, dtype=np.int64)
+        parsed = list(specs) or [(None, None, None, None)]
+        columns = {
+            column: _quantity_column(column, [s[position] for s in parsed], parse)[spec_codes]
+            for position, (column, parse) in enumerate((
+                ('cpu_requests', millicores_or_zero), ('memory_requests', bytes_or_zero),
+                ('cpu_limits', millicores_or_zero), ('memory_limits', bytes_or_zero),
+            ))
+        }
+        running = np.repeat(np.array(pod_running, dtype=bool), counts)
+        return cls(labels, codes, columns, running, len(pod_running), int(sum(pod_running)))
+
+    def totals(self) -> Dict[str, Any]:
+        """Cluster-wide sums of every value column"""
+        totals = {column: values.sum().item() for column, values in self.columns.items()}
+        totals['containers'] = len(self)
+        totals['pods'] = self.pods
+        totals['running_pods'] = self.running_pods
+        return totals
+
+    def group_by(self, key: str) -> Dict[str, Dict[str, Any]]:
+        """Sums of every value column and container counts per namespace, node, owner or workload"""
+        codes = self.codes[key]
+        size = len(self.labels[key])
+        sums = {column: _group_sum(codes, values, size) for column, values in self.columns.items()}
+        counts = np.bincount(codes, minlength=size)
+
+        groups = {}
+        for index, label in enumerate(self.labels[key]):
+            group = {column: sums[column][index].item() for column in VALUE_COLUMNS}
+            group['containers'] = int(counts[index])
+            groups[label] = group
+        return groups
+
+    def by_container(self) -> Tuple[Dict[Tuple[str, str], int], Dict[str, np.ndarray]]:
+        """Largest request/limit values and replica counts per (workload label, container name)
+
+        Returns the group index of every pair and the per-group columns,
+        plus 'replicas': how many containers of the pair were listed.
+        """
+        names = max(len(self.labels['container']), 1)
+        groups, inverse = np.unique(self.codes['workload'] * names + self.codes['container'], return_inverse=True)
+        columns = {}
+        for column, values in self.columns.items():
+            largest = np.zeros(len(groups), dtype=np.int64)
+            np.maximum.at(largest, inverse, values)
+            columns[column] = largest
+        columns['replicas'] = np.bincount(inverse, minlength=len(groups)).astype(np.int64)
+        workloads, containers = self.labels['workload'], self.labels['container']
+        index = {(workloads[code // names], containers[code % names]): group
+                 for group, code in enumerate(groups.tolist())}
+        return index, columns
+
+    def top(self, key: str, column: str = 'cpu_requests', limit: int = 10) -> List[Tuple[str, int]]:
+        """The groups with the largest sum of a column"""
+        sums = _group_sum(self.codes[key], self.columns[column], len(self.labels[key]))
+        order = np.argsort(sums)[::-1][:limit]
+        return [(self.labels[key][index], sums[index].item()) for index in order]
+
+    def ratios(self, numerator: str, denominator: str, key: str) -> Dict[str, float]:
+        """Per-group ratio of two column sums (e.g. requests/limits); groups with a zero denominator are omitted"""
+        size = len(self.labels[key])
+        top = _group_sum(self.codes[key], self.columns[numerator], size).astype(np.float64)
+        bottom = _group_sum(self.codes[key], self.columns[denominator], size).astype(np.float64)
+        mask = bottom > 0
+        ratios = np.zeros(size)
+        np.divide(top, bottom, out=ratios, where=mask)
+        return {self.labels[key][index]: ratios[index].item() for index in np.flatnonzero(mask)}
@@ -0,0 +1,213 @@
+"""
+On-disk API response cache
+Keeps GET responses of the UPID API with their validators so repeat commands
+are served locally while fresh and revalidated with a conditional request after
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_CACHE_DIR = '~/.upid/http-cache'
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# (endpoint pattern, seconds a response is used without asking the server), first match wins.
+# Other endpoints, e.g. operation status, are revalidated every time.
+DEFAULT_TTLS: Tuple[Tuple[str, float], ...] = (
+    ('/clusters/*/analysis/*', 300),
+    ('/clusters/*/reports/*', 300),
+    ('/clusters/*/report', 300),
+    ('/clusters/*/cost', 300),
+    ('/clusters/*/optimizations/*', 120),
+    ('/clusters/*/zero-pod-recommendations', 120),
+    ('/clusters/*/optimization-history', 600),
+    ('/clusters/*/deployments*', 30),
+    ('/clusters', 60),
+    ('/clusters/*', 60),
+)
+
+# Bump when the stored layout changes
+CACHE_FORMAT = 1
+
+_MAX_AGE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+def cache_control(value: Optional[str]) -> Dict[str, Any]:
+    """Directives of a Cache-Control header this cache honors: no-store, no-cache and max-age"""
+    directives = {token.strip().split('=', 1)[0].lower() for token in (value or '').split(',') if token.strip()}
+    match = _MAX_AGE.search(value or '')
+    return {
+        'no_store': 'no-store' in directives,
+        'no_cache': 'no-cache' in directives,
+        'max_age': int(match.group(1)) if match else None,
+    }
+
+
+def _scope(path: str) -> str:
+    """Collection or object a path belongs to, e.g. '/clusters/abc' for '/clusters/abc/analysis/costs'"""
+    return '/'.join(path.rstrip('/').split('/')[:3]) or '/'
+
+
+def _digest(value: str, length: int = 16) -> str:
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:length]
+
+
+class ResponseCache:
+    """GET responses stored per URL, parameters and credentials, with validators and a size bound
+
+    A response is used without a request until its max-age (from
+    Cache-Control, else the endpoint's TTL) runs out. After that, or under
+    no-cache, it is kept only if it carries an ETag or Last-Modified, and is
+    revalidated with If-None-Match/If-Modified-Since so an unchanged payload
+    costs a 304. Hits touch the file, and the least recently used files are
+    evicted whenever the directory grows past max_bytes. File names start
+    with a hash of the object they describe, so a write to a cluster drops
+    its cached reads without opening any file.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[Iterable[Tuple[str, float]]] = None):
+        self.directory = Path(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        self.ttls = tuple(ttls) if ttls is not None else DEFAULT_TTLS
+
+    def ttl(self, endpoint: str) -> float:
+        """Seconds a response of an endpoint path stays fresh without a server max-age"""
+        path = urlparse(endpoint).path
+        for pattern, seconds in self.ttls:
+            if fnmatch.fnmatchcase(path, pattern):
+                return seconds
+        return 0
+
+    def path(self, endpoint: str, url: str, params: Optional[Dict[str, Any]] = None,
+             authorization: Optional[str] = None) -> Path:
+        """Cache file of a request; credentials are part of the key so users never share entries"""
+        request = json.dumps([url, sorted((params or {}).items()), authorization or ''], default=str)
+        return self.directory / f'response-{_digest(_scope(urlparse(endpoint).path), 12)}-{_digest(request)}.json'
+
+    def load(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Stored entry, or None when missing or unreadable; marks it recently used"""
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('format') != CACHE_FORMAT:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        """Whether an entry can be used without asking the server"""
+        return time.time() < entry.get('expires_at', 0)
+
+    @staticmethod
+    def validators(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Conditional request headers that revalidate an entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, path: Path, endpoint: str, headers: Dict[str, str], body: Any) -> None:
+        """Keep a 200 response's parsed body when its Cache-Control and validators make it reusable"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        ttl = self._lifetime(endpoint, headers)
+        if ttl is None or (ttl <= 0 and not etag and not last_modified):
+            self._remove(path)
+            return
+        self._write(path, {
+            'format': CACHE_FORMAT,
+            'endpoint': endpoint,
+            'stored_at': time.time(),
+            'expires_at': time.time() + ttl,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body,
+        })
+
+    def refresh(self, path: Path, entry: Dict[str, Any], headers: Dict[str, str]) -> None:
+        """Extend an entry the server confirmed unchanged with a 304"""
+        ttl = self._lifetime(entry['endpoint'], headers)
+        if ttl is None:
+            self._remove(path)
+            return
+        entry = dict(entry, expires_at=time.time() + ttl)
+        entry['etag'] = headers.get('ETag') or entry.get('etag')
+        entry['last_modified'] = headers.get('Last-Modified') or entry.get('last_modified')
+        self._write(path, entry)
+
+    def invalidate(self, endpoint: str) -> None:
+        """Drop cached reads of the object an endpoint writes to and of its collection"""
+        path = urlparse(endpoint).path
+        for scope in {_scope(path), '/'.join(path.split('/')[:2])}:
+            for cached in self.directory.glob(f'response-{_digest(scope, 12)}-*.json'):
+                self._remove(cached)
+
+    def evict(self) -> List[Path]:
+        """Remove the least recently used files until the total fits max_bytes"""
+        files = []
+        for path in self.directory.glob('response-*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        removed = []
+        total = 0
+        # Most recently used first: keep files while they fit, evict everything older
+        for mtime, size, path in sorted(files, reverse=True):
+            if total + size > self.max_bytes:
+                self._remove(path)
+                removed.append(path)
+            else:
+                total += size
+        return removed
+
+    def _lifetime(self, endpoint: str, headers: Dict[str, str]) -> Optional[float]:
+        """Seconds a response stays fresh by its Cache-Control, else the endpoint's TTL; None for no-store"""
+        control = cache_control(headers.get('Cache-Control'))
+        if control['no_store']:
+            return None
+        if control['no_cache']:
+            return 0
+        return control['max_age'] if control['max_age'] is not None else self.ttl(endpoint)
+
+    def _write(self, path: Path, entry: Dict[str, Any]) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.response-')
+        except OSError:
+            # The cache is an optimization; a read-only home must not break commands
+            return
+        try:
+            with os.fdopen(handle, 'w') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            self._remove(Path(temp_path))
+            return
+        self.evict()
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
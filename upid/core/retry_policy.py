@@ -0,0 +1,188 @@
+"""
+Retry policy and circuit breaker for UPID API calls
+Retries transient failures with jittered exponential backoff and stops calling
+a host that keeps failing, counting both so throughput can be tuned
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_MAX_RETRY_AFTER = 120.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), None when absent or invalid"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(when - (time.time() if now is None else now), 0.0)
+
+
+class RetryPolicy:
+    """Which failures to retry and how long to wait before each attempt
+
+    Idempotent methods are retried on connection errors, timeouts and the
+    statuses in `statuses`. Other methods are retried only when the server
+    certainly did not act: a connect timeout or a 429. Waits use full jitter,
+    a uniform draw from [0, min(max_backoff, backoff * 2^attempt)], so many
+    clients do not retry in lockstep. A Retry-After header sets the minimum
+    wait, and when it asks for more than `max_retry_after` the call fails at
+    once instead.
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+                 statuses=RETRY_STATUSES, rng: Optional[random.Random] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = frozenset(statuses)
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+
+    def retries_status(self, method: str, status: int) -> bool:
+        """Whether a response status is worth another attempt of this method"""
+        if status not in self.statuses:
+            return False
+        return method.upper() in IDEMPOTENT_METHODS or status == 429
+
+    def retries_error(self, method: str, connect_timeout: bool) -> bool:
+        """Whether a transport error is worth another attempt of this method"""
+        return method.upper() in IDEMPOTENT_METHODS or connect_timeout
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` (0-based), or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        backoff = self.rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after consecutive failures, then lets one trial call through
+
+    While open, calls fail fast with CircuitOpenError. After `reset_timeout`
+    seconds a single trial call is allowed (half open). If it succeeds the
+    breaker closes; if it fails the breaker opens for another period.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self, host: str) -> None:
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+        raise CircuitOpenError(f'UPID API at {host} is failing; not calling it for another {max(remaining, 0):.0f}s')
+
+    def record_success(self) -> None:
+        """Close the breaker after a call the server answered"""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def release_trial(self) -> None:
+        """End a call that says nothing about the host, such as one cut short by a deadline, without counting it"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker at the threshold or when a trial call fails"""
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def status(self) -> Dict[str, Any]:
+        """State, consecutive failures and how often the breaker opened"""
+        return {'state': self.state, 'failures': self.failures, 'times_opened': self.times_opened}
+
+
+class RequestMetrics:
+    """Counters of calls, attempts, retries by reason and fail-fast rejections, safe across threads"""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.retry_wait = 0.0
+        self.retry_reasons: Dict[str, int] = {}
+        self.exhausted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def record(self, **counts) -> None:
+        """Add to counters by name, e.g. record(calls=1, attempts=1)"""
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_retry(self, reason: str, wait: float) -> None:
+        """Count one retry and the time spent waiting for it"""
+        with self._lock:
+            self.retries += 1
+            self.retry_wait += wait
+            self.retry_reasons[reason] = self.retry_reasons.get(reason, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counter values"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'retry_wait_seconds': round(self.retry_wait, 3),
+                'retry_reasons': dict(self.retry_reasons),
+                'exhausted': self.exhausted,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,196 @@
+"""
+Container right-sizing
+Compares usage percentiles of every container with its requests and limits
+as array operations and turns the gaps into per-workload recommendations
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .resource_table import ResourceTable
+
+HOURS_PER_MONTH = 730
+MEBIBYTE = 1024 ** 2
+GIBIBYTE = 1024 ** 3
+# On-demand price of a core-hour and a GiB-hour, close to general purpose cloud instances
+DEFAULT_CPU_PRICE = 0.0316
+DEFAULT_MEMORY_PRICE = 0.0042
+
+# Strategy -> (usage column the CPU request follows, the memory request follows, headroom)
+STRATEGIES = {
+    'conservative': ('cpu_p99', 'memory_peak', 0.30),
+    'balanced': ('cpu_p95', 'memory_p99', 0.15),
+    'aggressive': ('cpu_p90', 'memory_p95', 0.10),
+}
+MIN_CPU_REQUEST = 10
+MIN_MEMORY_REQUEST = 16 * MEBIBYTE
+
+USAGE_COLUMNS = (
+    'samples', 'cpu_p50', 'cpu_p90', 'cpu_p95', 'cpu_p99', 'cpu_peak',
+    'memory_p50', 'memory_p90', 'memory_p95', 'memory_p99', 'memory_peak',
+)
+
+# (namespace, workload, container)
+ContainerKey = Tuple[str, str, str]
+
+
+class ContainerUsage:
+    """Usage percentiles per container series as int64 columns (millicores and bytes)"""
+
+    def __init__(self, keys: List[ContainerKey], columns: Dict[str, np.ndarray]):
+        self.keys = keys
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'ContainerUsage':
+        """Build the columns from per-container dicts such as stored usage summaries"""
+        rows = list(rows)
+        keys = [(row['namespace'], row['workload'], row['container']) for row in rows]
+        columns = {
+            column: np.fromiter((row.get(column, 0) for row in rows), dtype=np.int64, count=len(rows))
+            for column in USAGE_COLUMNS
+        }
+        return cls(keys, columns)
+
+
+def _round_up(values: np.ndarray, step: int) -> np.ndarray:
+    """Round up to a multiple of `step`"""
+    return -(-values // step) * step
+
+
+def _scale(values: np.ndarray, factor: np.ndarray) -> np.ndarray:
+    """Integer values times a float factor, rounded up"""
+    return np.ceil(values * factor).astype(np.int64)
+
+
+class Rightsizing:
+    """Recommendations for every container that could be matched, as parallel columns
+
+    Columns hold current and recommended cpu/memory requests and limits,
+    replicas (containers seen in the pod list) and the monthly saving of
+    the change over all replicas, negative when a container needs more.
+    """
+
+    def __init__(self, keys: List[ContainerKey], columns: Dict[str, np.ndarray], changed: np.ndarray,
+                 unmatched: int, skipped: int):
+        self.keys = keys
+        self.columns = columns
+        self.changed = changed
+        self.unmatched = unmatched
+        self.skipped = skipped
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def totals(self) -> Dict[str, Any]:
+        """Counts and the summed effect of applying every change"""
+        changed = self.changed
+        columns = self.columns
+        return {
+            'containers': len(self),
+            'changes': int(changed.sum()),
+            'unmatched': self.unmatched,
+            'skipped': self.skipped,
+            'cpu_request_delta': int(((columns['cpu_recommended'] - columns['cpu_request'])
+                                      * columns['replicas'])[changed].sum()),
+            'memory_request_delta': int(((columns['memory_recommended'] - columns['memory_request'])
+                                         * columns['replicas'])[changed].sum()),
+            'monthly_savings': round(float(columns['monthly_savings'][changed].sum()), 2),
+        }
+
+    def rows(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Changed containers, largest saving first (containers needing more sort by the size of the gap)"""
+        indices = np.flatnonzero(self.changed)
+        order = indices[np.argsort(-np.abs(self.columns['monthly_savings'][indices]), kind='stable')][:limit]
+        rows = []
+        for index in order.tolist():
+            namespace, workload, container = self.keys[index]
+            row = {column: values[index].item() for column, values in self.columns.items()}
+            row.update(namespace=namespace, workload=workload, container=container,
+                       monthly_savings=round(row['monthly_savings'], 2))
+            rows.append(row)
+        return rows
+
+
+class RightsizingEngine:
+    """Per-container request and limit recommendations from usage percentiles
+
+    CPU requests follow a high usage percentile and memory requests a higher
+    one, since memory cannot be throttled, each plus headroom. Limits that
+    are set keep their ratio to the request, and memory limits never drop
+    below peak usage plus headroom. Containers with fewer than `min_samples`
+    samples are skipped, and changes within `tolerance` of the current
+    request are not worth a rollout.
+    """
+
+    def __init__(self, strategy: str = 'balanced', min_samples: int = 60, tolerance: float = 0.1,
+                 cpu_price: float = DEFAULT_CPU_PRICE, memory_price: float = DEFAULT_MEMORY_PRICE):
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown strategy: {strategy!r}')
+        self.strategy = strategy
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.cpu_price = cpu_price
+        self.memory_price = memory_price
+
+    def recommend(self, usage: ContainerUsage, table: ResourceTable) -> Rightsizing:
+        """Match usage series to the pods' containers and compute their recommendations"""
+        index, specs = table.by_container()
+        groups = np.fromiter(
+            (index.get((f'{namespace}/{workload}', container), -1) for namespace, workload, container in usage.keys),
+            dtype=np.int64, count=len(usage),
+        )
+        matched = groups >= 0
+        enough = usage.columns['samples'] >= self.min_samples
+        selected = np.flatnonzero(matched & enough)
+        groups = groups[selected]
+        current = {column: values[groups] for column, values in specs.items()}
+        used = {column: values[selected] for column, values in usage.columns.items()}
+
+        cpu_column, memory_column, headroom = STRATEGIES[self.strategy]
+        cpu = np.maximum(_scale(used[cpu_column], 1 + headroom), MIN_CPU_REQUEST)
+        memory = _round_up(np.maximum(_scale(used[memory_column], 1 + headroom), MIN_MEMORY_REQUEST), MEBIBYTE)
+
+        # Limits keep their ratio to the request; unset limits stay unset
+        cpu_request, memory_request = current['cpu_requests'], current['memory_requests']
+        cpu_ratio = np.where(cpu_request > 0, current['cpu_limits'] / np.maximum(cpu_request, 1), 1.0)
+        memory_ratio = np.where(memory_request > 0, current['memory_limits'] / np.maximum(memory_request, 1), 1.0)
+        cpu_limit = np.where(current['cpu_limits'] > 0, np.maximum(_scale(cpu, cpu_ratio), cpu), 0)
+        memory_floor = _round_up(_scale(used['memory_peak'], 1 + headroom), MEBIBYTE)
+        memory_limit = np.where(
+            current['memory_limits'] > 0,
+            _round_up(np.maximum(np.maximum(_scale(memory, memory_ratio), memory), memory_floor), MEBIBYTE), 0,
+        )
+
+        replicas = current['replicas']
+        monthly_savings = ((cpu_request - cpu) / 1000 * self.cpu_price
+                           + (memory_request - memory) / GIBIBYTE * self.memory_price) * HOURS_PER_MONTH * replicas
+        changed = ((np.abs(cpu - cpu_request) > self.tolerance * cpu_request)
+                   | (np.abs(memory - memory_request) > self.tolerance * memory_request))
+
+        columns = {
+            'replicas': replicas,
+            'samples': used['samples'],
+            'cpu_p50': used['cpu_p50'],
+            'cpu_p95': used['cpu_p95'],
+            'cpu_p99': used['cpu_p99'],
+            'memory_p50': used['memory_p50'],
+            'memory_p95': used['memory_p95'],
+            'memory_p99': used['memory_p99'],
+            'cpu_request': cpu_request,
+            'cpu_recommended': cpu,
+            'cpu_limit': current['cpu_limits'],
+            'cpu_limit_recommended': cpu_limit,
+            'memory_request': memory_request,
+            'memory_recommended': memory,
+            'memory_limit': current['memory_limits'],
+            'memory_limit_recommended': memory_limit,
+            'monthly_savings': monthly_savings,
+        }
+        keys = [usage.keys[index] for index in selected.tolist()]
+        return Rightsizing(keys, columns, changed, unmatched=int((~matched).sum()),
+                           skipped=int((matched & ~enough).sum()))
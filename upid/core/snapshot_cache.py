@@ -0,0 +1,120 @@
+"""
+On-disk cluster snapshot cache
+Lets back-to-back commands (status, analyze, optimize, report) reuse one
+cluster listing instead of fetching the whole cluster again
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+DEFAULT_CACHE_DIR = '~/.upid/cache'
+DEFAULT_TTL = 300
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Bump when the stored layout or the snapshot's item trimming changes
+CACHE_FORMAT = 2
+
+
+class SnapshotCache:
+    """Snapshot lists stored per kube context, with a TTL and a total size bound
+
+    Each context is one JSON file holding the list objects (items plus the
+    resourceVersion they were read at) and the outcomes of the detection
+    probes, so a fresh hit runs neither. Expired files are ignored and
+    removed, and the least recently written files are evicted whenever the
+    directory grows past max_bytes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(os.path.expanduser(directory))
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def path(self, context: str) -> Path:
+        """Cache file for a context (hashed, since context names may contain '/' or ':')"""
+        digest = hashlib.sha256(context.encode('utf-8')).hexdigest()[:24]
+        return self.directory / f'snapshot-{digest}.json'
+
+    def load(self, context: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Cached lists for a context, or None when missing, stale or unreadable"""
+        entry = self.load_entry(context)
+        return entry['lists'] if entry else None
+
+    def load_entry(self, context: str) -> Optional[Dict[str, Any]]:
+        """Cached 'lists' and 'probes' for a context, or None when missing, stale or unreadable"""
+        path = self.path(context)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (entry.get('format') != CACHE_FORMAT or entry.get('context') != context
+                or time.time() - entry.get('created_at', 0) > self.ttl):
+            self._remove(path)
+            return None
+        return {'lists': entry.get('lists') or {}, 'probes': entry.get('probes') or {}}
+
+    def store(self, context: str, lists: Dict[str, Dict[str, Any]],
+              probes: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Write a context's lists and probe outcomes atomically, then enforce the size bound"""
+        entry = {
+            'format': CACHE_FORMAT,
+            'context': context,
+            'created_at': time.time(),
+            'lists': lists,
+            'probes': probes or {},
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.snapshot-')
+        except OSError:
+            # The cache is an optimization; a read-only home must not break commands
+            return
+        try:
+            with os.fdopen(handle, 'w') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(temp_path, self.path(context))
+        except (OSError, TypeError, ValueError):
+            self._remove(Path(temp_path))
+            return
+        self.evict()
+
+    def invalidate(self, context: str) -> None:
+        """Drop a context's cached snapshot"""
+        self._remove(self.path(context))
+
+    def evict(self) -> List[Path]:
+        """Remove expired files, then the oldest ones until the total fits max_bytes"""
+        files = []
+        for path in self.directory.glob('snapshot-*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        removed = []
+        now = time.time()
+        total = 0
+        # Newest first: keep files while they fit, evict everything older
+        for mtime, size, path in sorted(files, reverse=True):
+            if now - mtime > self.ttl or total + size > self.max_bytes:
+                self._remove(path)
+                removed.append(path)
+            else:
+                total += size
+        return removed
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,663 @@
+"""
+On-disk usage time-series store
+Append-only, memory-mapped columnar storage of usage samples keyed by
+(cluster, namespace, workload, container), so collected history survives
+restarts and months of it can be range-scanned quickly
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STORE_DIR = '~/.upid/tsdb'
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_RAW_RETENTION_DAYS = 35
+SEGMENT_MS = 86400 * 1000
+
+# Rollup tier -> bucket width in milliseconds, finest first
+ROLLUP_TIERS = {'1m': 60 * 1000, '1h': 3600 * 1000, '1d': SEGMENT_MS}
+TIERS = ('raw',) + tuple(ROLLUP_TIERS)
+# Points per series a tier is chosen for when no resolution is asked for
+DEFAULT_POINTS = 168
+PERCENTILES = (50, 90, 95, 99)
+
+# Bump when the sealed segment layout changes
+STORE_FORMAT = 1
+
+# (namespace, workload, container)
+SeriesKey = Tuple[str, str, str]
+
+# One raw sample in a head segment, appended as-is
+RECORD = np.dtype([('time', '<i8'), ('series', '<u4'), ('cpu', '<i8'), ('memory', '<i8')])
+
+VALUE_COLUMNS = ('time', 'cpu', 'memory')
+METRICS = ('cpu', 'memory')
+ROLLUP_COLUMNS = ('time', 'count') + tuple(
+    f'{metric}_{field}' for metric in METRICS
+    for field in ('min', 'max', 'sum') + tuple(f'p{percentile}' for percentile in PERCENTILES)
+)
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    """Map signed deltas to unsigned so small magnitudes of either sign stay small"""
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _narrowest(values: np.ndarray) -> np.ndarray:
+    """Store unsigned values in the smallest integer type that holds them"""
+    largest = int(values.max()) if len(values) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if largest <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.uint64)
+
+
+def _encode(values: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Delta-encode a column within each series: (first value per series, zigzag deltas)"""
+    deltas = np.diff(values, prepend=values[:1] if len(values) else values)
+    deltas[starts] = 0
+    return values[starts], _narrowest(_zigzag(deltas))
+
+
+def _decode_into(out: np.ndarray, base: np.ndarray, deltas: np.ndarray, offsets: np.ndarray) -> None:
+    """Invert _encode() into a preallocated int64 slice
+
+    Decoding happens in place: the zigzag deltas are widened into `out`,
+    each series' first (zero) delta is replaced by the step from the
+    previous series' last value to its base, and one cumulative sum then
+    yields every value.
+    """
+    if not len(out):
+        return
+    out[:] = deltas
+    sign = out & 1
+    np.negative(sign, out=sign)
+    out >>= 1
+    out ^= sign
+    starts = offsets[:-1]
+    base = np.asarray(base, dtype=np.int64)
+    last = base + np.add.reduceat(out, starts)
+    out[starts] = base - np.concatenate(([0], last[:-1]))
+    np.cumsum(out, out=out)
+
+
+def _ranges(offsets: np.ndarray, groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row indices of the selected series groups and their new offsets"""
+    lengths = offsets[groups + 1] - offsets[groups]
+    new_offsets = np.concatenate(([0], np.cumsum(lengths)))
+    rows = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1] - offsets[groups], lengths)
+    return rows, new_offsets
+
+
+def _packed(groups: np.ndarray, values: np.ndarray) -> Optional[Tuple[np.ndarray, int]]:
+    """(group << bits | value, bits) when both fit one non-negative int64, so one sort orders by both"""
+    if not len(values) or values.min() < 0 or groups.min() < 0:
+        return None
+    bits = int(values.max()).bit_length()
+    if bits + int(groups.max()).bit_length() > 62:
+        return None
+    return (groups << bits) | values, bits
+
+
+def _sorted_within(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Values sorted by group, then value"""
+    packed = _packed(groups, values)
+    if packed is None:
+        return values[np.lexsort((values, groups))]
+    keys, bits = packed
+    keys.sort()
+    keys &= (1 << bits) - 1
+    return keys
+
+
+def _order_within(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Indices that sort by group, then value"""
+    packed = _packed(groups, values)
+    return np.lexsort((values, groups)) if packed is None else np.argsort(packed[0])
+
+
+def _rollup(series: np.ndarray, times: np.ndarray, cpu: np.ndarray, memory: np.ndarray,
+            width: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Roll rows sorted by series and time up into buckets `width` ms wide
+
+    Returns the series of every bucket and its ROLLUP_COLUMNS: bucket start
+    time, sample count, and min, max, sum and nearest-rank percentiles of
+    each metric.
+    """
+    buckets = times - times % width
+    change = np.ones(len(times), dtype=bool)
+    change[1:] = (series[1:] != series[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(change)
+    counts = np.diff(np.append(starts, len(times)))
+    groups = np.repeat(np.arange(len(starts)), counts)
+
+    columns = {'time': buckets[starts], 'count': counts}
+    for metric, values in (('cpu', cpu), ('memory', memory)):
+        ordered = _sorted_within(groups, values)
+        columns[f'{metric}_min'] = ordered[starts]
+        columns[f'{metric}_max'] = ordered[starts + counts - 1]
+        columns[f'{metric}_sum'] = np.add.reduceat(values, starts) if len(starts) else values[:0]
+        for percentile in PERCENTILES:
+            ranks = np.maximum(np.ceil(counts * (percentile / 100)).astype(np.int64), 1) - 1
+            columns[f'{metric}_p{percentile}'] = ordered[starts + ranks]
+    return series[starts], columns
+
+
+def _weighted_percentiles(series: np.ndarray, values: np.ndarray, weights: Optional[np.ndarray], size: int,
+                          percentiles: Tuple[int, ...] = PERCENTILES) -> Dict[int, np.ndarray]:
+    """Nearest-rank percentiles of the values of every series, each value counted `weights` times (default once)
+
+    All series are sorted at once; since the cumulative weight then grows
+    across the whole array, one searchsorted finds every series' rank.
+    Series without values get -1.
+    """
+    totals = np.bincount(series, weights=weights, minlength=size).astype(np.int64)
+    if weights is None:
+        values = _sorted_within(series, values)
+        cumulative = np.arange(1, len(values) + 1)
+    else:
+        order = _order_within(series, values)
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+    before = np.cumsum(totals) - totals
+    present = totals > 0
+
+    result = {}
+    for percentile in percentiles:
+        ranks = np.maximum(np.ceil(totals * (percentile / 100)).astype(np.int64), 1)
+        found = np.full(size, -1, dtype=np.int64)
+        found[present] = values[np.searchsorted(cumulative, (before + ranks)[present])]
+        result[percentile] = found
+    return result
+
+
+def _spans(series: np.ndarray, starts: np.ndarray, ends: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Earliest start and latest end time per series"""
+    first = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, series, starts)
+    last = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last, series, ends)
+    return first, last
+
+
+def _summaries(keys: List[SeriesKey], series: np.ndarray, counts: np.ndarray, spans: Tuple[np.ndarray, np.ndarray],
+               stats: Dict[str, Tuple[np.ndarray, np.ndarray, Dict[int, np.ndarray]]]) -> Dict[SeriesKey, Dict[str, Any]]:
+    """Per-series dicts from per-series (first, last) times and (sums, peaks, percentiles) of each metric"""
+    first, last = spans
+    summary = {}
+    for index in np.flatnonzero(counts).tolist():
+        count = int(counts[index])
+        entry: Dict[str, Any] = {'samples': count, 'first': int(first[index]), 'last': int(last[index])}
+        for metric, (sums, peaks, percentiles) in stats.items():
+            entry[f'{metric}_avg'] = float(sums[index]) / count
+            entry[f'{metric}_peak'] = int(peaks[index])
+            for percentile, values in percentiles.items():
+                entry[f'{metric}_p{percentile}'] = int(values[index])
+        summary[keys[index]] = entry
+    return summary
+
+
+def _columns(series: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Arrays storing columns of rows sorted by series: per-series ids and offsets plus encoded values"""
+    starts = np.flatnonzero(np.diff(series, prepend=-1))
+    arrays = {
+        'series': series[starts].astype(np.uint32),
+        'offsets': np.append(starts, len(series)).astype(np.int64),
+    }
+    for column, values in columns.items():
+        arrays[f'{column}_base'], arrays[f'{column}_delta'] = _encode(values.astype(np.int64), starts)
+    return arrays
+
+
+def _write_packed(path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    """Write several arrays to one file: a JSON index line, then their bytes back to back"""
+    index = {}
+    offset = 0
+    for name, array in arrays.items():
+        index[name] = [array.dtype.str, len(array), offset]
+        offset += array.nbytes
+    with open(path, 'wb') as f:
+        f.write(json.dumps(index).encode('utf-8') + b'\n')
+        for array in arrays.values():
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def _read_packed(path: Path) -> Dict[str, np.ndarray]:
+    """Arrays written by _write_packed(), as views of one read"""
+    with open(path, 'rb') as f:
+        index = json.loads(f.readline())
+        data = f.read()
+    return {name: np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            for name, (dtype, count, offset) in index.items()}
+
+
+class Scan:
+    """Samples of a time range as parallel columns
+
+    `series` indexes into `keys`; times are epoch milliseconds, cpu
+    millicores and memory bytes. Rows are grouped by segment and, within a
+    sealed segment, by series in time order.
+    """
+
+    def __init__(self, keys: List[SeriesKey], series: np.ndarray, times: np.ndarray,
+                 cpu: np.ndarray, memory: np.ndarray):
+        self.keys = keys
+        self.series = series
+        self.times = times
+        self.cpu = cpu
+        self.memory = memory
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def by_series(self) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(times, cpu, memory) per series key, each in time order"""
+        order = np.lexsort((self.times, self.series))
+        series = self.series[order]
+        bounds = np.flatnonzero(np.diff(series)) + 1
+        result = {}
+        for rows in np.split(order, bounds) if len(order) else []:
+            result[self.keys[self.series[rows[0]]]] = (self.times[rows], self.cpu[rows], self.memory[rows])
+        return result
+
+    def summarize(self) -> Dict[SeriesKey, Dict[str, Any]]:
+        """Sample count, first and last sample time, average, peak and exact percentiles of cpu/memory for every series present"""
+        size = len(self.keys)
+        series = self.series.astype(np.int64)
+        stats = {}
+        for metric, values in (('cpu', self.cpu), ('memory', self.memory)):
+            sums = np.zeros(size, dtype=np.int64)
+            np.add.at(sums, series, values)
+            peaks = np.full(size, -1, dtype=np.int64)
+            np.maximum.at(peaks, series, values)
+            stats[metric] = (sums, peaks, _weighted_percentiles(series, values, None, size))
+        times = self.times.astype(np.int64)
+        return _summaries(self.keys, series, np.bincount(series, minlength=size),
+                          _spans(series, times, times, size), stats)
+
+
+class Rollup:
+    """Rollup buckets of one tier over a time range as parallel columns
+
+    `series` indexes into `keys` and `columns` holds ROLLUP_COLUMNS, bucket
+    start times in epoch milliseconds.
+    """
+
+    def __init__(self, tier: str, keys: List[SeriesKey], series: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.tier = tier
+        self.keys = keys
+        self.series = series
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def summarize(self) -> Dict[SeriesKey, Dict[str, Any]]:
+        """Like Scan.summarize(); percentiles are approximated from the bucket percentiles
+
+        `last` is the end of the series' last bucket, so a span covers whole buckets.
+        """
+        size = len(self.keys)
+        series = self.series.astype(np.int64)
+        counts = np.zeros(size, dtype=np.int64)
+        np.add.at(counts, series, self.columns['count'])
+        stats = {}
+        for metric in METRICS:
+            sums = np.zeros(size, dtype=np.int64)
+            np.add.at(sums, series, self.columns[f'{metric}_sum'])
+            peaks = np.full(size, -1, dtype=np.int64)
+            np.maximum.at(peaks, series, self.columns[f'{metric}_max'])
+            # Each bucket's percentile stands in for its `count` samples
+            percentiles = {
+                percentile: _weighted_percentiles(series, self.columns[f'{metric}_p{percentile}'],
+                                                  self.columns['count'], size, (percentile,))[percentile]
+                for percentile in PERCENTILES
+            }
+            stats[metric] = (sums, peaks, percentiles)
+        starts = self.columns['time'].astype(np.int64)
+        return _summaries(self.keys, series, counts, _spans(series, starts, starts + ROLLUP_TIERS[self.tier], size), stats)
+
+
+class TimeSeriesStore:
+    """Append-only usage store, one directory per cluster
+
+    Samples are appended to a raw head file per UTC day. Once a day is over
+    its head is sealed: rows are sorted by series and time, and each column
+    is delta-encoded per series, zigzagged and stored at the narrowest
+    integer width as .npy files that are memory-mapped on read. Sealing also
+    rolls the day up into 1m, 1h and 1d tiers, encoded the same way but
+    packed into one file per tier since their arrays are small and many,
+    so long periods are answered from a few buckets per series instead of
+    every sample. Day segments are the time index; a range read only opens the
+    days it overlaps. Raw samples and the 1m tier are kept for
+    `raw_retention_days`, the coarser tiers for `retention_days`.
+    """
+
+    def __init__(self, directory: str = DEFAULT_STORE_DIR, retention_days: int = DEFAULT_RETENTION_DAYS,
+                 raw_retention_days: Optional[int] = None):
+        self.directory = Path(os.path.expanduser(directory))
+        self.retention_days = retention_days
+        if raw_retention_days is None:
+            raw_retention_days = min(DEFAULT_RAW_RETENTION_DAYS, retention_days)
+        self.retention = {'raw': raw_retention_days, '1m': raw_retention_days,
+                          '1h': retention_days, '1d': retention_days}
+        self._series: Dict[str, Dict[SeriesKey, int]] = {}
+
+    def cluster_dir(self, cluster: str) -> Path:
+        """Directory of a cluster (hashed, since context names may contain '/' or ':')"""
+        digest = hashlib.sha256(cluster.encode('utf-8')).hexdigest()[:24]
+        return self.directory / f'cluster-{digest}'
+
+    def clusters(self) -> List[str]:
+        """Names of the clusters with stored samples"""
+        names = []
+        for path in sorted(self.directory.glob('cluster-*/cluster.json')):
+            try:
+                names.append(json.loads(path.read_text())['name'])
+            except (OSError, ValueError, KeyError):
+                continue
+        return names
+
+    def series_keys(self, cluster: str) -> List[SeriesKey]:
+        """Every series of a cluster, indexed by series id"""
+        return list(self._load_series(cluster))
+
+    def _load_series(self, cluster: str) -> Dict[SeriesKey, int]:
+        series = self._series.get(cluster)
+        if series is None:
+            series = {}
+            path = self.cluster_dir(cluster) / 'series.jsonl'
+            if path.exists():
+                with open(path, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            series.setdefault(tuple(json.loads(line)), len(series))
+            self._series[cluster] = series
+        return series
+
+    def _series_ids(self, cluster: str, keys: List[SeriesKey]) -> np.ndarray:
+        """Ids of series keys, registering new ones in the append-only series file"""
+        series = self._load_series(cluster)
+        new = [key for key in dict.fromkeys(keys) if key not in series]
+        if new:
+            directory = self.cluster_dir(cluster)
+            directory.mkdir(parents=True, exist_ok=True)
+            if not (directory / 'cluster.json').exists():
+                (directory / 'cluster.json').write_text(json.dumps({'name': cluster}))
+            with open(directory / 'series.jsonl', 'a') as f:
+                f.write(''.join(json.dumps(list(key)) + '\n' for key in new))
+            for key in new:
+                series[key] = len(series)
+        return np.fromiter((series[key] for key in keys), dtype=np.uint32, count=len(keys))
+
+    def append(self, cluster: str, timestamp: float, keys: List[SeriesKey],
+               cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Append one sample (usage of every series present at `timestamp`)"""
+        ms = int(timestamp * 1000)
+        day = ms // SEGMENT_MS
+        self.seal(cluster, before_day=day)
+
+        records = np.empty(len(keys), dtype=RECORD)
+        records['time'] = ms
+        records['series'] = self._series_ids(cluster, keys)
+        records['cpu'] = cpu
+        records['memory'] = memory
+        directory = self.cluster_dir(cluster)
+        directory.mkdir(parents=True, exist_ok=True)
+        head = directory / f'head-{day:08d}.bin'
+        # Drop a partial record left by a torn write, so new records stay aligned
+        torn = head.stat().st_size % RECORD.itemsize if head.exists() else 0
+        if torn:
+            os.truncate(head, head.stat().st_size - torn)
+        with open(head, 'ab') as f:
+            f.write(records.tobytes())
+
+    def seal(self, cluster: str, before_day: Optional[int] = None) -> int:
+        """Seal the heads of days before `before_day` (default: today); returns how many were sealed"""
+        today = int(time.time() * 1000) // SEGMENT_MS
+        if before_day is None:
+            before_day = today
+        sealed = 0
+        for day, path in self._heads(cluster):
+            if day >= before_day:
+                continue
+            target = self.cluster_dir(cluster) / f'seg-{day:08d}'
+            if not target.exists():
+                self._write_segment(target, np.fromfile(path, dtype=RECORD))
+            os.remove(path)
+            sealed += 1
+        if sealed:
+            self.prune(cluster, min(before_day, today))
+        return sealed
+
+    def prune(self, cluster: str, today: int) -> None:
+        """Drop the tiers of every day older than their retention, and whole days older than all of them"""
+        for day, path in self._segments(cluster):
+            expired = [tier for tier in TIERS if day < today - self.retention[tier]]
+            if len(expired) == len(TIERS):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if 'raw' in expired and (path / 'offsets.npy').exists() and self._ensure_rollups(path):
+                for name in ['series.npy', 'offsets.npy'] + [f'{column}_{part}.npy' for column in VALUE_COLUMNS
+                                                              for part in ('base', 'delta')]:
+                    (path / name).unlink(missing_ok=True)
+            for tier in expired:
+                if tier != 'raw':
+                    (path / f'{tier}.bin').unlink(missing_ok=True)
+
+    def _write_rollup(self, directory: Path, tier: str, series: np.ndarray, times: np.ndarray,
+                      cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Roll sorted raw rows up into one tier's file under `directory`"""
+        _write_packed(directory / f'{tier}.bin', _columns(*_rollup(series, times, cpu, memory, ROLLUP_TIERS[tier])))
+
+    def _write_segment(self, target: Path, records: np.ndarray) -> None:
+        """Sort a day's records by series and time, encode and roll up each column and publish atomically"""
+        records = records[np.lexsort((records['time'], records['series']))]
+        series = records['series'].astype(np.int64)
+        times, cpu, memory = (records[column].astype(np.int64) for column in VALUE_COLUMNS)
+
+        temp = Path(tempfile.mkdtemp(dir=target.parent, prefix='.seg-'))
+        try:
+            for name, array in _columns(series, {'time': times, 'cpu': cpu, 'memory': memory}).items():
+                np.save(temp / f'{name}.npy', array)
+            for tier in ROLLUP_TIERS:
+                self._write_rollup(temp, tier, series, times, cpu, memory)
+            (temp / 'meta.json').write_text(json.dumps({
+                'format': STORE_FORMAT,
+                'rows': int(len(records)),
+                'start': int(times.min()) if len(records) else None,
+                'end': int(times.max()) if len(records) else None,
+            }))
+            os.replace(temp, target)
+        except BaseException:
+            shutil.rmtree(temp, ignore_errors=True)
+            raise
+
+    def _ensure_rollups(self, path: Path) -> bool:
+        """Roll up a segment sealed before it had some tier; False when its raw rows are gone"""
+        missing = [tier for tier in ROLLUP_TIERS if not (path / f'{tier}.bin').exists()]
+        if not missing:
+            return True
+        if not (path / 'offsets.npy').exists():
+            return False
+        offsets = np.load(path / 'offsets.npy')
+        columns = tuple(np.empty(offsets[-1], dtype=np.int64) for _ in range(4))
+        self._read_columns(self._raw_loader(path), offsets, np.arange(len(offsets) - 1), VALUE_COLUMNS, columns)
+        for tier in missing:
+            temp = Path(tempfile.mkdtemp(dir=path, prefix=f'.{tier}-'))
+            try:
+                self._write_rollup(temp, tier, *columns)
+                os.replace(temp / f'{tier}.bin', path / f'{tier}.bin')
+            finally:
+                shutil.rmtree(temp, ignore_errors=True)
+        return True
+
+    @staticmethod
+    def _raw_loader(path: Path):
+        """Loads a raw segment's arrays by name, memory-mapped"""
+        return lambda name: np.load(path / f'{name}.npy', mmap_mode='r')
+
+    def _heads(self, cluster: str) -> List[Tuple[int, Path]]:
+        return sorted((int(path.stem[5:]), path) for path in self.cluster_dir(cluster).glob('head-*.bin'))
+
+    def _segments(self, cluster: str) -> List[Tuple[int, Path]]:
+        return sorted((int(path.name[4:]), path) for path in self.cluster_dir(cluster).glob('seg-*') if path.is_dir())
+
+    def choose_tier(self, period: float, resolution: Optional[float] = None) -> str:
+        """Coarsest tier whose buckets are no wider than `resolution` seconds and that still covers `period`
+
+        The resolution defaults to DEFAULT_POINTS buckets over the period.
+        When no tier that fine is retained that long, the finest one that
+        is retained is used instead.
+        """
+        resolution_ms = (period / DEFAULT_POINTS if resolution is None else resolution) * 1000
+        covering = [tier for tier in TIERS if self.retention[tier] * 86400 >= period] or [TIERS[-1]]
+        fine_enough = [tier for tier in covering if ROLLUP_TIERS.get(tier, 0) <= resolution_ms]
+        return fine_enough[-1] if fine_enough else covering[0]
+
+    def _plan(self, cluster: str, start_ms: int, end_ms: int, series: Optional[np.ndarray],
+              tier: str) -> List[Tuple[str, Any, Any, int]]:
+        """Segments and heads overlapping a range: (kind, array loader or path, selection, rows)"""
+        first_day, last_day = start_ms // SEGMENT_MS, (end_ms - 1) // SEGMENT_MS
+        plan: List[Tuple[str, Any, Any, int]] = []
+        sealed = set()
+        for day, path in self._segments(cluster):
+            if not first_day <= day <= last_day:
+                continue
+            sealed.add(day)
+            meta = json.loads((path / 'meta.json').read_text())
+            if meta.get('format') != STORE_FORMAT or not meta['rows']:
+                continue
+            if tier == 'raw':
+                if not (path / 'offsets.npy').exists():
+                    continue
+                load = self._raw_loader(path)
+            elif (path / f'{tier}.bin').exists() or self._ensure_rollups(path):
+                load = _read_packed(path / f'{tier}.bin').__getitem__
+            else:
+                continue
+            offsets = np.asarray(load('offsets'))
+            groups = np.arange(len(offsets) - 1)
+            if series is not None:
+                groups = np.flatnonzero(np.isin(load('series'), series))
+            rows = int((offsets[groups + 1] - offsets[groups]).sum())
+            if rows:
+                plan.append(('segment', load, (offsets, groups), rows))
+        for day, path in self._heads(cluster):
+            # Whole records only; a crash can leave a partial one at the end
+            count = path.stat().st_size // RECORD.itemsize
+            if first_day <= day <= last_day and day not in sealed and count:
+                records = np.memmap(path, dtype=RECORD, mode='r', shape=(count,))
+                if series is not None:
+                    records = records[np.isin(records['series'], series)]
+                if tier != 'raw' and len(records):
+                    # The open day is rolled up on the fly
+                    records = records[np.lexsort((records['time'], records['series']))]
+                    records = _rollup(records['series'].astype(np.int64),
+                                      *(records[column].astype(np.int64) for column in VALUE_COLUMNS),
+                                      ROLLUP_TIERS[tier])
+                    records = dict(records[1], series=records[0])
+                if len(records['series']):
+                    plan.append(('head', path, records, len(records['series'])))
+        return plan
+
+    def _read_columns(self, load, offsets: np.ndarray, groups: np.ndarray,
+                      names: Tuple[str, ...], out: Tuple[np.ndarray, ...]) -> None:
+        """Decode the selected series of a sealed segment or tier into (series, *names) slices"""
+        everything = len(groups) == len(offsets) - 1
+        if everything:
+            rows, selected = slice(None), offsets
+        else:
+            rows, selected = _ranges(offsets, groups)
+        lengths = np.diff(selected)
+        out[0][:] = np.repeat(load('series')[groups], lengths)
+        for column, target in zip(names, out[1:]):
+            base = load(f'{column}_base')[groups]
+            deltas = load(f'{column}_delta')[rows]
+            _decode_into(target, base, deltas, selected)
+
+    def _read(self, cluster: str, start: float, end: float, series: Optional[List[int]],
+              tier: str) -> Dict[str, np.ndarray]:
+        """Columns of a tier over a time range, allocated once and decoded straight into place
+
+        Raw rows are kept when start <= time < end, rollup buckets when they
+        overlap the range; only the first and last day need that filter.
+        """
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        names = VALUE_COLUMNS if tier == 'raw' else ROLLUP_COLUMNS
+        selection = np.asarray(series, dtype=np.int64) if series is not None else None
+        plan = self._plan(cluster, start_ms, end_ms, selection, tier)
+        total = sum(rows for _, _, _, rows in plan)
+        columns = tuple(np.empty(total, dtype=np.int64) for _ in range(len(names) + 1))
+
+        position = 0
+        for kind, source, selected, rows in plan:
+            out = tuple(column[position:position + rows] for column in columns)
+            if kind == 'segment':
+                self._read_columns(source, *selected, names, out)
+            else:
+                for target, field in zip(out, ('series',) + names):
+                    target[:] = selected[field]
+            position += rows
+
+        result = dict(zip(('series',) + names, columns))
+        first_day, last_day = start_ms // SEGMENT_MS, (end_ms - 1) // SEGMENT_MS
+        if start_ms != first_day * SEGMENT_MS or end_ms != (last_day + 1) * SEGMENT_MS:
+            lowest = start_ms - max(ROLLUP_TIERS.get(tier, 1), 1) + 1
+            inside = (result['time'] >= lowest) & (result['time'] < end_ms)
+            if not inside.all():
+                result = {name: values[inside] for name, values in result.items()}
+        return result
+
+    def scan(self, cluster: str, start: float, end: float, series: Optional[List[int]] = None) -> Scan:
+        """Every raw sample with start <= time < end (epoch seconds), optionally of some series ids only"""
+        columns = self._read(cluster, start, end, series, 'raw')
+        return Scan(self.series_keys(cluster), columns['series'], columns['time'], columns['cpu'], columns['memory'])
+
+    def rollup(self, cluster: str, start: float, end: float, tier: str, series: Optional[List[int]] = None) -> Rollup:
+        """Buckets of a rollup tier ('1m', '1h' or '1d') overlapping a time range"""
+        if tier not in ROLLUP_TIERS:
+            raise ValueError(f'Unknown rollup tier: {tier!r}')
+        columns = self._read(cluster, start, end, series, tier)
+        return Rollup(tier, self.series_keys(cluster), columns.pop('series'), columns)
+
+    def read(self, cluster: str, start: float, end: float, tier: str, series: Optional[List[int]] = None):
+        """Raw scan or rollup of a time range, whichever `tier` names; both can summarize()"""
+        if tier == 'raw':
+            return self.scan(cluster, start, end, series)
+        return self.rollup(cluster, start, end, tier, series)
+
+    def query(self, cluster: str, start: float, end: float, namespace: Optional[str] = None,
+              workload: Optional[str] = None, container: Optional[str] = None
+              ) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Raw samples per series in a time range, optionally filtered by key parts"""
+        return self.scan(cluster, start, end, series=self.select(cluster, namespace, workload, container)).by_series()
+
+    def select(self, cluster: str, namespace: Optional[str] = None, workload: Optional[str] = None,
+               container: Optional[str] = None) -> Optional[List[int]]:
+        """Ids of the series matching the given key parts; None when nothing is filtered"""
+        if namespace is None and workload is None and container is None:
+            return None
+        return [
+            index for index, key in enumerate(self.series_keys(cluster))
+            if (namespace is None or key[0] == namespace) and (workload is None or key[1] == workload)
+            and (container is None or key[2] == container)
+        ]
+
+    def stats(self, cluster: str) -> Dict[str, Any]:
+        """Series count, segment count and bytes on disk"""
+        directory = self.cluster_dir(cluster)
+        size = sum(path.stat().st_size for path in directory.rglob('*') if path.is_file()) if directory.exists() else 0
+        return {
+            'series': len(self._load_series(cluster)),
+            'segments': len(self._segments(cluster)),
+            'heads': len(self._heads(cluster)),
+            'bytes': size,
+        }
@@ -0,0 +1,294 @@
+"""
+Usage history
+Fixed-size ring buffers of usage samples per container and per node, backed
+by preallocated arrays so memory stays bounded however long sampling runs
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .usage_metrics import UsageTable
+
+DEFAULT_HISTORY_DIR = '~/.upid/usage'
+DEFAULT_CAPACITY = 5760
+DEFAULT_MAX_SERIES = 5000
+
+# Bump when the saved array layout changes
+HISTORY_FORMAT = 2
+
+INT32_MAX = np.iinfo(np.int32).max
+
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d|w)?\s*$')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, None: 1}
+
+
+def parse_duration(value: str) -> float:
+    """Seconds in a duration such as '15s', '5m', '24h', '7d' or a bare number of seconds"""
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f'Invalid duration: {value!r}')
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+class UsageRingBuffer:
+    """The last `capacity` samples of many series on one shared sample clock
+
+    Each series (a container or node) owns one row of the cpu/memory arrays
+    and every sample writes one column, wrapping around once the buffer is
+    full. Rows are allocated in blocks, each a full `capacity` wide, up to
+    `max_series`; after that the series seen least recently is evicted.
+    Samples in which a series was absent hold MISSING.
+
+    Cells are 4 bytes: cpu millicores as int32 (clamped), memory as int32
+    right-shifted by a per-row `memory_shift` that grows, rescaling the row,
+    the first time a value above 2 GiB arrives, so memory is exact below
+    that and rounded up to 2**shift bytes above it.
+    """
+
+    MISSING = -1
+    GROWTH_BLOCK = 256
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_series: int = DEFAULT_MAX_SERIES):
+        if capacity <= 0 or max_series <= 0:
+            raise ValueError('capacity and max_series must be positive')
+        self.capacity = capacity
+        self.max_series = max_series
+        self.samples = 0
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.keys: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.memory_shift = np.zeros(0, dtype=np.int64)
+        self.cpu = np.full((0, capacity), self.MISSING, dtype=np.int32)
+        self.memory = np.full((0, capacity), self.MISSING, dtype=np.int32)
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        """Number of samples currently held"""
+        return min(self.samples, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the sample arrays"""
+        return (self.times.nbytes + self.last_seen.nbytes + self.memory_shift.nbytes
+                + self.cpu.nbytes + self.memory.nbytes)
+
+    @property
+    def max_nbytes(self) -> int:
+        """Bytes the sample arrays reach once `max_series` rows are allocated"""
+        row = self.capacity * (self.cpu.itemsize + self.memory.itemsize) + self.last_seen.itemsize + self.memory_shift.itemsize
+        return self.times.nbytes + self.max_series * row
+
+    def append(self, timestamp: float, keys: List[str], cpu: np.ndarray, memory: np.ndarray) -> None:
+        """Write one sample: usage of every series present at `timestamp`"""
+        column = self.samples % self.capacity
+        self.times[column] = timestamp
+        self.cpu[:, column] = self.MISSING
+        self.memory[:, column] = self.MISSING
+
+        rows = np.fromiter((self._row(key) for key in keys), dtype=np.int64, count=len(keys))
+        kept = rows >= 0
+        rows = rows[kept]
+        memory = np.asarray(memory, dtype=np.int64)[kept]
+        for row, value in zip(rows[memory > INT32_MAX].tolist(), memory[memory > INT32_MAX].tolist()):
+            self._rescale(row, value.bit_length() - 31)
+        shift = self.memory_shift[rows]
+        self.cpu[rows, column] = np.minimum(np.asarray(cpu, dtype=np.int64)[kept], INT32_MAX)
+        # Round up so peaks never understate; rounding up can reach exactly 2**31, hence the clamp
+        self.memory[rows, column] = np.minimum(-(-memory >> shift), INT32_MAX)
+        self.last_seen[rows] = self.samples
+        self.samples += 1
+
+    def _row(self, key: str) -> int:
+        """Row of a series, allocating or evicting one for a new key; -1 when none is free"""
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        if len(self.keys) < self.max_series:
+            row = len(self.keys)
+            if row >= len(self.last_seen):
+                self._grow()
+            self.keys.append(key)
+        else:
+            # Evict the series seen least recently, unless every row is already in this sample
+            row = int(np.argmin(self.last_seen))
+            if self.last_seen[row] >= self.samples:
+                return -1
+            del self.index[self.keys[row]]
+            self.keys[row] = key
+            self.cpu[row] = self.MISSING
+            self.memory[row] = self.MISSING
+            self.memory_shift[row] = 0
+            self.evicted += 1
+        self.index[key] = row
+        self.last_seen[row] = self.samples
+        return row
+
+    def _rescale(self, row: int, shift: int) -> None:
+        """Widen a row's memory shift to at least `shift`, rounding its held values up"""
+        extra = shift - int(self.memory_shift[row])
+        if extra <= 0:
+            return
+        values = self.memory[row]
+        present = values != self.MISSING
+        values[present] = -(-values[present] >> extra)
+        self.memory_shift[row] = shift
+
+    def _memory_bytes(self, values: np.ndarray, shift: np.ndarray) -> np.ndarray:
+        """Stored memory cells as int64 bytes, MISSING kept"""
+        values = values.astype(np.int64)
+        return np.where(values == self.MISSING, self.MISSING, values << shift)
+
+    def _grow(self) -> None:
+        rows = min(self.max_series, max(self.GROWTH_BLOCK, 2 * len(self.last_seen)))
+        extra = rows - len(self.last_seen)
+        self.last_seen = np.concatenate([self.last_seen, np.zeros(extra, dtype=np.int64)])
+        self.memory_shift = np.concatenate([self.memory_shift, np.zeros(extra, dtype=np.int64)])
+        self.cpu = np.vstack([self.cpu, np.full((extra, self.capacity), self.MISSING, dtype=np.int32)])
+        self.memory = np.vstack([self.memory, np.full((extra, self.capacity), self.MISSING, dtype=np.int32)])
+
+    def order(self) -> np.ndarray:
+        """Column indices of the held samples, oldest first"""
+        if self.samples <= self.capacity:
+            return np.arange(self.samples)
+        start = self.samples % self.capacity
+        return np.concatenate([np.arange(start, self.capacity), np.arange(start)])
+
+    def series(self, key: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamps, cpu millicores, memory bytes) of one series, oldest first, missing samples dropped"""
+        row = self.index[key]
+        order = self.order()
+        cpu = self.cpu[row, order].astype(np.int64)
+        present = cpu != self.MISSING
+        memory = self._memory_bytes(self.memory[row, order], self.memory_shift[row])
+        return self.times[order][present], cpu[present], memory[present]
+
+    def totals(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamps, cpu, memory) summed over all series per sample, oldest first"""
+        order = self.order()
+        rows = len(self.keys)
+        cpu = self.cpu[:rows][:, order]
+        memory = self._memory_bytes(self.memory[:rows][:, order], self.memory_shift[:rows, None])
+        return (self.times[order], np.where(cpu == self.MISSING, 0, cpu).sum(axis=0, dtype=np.int64),
+                np.where(memory == self.MISSING, 0, memory).sum(axis=0))
+
+    def peaks(self) -> Dict[str, Dict[str, int]]:
+        """Highest cpu and memory sample of every series"""
+        rows = len(self.keys)
+        cpu = self.cpu[:rows].max(axis=1, initial=self.MISSING).tolist()
+        memory = self._memory_bytes(self.memory[:rows].max(axis=1, initial=self.MISSING),
+                                    self.memory_shift[:rows]).tolist()
+        return {key: {'cpu': cpu[row], 'memory': memory[row]} for row, key in enumerate(self.keys)}
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """Arrays (trimmed to the allocated series) for saving"""
+        rows = len(self.keys)
+        return {
+            f'{prefix}_meta': np.array([self.capacity, self.max_series, self.samples, self.evicted], dtype=np.int64),
+            f'{prefix}_times': self.times,
+            f'{prefix}_keys': np.array(self.keys, dtype=str),
+            f'{prefix}_last_seen': self.last_seen[:rows],
+            f'{prefix}_memory_shift': self.memory_shift[:rows],
+            f'{prefix}_cpu': self.cpu[:rows],
+            f'{prefix}_memory': self.memory[:rows],
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> 'UsageRingBuffer':
+        """Rebuild a buffer saved with to_arrays()"""
+        capacity, max_series, samples, evicted = arrays[f'{prefix}_meta'].tolist()
+        buffer = cls(capacity, max_series)
+        buffer.samples = samples
+        buffer.evicted = evicted
+        buffer.times = arrays[f'{prefix}_times']
+        buffer.keys = arrays[f'{prefix}_keys'].tolist()
+        buffer.index = {key: row for row, key in enumerate(buffer.keys)}
+        buffer.last_seen = arrays[f'{prefix}_last_seen']
+        buffer.memory_shift = arrays[f'{prefix}_memory_shift']
+        buffer.cpu = arrays[f'{prefix}_cpu']
+        buffer.memory = arrays[f'{prefix}_memory']
+        return buffer
+
+
+class UsageHistory:
+    """Container and node usage buffers for one cluster"""
+
+    def __init__(self, context: str, interval: float, capacity: int = DEFAULT_CAPACITY,
+                 max_series: int = DEFAULT_MAX_SERIES):
+        self.context = context
+        self.interval = interval
+        self.containers = UsageRingBuffer(capacity, max_series)
+        self.nodes = UsageRingBuffer(capacity, max_series)
+
+    def record(self, timestamp: float, pods: UsageTable, nodes: UsageTable) -> None:
+        """Append one sample of pod (per container) and node usage"""
+        pod_labels = pods.labels.get('pod', [])
+        keys = [f'{pod_labels[code]}/{name}' for code, name in zip(pods.codes['pod'].tolist(), pods.names)]
+        self.containers.append(timestamp, keys, pods.columns['cpu_usage'], pods.columns['memory_usage'])
+        self.nodes.append(timestamp, nodes.names, nodes.columns['cpu_usage'], nodes.columns['memory_usage'])
+
+    def summary(self) -> Dict[str, Any]:
+        """Sample count, covered time span and tracked series"""
+        times = self.containers.times[self.containers.order()]
+        return {
+            'context': self.context,
+            'interval': self.interval,
+            'samples': len(self.containers),
+            'start': float(times[0]) if len(times) else None,
+            'end': float(times[-1]) if len(times) else None,
+            'containers': len(self.containers.keys),
+            'nodes': len(self.nodes.keys),
+            'bytes': self.containers.nbytes + self.nodes.nbytes,
+        }
+
+    @property
+    def max_nbytes(self) -> int:
+        """Worst-case bytes of both buffers, reached once each tracks `max_series` series"""
+        return self.containers.max_nbytes + self.nodes.max_nbytes
+
+    @staticmethod
+    def path(context: str, directory: str = DEFAULT_HISTORY_DIR) -> Path:
+        """History file for a context (hashed, since context names may contain '/' or ':')"""
+        digest = hashlib.sha256(context.encode('utf-8')).hexdigest()[:24]
+        return Path(os.path.expanduser(directory)) / f'usage-{digest}.npz'
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the buffers atomically so readers never see a partial file"""
+        path = Path(path) if path else self.path(self.context)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = {'format': HISTORY_FORMAT, 'context': self.context, 'interval': self.interval, 'saved_at': time.time()}
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.usage-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, header=np.array(json.dumps(header)),
+                         **self.containers.to_arrays('containers'), **self.nodes.to_arrays('nodes'))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['UsageHistory']:
+        """History saved by save(), or None when missing or unreadable"""
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            header = json.loads(str(arrays['header']))
+        except (OSError, ValueError, KeyError):
+            return None
+        if header.get('format') != HISTORY_FORMAT:
+            return None
+        history = cls(header['context'], header['interval'])
+        history.containers = UsageRingBuffer.from_arrays(arrays, 'containers')
+        history.nodes = UsageRingBuffer.from_arrays(arrays, 'nodes')
+        return history
@@ -0,0 +1,161 @@
+"""
+Current resource usage from the metrics.k8s.io API
+NodeMetrics and PodMetrics are listed like any other kind (one paged request
+per kind) and held as integer columns, one row per node or container
+"""
+
+from typing import Dict, Any, Iterable, List
+
+import numpy as np
+
+from .cluster_backend import METRICS_API
+from .cluster_snapshot import ClusterSnapshot
+from .quantity import millicores_or_zero, bytes_or_zero
+from .resource_table import _group_sum
+
+USAGE_COLUMNS = ('cpu_usage', 'memory_usage')
+
+
+def _trim_metrics(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields of a NodeMetrics/PodMetrics item that are aggregated"""
+    metadata = item.get('metadata', {})
+    trimmed = {
+        'metadata': {'name': metadata.get('name'), 'namespace': metadata.get('namespace')},
+        'timestamp': item.get('timestamp'),
+        'window': item.get('window'),
+    }
+    if 'containers' in item:
+        trimmed['containers'] = [
+            {'name': container.get('name'), 'usage': container.get('usage', {})}
+            for container in item.get('containers') or []
+        ]
+    else:
+        trimmed['usage'] = item.get('usage', {})
+    return trimmed
+
+
+class UsageSnapshot(ClusterSnapshot):
+    """Read-once view of node and pod usage
+
+    Scoped like the cluster snapshot: pod metrics are listed from the
+    snapshot's namespace and filtered by its label selector. Field selectors
+    only apply to pods, so they are not sent here.
+    """
+
+    KINDS = {
+        'node_metrics': f'{METRICS_API}/nodes',
+        'pod_metrics': f'{METRICS_API}/pods',
+    }
+    NAMESPACED = {'pod_metrics'}
+    TRANSFORMS = {
+        'node_metrics': _trim_metrics,
+        'pod_metrics': _trim_metrics,
+    }
+
+    def _selector_params(self, kind: str) -> Dict[str, Any]:
+        """Label selector for pod metrics"""
+        if kind == 'pod_metrics' and self.label_selector:
+            return {'labelSelector': self.label_selector}
+        return {}
+
+    def table(self, kind: str) -> 'UsageTable':
+        """Usage of 'nodes' or 'pods' as columns"""
+        if kind == 'nodes':
+            return UsageTable.from_node_metrics(self.items('node_metrics'))
+        return UsageTable.from_pod_metrics(self.items('pod_metrics'))
+
+
+class UsageTable:
+    """One row per node (node metrics) or per container (pod metrics)
+
+    `cpu_usage` holds exact millicores and `memory_usage` exact bytes
+    (int64). Rows are grouped by 'node', or by 'namespace' and 'pod'
+    ("namespace/name"); `names` holds each row's node or container name.
+    """
+
+    def __init__(self, labels: Dict[str, List[str]], codes: Dict[str, np.ndarray],
+                 names: List[str], columns: Dict[str, np.ndarray]):
+        self.labels = labels
+        self.codes = codes
+        self.names = names
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_node_metrics(cls, items: Iterable[Dict[str, Any]]) -> 'UsageTable':
+        """Build the table from NodeMetrics items"""
+        names: List[str] = []
+        cpu: List[int] = []
+        memory: List[int] = []
+        for item in items:
+            usage = item.get('usage') or {}
+            names.append((item.get('metadata') or {}).get('name') or '')
+            cpu.append(millicores_or_zero(usage.get('cpu') or '0'))
+            memory.append(bytes_or_zero(usage.get('memory') or '0'))
+        return cls(
+            {'node': list(names)},
+            {'node': np.arange(len(names), dtype=np.int64)},
+            names,
+            {'cpu_usage': np.array(cpu, dtype=np.int64), 'memory_usage': np.array(memory, dtype=np.int64)},
+        )
+
+    @classmethod
+    def from_pod_metrics(cls, items: Iterable[Dict[str, Any]]) -> 'UsageTable':
+        """Build the table from PodMetrics items, one row per container"""
+        namespaces: Dict[str, int] = {}
+        pods: List[str] = []
+        namespace_codes: List[int] = []
+        pod_codes: List[int] = []
+        names: List[str] = []
+        cpu: List[int] = []
+        memory: List[int] = []
+        for item in items:
+            metadata = item.get('metadata') or {}
+            namespace = metadata.get('namespace') or ''
+            namespace_code = namespaces.setdefault(namespace, len(namespaces))
+            pod_code = len(pods)
+            pods.append(f"{namespace}/{metadata.get('name') or ''}")
+            for container in item.get('containers') or ():
+                usage = container.get('usage') or {}
+                namespace_codes.append(namespace_code)
+                pod_codes.append(pod_code)
+                names.append(container.get('name') or '')
+                cpu.append(millicores_or_zero(usage.get('cpu') or '0'))
+                memory.append(bytes_or_zero(usage.get('memory') or '0'))
+        return cls(
+            {'namespace': list(namespaces), 'pod': pods},
+            {'namespace': np.array(namespace_codes, dtype=np.int64), 'pod': np.array(pod_codes, dtype=np.int64)},
+            names,
+            {'cpu_usage': np.array(cpu, dtype=np.int64), 'memory_usage': np.array(memory, dtype=np.int64)},
+        )
+
+    def totals(self) -> Dict[str, Any]:
+        """Sums of the usage columns"""
+        totals = {column: values.sum().item() for column, values in self.columns.items()}
+        totals['rows'] = len(self)
+        return totals
+
+    def group_by(self, key: str) -> Dict[str, Dict[str, Any]]:
+        """Usage sums and row counts per node, namespace or pod"""
+        codes = self.codes[key]
+        size = len(self.labels[key])
+        sums = {column: _group_sum(codes, values, size) for column, values in self.columns.items()}
+        counts = np.bincount(codes, minlength=size)
+
+        groups = {}
+        for index, label in enumerate(self.labels[key]):
+            group = {column: sums[column][index].item() for column in USAGE_COLUMNS}
+            group['containers'] = int(counts[index])
+            groups[label] = group
+        return groups
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Per-row usage as plain dicts"""
+        cpu = self.columns['cpu_usage'].tolist()
+        memory = self.columns['memory_usage'].tolist()
+        return [
+            {'name': name, 'cpu_usage': cpu[index], 'memory_usage': memory[index]}
+            for index, name in enumerate(self.names)
+        ]
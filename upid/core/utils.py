@@ -5,7 +5,7 @@ Utility functions for UPID CLI
 import os
 import json
 import yaml
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta
 from rich.console import Console
 from rich.table import Table
@@ -70,6 +70,30 @@ def print_table(data: List[Dict[str, Any]], title: str = "Data") -> None:
     
     console.print(table)
 
+def stream_items(pages: Iterable[List[Dict[str, Any]]], format: str,
+                 columns: List[Tuple[str, int, Callable[[Dict[str, Any]], Any]]]) -> int:
+    """Print items as their pages arrive and return how many were printed
+
+    Tables become aligned lines under one header, using (header, width,
+    value) columns; json becomes JSON Lines and yaml one document per item.
+    Nothing is printed for an empty list.
+    """
+    count = 0
+    for items in pages:
+        for item in items:
+            if format == 'table':
+                if count == 0:
+                    console.out(' '.join(f"{header:<{width}}" for header, width, _ in columns).rstrip(),
+                                style="bold", highlight=False)
+                console.out(' '.join(f"{str(value(item)):<{width}.{width}}" for _, width, value in columns).rstrip(),
+                            highlight=False)
+            elif format == 'json':
+                console.out(json.dumps(item, separators=(',', ':')), highlight=False)
+            else:
+                console.out('---\n' + yaml.dump(item, default_flow_style=False).rstrip(), highlight=False)
+            count += 1
+    return count
+
 def show_progress(description: str):
     """Show progress spinner"""
     return Progress(
@@ -0,0 +1,141 @@
+"""
+Informer-style watch cache
+Lists each kind once, then keeps it current from watch events so repeated
+reads in a long-running session cost O(changes) instead of O(cluster size)
+"""
+
+import threading
+from typing import Dict, Any, Optional
+from .cluster_snapshot import ClusterSnapshot
+from .json_stream import iter_watch_events
+from .probe_engine import ProbeResult
+
+
+class _WatchInterrupted(Exception):
+    """Raised inside a watch stream to end it early (expired version or stop())"""
+
+
+class WatchingSnapshot(ClusterSnapshot):
+    """ClusterSnapshot whose kinds stay current through background watches
+
+    The first read of a kind lists it as usual and records the list's
+    resourceVersion; a daemon thread then watches from that version with
+    bookmarks enabled and applies ADDED/MODIFIED/DELETED events to an
+    in-memory store keyed by uid. A 410 Gone relists the kind.
+    """
+
+    RETRY_DELAY = 5
+
+    def __init__(self, *args, watch_timeout: float = 300, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.watch_timeout = watch_timeout
+        self.events: Dict[str, int] = {}
+        self.relists: Dict[str, int] = {}
+        self._stores: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, Optional[str]] = {}
+        self._dirty: Dict[str, bool] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def _key(obj: Dict[str, Any]) -> str:
+        metadata = obj.get('metadata', {})
+        return metadata.get('uid') or f"{metadata.get('namespace', '')}/{metadata.get('name', '')}"
+
+    def _list_kind(self, kind: str, budget: float) -> ProbeResult:
+        """List a kind, seed its store and start watching it"""
+        result = super()._list_kind(kind, budget)
+        if not result.ok:
+            return result
+
+        with self._lock:
+            data = self._lists[kind]
+            self._stores[kind] = {self._key(item): item for item in data['items']}
+            self._versions[kind] = data['metadata'].get('resourceVersion')
+            self._dirty[kind] = False
+            self.events.setdefault(kind, 0)
+            start = kind not in self._threads and not self._stopped.is_set()
+            if start:
+                self._threads[kind] = threading.Thread(target=self._watch, args=(kind,),
+                                                       name=f'upid-watch-{kind}', daemon=True)
+        if start:
+            self._threads[kind].start()
+        return result
+
+    def get(self, kind: str) -> Optional[Dict[str, Any]]:
+        """Get the list object for a kind, rebuilt from the store only after changes"""
+        data = super().get(kind)
+        with self._lock:
+            if self._dirty.get(kind):
+                data = {'items': list(self._stores[kind].values()),
+                        'metadata': {'resourceVersion': self._versions[kind]}}
+                self._lists[kind] = data
+                self._dirty[kind] = False
+        return data
+
+    def stop(self) -> None:
+        """Stop watching; threads exit at their next event or watch timeout"""
+        self._stopped.set()
+
+    def _watch(self, kind: str) -> None:
+        """Watch loop for one kind: resume from the last version, relist when it expires"""
+        transform = self.TRANSFORMS.get(kind)
+
+        while not self._stopped.is_set():
+            expired = []
+
+            def consume(stream):
+                for event in iter_watch_events(stream):
+                    if self._stopped.is_set():
+                        raise _WatchInterrupted('stopped')
+                    if not self._apply(kind, event, transform):
+                        expired.append(event)
+                        raise _WatchInterrupted('resource version expired')
+
+            params = self._selector_params(kind)
+            params.update({
+                'watch': 1,
+                'allowWatchBookmarks': 'true',
+                'resourceVersion': self._versions.get(kind) or '',
+                'timeoutSeconds': int(self.watch_timeout),
+            })
+            result = self.backend.stream_list(f'watch:{kind}', self._list_path(kind), params,
+                                              self.watch_timeout + self.timeout, consume)
+            if self._stopped.is_set():
+                return
+            if expired or (not result.ok and self._is_expired(result)):
+                self._relist(kind)
+            elif not result.ok:
+                # Keep serving the last known state while the API server is unreachable
+                with self._lock:
+                    self.errors[f'watch:{kind}'] = result.stderr.strip() or result.status
+                self._stopped.wait(self.RETRY_DELAY)
+
+    def _apply(self, kind: str, event: Dict[str, Any], transform) -> bool:
+        """Apply one watch event to the store; False when the watch must relist"""
+        event_type = event.get('type')
+        obj = event.get('object') or {}
+        version = obj.get('metadata', {}).get('resourceVersion')
+
+        if event_type == 'ERROR':
+            return False
+        with self._lock:
+            if event_type in ('ADDED', 'MODIFIED'):
+                self._stores[kind][self._key(obj)] = transform(obj) if transform else obj
+                self._dirty[kind] = True
+                self.events[kind] += 1
+            elif event_type == 'DELETED':
+                self._stores[kind].pop(self._key(obj), None)
+                self._dirty[kind] = True
+                self.events[kind] += 1
+            if version:
+                self._versions[kind] = version
+            self.errors.pop(f'watch:{kind}', None)
+        return True
+
+    def _relist(self, kind: str) -> None:
+        """Replace a kind's store with a fresh list after its version expired"""
+        result = self._list_kind(kind, self.list_deadline)
+        self.relists[kind] = self.relists.get(kind, 0) + 1
+        if not result.ok:
+            self._stopped.wait(self.RETRY_DELAY)
@@ -6,8 +6,12 @@ import math
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from ..core.config import Config
+from ..core.decaying_histogram import UsageRecommender
 from ..core.utils import calculate_savings, format_zero_pod_recommendation
 
+# Idle spans shorter than a full day may only have missed the busy hours of a daily cycle
+MIN_IDLE_SECONDS = 24 * 3600
+
 class OptimizationService:
     """Service for resource optimization calculations"""
     
@@ -38,6 +42,47 @@ class OptimizationService:
             'recommendations': self._generate_recommendations(cpu_usage, memory_usage)
         }
     
+    def calculate_container_recommendations(self, recommender: UsageRecommender,
+                                            requests: Optional[Dict[tuple, Dict[str, int]]] = None) -> Dict[str, Any]:
+        """Calculate per-container request recommendations from decaying usage histograms (VPA-style)
+
+        Unlike calculate_resource_optimization() this works per container and
+        reads recommendations straight from the histograms `collect` keeps
+        updated. `requests` maps the same keys to current {'cpu', 'memory'}
+        requests (millicores, bytes); containers whose request lies outside
+        the lower and upper bounds are flagged.
+        """
+        requests = requests or {}
+        containers = []
+        for key, recommendation in recommender.recommend().items():
+            current = requests.get(key)
+            action = 'unknown'
+            if current:
+                lower, upper = recommendation['lower_bound'], recommendation['upper_bound']
+                if any(current[metric] > upper[metric] for metric in ('cpu', 'memory')):
+                    action = 'decrease'
+                elif any(current[metric] < lower[metric] for metric in ('cpu', 'memory')):
+                    action = 'increase'
+                else:
+                    action = 'keep'
+            containers.append(dict(recommendation, key=list(key), current=current, action=action))
+        
+        counts = {action: sum(1 for c in containers if c['action'] == action)
+                  for action in ('decrease', 'increase', 'keep', 'unknown')}
+        recommendations = []
+        if counts['decrease']:
+            recommendations.append(f"{counts['decrease']} containers request more than their upper bound; lower them to the target")
+        if counts['increase']:
+            recommendations.append(f"{counts['increase']} containers request less than their lower bound; raise them to the target")
+        if not recommendations:
+            recommendations.append("Container requests are within their recommended bounds")
+        
+        return {
+            'containers': containers,
+            'counts': counts,
+            'recommendations': recommendations
+        }
+    
     def calculate_zero_pod_recommendations(self, pod_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Calculate zero-pod scaling recommendations"""
         recommendations = []
@@ -70,6 +115,37 @@ class OptimizationService:
         
         return recommendations
     
+    def calculate_idle_workload_recommendations(self, workloads: List[Dict[str, Any]],
+                                                min_idle_seconds: int = MIN_IDLE_SECONDS) -> List[Dict[str, Any]]:
+        """Zero-pod scaling recommendations computed locally for workloads idle at least `min_idle_seconds`
+
+        `workloads` are per-workload rollups (namespace, workload 'Kind/name',
+        pods, monthly_cost) of workloads whose stored usage stayed idle, each
+        with the `idle_seconds` its samples actually span; the output has the
+        shape of the API's zero-pod recommendations, with savings as the
+        monthly cost of the workload's requests.
+        """
+        recommendations = []
+        for workload in workloads:
+            kind, name = workload['workload'].split('/', 1)
+            idle_seconds = int(workload.get('idle_seconds', 0))
+            if kind not in ('Deployment', 'StatefulSet') or not workload.get('pods') or idle_seconds < min_idle_seconds:
+                continue
+            recommendations.append({
+                'namespace': workload['namespace'],
+                'deployment': name,
+                'kind': kind,
+                'current_replicas': workload['pods'],
+                'recommended_replicas': 0,
+                'idle_time_seconds': idle_seconds,
+                'idle_time': self._format_duration(idle_seconds),
+                'estimated_savings': workload.get('monthly_cost', 0),
+                'risk_level': self._assess_risk({'namespace': workload['namespace'], 'deployment': name}),
+                'reason': f"{kind} idle for {self._format_duration(idle_seconds)}"
+            })
+        recommendations.sort(key=lambda rec: rec['estimated_savings'], reverse=True)
+        return recommendations
+    
     def calculate_cost_optimization(self, cost_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate cost optimization recommendations"""
         current_cost = cost_data.get('current_cost', 0)